@@ -0,0 +1,79 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.component.benchmark_suite import (BenchmarkSuite, compare_benchmarks,
+                                                                              load_benchmark, save_benchmark)
+import argparse
+import sys
+import pandas as pd
+
+# timings of split, load_data, drift report, fit_transform, resampling, grid search and batch prediction on synthetic
+# framingham shaped datasets (benchmark_config of config.yaml)
+# baseline : python benchmark.py --save-baseline [--sizes 4000,100000] [--cases split,load_data] [--repeats 3]
+# compare  : python benchmark.py --compare [--baseline benchmarks/baseline.json] [--tolerance 0.25] [--output run.json]
+# the compare mode exits with code 1 when a case is slower than its baseline
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark of the training and inference hot paths.")
+    parser.add_argument("--sizes", default=None, help="comma separated dataset sizes, benchmark_config by default")
+    parser.add_argument("--cases", default=None, help="comma separated cases to run, all by default")
+    parser.add_argument("--repeats", type=int, default=None, help="runs of every case on the small datasets, best is kept")
+    parser.add_argument("--max-rows", default=None, help="comma separated case=rows limits added to benchmark_config")
+    parser.add_argument("--baseline", default=None, help="baseline file, benchmark_config by default")
+    parser.add_argument("--save-baseline", action="store_true", help="writes the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="compares the results to the baseline")
+    parser.add_argument("--tolerance", type=float, default=None, help="allowed slowdown share before a regression")
+    parser.add_argument("--output", default=None, help="file the results are written to")
+    return parser
+
+def main() -> int:
+    try:
+        args = get_argument_parser().parse_args()
+        config = Config()
+        benchmark_config = config.get_benchmark_config()
+        if args.sizes is not None:
+            benchmark_config = benchmark_config._replace(sizes=[int(rows) for rows in args.sizes.split(",")])
+        if args.repeats is not None:
+            benchmark_config = benchmark_config._replace(repeats=args.repeats)
+        if args.max_rows is not None:
+            max_rows = dict(benchmark_config.max_rows)
+            for case_limit in args.max_rows.split(","):
+                case, rows = case_limit.split("=")
+                max_rows[case] = int(rows)
+            benchmark_config = benchmark_config._replace(max_rows=max_rows)
+        if args.baseline is not None:
+            benchmark_config = benchmark_config._replace(baseline_file_path=args.baseline)
+        if args.tolerance is not None:
+            benchmark_config = benchmark_config._replace(tolerance=args.tolerance)
+
+        #the baseline is read first so a missing file is reported before the long run
+        baseline = load_benchmark(benchmark_config.baseline_file_path) if args.compare else None
+
+        benchmark_suite = BenchmarkSuite(benchmark_config=benchmark_config, config=config,
+                                         case_list=args.cases.split(",") if args.cases else None)
+        benchmark = benchmark_suite.initiate_benchmark()
+        print(pd.DataFrame(benchmark["results"]).drop(columns=["message"]).to_string(index=False))
+
+        if args.output is not None:
+            print(f"Results saved at [{save_benchmark(file_path=args.output, benchmark=benchmark)}]")
+        if args.save_baseline:
+            print(f"Baseline saved at [{save_benchmark(file_path=benchmark_config.baseline_file_path, benchmark=benchmark)}]")
+
+        exit_code = 0
+        if baseline is not None:
+            if baseline["environment"] != benchmark["environment"]:
+                print(f"Baseline was measured on another environment: {baseline['environment']}")
+            comparison_df = pd.DataFrame(compare_benchmarks(baseline=baseline, current=benchmark,
+                                                            tolerance=benchmark_config.tolerance,
+                                                            min_seconds=benchmark_config.min_seconds))
+            print(comparison_df.to_string(index=False))
+            if len(comparison_df) > 0 and comparison_df["is_regression"].any():
+                print(f"Regressions found: {comparison_df[comparison_df['is_regression']][['case', 'rows']].to_dict('records')}")
+                exit_code = 1
+        logging.info("benchmark completed.")
+        return exit_code
+    except Exception as e:
+        logging.error(f"{e}")
+        print(e)
+        return 1
+
+if __name__=="__main__":
+    sys.exit(main())
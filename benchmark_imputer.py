@@ -0,0 +1,54 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.utils.tree_knn_imputer import TreeKNNImputer, benchmark_imputation
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import read_dataframe, read_yaml_file
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from sklearn.impute import KNNImputer
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# accuracy and runtime of the numerical imputers on the framingham columns, bigger datasets are made by
+# resampling the rows with a small gaussian jitter so that no row has an exact duplicate
+# python benchmark_imputer.py [--input experiment/framingham.csv] [--rows 4238,20000,100000]
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Numerical imputer benchmark.")
+    parser.add_argument("--input", default=os.path.join("experiment", "framingham.csv"), help="csv or parquet file with the numerical columns")
+    parser.add_argument("--rows", default="4238,20000,100000", help="comma separated dataset sizes")
+    parser.add_argument("--mask-fraction", type=float, default=0.1, help="fraction of the complete rows with one hidden value")
+    parser.add_argument("--max-reference-rows", type=int, default=50000, help="reference sample of the tree imputer")
+    parser.add_argument("--knn-max-rows", type=int, default=20000,
+                        help="KNNImputer is quadratic, it is skipped for datasets bigger than this")
+    return parser
+
+def get_dataset(dataframe: pd.DataFrame, rows: int, random_generator: np.random.Generator) -> np.ndarray:
+    X = dataframe.to_numpy(dtype=np.float64)
+    if rows == len(X):
+        return X
+    X = X[random_generator.integers(0, len(X), rows)]
+    return X + random_generator.normal(0.0, 0.05, X.shape) * np.nanstd(X, axis=0)
+
+def main():
+    try:
+        args = get_argument_parser().parse_args()
+        schema_file_path = Config().get_data_validation_config().schema_file_path
+        numerical_columns = read_yaml_file(schema_file_path)[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY]
+        dataframe = read_dataframe(file_path=args.input, columns=numerical_columns)
+        random_generator = np.random.default_rng(42)
+
+        benchmark_list = []
+        for rows in [int(rows) for rows in args.rows.split(",")]:
+            X = get_dataset(dataframe, rows, random_generator)
+            imputer_dict = {"tree_knn": TreeKNNImputer(n_neighbors=5, max_reference_rows=args.max_reference_rows, n_jobs=-1)}
+            if rows <= args.knn_max_rows:
+                imputer_dict["knn"] = KNNImputer(n_neighbors=5)
+            benchmark_list.extend(benchmark_imputation(X, imputer_dict, mask_fraction=args.mask_fraction))
+        print(pd.DataFrame(benchmark_list).to_string(index=False))
+        logging.info("imputer benchmark completed.")
+    except Exception as e:
+        logging.error(f"{e}")
+        print(e)
+
+if __name__=="__main__":
+    main()
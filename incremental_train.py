@@ -0,0 +1,84 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.component.incremental_trainer import IncrementalTrainer, benchmark_incremental_training
+from src.Heart_Attack_Risk_Analyzer_Project.component.data_transformation import DataTransformation
+from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataValidationArtifact
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import load_data, load_object, read_yaml_file
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import GaussianNB
+import argparse
+import json
+import numpy as np
+import pandas as pd
+
+# updating the latest trained model with new labelled patients instead of running the full pipeline
+# update    : python incremental_train.py --input new_patients.csv [--input more_patients.parquet]
+# benchmark : python incremental_train.py --benchmark experiment/framingham.csv [--base-rows 100000] [--batch-rows 1000,10000]
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Incremental training of the heart attack risk model.")
+    parser.add_argument("--input", action="append", help="csv or parquet file of labelled patients, can be repeated")
+    parser.add_argument("--benchmark", help="csv or parquet file used to compare incremental updates with full retrains")
+    parser.add_argument("--base-rows", type=int, default=100000, help="rows the models were trained on before the new batches")
+    parser.add_argument("--batch-rows", default="1000,10000", help="comma separated sizes of the new batches")
+    parser.add_argument("--test-fraction", type=float, default=0.2, help="rows of --benchmark held out for the scores")
+    return parser
+
+def get_batch(dataframe: pd.DataFrame, rows: int, numerical_columns: list, random_generator: np.random.Generator) -> pd.DataFrame:
+    """
+    new patients made by resampling the rows with a small gaussian jitter on the numerical columns
+    """
+    batch_df = dataframe.iloc[random_generator.integers(0, len(dataframe), rows)].reset_index(drop=True)
+    jitter = random_generator.normal(0.0, 0.05, (rows, len(numerical_columns))) * dataframe[numerical_columns].std().to_numpy()
+    batch_df[numerical_columns] = batch_df[numerical_columns].to_numpy(dtype=np.float64) + jitter
+    return batch_df
+
+def run_benchmark(config: Config, file_path: str, base_rows: int, batch_rows_list: list, test_fraction: float):
+    data_validation_config = config.get_data_validation_config()
+    incremental_training_config = config.get_incremental_training_config()
+    schema_file_path = data_validation_config.schema_file_path
+    numerical_columns = read_yaml_file(schema_file_path)[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY]
+
+    dataframe = load_data(file_path=file_path, schema_file_path=schema_file_path)
+    random_generator = np.random.default_rng(42)
+    test_mask = random_generator.random(len(dataframe)) < test_fraction
+    train_df, test_df = dataframe[~test_mask].reset_index(drop=True), dataframe[test_mask].reset_index(drop=True)
+    base_df = get_batch(train_df, base_rows, numerical_columns, random_generator) if base_rows > len(train_df) else train_df
+    batch_df_list = [get_batch(train_df, rows, numerical_columns, random_generator) for rows in batch_rows_list]
+
+    data_transformation = DataTransformation(data_ingestion_artifact=None,
+                                             data_validation_artifact=DataValidationArtifact(
+                                                 *[None] * len(DataValidationArtifact._fields))._replace(schema_file_path=schema_file_path),
+                                             data_transformation_config=config.get_data_transformation_config())
+    #the trained model with its searched parameters, and the two models learning with partial_fit
+    model_list = [GaussianNB(), SGDClassifier(loss="log_loss", random_state=42)]
+    if incremental_training_config.base_trained_model_file_path is not None:
+        model_list.insert(0, load_object(file_path=incremental_training_config.base_trained_model_file_path))
+    return benchmark_incremental_training(base_df=base_df, test_df=test_df, batch_df_list=batch_df_list,
+                                          get_preprocessing_obj=data_transformation.get_data_transformer_object,
+                                          model_list=model_list, schema_file_path=schema_file_path,
+                                          replay_sample_size=incremental_training_config.replay_sample_size,
+                                          resample=incremental_training_config.resample)
+
+def main():
+    try:
+        args = get_argument_parser().parse_args()
+        config = Config()
+
+        if args.input:
+            incremental_trainer = IncrementalTrainer(incremental_training_config=config.get_incremental_training_config(),
+                                                     input_file_path_list=args.input)
+            print(json.dumps(incremental_trainer.initiate_incremental_training()._asdict(), indent=2))
+
+        if args.benchmark is not None:
+            benchmark_list = run_benchmark(config=config, file_path=args.benchmark, base_rows=args.base_rows,
+                                           batch_rows_list=[int(rows) for rows in args.batch_rows.split(",")],
+                                           test_fraction=args.test_fraction)
+            print(pd.DataFrame(benchmark_list).to_string(index=False))
+        logging.info("incremental training completed.")
+    except Exception as e:
+        logging.error(f"{e}")
+        print(e)
+
+if __name__=="__main__":
+    main()
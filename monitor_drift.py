@@ -0,0 +1,84 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.utils.reference_profile import (ReferenceProfile, load_reference_profile,
+                                                                            save_reference_profile)
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import load_data_chunks, read_yaml_file
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+import argparse
+import json
+import os
+
+# drift check of a new batch against the reference profile of the train split, only the batch is read:
+# it is profiled chunk by chunk and its profile is compared to the reference profile
+# check a batch   : python monitor_drift.py --input batch.csv [--reference-profile reference_profile.json]
+# keep a profile  : python monitor_drift.py --input batch.csv --save-profile batch_profile.json
+# update a profile: python monitor_drift.py --input batch.csv --merge-into monitored_profile.json
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Drift monitoring of new batches.")
+    parser.add_argument("--input", required=True, help="csv or parquet file of the new batch")
+    parser.add_argument("--reference-profile", default=None, help="reference profile file, latest pipeline run by default")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="rows profiled at once")
+    parser.add_argument("--drift-share", type=float, default=None, help="share of drifted columns of a dataset drift, "
+                                                                         "data_validation_config by default")
+    parser.add_argument("--save-profile", default=None, help="file the profile of the batch is written to")
+    parser.add_argument("--merge-into", default=None, help="profile file the batch profile is merged into, "
+                                                           "created when it does not exist")
+    return parser
+
+def get_batch_profile(file_path: str, reference_profile: ReferenceProfile, schema_file_path: str,
+                      chunk_size: int) -> ReferenceProfile:
+    schema = read_yaml_file(schema_file_path)
+    batch_profile = None
+    for dataframe in load_data_chunks(file_path=file_path, schema_file_path=schema_file_path, chunk_size=chunk_size):
+        dataframe = dataframe[[column for column in dataframe.columns if column in reference_profile.columns]]
+        chunk_profile = ReferenceProfile.from_dataframe(dataframe=dataframe,
+                                                        numerical_columns=schema[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY],
+                                                        categorical_columns=schema[DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY],
+                                                        max_centroids=reference_profile.max_centroids,
+                                                        column_type_dict=reference_profile.get_column_type_dict())
+        batch_profile = chunk_profile if batch_profile is None else batch_profile.merge(chunk_profile)
+    if batch_profile is None:
+        raise Exception(f"Batch [{file_path}] has no rows")
+    return batch_profile
+
+def main():
+    try:
+        args = get_argument_parser().parse_args()
+        config = Config()
+        data_validation_config = config.get_data_validation_config()
+
+        reference_profile_file_path = args.reference_profile
+        if reference_profile_file_path is None:
+            reference_profile_file_path = config.get_latest_artifact_file_path(
+                DATA_VALIDATION_ARTIFACT_DIR_NAME, os.path.basename(data_validation_config.reference_profile_file_path))
+            if reference_profile_file_path is None:
+                raise Exception("No reference profile found, run the training pipeline or give --reference-profile")
+        reference_profile = load_reference_profile(reference_profile_file_path)
+
+        batch_profile = get_batch_profile(file_path=args.input, reference_profile=reference_profile,
+                                          schema_file_path=data_validation_config.schema_file_path,
+                                          chunk_size=args.chunk_size)
+        drift_share = args.drift_share if args.drift_share is not None else data_validation_config.drift_share
+        drift_result = reference_profile.get_drift_report(current_profile=batch_profile, drift_share=drift_share)["metrics"][1]["result"]
+        print(json.dumps({"reference_profile": reference_profile_file_path,
+                          "batch_rows": batch_profile.rows,
+                          "dataset_drift": drift_result["dataset_drift"],
+                          "share_of_drifted_columns": drift_result["share_of_drifted_columns"],
+                          "drifted_columns": [column for column, column_drift in drift_result["drift_by_columns"].items()
+                                              if column_drift["drift_detected"]]}, indent=2))
+
+        if args.save_profile is not None:
+            save_reference_profile(file_path=args.save_profile, reference_profile=batch_profile)
+        if args.merge_into is not None:
+            if os.path.exists(args.merge_into):
+                batch_profile = load_reference_profile(args.merge_into).merge(batch_profile)
+            save_reference_profile(file_path=args.merge_into, reference_profile=batch_profile)
+            print(f"Profile [{args.merge_into}] holds {batch_profile.rows} rows of {batch_profile.batches} batches "
+                  f"(version {batch_profile.version})")
+        logging.info("drift monitoring completed.")
+    except Exception as e:
+        logging.error(f"{e}")
+        print(e)
+
+if __name__=="__main__":
+    main()
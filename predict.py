@@ -0,0 +1,74 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.component.model_predictor import HeartRiskPredictor
+from src.Heart_Attack_Risk_Analyzer_Project.constant import PREDICTION_DILL_ARTIFACT_FORMAT
+import argparse
+import json
+import numpy as np
+import pandas as pd
+
+# scoring new patients with the latest trained artifacts
+# single patient : python predict.py --record '{"male": 1, "age": 39, ...}'
+# batch file     : python predict.py --input patients.csv --output scored.csv [--chunk-size 50000]
+# benchmark      : python predict.py --benchmark experiment/framingham.csv [--batch-sizes 1,100,10000]
+# kernel speedup : python predict.py --benchmark experiment/framingham.csv --compare-kernel
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Heart attack risk prediction.")
+    parser.add_argument("--record", help="json object with the features of a single patient")
+    parser.add_argument("--input", help="csv or parquet file of patients to score")
+    parser.add_argument("--output", help="csv or parquet file the scored patients are written to")
+    parser.add_argument("--chunk-size", type=int, default=None, help="rows scored at once when streaming a file")
+    parser.add_argument("--benchmark", help="csv or parquet file used to measure latency and throughput per batch size")
+    parser.add_argument("--batch-sizes", default=None, help="comma separated batch sizes for --benchmark")
+    parser.add_argument("--compare-kernel", action="store_true",
+                        help="with --benchmark, also run the sklearn path and report the speedup of the compiled kernel")
+    parser.add_argument("--preprocessor", default=None, help="preprocessing object file, latest pipeline run by default")
+    parser.add_argument("--model", default=None, help="trained model file, latest pipeline run by default")
+    return parser
+
+def main():
+    try:
+        args = get_argument_parser().parse_args()
+
+        prediction_config = Config().get_prediction_config()
+        if args.preprocessor is not None:
+            prediction_config = prediction_config._replace(preprocessed_object_file_path=args.preprocessor,
+                                                           artifact_format=PREDICTION_DILL_ARTIFACT_FORMAT)
+        if args.model is not None:
+            prediction_config = prediction_config._replace(trained_model_file_path=args.model,
+                                                           artifact_format=PREDICTION_DILL_ARTIFACT_FORMAT)
+        predictor = HeartRiskPredictor(prediction_config=prediction_config)
+
+        if args.record is not None:
+            print(json.dumps(predictor.predict_record(json.loads(args.record))))
+
+        if args.input is not None:
+            if args.output is None:
+                raise Exception("--output is required with --input")
+            print(predictor.predict_file(input_file_path=args.input, output_file_path=args.output,
+                                         chunk_size=args.chunk_size))
+
+        if args.benchmark is not None:
+            benchmark_df = next(HeartRiskPredictor.iterate_file_chunks(args.benchmark, chunk_size=prediction_config.chunk_size))
+            batch_size_list = [int(batch_size) for batch_size in args.batch_sizes.split(",")] if args.batch_sizes else None
+            benchmark_result_df = pd.DataFrame(predictor.benchmark(dataframe=benchmark_df, batch_size_list=batch_size_list))
+            if args.compare_kernel:
+                if predictor.kernel is None:
+                    raise Exception("--compare-kernel needs a model the kernel can be compiled for")
+                #the baseline is the plain sklearn path, the dill pickles without the kernel
+                sklearn_predictor = HeartRiskPredictor(prediction_config=prediction_config._replace(
+                    compile_kernel=False, artifact_format=PREDICTION_DILL_ARTIFACT_FORMAT))
+                sklearn_result_df = pd.DataFrame(sklearn_predictor.benchmark(dataframe=benchmark_df, batch_size_list=batch_size_list))
+                benchmark_result_df = benchmark_result_df.merge(sklearn_result_df[["batch_size", "mean_latency_ms", "rows_per_second"]],
+                                                                on="batch_size", suffixes=("", "_sklearn"))
+                benchmark_result_df["speedup"] = benchmark_result_df["mean_latency_ms_sklearn"] / benchmark_result_df["mean_latency_ms"]
+                max_difference = np.abs(predictor.predict_proba(benchmark_df) - sklearn_predictor.predict_proba(benchmark_df)).max()
+                print(f"max probability difference between the compiled kernel and the sklearn path: {max_difference:.3e}")
+            print(benchmark_result_df.to_string(index=False))
+        logging.info("prediction execution completed.")
+    except Exception as e:
+        logging.error(f"{e}")
+        print(e)
+
+if __name__=="__main__":
+    main()
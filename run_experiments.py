@@ -0,0 +1,64 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.pipeline.scheduler import PipelineScheduler
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+import argparse
+import pandas as pd
+
+# several pipeline runs at the same time, each one in its own process with its own artifact dirs and limits
+# run    : python run_experiments.py --config config/config.yaml --config config/other_models.yaml [--n-workers 2]
+#                                    [--memory-mb 4096] [--cpu-seconds 3600] [--timeout-seconds 7200] [--n-threads 1]
+# status : python run_experiments.py --status [--job JOB_ID]
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Runs several training pipelines at the same time.")
+    parser.add_argument("--config", action="append", help="config.yaml of a run, can be repeated")
+    parser.add_argument("--name", action="append", help="name of the run of the --config at the same position")
+    parser.add_argument("--n-workers", type=int, default=None, help="runs executed at the same time, scheduler_config by default")
+    parser.add_argument("--memory-mb", type=int, default=None, help="address space limit of every run")
+    parser.add_argument("--cpu-seconds", type=int, default=None, help="cpu time limit of every run")
+    parser.add_argument("--timeout-seconds", type=int, default=None, help="wall time limit of every run")
+    parser.add_argument("--n-threads", type=int, default=None, help="numpy / sklearn threads of every run")
+    parser.add_argument("--status", action="store_true", help="prints the jobs instead of running")
+    parser.add_argument("--job", default=None, help="with --status, prints this job only")
+    return parser
+
+def get_job_table(job_list: list) -> pd.DataFrame:
+    return pd.DataFrame([{"job_id": job.job_id,
+                          "name": job.name,
+                          "status": job.status,
+                          "time_stamp": job.time_stamp,
+                          "seconds": round(job.stopped_at - job.started_at, 1) if job.stopped_at and job.started_at else None,
+                          "message": job.message} for job in job_list])
+
+def main():
+    try:
+        args = get_argument_parser().parse_args()
+        scheduler_config = Config().get_scheduler_config()
+        if args.n_workers is not None:
+            scheduler_config = scheduler_config._replace(n_workers=args.n_workers)
+        scheduler = PipelineScheduler(scheduler_config=scheduler_config)
+
+        if args.status:
+            if args.job is not None:
+                print(pd.Series(scheduler.get_job(args.job)._asdict()).to_string())
+            else:
+                print(get_job_table(scheduler.list_jobs()).to_string(index=False))
+        else:
+            config_file_path_list = args.config or [CONFIG_FILE_PATH]
+            name_list = args.name or []
+            job_id_list = [scheduler.submit(config_file_path=config_file_path,
+                                            name=name_list[index] if index < len(name_list) else None,
+                                            memory_mb=args.memory_mb, cpu_seconds=args.cpu_seconds,
+                                            timeout_seconds=args.timeout_seconds, n_threads=args.n_threads)
+                           for index, config_file_path in enumerate(config_file_path_list)]
+            print(f"Submitted jobs: {job_id_list}")
+            job_list = scheduler.wait(job_id_list)
+            print(get_job_table(job_list).to_string(index=False))
+        scheduler.shutdown()
+        logging.info("experiments completed.")
+    except Exception as e:
+        logging.error(f"{e}")
+        print(e)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,37 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.component.model_predictor import HeartRiskPredictor
+from src.Heart_Attack_Risk_Analyzer_Project.component.scoring_server import ScoringServer
+import argparse
+import asyncio
+
+# local scoring service with the latest trained artifacts
+# python serve.py [--host 127.0.0.1] [--port 8080] [--max-batch-size 64] [--max-wait-ms 5]
+# curl -X POST localhost:8080/predict -d '{"male": 1, "age": 39, ...}'  and  curl localhost:8080/metrics
+def main():
+    try:
+        parser = argparse.ArgumentParser(description="Heart attack risk scoring server.")
+        parser.add_argument("--host", default=None)
+        parser.add_argument("--port", type=int, default=None)
+        parser.add_argument("--max-batch-size", type=int, default=None)
+        parser.add_argument("--max-wait-ms", type=float, default=None)
+        args = parser.parse_args()
+
+        config = Config()
+        serving_config = config.get_serving_config()
+        overrides = {"host": args.host, "port": args.port, "max_batch_size": args.max_batch_size,
+                     "max_wait_ms": args.max_wait_ms}
+        serving_config = serving_config._replace(**{key: value for key, value in overrides.items() if value is not None})
+
+        predictor = HeartRiskPredictor(prediction_config=config.get_prediction_config())
+        server = ScoringServer(serving_config=serving_config, predictor=predictor)
+        print(f"Scoring server listening on http://{serving_config.host}:{serving_config.port}")
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logging.info("scoring server interrupted.")
+    except Exception as e:
+        logging.error(f"{e}")
+        print(e)
+
+if __name__=="__main__":
+    main()
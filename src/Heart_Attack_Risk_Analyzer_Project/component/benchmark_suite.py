@@ -0,0 +1,399 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import BenchmarkConfig
+from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataValidationArtifact
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.component.data_ingestion import DataIngestion
+from src.Heart_Attack_Risk_Analyzer_Project.component.data_transformation import DataTransformation
+from src.Heart_Attack_Risk_Analyzer_Project.component.model_predictor import HeartRiskPredictor
+from src.Heart_Attack_Risk_Analyzer_Project.entity.model_factory import ModelFactory
+from src.Heart_Attack_Risk_Analyzer_Project.utils.drift_engine import build_drift_reference, get_drift_report
+from src.Heart_Attack_Risk_Analyzer_Project.utils.stage_profiler import StageProfiler
+from src.Heart_Attack_Risk_Analyzer_Project.utils.array_artifact import (save_array_preprocessor, save_array_model,
+                                                                         is_array_model_supported)
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import load_data, read_dataframe, read_yaml_file, save_object
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from sklearn.linear_model import LogisticRegression
+from collections import namedtuple
+from scipy.stats import norm
+import os, sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import numpy as np
+import pandas as pd
+import sklearn
+
+# Benchmark suite:
+# times the training and inference hot paths on synthetic datasets of growing size. The datasets have the columns
+# of the schema and the shape of the source file (framingham.csv): every column keeps the values of the source
+# column with the same frequencies and missing share, and the columns keep their rank correlations (gaussian copula),
+# so the target stays learnable. A dataset only depends on the seed and its size, the runs of two commits time the
+# same rows. Results are saved as a json baseline, a later run is compared to it to find the regressions.
+
+BENCHMARK_FORMAT_VERSION = 1
+GENERATION_CHUNK_ROWS = 1000000
+SPLIT_CASE = "split"
+LOAD_DATA_CASE = "load_data"
+DRIFT_REPORT_CASE = "drift_report"
+FIT_TRANSFORM_CASE = "fit_transform"
+RESAMPLING_CASE = "resampling"
+GRID_SEARCH_CASE = "grid_search"
+BATCH_PREDICTION_CASE = "batch_prediction"
+BENCHMARK_CASE_LIST = [SPLIT_CASE, LOAD_DATA_CASE, DRIFT_REPORT_CASE, FIT_TRANSFORM_CASE, RESAMPLING_CASE,
+                       GRID_SEARCH_CASE, BATCH_PREDICTION_CASE]
+#rows the preprocessing object and the model used by the later cases are fitted on when their own case is skipped
+FALLBACK_FIT_ROWS = 100000
+
+BenchmarkResult = namedtuple("BenchmarkResult", ["case", "rows", "status", "repeats", "wall_seconds",
+                                                 "median_wall_seconds", "cpu_seconds", "peak_rss_bytes",
+                                                 "rows_per_second", "message"])
+
+BenchmarkComparison = namedtuple("BenchmarkComparison", ["case", "rows", "baseline_seconds", "current_seconds",
+                                                         "ratio", "is_regression"])
+
+
+class SyntheticDatasetGenerator:
+    """
+    gaussian copula of the source file, see the top of the module
+    """
+    def __init__(self, source_df: pd.DataFrame, schema: dict):
+        try:
+            self.schema = schema
+            self.columns = list(schema[DATA_VALIDATION_GET_ALL_COLUMNS_KEY].keys())
+            source_df = source_df[self.columns]
+
+            #normal scores of the ranks give the correlation of the copula, missing values do not take part
+            filled_df = source_df.fillna(source_df.median())
+            normal_scores = norm.ppf(filled_df.rank(method="average").to_numpy() / (len(filled_df) + 1))
+            correlation = np.corrcoef(normal_scores, rowvar=False)
+            eigen_values, eigen_vectors = np.linalg.eigh(correlation)
+            self.correlation_factor = eigen_vectors * np.sqrt(np.clip(eigen_values, 0.0, None))
+
+            self.sorted_values = [np.sort(source_df[column].dropna().to_numpy(dtype=np.float64)) for column in self.columns]
+            self.missing_share = source_df.isna().mean().to_numpy()
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def generate_chunk(self, rows: int, random_generator: np.random.Generator) -> pd.DataFrame:
+        normal_sample = random_generator.standard_normal((rows, len(self.columns))) @ self.correlation_factor.T
+        uniform_sample = norm.cdf(normal_sample)
+        column_dict = {}
+        for index, column in enumerate(self.columns):
+            sorted_values = self.sorted_values[index]
+            values = sorted_values[np.minimum((uniform_sample[:, index] * len(sorted_values)).astype(np.int64),
+                                              len(sorted_values) - 1)]
+            if self.missing_share[index] > 0:
+                values[random_generator.random(rows) < self.missing_share[index]] = np.nan
+            column_dict[column] = values
+        return pd.DataFrame(column_dict).astype(self.schema[DATA_VALIDATION_GET_ALL_COLUMNS_KEY])
+
+    def generate(self, rows: int, seed: int) -> pd.DataFrame:
+        """
+        rows of the synthetic dataset, generated in chunks of GENERATION_CHUNK_ROWS with a random generator per chunk
+        so a size always gives the same rows
+        """
+        try:
+            chunk_list = [self.generate_chunk(min(GENERATION_CHUNK_ROWS, rows - start),
+                                              np.random.default_rng([seed, start // GENERATION_CHUNK_ROWS]))
+                          for start in range(0, rows, GENERATION_CHUNK_ROWS)]
+            return pd.concat(chunk_list, ignore_index=True)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+
+def get_environment_info() -> dict:
+    return {"python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count()}
+
+
+def compare_benchmarks(baseline: dict, current: dict, tolerance: float, min_seconds: float) -> list:
+    """
+    compares the cases run in both benchmarks, a case is a regression when its best wall time is above
+    baseline * (1 + tolerance) and more than min_seconds slower (timer noise of the small cases)
+    return: list of BenchmarkComparison
+    """
+    try:
+        baseline_dict = {(result["case"], result["rows"]): result for result in baseline["results"]
+                         if result["status"] == "ok"}
+        comparison_list = []
+        for result in current["results"]:
+            baseline_result = baseline_dict.get((result["case"], result["rows"]), None)
+            if baseline_result is None or result["status"] != "ok":
+                continue
+            baseline_seconds, current_seconds = baseline_result["wall_seconds"], result["wall_seconds"]
+            comparison_list.append(BenchmarkComparison(
+                case=result["case"],
+                rows=result["rows"],
+                baseline_seconds=baseline_seconds,
+                current_seconds=current_seconds,
+                ratio=round(current_seconds / baseline_seconds, 3) if baseline_seconds > 0 else None,
+                is_regression=bool(current_seconds > baseline_seconds * (1 + tolerance)
+                                   and current_seconds - baseline_seconds > min_seconds)))
+        return comparison_list
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def save_benchmark(file_path: str, benchmark: dict) -> str:
+    try:
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        with open(file_path, 'w') as benchmark_file:
+            json.dump(benchmark, benchmark_file, indent=4, default=str)
+        return file_path
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def load_benchmark(file_path: str) -> dict:
+    try:
+        with open(file_path, 'r') as benchmark_file:
+            benchmark = json.load(benchmark_file)
+        if benchmark.get("format_version") != BENCHMARK_FORMAT_VERSION:
+            raise Exception(f"Benchmark format version [{benchmark.get('format_version')}] is not supported, "
+                            f"expected [{BENCHMARK_FORMAT_VERSION}]")
+        return benchmark
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+class BenchmarkSuite:
+    """
+    runs every case of case_list on the synthetic dataset of every size of benchmark_config.sizes.
+    Per size the cases run in pipeline order on the outputs of the previous cases, a case bigger than its
+    max rows is skipped (the later cases then use objects fitted on FALLBACK_FIT_ROWS rows, not timed).
+    A case is run benchmark_config.repeats times on datasets up to repeat_max_rows rows, the best wall time is kept.
+    """
+    def __init__(self, benchmark_config: BenchmarkConfig, config: Config, case_list: list = None):
+        try:
+            logging.info(f"{'='*20}Benchmark suite log started.{'='*20}")
+            self.benchmark_config = benchmark_config
+            self.config = config
+            self.case_list = case_list or BENCHMARK_CASE_LIST
+            unknown_case_list = [case for case in self.case_list if case not in BENCHMARK_CASE_LIST]
+            if len(unknown_case_list) > 0:
+                raise Exception(f"Benchmark cases {unknown_case_list} are not known, use {BENCHMARK_CASE_LIST}")
+            self.data_validation_config = config.get_data_validation_config()
+            self.schema_file_path = self.data_validation_config.schema_file_path
+            self.schema = read_yaml_file(self.schema_file_path)
+            self.target_column = self.schema[DATA_VALIDATION_GET_TARGET_COLUMN_KEY]
+            self.generator = SyntheticDatasetGenerator(source_df=read_dataframe(benchmark_config.source_file_path),
+                                                       schema=self.schema)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_repeats(self, rows: int) -> int:
+        if self.benchmark_config.repeat_max_rows is not None and rows > self.benchmark_config.repeat_max_rows:
+            return 1
+        return max(int(self.benchmark_config.repeats), 1)
+
+    def is_case_skipped(self, case: str, rows: int) -> bool:
+        max_rows = (self.benchmark_config.max_rows or {}).get(case, None)
+        return case not in self.case_list or (max_rows is not None and rows > max_rows)
+
+    def run_case(self, profiler: StageProfiler, case: str, rows: int, case_function) -> tuple:
+        """
+        runs case_function repeats times, a failing case stops the benchmark (the next cases need its output)
+        return: (BenchmarkResult, output of the last run)
+        """
+        repeats = self.get_repeats(rows)
+        record_list = []
+        output = None
+        for _ in range(repeats):
+            with profiler.step(case, rows=rows):
+                output = case_function()
+            record_list.append([record for record in profiler.get_records() if record.path == case][-1])
+        best_record = min(record_list, key=lambda record: record.wall_seconds)
+        result = BenchmarkResult(case=case,
+                                 rows=rows,
+                                 status="ok",
+                                 repeats=repeats,
+                                 wall_seconds=best_record.wall_seconds,
+                                 median_wall_seconds=float(np.median([record.wall_seconds for record in record_list])),
+                                 cpu_seconds=best_record.cpu_seconds,
+                                 peak_rss_bytes=max(record.peak_rss_bytes or 0 for record in record_list),
+                                 rows_per_second=best_record.rows_per_second,
+                                 message=None)
+        logging.info(f"Benchmark result: {result}")
+        return result, output
+
+    @staticmethod
+    def get_skipped_result(case: str, rows: int) -> BenchmarkResult:
+        return BenchmarkResult(case=case, rows=rows, status="skipped", repeats=0, wall_seconds=None,
+                               median_wall_seconds=None, cpu_seconds=None, peak_rss_bytes=None,
+                               rows_per_second=None, message="case not selected or dataset above its max rows")
+
+    def run_size(self, rows: int, work_dir: str) -> list:
+        """
+        generates the dataset of rows rows and runs the cases on it
+        """
+        try:
+            profiler = StageProfiler(sample_interval_seconds=0.01).start()
+            size_dir = os.path.join(work_dir, str(rows))
+            result_list = []
+            try:
+                logging.info(f"Generating the synthetic dataset of [{rows}] rows.")
+                dataframe = self.generator.generate(rows=rows, seed=self.benchmark_config.seed)
+
+                #split: the raw csv is split into the stored train and test files like in the ingestion stage
+                raw_data_dir = os.path.join(size_dir, "raw_data")
+                os.makedirs(raw_data_dir, exist_ok=True)
+                dataframe.to_csv(os.path.join(raw_data_dir, "framingham.csv"), index=False)
+                data_ingestion_config = self.config.get_data_ingestion_config()._replace(
+                    raw_data_dir=raw_data_dir,
+                    ingested_train_dir=os.path.join(size_dir, "ingested_data", "train"),
+                    ingested_test_dir=os.path.join(size_dir, "ingested_data", "test"))
+                data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
+                if self.is_case_skipped(SPLIT_CASE, rows):
+                    result_list.append(self.get_skipped_result(SPLIT_CASE, rows))
+                    data_ingestion_artifact = data_ingestion.split_dataset_as_train_test()
+                else:
+                    result, data_ingestion_artifact = self.run_case(profiler, SPLIT_CASE, rows,
+                                                                    data_ingestion.split_dataset_as_train_test)
+                    result_list.append(result)
+                train_file_path = data_ingestion_artifact.train_file_path
+                test_file_path = data_ingestion_artifact.test_file_path
+                del dataframe, data_ingestion_artifact
+
+                #load_data: reading the stored train split with the schema types
+                load_train = lambda: load_data(file_path=train_file_path, schema_file_path=self.schema_file_path)
+                if self.is_case_skipped(LOAD_DATA_CASE, rows):
+                    result_list.append(self.get_skipped_result(LOAD_DATA_CASE, rows))
+                    train_df = load_train()
+                else:
+                    result, train_df = self.run_case(profiler, LOAD_DATA_CASE, rows, load_train)
+                    result_list.append(result)
+                test_df = load_data(file_path=test_file_path, schema_file_path=self.schema_file_path)
+
+                #drift_report: test split against the train split with the native drift engine
+                if self.is_case_skipped(DRIFT_REPORT_CASE, rows):
+                    result_list.append(self.get_skipped_result(DRIFT_REPORT_CASE, rows))
+                else:
+                    drift_report = lambda: get_drift_report(
+                        drift_reference=build_drift_reference(dataframe=train_df,
+                                                              numerical_columns=self.schema[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY],
+                                                              categorical_columns=self.schema[DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY]),
+                        current_df=test_df, drift_share=self.data_validation_config.drift_share)
+                    result_list.append(self.run_case(profiler, DRIFT_REPORT_CASE, rows, drift_report)[0])
+
+                #fit_transform: the ColumnTransformer of the transformation stage on the train split
+                data_transformation = DataTransformation(
+                    data_ingestion_artifact=None,
+                    data_validation_artifact=DataValidationArtifact(*[None] * len(DataValidationArtifact._fields))._replace(
+                        schema_file_path=self.schema_file_path),
+                    data_transformation_config=self.config.get_data_transformation_config())
+                preprocessing_obj = data_transformation.get_data_transformer_object()
+                if self.is_case_skipped(FIT_TRANSFORM_CASE, rows):
+                    result_list.append(self.get_skipped_result(FIT_TRANSFORM_CASE, rows))
+                    preprocessing_obj.fit(train_df.iloc[:FALLBACK_FIT_ROWS])
+                    transformed_train_arr = preprocessing_obj.transform(train_df)
+                else:
+                    result, transformed_train_arr = self.run_case(profiler, FIT_TRANSFORM_CASE, rows,
+                                                                  lambda: preprocessing_obj.fit_transform(train_df))
+                    result_list.append(result)
+                train_arr = np.c_[transformed_train_arr, train_df[self.target_column].astype(float).to_numpy()]
+                del transformed_train_arr, train_df
+
+                #resampling: class balancing of the transformed train split
+                re_sampling_obj = data_transformation.get_resampling_object()
+                if self.is_case_skipped(RESAMPLING_CASE, rows):
+                    result_list.append(self.get_skipped_result(RESAMPLING_CASE, rows))
+                else:
+                    result, resampled_arr = self.run_case(profiler, RESAMPLING_CASE, rows,
+                                                          lambda: re_sampling_obj.fit_transform(train_arr))
+                    result_list.append(result)
+                    train_arr = resampled_arr
+
+                #grid_search: the parameter search of model.yaml, the best model scores the batch prediction case
+                model = None
+                if self.is_case_skipped(GRID_SEARCH_CASE, rows):
+                    result_list.append(self.get_skipped_result(GRID_SEARCH_CASE, rows))
+                else:
+                    model_factory = ModelFactory(model_config_path=self.config.get_model_trainer_config().model_config_file_path)
+                    grid_search = lambda: model_factory.initiate_best_parameter_search_for_initialized_models(
+                        initialized_model_list=model_factory.get_initialized_model_list(),
+                        input_feature=train_arr[:, :-1], output_feature=train_arr[:, -1])
+                    result, grid_search_best_model_list = self.run_case(profiler, GRID_SEARCH_CASE, rows, grid_search)
+                    result_list.append(result)
+                    if grid_search_best_model_list:
+                        model = max(grid_search_best_model_list, key=lambda best_model: best_model.best_score).best_model
+                if model is None:
+                    model = LogisticRegression().fit(train_arr[:FALLBACK_FIT_ROWS, :-1], train_arr[:FALLBACK_FIT_ROWS, -1])
+                del train_arr
+
+                #batch_prediction: the prediction path (array artifacts, compiled kernel) over the test split by chunks
+                if self.is_case_skipped(BATCH_PREDICTION_CASE, rows):
+                    result_list.append(self.get_skipped_result(BATCH_PREDICTION_CASE, rows))
+                else:
+                    predictor = self.get_predictor(preprocessing_obj=preprocessing_obj, model=model,
+                                                   predictor_dir=os.path.join(size_dir, "predictor"))
+                    chunk_size = predictor.prediction_config.chunk_size
+                    batch_prediction = lambda: [predictor.predict_proba(test_df.iloc[start:start + chunk_size])
+                                                for start in range(0, len(test_df), chunk_size)]
+                    result_list.append(self.run_case(profiler, BATCH_PREDICTION_CASE, rows, batch_prediction)[0])
+            finally:
+                profiler.stop()
+                shutil.rmtree(size_dir, ignore_errors=True)
+            return result_list
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_predictor(self, preprocessing_obj, model, predictor_dir: str) -> HeartRiskPredictor:
+        try:
+            prediction_config = self.config.get_prediction_config()
+            preprocessed_object_file_path = os.path.join(predictor_dir, "preprocessed.pkl")
+            trained_model_file_path = os.path.join(predictor_dir, "model.pkl")
+            save_object(file_path=preprocessed_object_file_path, obj=preprocessing_obj)
+            save_object(file_path=trained_model_file_path, obj=model)
+            preprocessed_array_dir = save_array_preprocessor(artifact_dir=os.path.join(predictor_dir, "preprocessed_array"),
+                                                             preprocessing_obj=preprocessing_obj)
+            model_array_dir = None
+            if is_array_model_supported(model):
+                model_array_dir = save_array_model(artifact_dir=os.path.join(predictor_dir, "model_array"), model=model)
+            return HeartRiskPredictor(prediction_config=prediction_config._replace(
+                preprocessed_object_file_path=preprocessed_object_file_path,
+                trained_model_file_path=trained_model_file_path,
+                preprocessed_array_dir=preprocessed_array_dir,
+                model_array_dir=model_array_dir))
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def initiate_benchmark(self) -> dict:
+        """
+        return: benchmark dict (environment, settings and results), the format of the baseline files
+        """
+        try:
+            work_dir = self.benchmark_config.work_dir
+            temp_dir = None
+            if work_dir is None:
+                temp_dir = work_dir = tempfile.mkdtemp(prefix="heart_risk_benchmark_")
+            started_at = time.time()
+            result_list = []
+            try:
+                for rows in self.benchmark_config.sizes:
+                    result_list.extend(self.run_size(rows=int(rows), work_dir=work_dir))
+            finally:
+                if temp_dir is not None:
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+            return {"format_version": BENCHMARK_FORMAT_VERSION,
+                    "created_at": started_at,
+                    "wall_seconds": round(time.time() - started_at, 3),
+                    "environment": get_environment_info(),
+                    "seed": self.benchmark_config.seed,
+                    "sizes": list(self.benchmark_config.sizes),
+                    "cases": self.case_list,
+                    "results": [result._asdict() for result in result_list]}
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def __del__(self):
+        logging.info(f"{'='*20}Benchmark suite log completed.{'='*20}")
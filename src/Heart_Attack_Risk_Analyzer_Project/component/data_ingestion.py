@@ -2,120 +2,411 @@ from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
 from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
 from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import DataIngestionConfig
 import sys, os
+import json
+import hashlib
 from sklearn.model_selection import StratifiedShuffleSplit
 import pandas as pd
 import numpy as np
-from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import unzip_file
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import arrow_table_to_dataframe, read_yaml_file, save_dataframe
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
 from dotenv import load_dotenv
 from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataIngestionArtifact
+from src.Heart_Attack_Risk_Analyzer_Project.utils.dataset_handle import DatasetHandle
+from src.Heart_Attack_Risk_Analyzer_Project.utils.dataset_source import (DatasetCache, IngestedFile, check_ingested_files,
+                                                                        get_dataset_source, get_zip_member_name,
+                                                                        iter_dataset_file_chunks, iter_dataset_files,
+                                                                        list_dataset_files, read_dataset_file,
+                                                                        read_dataset_files, get_file_sha256, verify_sha256)
+from src.Heart_Attack_Risk_Analyzer_Project.utils.hash_split import hash_split_chunks
+from src.Heart_Attack_Risk_Analyzer_Project.utils.row_index import RowFingerprintIndex
+from src.Heart_Attack_Risk_Analyzer_Project.utils.stage_profiler import profile_step, set_step_info, set_step_rows
+import zipfile
 
+#the kaggle credentials of .env are loaded into the environment, the kaggle source authenticates with them
 load_dotenv()
 
-#this is imported afterwards to import the necessary kaggle credentials into the environment that will be used for authentication on import
-from kaggle.api.kaggle_api_extended import KaggleApi
-
 class DataIngestion:
     def __init__(self, data_ingestion_config:DataIngestionConfig):
         try:
             logging.info(f"{'='*20}Data Ingestion log started...{'='*20}")
             self.data_ingestion_config = data_ingestion_config
+            #file the split reads, set by download_heart_risk_dataset and extract_zip_file. When it stays None
+            #the split reads the single file of raw_data_dir
+            self.dataset_file_path = None
+            self.dataset_sha256 = None
+            self.dataset_name = None
+            self.file_report_file_path = None
+            #row fingerprint index of the earlier batches, opened by split_dataset_as_train_test with deduplication
+            self.row_index = None
+            self.fingerprint_columns = None
+            self.file_sha256_dict = {}
 
         except Exception as e:
             raise HeartRiskException(e, sys)
     
     def download_heart_risk_dataset(self,) -> str:
+        """
+        the dataset file of the configured source, from the dataset cache for the remote sources
+        return: path of the csv or zip file
+        """
         try:
-            #dataset url to download the data using kaggle api
-            dowload_url = self.data_ingestion_config.dataset_url
+            source = get_dataset_source(source_info=self.data_ingestion_config.source_info,
+                                        dataset_url=self.data_ingestion_config.dataset_url,
+                                        file_name=self.data_ingestion_config.zip_file_name)
+            local_dir = source.get_local_dir() if self.data_ingestion_config.multi_file else None
+            if local_dir is not None:
+                #the partitioned files are read in place, each one is checked against the schema when it is read
+                self.dataset_file_path, self.dataset_sha256 = local_dir, None
+            elif source.is_remote:
+                dataset_cache = DatasetCache(cache_dir=self.data_ingestion_config.dataset_cache_dir)
+                self.dataset_file_path, self.dataset_sha256 = dataset_cache.get_file(source)
+            else:
+                self.dataset_file_path = source.get_local_path()
+                self.dataset_sha256 = verify_sha256(file_path=self.dataset_file_path,
+                                                    expected_sha256=source.expected_sha256)
+            self.dataset_name = os.path.splitext(os.path.basename(os.path.normpath(self.dataset_file_path)))[0]
+            logging.info(f"Dataset file available at : [{self.dataset_file_path}] sha256 : [{self.dataset_sha256}]")
+            set_step_info(source=source.get_identity(), sha256=self.dataset_sha256)
+            return self.dataset_file_path
 
-            #folder location to download file
-            zip_data_dir = self.data_ingestion_config.zip_data_dir
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+        
+    def get_dataset_identity(self) -> str:
+        """
+        content identity of the resolved dataset for the stage cache key: the sha256 of the dataset file, or for a
+        directory of files the sha256 of its sorted listing of (relative path, size, sha256) of every file, so a
+        replaced or an added file changes it
+        """
+        try:
+            if self.dataset_file_path is None:
+                self.download_heart_risk_dataset()
+            if not os.path.isdir(self.dataset_file_path):
+                return self.dataset_sha256 or self.get_dataset_file_sha256(self.dataset_file_path)
+            file_info_list = []
+            for dir_path, _, file_name_list in os.walk(self.dataset_file_path):
+                for file_name in file_name_list:
+                    file_path = os.path.join(dir_path, file_name)
+                    file_info_list.append([os.path.relpath(file_path, self.dataset_file_path).replace(os.sep, "/"),
+                                           os.path.getsize(file_path), self.get_dataset_file_sha256(file_path)])
+            listing = json.dumps(sorted(file_info_list))
+            return hashlib.sha256(listing.encode("utf-8")).hexdigest()
+        except Exception as e:
+            raise HeartRiskException(e, sys)
 
-            if os.path.exists(zip_data_dir):
-                os.remove(zip_data_dir)
-            
-            os.makedirs(zip_data_dir, exist_ok=True)
+    def extract_zip_file(self):
+        """
+        with stream_extract the split reads the archive itself, otherwise the archive is extracted once per
+        checksum into the dataset cache and the split reads the extracted file
+        """
+        try:
+            if self.dataset_file_path is None or os.path.isdir(self.dataset_file_path) or \
+                    not zipfile.is_zipfile(self.dataset_file_path):
+                return self.dataset_file_path
+            if self.data_ingestion_config.stream_extract:
+                logging.info(f"Extraction skipped, the dataset is read straight from [{self.dataset_file_path}]")
+                return self.dataset_file_path
 
-            try:
-                logging.info("Dataset source authentication in progress...")
-                api = KaggleApi()
-                api.authenticate()
-                logging.info("Dataset source authentication completed.")
-            except Exception as e:
-                raise HeartRiskException(e, sys)
-            
-            try:
-                logging.info(f"Downloading dataset from : [{dowload_url}] into : [{zip_data_dir}]")
-                api.dataset_download_files(dowload_url, path=zip_data_dir)
-                logging.info(f"Download completed successfully. File available at : [{zip_data_dir}]")
-            except Exception as e:
-                raise HeartRiskException(e, sys)
-            return zip_data_dir
+            dataset_cache = DatasetCache(cache_dir=self.data_ingestion_config.dataset_cache_dir)
+            extracted_dir = dataset_cache.get_extracted_dir(zip_file_path=self.dataset_file_path,
+                                                            sha256=self.dataset_sha256)
+            if self.data_ingestion_config.multi_file:
+                self.dataset_file_path = extracted_dir
+                logging.info(f"Extracted data available at : [{self.dataset_file_path}]")
+                return self.dataset_file_path
+            with zipfile.ZipFile(self.dataset_file_path, 'r') as zip_file:
+                member_name = get_zip_member_name(zip_file=zip_file,
+                                                  member_name=self.data_ingestion_config.source_info.get(DATASET_SOURCE_MEMBER_KEY, None))
+            self.dataset_file_path = os.path.join(extracted_dir, member_name)
+            logging.info(f"Extracted data available at : [{self.dataset_file_path}]")
+            return self.dataset_file_path
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_raw_dataset_file(self) -> tuple:
+        """
+        single file mode: (file path, archive member name or None, file name of the dataset)
+        """
+        try:
+            if self.dataset_file_path is None:
+                raw_data_dir = self.data_ingestion_config.raw_data_dir
+                file_name = os.listdir(raw_data_dir)[0]
+                return os.path.join(raw_data_dir, file_name), None, file_name
 
+            member_name = self.data_ingestion_config.source_info.get(DATASET_SOURCE_MEMBER_KEY, None)
+            if zipfile.is_zipfile(self.dataset_file_path):
+                with zipfile.ZipFile(self.dataset_file_path, 'r') as zip_file:
+                    member_name = get_zip_member_name(zip_file=zip_file, member_name=member_name)
+                return self.dataset_file_path, member_name, os.path.basename(member_name)
+            return self.dataset_file_path, None, os.path.basename(self.dataset_file_path)
         except Exception as e:
             raise HeartRiskException(e, sys)
-        
-    def extract_zip_file(self):
+
+    def get_dataset_file_list(self) -> tuple:
+        """
+        multi file mode: (files of list_dataset_files, file name of the dataset)
+        """
         try:
-            zip_data_dir = self.data_ingestion_config.zip_data_dir
-            raw_data_dir = self.data_ingestion_config.raw_data_dir
+            dataset_path = self.dataset_file_path or self.data_ingestion_config.raw_data_dir
+            file_list = list_dataset_files(file_path=dataset_path, file_pattern=self.data_ingestion_config.file_pattern)
+            logging.info(f"[{len(file_list)}] files matching [{self.data_ingestion_config.file_pattern}] found in [{dataset_path}]")
+            #the splits are named after the directory or archive of the files
+            return file_list, self.dataset_name or os.path.basename(os.path.normpath(dataset_path))
+        except Exception as e:
+            raise HeartRiskException(e, sys)
 
-            if os.path.exists(raw_data_dir):
-                os.remove(raw_data_dir)
-            
-            os.makedirs(raw_data_dir, exist_ok=True)
+    def save_file_report(self, ingested_file_list: list) -> str:
+        """
+        writes the rows and bytes of every file of the multi file mode to the file report
+        """
+        try:
+            file_report_df = pd.DataFrame(ingested_file_list, columns=IngestedFile._fields)
+            os.makedirs(os.path.dirname(self.data_ingestion_config.file_report_file_path), exist_ok=True)
+            file_report_df.to_csv(self.data_ingestion_config.file_report_file_path, index=False)
+            self.file_report_file_path = self.data_ingestion_config.file_report_file_path
+            logging.info(f"Per file report available at : [{self.file_report_file_path}]")
+            set_step_info(files=len(file_report_df), invalid_files=int((~file_report_df["is_valid"]).sum()),
+                          bytes=int(file_report_df["bytes"].fillna(0).sum()))
+            return self.file_report_file_path
+        except Exception as e:
+            raise HeartRiskException(e, sys)
 
-            zip_file_path = os.path.join(self.data_ingestion_config.zip_data_dir,
-                                         self.data_ingestion_config.zip_file_name)
-            try:
-                logging.info(f"Extracting the dataset zip file from : [{zip_file_path}] into : [{self.data_ingestion_config.raw_data_dir}]")
-                unzip_file(zip_file_path=zip_file_path, extract_to=self.data_ingestion_config.raw_data_dir)
-                logging.info(f"Extraction complete. Extracted data available at : [{self.data_ingestion_config.raw_data_dir}]")
-            except Exception as e:
-                raise HeartRiskException(e, sys)
-            
-            return zip_file_path
+    def read_raw_dataset(self) -> tuple:
+        """
+        return: (file name of the dataset, dataframe)
+        """
+        try:
+            if self.data_ingestion_config.multi_file:
+                return self.read_raw_dataset_files()
+            file_path, member_name, file_name = self.get_raw_dataset_file()
+            return file_name, self.drop_duplicate_rows(dataframe=read_dataset_file(file_path=file_path, member_name=member_name),
+                                                       file_path=file_path, member_name=member_name)
         except Exception as e:
             raise HeartRiskException(e, sys)
     
-    def split_dataset_as_train_test(self) -> DataIngestionArtifact:
+    def read_raw_dataset_files(self) -> tuple:
+        """
+        multi file mode: reads every file of the dataset directory or archive matching file_pattern in parallel,
+        checked against the schema, and writes the rows and bytes of every file to the file report
+        return: (file name of the dataset, dataframe)
+        """
+        try:
+            file_list, file_name = self.get_dataset_file_list()
+            table, ingested_file_list = read_dataset_files(file_list=file_list,
+                                                           schema_file_path=self.data_ingestion_config.schema_file_path,
+                                                           n_workers=self.data_ingestion_config.n_workers,
+                                                           skip_invalid_files=self.data_ingestion_config.skip_invalid_files)
+            self.save_file_report(ingested_file_list)
+            dataframe = arrow_table_to_dataframe(table)
+            if self.row_index is None:
+                return file_name, dataframe
+            #the files are concatenated in order, every file is a batch of the row index
+            dataframe_list = []
+            start = 0
+            for ingested_file in ingested_file_list:
+                if ingested_file.rows is None:
+                    continue
+                dataframe_list.append(self.drop_duplicate_rows(dataframe=dataframe.iloc[start:start + ingested_file.rows],
+                                                               file_path=ingested_file.file_path,
+                                                               member_name=ingested_file.member_name))
+                start += ingested_file.rows
+            return file_name, pd.concat(dataframe_list)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def iter_raw_dataset_chunks(self, ingested_file_list: list):
+        """
+        yields the raw dataset as dataframes of at most split chunk_size rows (one per file in multi file mode),
+        the files read in multi file mode are appended to ingested_file_list
+        """
+        try:
+            if not self.data_ingestion_config.multi_file:
+                file_path, member_name, _ = self.get_raw_dataset_file()
+                for chunk_df in iter_dataset_file_chunks(file_path=file_path, member_name=member_name,
+                                                         chunk_size=self.data_ingestion_config.split_info.get(SPLIT_CHUNK_SIZE_KEY, 100000)):
+                    yield self.drop_duplicate_rows(dataframe=chunk_df, file_path=file_path, member_name=member_name)
+                return
+
+            file_list, _ = self.get_dataset_file_list()
+            for ingested_file, table in iter_dataset_files(file_list=file_list,
+                                                          schema_file_path=self.data_ingestion_config.schema_file_path,
+                                                          n_workers=self.data_ingestion_config.n_workers):
+                ingested_file_list.append(ingested_file)
+                check_ingested_files(ingested_file_list=[ingested_file],
+                                     skip_invalid_files=self.data_ingestion_config.skip_invalid_files)
+                if table is not None:
+                    yield self.drop_duplicate_rows(dataframe=arrow_table_to_dataframe(table),
+                                                   file_path=ingested_file.file_path, member_name=ingested_file.member_name)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_dataset_file_sha256(self, file_path: str) -> str:
+        """
+        sha256 of a dataset file, computed once per file
+        """
+        if file_path not in self.file_sha256_dict:
+            if file_path == self.dataset_file_path and self.dataset_sha256 is not None:
+                self.file_sha256_dict[file_path] = self.dataset_sha256
+            else:
+                self.file_sha256_dict[file_path] = get_file_sha256(file_path)
+        return self.file_sha256_dict[file_path]
+
+    def get_batch_key(self, file_path: str, member_name: str = None) -> str:
+        """
+        key of a dataset file in the row index: the name of the source file (its member name in an archive, its
+        path in the dataset directory), a file that grows or is published again stays the same batch
+        """
+        if member_name is not None:
+            return member_name
+        if self.dataset_file_path is not None and os.path.isdir(self.dataset_file_path):
+            return os.path.relpath(file_path, self.dataset_file_path).replace(os.sep, "/")
+        return os.path.basename(file_path)
+
+    def drop_duplicate_rows(self, dataframe: pd.DataFrame, file_path: str, member_name: str = None) -> pd.DataFrame:
+        """
+        the rows of a chunk of a dataset file not ingested from another file of the dataset or earlier in the
+        file, the chunk as it is without deduplication
+        """
+        try:
+            if self.row_index is None:
+                return dataframe
+            return self.row_index.drop_duplicates(dataframe=dataframe,
+                                                  batch_key=self.get_batch_key(file_path=file_path, member_name=member_name),
+                                                  fingerprint_columns=self.fingerprint_columns)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_split_file_paths(self, file_name: str) -> tuple:
+        """
+        (train file path, test file path) of the splits of the dataset file_name
+        """
+        #the splits keep the column types of the raw file, in parquet they are stored with the data
+        if self.data_ingestion_config.storage_format == PARQUET_STORAGE_FORMAT:
+            split_file_name = os.path.splitext(file_name)[0] + PARQUET_FILE_EXTENSION
+        else:
+            split_file_name = os.path.splitext(file_name)[0] + CSV_FILE_EXTENSION
+
+        return (os.path.join(self.data_ingestion_config.ingested_train_dir, split_file_name),
+                os.path.join(self.data_ingestion_config.ingested_test_dir, split_file_name))
+
+    def hash_split_dataset(self) -> DataIngestionArtifact:
+        """
+        streaming split: every row is assigned by a hash of its id or feature columns (utils/hash_split.py) while
+        the dataset is read in chunks, the splits are written chunk by chunk and loaded by the next stages
+        """
         try:
-            raw_data_dir = self.data_ingestion_config.raw_data_dir
+            split_info = self.data_ingestion_config.split_info
+            schema = read_yaml_file(self.data_ingestion_config.schema_file_path)
+            target_column = schema[DATA_VALIDATION_GET_TARGET_COLUMN_KEY]
+            id_column = split_info.get(SPLIT_ID_COLUMN_KEY, None)
+            if self.data_ingestion_config.multi_file:
+                file_name = self.get_dataset_file_list()[1]
+            else:
+                file_name = self.get_raw_dataset_file()[2]
+            train_file_path, test_file_path = self.get_split_file_paths(file_name)
+
+            logging.info(f"Hash splitting the dataset into train and test on [{id_column or 'the feature columns'}].")
+            ingested_file_list = []
+            hash_split_report = hash_split_chunks(chunk_iterator=self.iter_raw_dataset_chunks(ingested_file_list),
+                                                  train_file_path=train_file_path,
+                                                  test_file_path=test_file_path,
+                                                  target_column=target_column,
+                                                  test_size=split_info.get(SPLIT_TEST_SIZE_KEY, 0.2),
+                                                  hash_columns=[id_column] if id_column is not None else None,
+                                                  seed=split_info.get(SPLIT_SEED_KEY, 0),
+                                                  column_dtypes=schema[DATA_VALIDATION_GET_ALL_COLUMNS_KEY])
+            if self.data_ingestion_config.multi_file:
+                self.save_file_report(ingested_file_list)
+            set_step_rows(hash_split_report.rows)
+            set_step_info(test_share=hash_split_report.test_share)
 
-            file_name = os.listdir(raw_data_dir)[0]
+            logging.info(f"Splitting completed. Datasets are available at train : [{train_file_path}] and test : [{test_file_path}]")
+            data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path,
+                                                            test_file_path=test_file_path,
+                                                            is_ingested=True,
+                                                            message="Data Ingestion completed successfully",
+                                                            train_dataset=DatasetHandle(file_path=train_file_path),
+                                                            test_dataset=DatasetHandle(file_path=test_file_path),
+                                                            file_report_file_path=self.file_report_file_path)
+            logging.info(f"DataIngestionArtifact generated : [{data_ingestion_artifact}]")
+            return data_ingestion_artifact
+        except Exception as e:
+            raise HeartRiskException(e, sys)
 
-            dataset_file_path = os.path.join(raw_data_dir, file_name)
+    def split_dataset_as_train_test(self) -> DataIngestionArtifact:
+        """
+        splits with the configured method, with deduplication the rows of the earlier batches are dropped on the
+        way and the fingerprints of the new batches are added to the row index once the splits are written
+        """
+        try:
+            deduplication_info = self.data_ingestion_config.deduplication_info
+            if deduplication_info.get(DEDUPLICATION_ENABLED_KEY, False):
+                schema = read_yaml_file(self.data_ingestion_config.schema_file_path)
+                self.fingerprint_columns = list(schema[DATA_VALIDATION_GET_ALL_COLUMNS_KEY])
+                self.row_index = RowFingerprintIndex(index_dir=self.data_ingestion_config.row_index_dir).open()
+                if self.data_ingestion_config.multi_file:
+                    file_list = self.get_dataset_file_list()[0]
+                else:
+                    file_list = [self.get_raw_dataset_file()[:2]]
+                self.row_index.set_active_batches([self.get_batch_key(file_path=file_path, member_name=member_name)
+                                                   for file_path, member_name in file_list])
+            try:
+                if self.data_ingestion_config.split_info.get(SPLIT_METHOD_KEY, SHUFFLE_SPLIT_METHOD) == HASH_SPLIT_METHOD:
+                    data_ingestion_artifact = self.hash_split_dataset()
+                else:
+                    data_ingestion_artifact = self.shuffle_split_dataset()
+            except Exception:
+                if self.row_index is not None:
+                    self.row_index.close()
+                raise
+
+            if self.row_index is not None:
+                duplicate_rows = self.row_index.commit()
+                logging.info(f"Duplicate rows dropped per batch: {duplicate_rows}")
+                set_step_info(duplicate_rows=int(sum(duplicate_rows.values())))
+            return data_ingestion_artifact
+        except Exception as e:
+            raise HeartRiskException(e, sys)
 
-            heart_data_frame = pd.read_csv(dataset_file_path)
+    def shuffle_split_dataset(self) -> DataIngestionArtifact:
+        """
+        StratifiedShuffleSplit of the whole dataset in memory
+        """
+        try:
+            split_info = self.data_ingestion_config.split_info
+            file_name, heart_data_frame = self.read_raw_dataset()
+            heart_data_frame = heart_data_frame.reset_index(drop=True)
+            set_step_rows(len(heart_data_frame))
 
             strat_train_set = None
             strat_test_set = None
 
-            split = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+            split = StratifiedShuffleSplit(n_splits=1, test_size=split_info.get(SPLIT_TEST_SIZE_KEY, 0.2),
+                                           random_state=split_info.get(SPLIT_SEED_KEY, 42))
 
             logging.info("Spliting the dataset into train and test.")
             for train_index, test_index in split.split(heart_data_frame.drop(['TenYearCHD'], axis=1), heart_data_frame['TenYearCHD']):
                 strat_train_set = heart_data_frame.loc[train_index]
                 strat_test_set = heart_data_frame.loc[test_index]
             
-            train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir,
-                                           file_name)
-            test_file_path = os.path.join(self.data_ingestion_config.ingested_test_dir,
-                                          file_name)
+            train_file_path, test_file_path = self.get_split_file_paths(file_name)
             
             logging.info(f"Splitting completed. Datasets are available at train : [{train_file_path}] and test : [{test_file_path}]")
             if strat_train_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_train_dir, exist_ok=True)
-                strat_train_set.to_csv(train_file_path, index=False)
+                save_dataframe(file_path=train_file_path, dataframe=strat_train_set)
             
             if strat_test_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_test_dir, exist_ok=True)
-                strat_test_set.to_csv(test_file_path, index=False)
+                save_dataframe(file_path=test_file_path, dataframe=strat_test_set)
             
             data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path,
                                                             test_file_path=test_file_path,
                                                             is_ingested=True,
-                                                            message="Data Ingestion completed successfully")
+                                                            message="Data Ingestion completed successfully",
+                                                            train_dataset=DatasetHandle(file_path=train_file_path,
+                                                                                        dataframe=strat_train_set.reset_index(drop=True)),
+                                                            test_dataset=DatasetHandle(file_path=test_file_path,
+                                                                                       dataframe=strat_test_set.reset_index(drop=True)),
+                                                            file_report_file_path=self.file_report_file_path)
             logging.info(f"DataIngestionArtifact generated : [{data_ingestion_artifact}]")
             return data_ingestion_artifact
         except Exception as e:
@@ -123,9 +414,14 @@ class DataIngestion:
         
     def initiate_data_ingestion(self) ->DataIngestionArtifact:
         try:
-            zip_data_dir = self.download_heart_risk_dataset()
-            self.extract_zip_file()
-            return self.split_dataset_as_train_test()
+            with profile_step("download"):
+                #already resolved when the pipeline asked for the dataset identity
+                if self.dataset_file_path is None:
+                    self.download_heart_risk_dataset()
+            with profile_step("unzip"):
+                self.extract_zip_file()
+            with profile_step("split"):
+                return self.split_dataset_as_train_test()
         except Exception as e:
             raise HeartRiskException(e, sys)
     
@@ -3,40 +3,136 @@ from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
 from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact
 from src.Heart_Attack_Risk_Analyzer_Project.config.config import DataTransformationConfig
 import os,sys
+from collections import Counter
 import pandas as pd
 import numpy as np
 from sklearn.pipeline import Pipeline
 from sklearn.impute import KNNImputer, SimpleImputer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from imblearn.over_sampling import SMOTE, ADASYN
+from sklearn.neighbors import NearestNeighbors
 from sklearn.compose import ColumnTransformer
+from sklearn import config_context
 from sklearn.base import BaseEstimator, TransformerMixin
-from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import load_data, read_yaml_file, save_numpy_array_data, save_object
-from src.Heart_Attack_Risk_Analyzer_Project.constant import DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY, DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY, DATA_VALIDATION_GET_TARGET_COLUMN_KEY
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import count_rows, load_data_chunks, read_yaml_file, save_numpy_array_data, save_object
+from src.Heart_Attack_Risk_Analyzer_Project.utils.array_artifact import save_array_preprocessor
+from src.Heart_Attack_Risk_Analyzer_Project.utils.tree_knn_imputer import TreeKNNImputer
+from src.Heart_Attack_Risk_Analyzer_Project.utils.knn_imputer import ReferenceKNNImputer
+from src.Heart_Attack_Risk_Analyzer_Project.utils.dataset_handle import get_dataset_handle
+from src.Heart_Attack_Risk_Analyzer_Project.utils.stage_profiler import profile_step, set_step_rows
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+
+STREAMING_WORKING_MEMORY_MB = 64
+RESAMPLING_BLOCK_ROWS = 100000
+#the chunked brute force search is several times faster than a kd tree on the ~25 transformed columns
+RESAMPLING_NEIGHBORS_ALGORITHM = "brute"
 
 
 class ReSampling(BaseEstimator, TransformerMixin):
-    def __init__(self, TenYearCHD=15):
+    """
+    oversampling of the minority class of a training array, the target is the column target_column_index.
+    strategy: smote (new rows spread evenly over the minority rows), adasyn (more new rows around the minority rows
+    with majority neighbours), smote_adasyn (half of the new rows each way) or none
+    sampling_ratio: minority rows / majority rows after resampling
+    A new row is a random point between a minority row and one of its k_neighbors nearest minority rows. The minority
+    neighbours are searched once in one NearestNeighbors index used by both strategies (adasyn also queries an index
+    of all the rows for its weights), the queries run on n_jobs workers. The output is allocated once: the rows of
+    the input followed by the new rows written in place.
+    The new rows are only made by fit_transform on the training array, transform returns its input unchanged so
+    the test array is never resampled.
+    """
+    def __init__(self, strategy: str = SMOTE_RESAMPLING_STRATEGY, sampling_ratio: float = 1.0,
+                 k_neighbors: int = 5, n_jobs: int = None, random_state: int = None, target_column_index: int = -1):
+        self.strategy = strategy
+        self.sampling_ratio = sampling_ratio
+        self.k_neighbors = k_neighbors
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.target_column_index = target_column_index
+
+    def fit(self, X, y=None):
         try:
-            self.TenYearCHD = TenYearCHD
+            if self.strategy not in [SMOTE_RESAMPLING_STRATEGY, ADASYN_RESAMPLING_STRATEGY,
+                                     SMOTE_ADASYN_RESAMPLING_STRATEGY, NO_RESAMPLING_STRATEGY]:
+                raise Exception(f"Resampling strategy [{self.strategy}] is not supported, use "
+                                f"[{SMOTE_RESAMPLING_STRATEGY}], [{ADASYN_RESAMPLING_STRATEGY}], "
+                                f"[{SMOTE_ADASYN_RESAMPLING_STRATEGY}] or [{NO_RESAMPLING_STRATEGY}]")
+            return self
         except Exception as e:
             raise HeartRiskException(e, sys)
-    
-    def fit(self, X, y=None):
-        return self
-    
+
     def transform(self, X, y=None):
+        return X
+
+    def fit_transform(self, X, y=None):
+        return self.fit(X).resample(X)
+
+    def get_adasyn_weights(self, features: np.ndarray, is_minority: np.ndarray, minority_features: np.ndarray,
+                           n_neighbors: int) -> np.ndarray:
+        """
+        share of majority rows among the neighbours of every minority row, normalised to a distribution
+        """
+        index = NearestNeighbors(n_neighbors=n_neighbors + 1, algorithm=RESAMPLING_NEIGHBORS_ALGORITHM,
+                                 n_jobs=self.n_jobs).fit(features)
+        neighbors = index.kneighbors(minority_features, return_distance=False)[:, 1:]
+        weights = (~is_minority[neighbors]).mean(axis=1)
+        if weights.sum() == 0:
+            logging.info("No minority row has majority neighbours, adasyn rows are spread evenly.")
+            return np.full(len(minority_features), 1.0 / len(minority_features))
+        return weights / weights.sum()
+
+    def resample(self, X: np.ndarray) -> np.ndarray:
         try:
-            smote_obj = SMOTE()
-            adasyn_obj = ADASYN()
+            X = np.asarray(X, dtype=np.float64)
+            target_column_index = self.target_column_index % X.shape[1]
+            y = X[:, target_column_index]
+            classes, class_counts = np.unique(y, return_counts=True)
+            if self.strategy == NO_RESAMPLING_STRATEGY or len(classes) < 2:
+                return X
+            minority_class = classes[np.argmin(class_counts)]
+            n_synthetic = int(self.sampling_ratio * class_counts.max()) - class_counts.min()
+            n_neighbors = min(self.k_neighbors, class_counts.min() - 1)
+            if n_synthetic <= 0 or n_neighbors < 1:
+                logging.info(f"No rows resampled: [{n_synthetic}] rows to make from [{class_counts.min()}] minority rows.")
+                return X
 
-            y = X[:, self.TenYearCHD]
-            X = np.delete(X, self.TenYearCHD, axis=1)
+            #a view of the features when the target is the last column
+            if target_column_index == X.shape[1] - 1:
+                features = X[:, :-1]
+            else:
+                features = np.delete(X, target_column_index, axis=1)
+            is_minority = y == minority_class
+            minority_features = features[is_minority]
+            minority_index = NearestNeighbors(n_neighbors=n_neighbors + 1, algorithm=RESAMPLING_NEIGHBORS_ALGORITHM,
+                                              n_jobs=self.n_jobs).fit(minority_features)
+            minority_neighbors = minority_index.kneighbors(minority_features, return_distance=False)[:, 1:]
 
-            X, y = smote_obj.fit_resample(X, y)
-            X, y = adasyn_obj.fit_resample(X, y)
-            generated_data = np.c_[X, y]
-            return generated_data
+            random_generator = np.random.default_rng(self.random_state)
+            smote_rows = {SMOTE_RESAMPLING_STRATEGY: n_synthetic, ADASYN_RESAMPLING_STRATEGY: 0,
+                          SMOTE_ADASYN_RESAMPLING_STRATEGY: n_synthetic // 2}[self.strategy]
+            base_rows = random_generator.integers(0, len(minority_features), smote_rows)
+            if n_synthetic > smote_rows:
+                adasyn_weights = self.get_adasyn_weights(features=features, is_minority=is_minority,
+                                                         minority_features=minority_features, n_neighbors=n_neighbors)
+                adasyn_counts = random_generator.multinomial(n_synthetic - smote_rows, adasyn_weights)
+                base_rows = np.concatenate([base_rows, np.repeat(np.arange(len(minority_features)), adasyn_counts)])
+            neighbor_rows = minority_neighbors[base_rows, random_generator.integers(0, n_neighbors, n_synthetic)]
+            gaps = random_generator.random(n_synthetic)
+
+            feature_columns = np.delete(np.arange(X.shape[1]), target_column_index)
+            resampled_arr = np.empty((len(X) + n_synthetic, X.shape[1]), dtype=np.float64)
+            resampled_arr[:len(X)] = X
+            resampled_arr[len(X):, target_column_index] = minority_class
+            #new rows in blocks so the temporary arrays stay small
+            for start in range(0, n_synthetic, RESAMPLING_BLOCK_ROWS):
+                block = slice(start, start + RESAMPLING_BLOCK_ROWS)
+                base_features = minority_features[base_rows[block]]
+                block_features = base_features + gaps[block, None] * (minority_features[neighbor_rows[block]] - base_features)
+                if target_column_index == X.shape[1] - 1:
+                    resampled_arr[len(X) + start:len(X) + start + len(block_features), :-1] = block_features
+                else:
+                    resampled_arr[len(X) + start:len(X) + start + len(block_features), feature_columns] = block_features
+            logging.info(f"[{n_synthetic}] [{self.strategy}] rows of class [{minority_class}] added to [{len(X)}] rows.")
+            return resampled_arr
         except Exception as e:
             raise HeartRiskException(e, sys)
 
@@ -51,7 +147,43 @@ class DataTransformation:
         except Exception as e:
             raise HeartRiskException(e, sys)
     
-    def get_data_transformer_object(self) -> ColumnTransformer:
+    def get_numerical_imputer(self):
+        """
+        returns the imputer of the numerical columns selected by numerical_imputer in config.yaml
+        """
+        try:
+            numerical_imputer_info = self.data_transformation_config.numerical_imputer_info
+            engine = numerical_imputer_info.get(NUMERICAL_IMPUTER_ENGINE_KEY, KNN_IMPUTER_ENGINE)
+            n_neighbors = numerical_imputer_info.get(NUMERICAL_IMPUTER_N_NEIGHBORS_KEY, 5)
+            if engine == TREE_KNN_IMPUTER_ENGINE:
+                return TreeKNNImputer(n_neighbors=n_neighbors,
+                                      max_reference_rows=numerical_imputer_info.get(NUMERICAL_IMPUTER_MAX_REFERENCE_ROWS_KEY, None),
+                                      n_jobs=numerical_imputer_info.get(NUMERICAL_IMPUTER_N_JOBS_KEY, None))
+            if engine == KNN_IMPUTER_ENGINE:
+                return ReferenceKNNImputer(n_neighbors=n_neighbors)
+            raise Exception(f"Numerical imputer engine [{engine}] is not supported, use "
+                            f"[{TREE_KNN_IMPUTER_ENGINE}] or [{KNN_IMPUTER_ENGINE}]")
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_resampling_object(self) -> ReSampling:
+        """
+        returns the resampling of the training array selected by resampling in config.yaml
+        """
+        try:
+            resampling_info = self.data_transformation_config.resampling_info
+            return ReSampling(strategy=resampling_info.get(RESAMPLING_STRATEGY_KEY, SMOTE_RESAMPLING_STRATEGY),
+                              sampling_ratio=resampling_info.get(RESAMPLING_SAMPLING_RATIO_KEY, 1.0),
+                              k_neighbors=resampling_info.get(RESAMPLING_K_NEIGHBORS_KEY, 5),
+                              n_jobs=resampling_info.get(RESAMPLING_N_JOBS_KEY, None),
+                              random_state=resampling_info.get(RESAMPLING_RANDOM_STATE_KEY, None))
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_data_transformer_object(self, categories: list = None) -> ColumnTransformer:
+        """
+        categories: list of the categories of every categorical column, found from the data when not given
+        """
         try:
             schema_file_path = self.data_validation_artifact.schema_file_path
 
@@ -69,13 +201,13 @@ class DataTransformation:
             # ])
 
             num_pipeline = Pipeline(steps=[
-                ("imputer", KNNImputer(n_neighbors=5)),
+                ("imputer", self.get_numerical_imputer()),
                 ('scaler', StandardScaler())
             ])
 
             cat_pipeline = Pipeline(steps=[
                 ('imputer', SimpleImputer(strategy="most_frequent")),
-                ('one_hot_encoder', OneHotEncoder())
+                ('one_hot_encoder', OneHotEncoder(handle_unknown="ignore", categories=categories or "auto"))
             ])
 
             preprocessing = ColumnTransformer([
@@ -87,8 +219,186 @@ class DataTransformation:
         except Exception as e:
             raise HeartRiskException(e, sys)
     
+    def get_streaming_statistics(self, file_path: str, schema_file_path: str):
+        """
+        first pass over the training file: number of rows, count of every category and a uniform sample of
+        at most knn_reference_sample_size rows (reservoir sampling with random keys), memory is bounded by
+        the chunk size and the sample size
+        return: rows, {column: Counter of categories}, sampled dataframe
+        """
+        try:
+            dataset_schema = read_yaml_file(config_file_path=schema_file_path)
+            categorical_columns = dataset_schema[DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY]
+            sample_size = self.data_transformation_config.knn_reference_sample_size
+
+            random_generator = np.random.default_rng(42)
+            rows = 0
+            category_counts = {column: Counter() for column in categorical_columns}
+            sample_df, sample_keys = None, np.empty(0)
+            for chunk_df in load_data_chunks(file_path=file_path, schema_file_path=schema_file_path,
+                                             chunk_size=self.data_transformation_config.chunk_size):
+                rows += len(chunk_df)
+                for column in categorical_columns:
+                    category_counts[column].update(chunk_df[column].dropna().value_counts().to_dict())
+
+                chunk_keys = random_generator.random(len(chunk_df))
+                sample_df = chunk_df if sample_df is None else pd.concat([sample_df, chunk_df], ignore_index=True)
+                sample_keys = np.concatenate([sample_keys, chunk_keys])
+                if len(sample_keys) > sample_size:
+                    keep_index = np.sort(np.argpartition(sample_keys, sample_size)[:sample_size])
+                    sample_df = sample_df.iloc[keep_index].reset_index(drop=True)
+                    sample_keys = sample_keys[keep_index]
+            return rows, category_counts, sample_df
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def fit_transform_to_memmap(self, file_path: str, schema_file_path: str, target_column_name: str,
+                                transformed_file_path: str) -> ColumnTransformer:
+        """
+        fits the preprocessing object and transforms the training file without loading it in memory:
+        the one hot categories and the most frequent values come from the counts of the whole file,
+        the KNN imputer reference data is a uniform sample of the rows and the scaler is fitted incrementally.
+        The imputed but unscaled chunks are written first, the scaler is fitted with partial_fit over the written
+        rows and the scaled values are set in place, so every row goes through the KNN imputer only once.
+        return: fitted preprocessing object
+        """
+        try:
+            rows, category_counts, sample_df = self.get_streaming_statistics(file_path=file_path,
+                                                                             schema_file_path=schema_file_path)
+            logging.info(f"Training file has [{rows}] rows, [{len(sample_df)}] rows sampled as KNN imputer reference data.")
+
+            categorical_columns = list(category_counts.keys())
+            categories = [sorted(category_counts[column].keys()) for column in categorical_columns]
+            preprocessing_obj = self.get_data_transformer_object(categories=categories)
+            preprocessing_obj.fit(sample_df)
+
+            #most frequent value of the whole file, ties go to the smallest value as in SimpleImputer
+            cat_imputer = preprocessing_obj.named_transformers_['cat_pipeline'].named_steps['imputer']
+            cat_imputer.statistics_ = np.array([min(counts, key=lambda value: (-counts[value], value))
+                                                for counts in category_counts.values()], dtype=object)
+
+            num_pipeline = preprocessing_obj.named_transformers_['num_pipeline']
+            scaler_step_name = num_pipeline.steps[-1][0]
+            num_pipeline.steps[-1] = (scaler_step_name, "passthrough")
+            self.transform_to_memmap(preprocessing_obj=preprocessing_obj, file_path=file_path,
+                                     schema_file_path=schema_file_path, target_column_name=target_column_name,
+                                     transformed_file_path=transformed_file_path, rows=rows)
+
+            chunk_size = self.data_transformation_config.chunk_size
+            num_output_slice = preprocessing_obj.output_indices_['num_pipeline']
+            transformed_arr = np.load(transformed_file_path, mmap_mode='r+')
+            scaler = StandardScaler()
+            for start in range(0, rows, chunk_size):
+                scaler.partial_fit(transformed_arr[start:start + chunk_size, num_output_slice])
+            for start in range(0, rows, chunk_size):
+                transformed_arr[start:start + chunk_size, num_output_slice] = scaler.transform(
+                    transformed_arr[start:start + chunk_size, num_output_slice])
+            transformed_arr.flush()
+            del transformed_arr
+            num_pipeline.steps[-1] = (scaler_step_name, scaler)
+            return preprocessing_obj
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def transform_to_memmap(self, preprocessing_obj: ColumnTransformer, file_path: str, schema_file_path: str,
+                            target_column_name: str, transformed_file_path: str, rows: int = None) -> str:
+        """
+        transforms the file chunk by chunk into a preallocated memory mapped .npy file,
+        the target is kept as the last column like in the in memory transformation
+        rows: number of rows of the file, counted with an extra pass when not given
+        """
+        try:
+            if rows is None:
+                rows = count_rows(file_path=file_path, chunk_size=self.data_transformation_config.chunk_size)
+            os.makedirs(os.path.dirname(transformed_file_path), exist_ok=True)
+            transformed_arr = None
+            start = 0
+            for chunk_df in load_data_chunks(file_path=file_path, schema_file_path=schema_file_path,
+                                             chunk_size=self.data_transformation_config.chunk_size):
+                chunk_arr = preprocessing_obj.transform(chunk_df)
+                if hasattr(chunk_arr, "toarray"):
+                    chunk_arr = chunk_arr.toarray()
+                if transformed_arr is None:
+                    transformed_arr = np.lib.format.open_memmap(transformed_file_path, mode='w+', dtype=np.float64,
+                                                                shape=(rows, chunk_arr.shape[1] + 1))
+                transformed_arr[start:start + len(chunk_df), :-1] = chunk_arr
+                transformed_arr[start:start + len(chunk_df), -1] = chunk_df[target_column_name].astype(float).to_numpy()
+                start += len(chunk_df)
+            if transformed_arr is None:
+                raise Exception(f"No rows found in [{file_path}]")
+            transformed_arr.flush()
+            del transformed_arr
+            set_step_rows(start)
+            logging.info(f"[{start}] transformed rows written at [{transformed_file_path}]")
+            return transformed_file_path
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def initiate_streaming_data_transformation(self) -> DataTransformationArtifact:
+        """
+        out of core version of initiate_data_transformation, the resampling is not applied because its neighbour
+        search needs the whole training array in memory
+        """
+        try:
+            train_file_path = self.data_ingestion_artifact.train_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
+            schema_file_path = self.data_validation_artifact.schema_file_path
+            target_column_name = read_yaml_file(config_file_path=schema_file_path)[DATA_VALIDATION_GET_TARGET_COLUMN_KEY]
+
+            transformed_train_file_path = os.path.join(self.data_transformation_config.transformed_train_dir,
+                                                       os.path.splitext(os.path.basename(train_file_path))[0] + ".npy")
+            transformed_test_file_path = os.path.join(self.data_transformation_config.transformed_test_dir,
+                                                      os.path.splitext(os.path.basename(test_file_path))[0] + ".npy")
+
+            #the KNN imputer distance blocks are kept small so memory is bounded by the chunk size
+            with config_context(working_memory=STREAMING_WORKING_MEMORY_MB):
+                logging.info(f"Fitting preprocessing object and transforming the training file over chunks of "
+                             f"[{self.data_transformation_config.chunk_size}] rows, resampling is skipped in streaming mode.")
+                with profile_step("streaming_fit_transform"):
+                    preprocessing_obj = self.fit_transform_to_memmap(file_path=train_file_path, schema_file_path=schema_file_path,
+                                                                     target_column_name=target_column_name,
+                                                                     transformed_file_path=transformed_train_file_path)
+
+                logging.info(f"Transforming testing file chunk by chunk.")
+                with profile_step("streaming_transform"):
+                    self.transform_to_memmap(preprocessing_obj=preprocessing_obj, file_path=test_file_path,
+                                             schema_file_path=schema_file_path, target_column_name=target_column_name,
+                                             transformed_file_path=transformed_test_file_path)
+            return self.save_preprocessing_object(preprocessing_obj=preprocessing_obj,
+                                                  transformed_train_file_path=transformed_train_file_path,
+                                                  transformed_test_file_path=transformed_test_file_path)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def save_preprocessing_object(self, preprocessing_obj: ColumnTransformer, transformed_train_file_path: str,
+                                  transformed_test_file_path: str) -> DataTransformationArtifact:
+        try:
+            preprocessing_obj_file_path = self.data_transformation_config.preprocessed_object_file_path
+
+            logging.info(f"Saving preprocessing object.")
+            save_object(file_path=preprocessing_obj_file_path, obj=preprocessing_obj)
+
+            preprocessed_array_dir = self.data_transformation_config.preprocessed_array_dir
+            logging.info(f"Saving preprocessing object as array artifact at: [{preprocessed_array_dir}]")
+            save_array_preprocessor(artifact_dir=preprocessed_array_dir, preprocessing_obj=preprocessing_obj)
+
+            data_transformation_artifact = DataTransformationArtifact(is_transformed=True,
+                                                                      message="Data Transformation successful.",
+                                                                      transformed_train_file_path=transformed_train_file_path,
+                                                                      transformed_test_file_path=transformed_test_file_path,
+                                                                      preprocessed_object_file_path=preprocessing_obj_file_path,
+                                                                      preprocessed_array_dir=preprocessed_array_dir
+                                                                      )
+            logging.info(f"Data Transformation artifact: {data_transformation_artifact}")
+            return data_transformation_artifact
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         try:
+            if self.data_transformation_config.streaming:
+                return self.initiate_streaming_data_transformation()
+
             logging.info(f"Obtaining preprocessing object.")
             preprocessing_obj = self.get_data_transformer_object()
 
@@ -99,48 +409,51 @@ class DataTransformation:
             schema_file_path = self.data_validation_artifact.schema_file_path
 
             logging.info(f"Loading training and test data as pandas dataframe.")
-            train_df = load_data(file_path=train_file_path, schema_file_path=schema_file_path)
-            test_df = load_data(file_path=test_file_path, schema_file_path=schema_file_path)
+            train_df = get_dataset_handle(dataset_handle=self.data_ingestion_artifact.train_dataset,
+                                          file_path=train_file_path).get_schema_dataframe(schema_file_path=schema_file_path)
+            test_df = get_dataset_handle(dataset_handle=self.data_ingestion_artifact.test_dataset,
+                                         file_path=test_file_path).get_schema_dataframe(schema_file_path=schema_file_path)
 
             schema = read_yaml_file(config_file_path=schema_file_path)
 
             target_column_name = schema[DATA_VALIDATION_GET_TARGET_COLUMN_KEY]
 
             logging.info(f"Applying preprocessing object on traing dataframe and testing dataframe")
-            input_feature_train_df=preprocessing_obj.fit_transform(train_df)
-            input_feature_test_df=preprocessing_obj.fit_transform(test_df)
+            with profile_step("fit_transform", rows=len(train_df)):
+                input_feature_train_arr = preprocessing_obj.fit_transform(train_df)
+            with profile_step("transform", rows=len(test_df)):
+                input_feature_test_arr = preprocessing_obj.transform(test_df)
+
+            #the target is kept as the last column of the transformed arrays
+            target_feature_train_arr = train_df[target_column_name].astype(float).to_numpy()
+            target_feature_test_arr = test_df[target_column_name].astype(float).to_numpy()
+            input_feature_train_df = np.c_[input_feature_train_arr, target_feature_train_arr]
+            input_feature_test_df = np.c_[input_feature_test_arr, target_feature_test_arr]
 
-            logging.info(f"After preprocessing applying resampling of the data to avoid class imbalance.")
-            re_sampling_obj = ReSampling()
-            input_feature_train_df = re_sampling_obj.fit_transform(input_feature_train_df)
-            input_feature_test_df = re_sampling_obj.fit_transform(input_feature_test_df)
+            logging.info(f"After preprocessing applying resampling of the training data to avoid class imbalance.")
+            re_sampling_obj = self.get_resampling_object()
+            with profile_step("resampling", rows=len(input_feature_train_df), strategy=re_sampling_obj.strategy) as step:
+                input_feature_train_df = re_sampling_obj.fit_transform(input_feature_train_df)
+                if step is not None:
+                    step.set_info(output_rows=len(input_feature_train_df))
 
-            logging.info(f"Data set up and down sampling completed successfully.")
+            logging.info(f"Training data resampling completed successfully.")
 
-            train_file_name = os.path.basename(train_file_path).replace(".csv", ".npz")
-            test_file_name = os.path.basename(test_file_path).replace(".csv", ".npz")
+            train_file_name = os.path.splitext(os.path.basename(train_file_path))[0] + ".npz"
+            test_file_name = os.path.splitext(os.path.basename(test_file_path))[0] + ".npz"
 
 
             transformed_train_file_path = os.path.join(self.data_transformation_config.transformed_train_dir, train_file_name)
             transformed_test_file_path = os.path.join(self.data_transformation_config.transformed_test_dir, test_file_name)
 
             logging.info(f"Saving transformed training and testing array.")
-            save_numpy_array_data(file_path=transformed_train_file_path, array=input_feature_train_df)
-            save_numpy_array_data(file_path=transformed_test_file_path, array=input_feature_test_df)
-
-            preprocessing_obj_file_path = self.data_transformation_config.preprocessed_object_file_path
+            with profile_step("save_arrays", rows=len(input_feature_train_df) + len(input_feature_test_df)):
+                save_numpy_array_data(file_path=transformed_train_file_path, array=input_feature_train_df)
+                save_numpy_array_data(file_path=transformed_test_file_path, array=input_feature_test_df)
 
-            logging.info(f"Saving preprocessing object.")
-            save_object(file_path=preprocessing_obj_file_path, obj=preprocessing_obj)
-
-            data_transformation_artifact = DataTransformationArtifact(is_transformed=True,
-                                                                      message="Data Transformation successful.",
-                                                                      transformed_train_file_path=transformed_train_file_path,
-                                                                      transformed_test_file_path=transformed_test_file_path,
-                                                                      preprocessed_object_file_path=preprocessing_obj_file_path
-                                                                      )
-            logging.info(f"Data Transformation artifact: {data_transformation_artifact}")
-            return data_transformation_artifact
+                return self.save_preprocessing_object(preprocessing_obj=preprocessing_obj,
+                                                      transformed_train_file_path=transformed_train_file_path,
+                                                      transformed_test_file_path=transformed_test_file_path)
 
         except Exception as e:
             raise HeartRiskException(e, sys)
@@ -3,9 +3,19 @@ from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
 import os, sys
 import pandas as pd
 import json
+import threading
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import DataValidationConfig
 from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
-from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import read_yaml_file
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import read_yaml_file, read_dataframe_chunks
+from src.Heart_Attack_Risk_Analyzer_Project.utils.dataset_handle import get_dataset_handle
+from src.Heart_Attack_Risk_Analyzer_Project.utils.drift_engine import get_drift_report
+from src.Heart_Attack_Risk_Analyzer_Project.utils.reference_profile import ReferenceProfile, save_reference_profile
+from src.Heart_Attack_Risk_Analyzer_Project.utils.column_profile import ColumnProfile, save_column_profile
+from src.Heart_Attack_Risk_Analyzer_Project.utils.schema_validator import SchemaValidator, SchemaValidationResult, \
+    get_schema_validation_summary
+from src.Heart_Attack_Risk_Analyzer_Project.utils.stage_profiler import profile_step, set_step_rows, set_step_info
 from src.Heart_Attack_Risk_Analyzer_Project.constant import *
 from evidently.report import Report
 from evidently.metric_preset import DataDriftPreset
@@ -13,6 +23,22 @@ from evidently.test_suite import TestSuite
 from evidently.tests import *
 from evidently.metrics import *
 
+class InlineExecutor:
+    """
+    runs every submitted call right away in the calling thread, the futures it returns are already done
+    """
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        pass
+
+
 class DataValidation:
 
     def __init__(self, data_validation_config:DataValidationConfig,
@@ -21,13 +47,40 @@ class DataValidation:
             logging.info(f"{'='*20} Data Validation log started. {'='*20}")
             self.data_validation_config = data_validation_config
             self.data_ingestion_artifact = data_ingestion_artifiact
+            #every check reads the splits from these handles, they are loaded once and kept in memory
+            self.train_dataset = get_dataset_handle(dataset_handle=data_ingestion_artifiact.train_dataset,
+                                                    file_path=data_ingestion_artifiact.train_file_path)
+            self.test_dataset = get_dataset_handle(dataset_handle=data_ingestion_artifiact.test_dataset,
+                                                   file_path=data_ingestion_artifiact.test_file_path)
+            #set by the first check that fails, the other checks poll it and stop before their next step
+            self.stop_event = threading.Event()
         except Exception as e:
             raise HeartRiskException(e, sys)
+
+    def stop_if_requested(self, step_name: str) -> None:
+        """
+        raises when another check failed, checked before the slow steps of a check and before it writes a file
+        """
+        if self.stop_event.is_set():
+            raise Exception(f"Validation stopped before [{step_name}], another check failed.")
+
+    def run_check(self, check_function, *args):
+        """
+        runs a task of the validation pool, a failure stops the other tasks at their next poll.
+        A stopped task returns None, the error raised is the one of the task that failed first
+        """
+        try:
+            return check_function(*args)
+        except Exception:
+            if self.stop_event.is_set():
+                return None
+            self.stop_event.set()
+            raise
     
     def get_train_and_test_df(self):
         try:
-            train_df = pd.read_csv(self.data_ingestion_artifact.train_file_path)
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            train_df = self.train_dataset.get_dataframe()
+            test_df = self.test_dataset.get_dataframe()
             return train_df, test_df
         except Exception as e:
             raise HeartRiskException(e, sys)
@@ -56,82 +109,200 @@ class DataValidation:
         except Exception as e:
             raise HeartRiskException(e, sys)
     
+    def get_schema_validation_result(self, schema_validator: SchemaValidator, dataset_handle,
+                                     file_path: str) -> SchemaValidationResult:
+        """
+        runs the schema checks over a split, from the file in chunks of schema_chunk_size rows when it is set
+        """
+        try:
+            schema_chunk_size = self.data_validation_config.schema_chunk_size
+            if schema_chunk_size:
+                return schema_validator.validate_chunks(read_dataframe_chunks(file_path=file_path,
+                                                                              chunk_size=schema_chunk_size))
+            return schema_validator.validate(dataset_handle.get_dataframe())
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
     def validate_dataset_schema(self) -> bool:
+        """
+        checks the dtypes, nulls, allowed values and ranges of the schema on every row of both splits and writes the
+        violations of every rule to the schema report. Fails on a column error or when the invalid rows of a split
+        are more than max_invalid_row_share of its rows
+        """
         try:
-            train_set, _ = self.get_train_and_test_df()
-            
-            #getting schema structure
             schema_structure = read_yaml_file(config_file_path=self.data_validation_config.schema_file_path)
-            columns = schema_structure[DATA_VALIDATION_GET_ALL_COLUMNS_KEY]
+            schema_validator = SchemaValidator(schema=schema_structure)
 
-            schema_feature_datatype = {}
-            for schema_feature, schema_datatype in columns.items():
-                schema_feature_datatype[schema_feature] = schema_datatype
-            
-            #getting dataset structure
-            train_set_feature_datatype = {}
-            for feature in train_set.columns:
-                train_set_feature_datatype[feature] = str(train_set[feature].dtypes)
-            
-            flag = True
-            for feature in schema_feature_datatype.keys():
-                if train_set_feature_datatype[feature] != schema_feature_datatype[feature]:
-                    flag = False
-                    raise Exception(f"column {feature} or datatype {train_set_feature_datatype[feature]} didn't match the requirements.")
-            
-            return flag
+            schema_report = {}
+            rows = 0
+            for split_name, dataset_handle, file_path in [("train", self.train_dataset, self.data_ingestion_artifact.train_file_path),
+                                                          ("test", self.test_dataset, self.data_ingestion_artifact.test_file_path)]:
+                self.stop_if_requested(f"schema check of the {split_name} split")
+                result = self.get_schema_validation_result(schema_validator=schema_validator,
+                                                           dataset_handle=dataset_handle, file_path=file_path)
+                schema_report[split_name] = get_schema_validation_summary(result)
+                rows += result.rows
+                logging.info(f"Schema check of the {split_name} split: {schema_report[split_name]}")
 
+            schema_report_file_path = self.data_validation_config.schema_report_file_path
+            self.stop_if_requested("schema report")
+            os.makedirs(os.path.dirname(schema_report_file_path), exist_ok=True)
+            with open(schema_report_file_path, 'w') as schema_report_file:
+                json.dump(schema_report, schema_report_file, indent=6)
+            set_step_rows(rows)
+            set_step_info(invalid_rows={split_name: summary["invalid_rows"] for split_name, summary in schema_report.items()})
 
+            max_invalid_row_share = self.data_validation_config.max_invalid_row_share
+            for split_name, summary in schema_report.items():
+                if len(summary["column_errors"]) > 0:
+                    raise Exception(f"Columns of the {split_name} split didn't match the schema: {summary['column_errors']}")
+                if summary["invalid_row_share"] > max_invalid_row_share:
+                    raise Exception(f"[{summary['invalid_rows']}] rows of the {split_name} split break the column rules "
+                                    f"(more than [{max_invalid_row_share}] of the rows): {summary['rule_counts']}, "
+                                    f"see [{schema_report_file_path}]")
+            return True
         except Exception as e:
             raise HeartRiskException(e, sys)
     
-    def get_cat_num_feature_list(self):
+    def get_column_profile(self) -> ColumnProfile:
+        """
+        profiles every column of the train split in one pass (in chunks of schema_chunk_size rows when it is set)
+        and saves the profile next to report.json
+        """
         try:
-            train_dataset, _ = self.get_train_and_test_df()
-
-            categorical_feature_list = []
-            numerical_feature_list = []
-            for feature in train_dataset.columns:
-                if train_dataset[feature].nunique() < 5:
-                    categorical_feature_list.append(feature)
+            with profile_step("column_profile"):
+                schema_chunk_size = self.data_validation_config.schema_chunk_size
+                if schema_chunk_size:
+                    chunk_iterator = read_dataframe_chunks(file_path=self.data_ingestion_artifact.train_file_path,
+                                                           chunk_size=schema_chunk_size)
                 else:
-                    numerical_feature_list.append(feature)
-            
+                    chunk_iterator = [self.train_dataset.get_dataframe()]
+                column_profile = ColumnProfile.from_chunks(chunk_iterator,
+                                                           precision=self.data_validation_config.profile_hll_precision,
+                                                           top_k=self.data_validation_config.profile_top_k)
+                set_step_rows(column_profile.rows)
+                column_profile_file_path = save_column_profile(file_path=self.data_validation_config.column_profile_file_path,
+                                                               column_profile=column_profile)
+            logging.info(f"Column profile of the train split saved at [{column_profile_file_path}]")
+            return column_profile
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_cat_num_feature_list(self):
+        """
+        columns of less than max_categories distinct values in the column profile are categorical
+        """
+        try:
+            column_profile = self.get_column_profile()
+            categorical_feature_list, numerical_feature_list = column_profile.get_feature_types(
+                max_categories=self.data_validation_config.max_categories)
+            logging.info(f"Distinct values of the train columns: "
+                         f"{ {column: sketch.get_distinct_count() for column, sketch in column_profile.columns.items()} }")
             return categorical_feature_list, numerical_feature_list
         except Exception as e:
             raise HeartRiskException(e, sys)
     
-    def get_and_save_data_drift_report(self):
+    def run_evidently_drift_report(self, dataset_train: pd.DataFrame, dataset_test: pd.DataFrame) -> Report:
         try:
-            dataset_train, dataset_test = self.get_train_and_test_df()
-
             report = Report(metrics=[
-                DataDriftPreset()
+                DataDriftPreset(drift_share=self.data_validation_config.drift_share)
             ])
-            report.run(reference_data=dataset_train, current_data=dataset_test)
-            
-            report_file_path = self.data_validation_config.report_file_path
-            report_dir = os.path.dirname(report_file_path)
-            os.makedirs(report_dir, exist_ok=True)
+            with profile_step("evidently_drift_report", rows=len(dataset_train) + len(dataset_test)):
+                report.run(reference_data=dataset_train, current_data=dataset_test)
+            return report
+        except Exception as e:
+            raise HeartRiskException(e, sys)
 
-            report_json = json.loads(report.json())
-            
-            with open(report_file_path, 'w') as report_file:
-                json.dump(report_json, report_file, indent = 6)
+    def save_reference_profile(self, dataset_train: pd.DataFrame) -> ReferenceProfile:
+        """
+        profiles the train split and saves the profile next to report.json, later batches are checked
+        against it without the train split
+        """
+        try:
+            schema = read_yaml_file(config_file_path=self.data_validation_config.schema_file_path)
+            with profile_step("reference_profile", rows=len(dataset_train)):
+                reference_profile = ReferenceProfile.from_dataframe(dataframe=dataset_train,
+                                                                    numerical_columns=schema[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY],
+                                                                    categorical_columns=schema[DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY],
+                                                                    max_centroids=self.data_validation_config.profile_max_centroids)
+                self.stop_if_requested("reference profile")
+                reference_profile_file_path = save_reference_profile(file_path=self.data_validation_config.reference_profile_file_path,
+                                                                     reference_profile=reference_profile)
+            logging.info(f"Reference profile of the train split saved at [{reference_profile_file_path}]")
+            return reference_profile
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def run_data_drift_report(self):
+        """
+        checks the test split for drift against the train split with the configured drift engine,
+        returns the evidently report (None with the native engine) and the report json
+        """
+        try:
+            dataset_train, dataset_test = self.get_train_and_test_df()
+            self.stop_if_requested("drift report")
+            reference_profile = self.save_reference_profile(dataset_train=dataset_train)
+
+            drift_engine = self.data_validation_config.drift_engine
+            if drift_engine == NATIVE_DRIFT_ENGINE:
+                with profile_step("native_drift_report", rows=len(dataset_test)):
+                    return None, get_drift_report(drift_reference=reference_profile.columns, current_df=dataset_test,
+                                                  drift_share=self.data_validation_config.drift_share)
+            if drift_engine == EVIDENTLY_DRIFT_ENGINE:
+                report = self.run_evidently_drift_report(dataset_train=dataset_train, dataset_test=dataset_test)
+                return report, json.loads(report.json())
+            raise Exception(f"Drift engine [{drift_engine}] is not supported, use "
+                            f"[{NATIVE_DRIFT_ENGINE}] or [{EVIDENTLY_DRIFT_ENGINE}]")
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def save_data_drift_report(self, report: Report, report_json: dict):
+        """
+        writes report.json and, when drift_report_html is set, the evidently html page (the evidently report is
+        run here for the native engine). The page path is None when no page is written.
+        """
+        try:
+            self.stop_if_requested("drift report files")
+            with profile_step("save_drift_report"):
+                report_file_path = self.data_validation_config.report_file_path
+                report_dir = os.path.dirname(report_file_path)
+                os.makedirs(report_dir, exist_ok=True)
+
+                with open(report_file_path, 'w') as report_file:
+                    json.dump(report_json, report_file, indent = 6)
+
+                if not self.data_validation_config.drift_report_html:
+                    return report_file_path, None
 
-            report_page_file_path = self.data_validation_config.report_page_file_path
-            report_page_file_dir= os.path.dirname(report_page_file_path)
-            os.makedirs(report_page_file_dir, exist_ok=True)
+                if report is None:
+                    dataset_train, dataset_test = self.get_train_and_test_df()
+                    report = self.run_evidently_drift_report(dataset_train=dataset_train, dataset_test=dataset_test)
 
-            report.save_html(report_page_file_path)
+                report_page_file_path = self.data_validation_config.report_page_file_path
+                report_page_file_dir= os.path.dirname(report_page_file_path)
+                os.makedirs(report_page_file_dir, exist_ok=True)
 
+                report.save_html(report_page_file_path)
+
+                return report_file_path, report_page_file_path
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_and_save_data_drift_report(self):
+        try:
+            report, report_json = self.run_data_drift_report()
+            report_file_path, report_page_file_path = self.save_data_drift_report(report=report, report_json=report_json)
             return report_json, report_file_path, report_page_file_path
         except Exception as e:
             raise HeartRiskException(e, sys)
-    
-    def get_and_save_data_test_report(self):
+
+    def run_data_test_report(self):
+        """
+        runs the evidently test suite, returns the suite and its json
+        """
         try:
             dataset_train, dataset_test = self.get_train_and_test_df()
+            self.stop_if_requested("test suite")
             tests = TestSuite(tests=[
                 TestNumberOfColumnsWithMissingValues(),
                 TestNumberOfRowsWithMissingValues(),
@@ -141,45 +312,134 @@ class DataValidation:
                 TestColumnsType(),
                 TestNumberOfDriftedColumns()
             ])
-            tests.run(reference_data=dataset_train, current_data=dataset_test)
+            with profile_step("evidently_test_suite", rows=len(dataset_train) + len(dataset_test)):
+                tests.run(reference_data=dataset_train, current_data=dataset_test)
+                return tests, json.loads(tests.json())
+        except Exception as e:
+            raise HeartRiskException(e, sys)
 
-            test_json = json.loads(tests.json())
-            test_file_path = self.data_validation_config.report_file_path
-            test_file_dir = os.path.dirname(test_file_path)
-            os.makedirs(test_file_dir, exist_ok= True)
+    def save_data_test_report(self, tests: TestSuite, test_json: dict):
+        try:
+            self.stop_if_requested("test report files")
+            with profile_step("save_test_report"):
+                test_file_dir = os.path.dirname(self.data_validation_config.report_file_path)
+                os.makedirs(test_file_dir, exist_ok= True)
 
-            test_file_page_path = os.path.join(test_file_dir, "tests.html")
-            tests.save_html(test_file_page_path)
-            test_file_path = os.path.join(test_file_dir, "tests.json")
-            with open(test_file_path, 'w') as test_file:
-                json.dump(test_json, test_file, indent=6)
+                test_file_page_path = os.path.join(test_file_dir, "tests.html")
+                tests.save_html(test_file_page_path)
+                test_file_path = os.path.join(test_file_dir, "tests.json")
+                with open(test_file_path, 'w') as test_file:
+                    json.dump(test_json, test_file, indent=6)
 
+            return test_file_path, test_file_page_path
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_and_save_data_test_report(self):
+        try:
+            tests, test_json = self.run_data_test_report()
+            test_file_path, test_file_page_path = self.save_data_test_report(tests=tests, test_json=test_json)
             return test_json, test_file_path, test_file_page_path
         except Exception as e:
             raise HeartRiskException(e, sys)
-    
-    def check_data_and_get_paths(self):
+
+    def check_file_and_schema(self) -> bool:
+        """
+        hard checks, the other checks are stopped when one of them fails
+        """
         try:
-            #file existance check
-            logging.info("Checking for the existance of files.")
-            file_flag = self.is_train_test_file_exists()
-            logging.info(f"Result of check [{file_flag}]")
+            with profile_step("file_and_schema"):
+                #file existance check
+                logging.info("Checking for the existance of files.")
+                file_flag = self.is_train_test_file_exists()
+                logging.info(f"Result of check [{file_flag}]")
+                self.stop_if_requested("schema check")
+
+                #schema check
+                logging.info("Checking for correct schema.")
+                schema_flag = self.validate_dataset_schema()
+                logging.info(f"Schema check results are [{schema_flag}]")
+            if not (file_flag and schema_flag):
+                raise Exception(f"File check [{file_flag}] or schema check [{schema_flag}] failed.")
+            return True
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_validation_executor(self):
+        executor = self.data_validation_config.executor
+        n_workers = self.data_validation_config.n_workers
+        #concurrent.futures refuses new work once the main thread has exited (a pipeline thread left running)
+        if not threading.main_thread().is_alive():
+            logging.info("Main thread has exited, running the validation checks inline.")
+            return InlineExecutor()
+        if executor == THREAD_VALIDATION_EXECUTOR:
+            return ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="validation")
+        if executor == PROCESS_VALIDATION_EXECUTOR:
+            return ProcessPoolExecutor(max_workers=n_workers)
+        raise Exception(f"Validation executor [{executor}] is not supported, use "
+                        f"[{THREAD_VALIDATION_EXECUTOR}] or [{PROCESS_VALIDATION_EXECUTOR}]")
 
+    def check_data_and_get_paths(self):
+        """
+        the file/schema checks, the drift report and the test suite run at the same time in the validation pool.
+        The pass/fail decision only needs the json results, the report files (the html rendering is the slow part)
+        are written by other pool tasks while the remaining checks run. When a check raises, the checks not started
+        yet are cancelled, the running ones stop at their next poll of stop_event (before a slow step or a file write)
+        and the error is raised without waiting for them.
+        """
+        try:
+            executor = self.get_validation_executor()
+            manager = None
+            if isinstance(executor, ProcessPoolExecutor):
+                #a threading.Event does not reach the worker processes, the checks poll a manager event there
+                manager = multiprocessing.Manager()
+                self.stop_event = manager.Event()
+            try:
+                logging.info(f"Running the validation checks with [{self.data_validation_config.n_workers}] "
+                             f"[{self.data_validation_config.executor}] workers.")
+                check_future_dict = {
+                    executor.submit(self.run_check, self.check_file_and_schema): "file_and_schema",
+                    executor.submit(self.run_check, self.run_data_drift_report): "data_drift",
+                    executor.submit(self.run_check, self.run_data_test_report): "data_tests"
+                }
+                check_result_dict = {}
+                save_future_dict = {}
+                for check_future in as_completed(check_future_dict):
+                    check_name = check_future_dict[check_future]
+                    check_result_dict[check_name] = check_future.result()
+                    if check_result_dict[check_name] is None:
+                        logging.info(f"Validation check [{check_name}] stopped.")
+                        continue
+                    logging.info(f"Validation check [{check_name}] completed.")
+                    if check_name == "data_drift":
+                        save_future_dict[check_name] = executor.submit(self.run_check, self.save_data_drift_report,
+                                                                       *check_result_dict[check_name])
+                    elif check_name == "data_tests":
+                        save_future_dict[check_name] = executor.submit(self.run_check, self.save_data_test_report,
+                                                                       *check_result_dict[check_name])
 
-            #schema check
-            logging.info("Checking for correct schema.")
-            schema_flag = self.validate_dataset_schema()
-            logging.info(f"Schema check results are [{schema_flag}]")
+                save_result_dict = {check_name: save_future.result() for check_name, save_future in save_future_dict.items()}
+                if self.stop_event.is_set():
+                    raise Exception("Validation checks were stopped.")
+                report_file_path, report_file_page_path = save_result_dict["data_drift"]
+                tests_file_path, tests_file_page_path = save_result_dict["data_tests"]
+                executor.shutdown(wait=True)
+            except Exception:
+                self.stop_event.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            finally:
+                if manager is not None:
+                    #worker processes still running fail on their next poll once the manager is gone
+                    manager.shutdown()
 
             #data drift check
-            logging.info("Checking for data drift.")
-            report_json, report_file_path, report_file_page_path = self.get_and_save_data_drift_report()
+            report_json = check_result_dict["data_drift"][1]
             data_drift_test_result = report_json["metrics"][0]["result"]["dataset_drift"]
-            logging.info(f"Is data drift found [{not data_drift_test_result}]")
+            logging.info(f"Is data drift found [{data_drift_test_result}]")
 
             #other miscelleneous tests
-            logging.info("Checking using different valid checks.")
-            tests_json, tests_file_path, tests_file_page_path = self.get_and_save_data_test_report()
+            tests_json = check_result_dict["data_tests"][1]
             tests_flag = True
             for test in tests_json["tests"]:
                 if test['status'] != "SUCCESS":
@@ -187,7 +447,7 @@ class DataValidation:
             logging.info(f"Miscellaneous test results [{tests_flag}]")
 
             check_flag = False
-            if file_flag and schema_flag and not data_drift_test_result and tests_flag:
+            if check_result_dict["file_and_schema"] and not data_drift_test_result and tests_flag:
                 check_flag = True
             logging.info(f"Did the data pass all tests. [{check_flag}]")
 
@@ -214,7 +474,9 @@ class DataValidation:
                 tests_file_path=tests_file_path,
                 tests_file_page_path=tests_file_page_path,
                 cat_features_list=cat_features_list,
-                num_features_list=num_features_list
+                num_features_list=num_features_list,
+                reference_profile_file_path=self.data_validation_config.reference_profile_file_path,
+                column_profile_file_path=self.data_validation_config.column_profile_file_path
             )
             logging.info(f"Data Validation artifact: {data_validation_artifact}")
             return data_validation_artifact
@@ -0,0 +1,413 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import IncrementalTrainingArtifact
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import IncrementalTrainingConfig
+from src.Heart_Attack_Risk_Analyzer_Project.component.data_transformation import ReSampling
+from src.Heart_Attack_Risk_Analyzer_Project.pipeline.stage_cache import StageCache
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import load_data, load_object, numpy_array_data, read_yaml_file, save_numpy_array_data, save_object
+from src.Heart_Attack_Risk_Analyzer_Project.utils.array_artifact import save_array_preprocessor, save_array_model, is_array_model_supported
+from src.Heart_Attack_Risk_Analyzer_Project.utils.tree_knn_imputer import merge_reservoir_sample
+from src.Heart_Attack_Risk_Analyzer_Project.utils.reference_profile import ReferenceProfile, load_reference_profile, save_reference_profile
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from collections import namedtuple
+from datetime import datetime
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, recall_score
+from sklearn.naive_bayes import GaussianNB
+import os, sys
+import copy
+import json
+import time
+import numpy as np
+import pandas as pd
+
+#SMOTE needs more minority rows than its number of neighbors
+SMOTE_K_NEIGHBORS = 5
+
+#solvers which start every fit from scratch, warm_start or not
+WARM_START_IGNORED_SOLVER_LIST = ["liblinear"]
+
+IncrementalUpdate = namedtuple("IncrementalUpdate",
+                               ["preprocessing_obj", "model", "replay_arr", "replay_rows_seen", "data_profile",
+                                "update_method", "rows_added", "batch_accuracy", "batch_recall"])
+
+IncrementalBenchmark = namedtuple("IncrementalBenchmark",
+                                  ["model", "batch_rows", "full_seconds", "incremental_seconds", "speedup",
+                                   "full_accuracy", "incremental_accuracy", "full_recall", "incremental_recall"])
+
+
+def get_update_method(model, replay_complete: bool = False) -> str:
+    """
+    partial_fit models learn the new rows only (their state sums up the rows seen), warm_start models are refitted
+    from their current coefficients on the replay sample and the new rows. Other models are refitted from scratch
+    on the replay sample and the new rows when the replay sample holds every row learned so far.
+    replay_complete: the replay sample holds every training row learned so far
+    """
+    if hasattr(model, "partial_fit"):
+        return PARTIAL_FIT_UPDATE_METHOD
+    if is_warm_start_supported(model):
+        return WARM_START_UPDATE_METHOD
+    if replay_complete:
+        return REFIT_UPDATE_METHOD
+    raise Exception(f"[{type(model).__name__}] can not be updated from its fitted state and the replay sample does not "
+                    f"hold every training row, run the full training pipeline")
+
+
+def is_warm_start_supported(model) -> bool:
+    """
+    fit with warm_start goes on from the fitted coefficients, tree ensembles only add estimators with it
+    and liblinear ignores it
+    """
+    params = model.get_params()
+    return ("warm_start" in params and hasattr(model, "coef_")
+            and params.get("solver") not in WARM_START_IGNORED_SOLVER_LIST)
+
+
+def is_feature_rescale_supported(model) -> bool:
+    return isinstance(model, (LogisticRegression, SGDClassifier, GaussianNB))
+
+
+def rescale_model_features(model, feature_slice: slice, scale: np.ndarray, shift: np.ndarray):
+    """
+    changes the fitted model in place so that it gives the same predictions on the features x * scale + shift
+    of feature_slice as before on x. Used when the scaler is updated: the model learned on the old scaling
+    goes on from the same decision function in the new scaling.
+    """
+    if isinstance(model, GaussianNB):
+        model.theta_[:, feature_slice] = model.theta_[:, feature_slice] * scale + shift
+        model.var_[:, feature_slice] = model.var_[:, feature_slice] * scale ** 2
+    elif isinstance(model, (LogisticRegression, SGDClassifier)):
+        coef = model.coef_[:, feature_slice] / scale
+        model.intercept_ = model.intercept_ - (coef * shift).sum(axis=1)
+        model.coef_[:, feature_slice] = coef
+    else:
+        raise Exception(f"Features of [{type(model).__name__}] can not be rescaled")
+    return model
+
+
+def get_pipeline_columns(preprocessing_obj: ColumnTransformer, name: str) -> list:
+    return next(list(columns) for transformer_name, _, columns in preprocessing_obj.transformers_ if transformer_name == name)
+
+
+def update_preprocessing_object(preprocessing_obj: ColumnTransformer, batch_df: pd.DataFrame, data_profile: ReferenceProfile):
+    """
+    updates the imputers of the fitted preprocessing object in place with the rows of batch_df:
+    most frequent categories from the category counts of data_profile (all the rows seen, batch included)
+    and numerical imputer with the new rows
+    """
+    try:
+        cat_imputer = preprocessing_obj.named_transformers_['cat_pipeline'].named_steps['imputer']
+        categorical_columns = get_pipeline_columns(preprocessing_obj, 'cat_pipeline')
+        #values of the profile tables are sorted, argmax gives the smallest of the most frequent ones like SimpleImputer
+        cat_imputer.statistics_ = np.array([float(data_profile.columns[column].values[np.argmax(data_profile.columns[column].counts)])
+                                            for column in categorical_columns], dtype=cat_imputer.statistics_.dtype)
+
+        num_imputer = preprocessing_obj.named_transformers_['num_pipeline'].steps[0][1]
+        numerical_arr = batch_df[get_pipeline_columns(preprocessing_obj, 'num_pipeline')].to_numpy(dtype=np.float64, na_value=np.nan)
+        if hasattr(num_imputer, "partial_fit"):
+            num_imputer.partial_fit(numerical_arr)
+        else:
+            raise Exception(f"Numerical imputer [{type(num_imputer).__name__}] can not be updated")
+        return preprocessing_obj
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def update_scaler(preprocessing_obj: ColumnTransformer, X: np.ndarray):
+    """
+    updates the scaler of the numerical columns with the new rows X transformed by preprocessing_obj, the imputed
+    values are taken back from X so the rows are imputed once. X is moved to the new scaling in place.
+    return: (scale, shift) mapping the old scaled features to the new ones
+    """
+    try:
+        feature_slice = preprocessing_obj.output_indices_['num_pipeline']
+        scaler = preprocessing_obj.named_transformers_['num_pipeline'].steps[-1][1]
+        old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+        scaler.partial_fit(X[:, feature_slice] * old_scale + old_mean)
+        scale, shift = old_scale / scaler.scale_, (old_mean - scaler.mean_) / scaler.scale_
+        X[:, feature_slice] = X[:, feature_slice] * scale + shift
+        return scale, shift
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def apply_incremental_update(preprocessing_obj: ColumnTransformer, model, batch_df: pd.DataFrame, target_column_name: str,
+                             data_profile: ReferenceProfile, batch_profile: ReferenceProfile, replay_arr: np.ndarray,
+                             replay_rows_seen: int, replay_sample_size: int, resample: bool = True,
+                             random_state: int = None) -> IncrementalUpdate:
+    """
+    updates the fitted preprocessing object and model in place with the labelled rows of batch_df
+    data_profile: profile of the rows the objects were fitted on, batch_profile: profile of batch_df
+    replay_arr: transformed training rows (target last) sampled from the replay_rows_seen rows learned so far,
+    the warm start and the refit use it so the model does not forget the older rows
+    """
+    try:
+        update_method = get_update_method(model, replay_complete=replay_arr is not None and len(replay_arr) >= replay_rows_seen)
+        if update_method == REFIT_UPDATE_METHOD:
+            logging.info(f"[{type(model).__name__}] can not go on from its fitted state, it is refitted on the "
+                         f"[{len(replay_arr)}] replay rows and the new rows.")
+        data_profile = data_profile.merge(batch_profile)
+
+        update_preprocessing_object(preprocessing_obj=preprocessing_obj, batch_df=batch_df, data_profile=data_profile)
+        X = preprocessing_obj.transform(batch_df)
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        y = batch_df[target_column_name].astype(float).to_numpy()
+        #score of the model on rows it has not learned yet
+        y_pred = model.predict(X)
+        batch_accuracy = float(accuracy_score(y, y_pred))
+        batch_recall = float(recall_score(y, y_pred, zero_division=0))
+
+        if is_feature_rescale_supported(model):
+            scale, shift = update_scaler(preprocessing_obj=preprocessing_obj, X=X)
+            feature_slice = preprocessing_obj.output_indices_['num_pipeline']
+            rescale_model_features(model, feature_slice, scale, shift)
+            if replay_arr is not None:
+                replay_arr = replay_arr.copy()
+                replay_arr[:, feature_slice] = replay_arr[:, feature_slice] * scale + shift
+        else:
+            logging.info(f"[{type(model).__name__}] can not follow a new feature scaling, the scaler is kept as fitted.")
+
+        train_arr = np.c_[X, y]
+        class_counts = np.unique(y, return_counts=True)[1]
+        if resample and len(class_counts) > 1 and class_counts.min() > SMOTE_K_NEIGHBORS:
+            train_arr = ReSampling(random_state=random_state).fit_transform(train_arr)
+        elif resample:
+            logging.info(f"Resampling skipped, the batch has less than [{SMOTE_K_NEIGHBORS + 1}] rows of a class.")
+
+        if update_method == PARTIAL_FIT_UPDATE_METHOD:
+            model.partial_fit(train_arr[:, :-1], train_arr[:, -1], classes=model.classes_)
+        else:
+            if replay_arr is None:
+                raise Exception(f"[{type(model).__name__}] is warm started on the replay sample, no replay sample found")
+            if "warm_start" in model.get_params():
+                model.set_params(warm_start=update_method == WARM_START_UPDATE_METHOD)
+            model.fit(np.vstack([replay_arr[:, :-1], train_arr[:, :-1]]),
+                      np.concatenate([replay_arr[:, -1], train_arr[:, -1]]))
+
+        if replay_arr is not None:
+            replay_arr = merge_reservoir_sample(sample=replay_arr, rows_seen=replay_rows_seen, new_rows=train_arr,
+                                                max_rows=replay_sample_size,
+                                                random_generator=np.random.default_rng(random_state))
+            replay_rows_seen += len(train_arr)
+
+        return IncrementalUpdate(preprocessing_obj=preprocessing_obj, model=model, replay_arr=replay_arr,
+                                 replay_rows_seen=replay_rows_seen, data_profile=data_profile,
+                                 update_method=update_method, rows_added=len(batch_df),
+                                 batch_accuracy=batch_accuracy, batch_recall=batch_recall)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def get_data_profile(dataframe: pd.DataFrame, schema: dict, reference_profile: ReferenceProfile = None) -> ReferenceProfile:
+    """
+    profile of dataframe with the columns and column types of reference_profile when given
+    """
+    if reference_profile is not None:
+        dataframe = dataframe[list(reference_profile.columns)]
+    return ReferenceProfile.from_dataframe(dataframe=dataframe,
+                                           numerical_columns=schema[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY],
+                                           categorical_columns=schema[DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY],
+                                           column_type_dict=None if reference_profile is None else reference_profile.get_column_type_dict())
+
+
+def benchmark_incremental_training(base_df: pd.DataFrame, test_df: pd.DataFrame, batch_df_list: list,
+                                   get_preprocessing_obj, model_list: list, schema_file_path: str,
+                                   replay_sample_size: int = 20000, resample: bool = True) -> list:
+    """
+    time of a full retrain (preprocessing fitted on the base and batch rows, resampling, model fitted from scratch)
+    against the incremental update of the objects fitted on the base rows, and the score of both on test_df
+    get_preprocessing_obj: returns a new unfitted preprocessing object
+    model_list: unfitted models with the parameters to compare
+    return: list of IncrementalBenchmark
+    """
+    try:
+        schema = read_yaml_file(schema_file_path)
+        target_column_name = schema[DATA_VALIDATION_GET_TARGET_COLUMN_KEY]
+
+        def fit_from_scratch(train_df: pd.DataFrame, model):
+            preprocessing_obj = get_preprocessing_obj()
+            train_arr = np.c_[preprocessing_obj.fit_transform(train_df), train_df[target_column_name].astype(float).to_numpy()]
+            if resample:
+                train_arr = ReSampling().fit_transform(train_arr)
+            return preprocessing_obj, model.fit(train_arr[:, :-1], train_arr[:, -1]), train_arr
+
+        def get_test_scores(preprocessing_obj, model):
+            y_pred = model.predict(preprocessing_obj.transform(test_df))
+            y = test_df[target_column_name].astype(float).to_numpy()
+            return float(accuracy_score(y, y_pred)), float(recall_score(y, y_pred, zero_division=0))
+
+        benchmark_list = []
+        base_profile = get_data_profile(base_df, schema)
+        for model in model_list:
+            base_preprocessing_obj, base_model, base_train_arr = fit_from_scratch(base_df, clone(model))
+            base_replay_arr = merge_reservoir_sample(sample=base_train_arr[:0], rows_seen=0, new_rows=base_train_arr,
+                                                     max_rows=replay_sample_size, random_generator=np.random.default_rng(42))
+            for batch_df in batch_df_list:
+                start_time = time.perf_counter()
+                full_preprocessing_obj, full_model, _ = fit_from_scratch(pd.concat([base_df, batch_df], ignore_index=True),
+                                                                         clone(model))
+                full_seconds = time.perf_counter() - start_time
+
+                preprocessing_obj, incremental_model = copy.deepcopy((base_preprocessing_obj, base_model))
+                start_time = time.perf_counter()
+                apply_incremental_update(preprocessing_obj=preprocessing_obj, model=incremental_model, batch_df=batch_df,
+                                         target_column_name=target_column_name, data_profile=base_profile,
+                                         batch_profile=get_data_profile(batch_df, schema, base_profile),
+                                         replay_arr=base_replay_arr, replay_rows_seen=len(base_train_arr),
+                                         replay_sample_size=replay_sample_size, resample=resample)
+                incremental_seconds = time.perf_counter() - start_time
+
+                full_accuracy, full_recall = get_test_scores(full_preprocessing_obj, full_model)
+                incremental_accuracy, incremental_recall = get_test_scores(preprocessing_obj, incremental_model)
+                benchmark_list.append(IncrementalBenchmark(model=type(model).__name__,
+                                                           batch_rows=len(batch_df),
+                                                           full_seconds=full_seconds,
+                                                           incremental_seconds=incremental_seconds,
+                                                           speedup=full_seconds / incremental_seconds,
+                                                           full_accuracy=full_accuracy,
+                                                           incremental_accuracy=incremental_accuracy,
+                                                           full_recall=full_recall,
+                                                           incremental_recall=incremental_recall))
+        return benchmark_list
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+class IncrementalTrainer:
+    def __init__(self, incremental_training_config: IncrementalTrainingConfig, input_file_path_list: list):
+        try:
+            logging.info(f"{'='*20} Incremental Trainer log started. {'='*20}")
+            self.incremental_training_config = incremental_training_config
+            self.input_file_path_list = input_file_path_list
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_base_lineage(self, data_profile: ReferenceProfile) -> list:
+        """
+        lineage of the base objects, a single full training entry when they come from a full run
+        """
+        try:
+            config = self.incremental_training_config
+            if config.base_lineage_file_path is not None:
+                with open(config.base_lineage_file_path, 'r') as lineage_file:
+                    return json.load(lineage_file)
+            return [{"time_stamp": config.base_time_stamp,
+                     "update_method": FULL_TRAINING_UPDATE_METHOD,
+                     "preprocessed_object_file_path": config.base_preprocessed_object_file_path,
+                     "trained_model_file_path": config.base_trained_model_file_path,
+                     "rows_seen": data_profile.rows}]
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_base_replay(self, lineage: list):
+        """
+        returns the replay sample of the base and the number of training rows it was drawn from
+        """
+        try:
+            replay_file_path = self.incremental_training_config.base_replay_file_path
+            if replay_file_path is None or not os.path.exists(replay_file_path):
+                return None, 0
+            replay_arr = numpy_array_data(file_path=replay_file_path)
+            replay_rows_seen = lineage[-1].get("replay_rows_seen", len(replay_arr))
+            if len(replay_arr) > self.incremental_training_config.replay_sample_size:
+                replay_arr = merge_reservoir_sample(sample=replay_arr[:0], rows_seen=0, new_rows=replay_arr,
+                                                    max_rows=self.incremental_training_config.replay_sample_size,
+                                                    random_generator=np.random.default_rng(42))
+            return replay_arr, replay_rows_seen
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def load_batch(self, schema_file_path: str) -> pd.DataFrame:
+        try:
+            return pd.concat([load_data(file_path=file_path, schema_file_path=schema_file_path)
+                              for file_path in self.input_file_path_list], ignore_index=True)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def save_lineage(self, lineage: list) -> str:
+        try:
+            lineage_file_path = self.incremental_training_config.lineage_file_path
+            os.makedirs(os.path.dirname(lineage_file_path), exist_ok=True)
+            with open(lineage_file_path, 'w') as lineage_file:
+                json.dump(lineage, lineage_file, indent=2)
+            return lineage_file_path
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def initiate_incremental_training(self) -> IncrementalTrainingArtifact:
+        try:
+            start_time = time.perf_counter()
+            config = self.incremental_training_config
+            if config.base_trained_model_file_path is None or config.base_preprocessed_object_file_path is None:
+                raise Exception("No trained model found, run the training pipeline before an incremental update")
+            if config.base_profile_file_path is None or not os.path.exists(config.base_profile_file_path):
+                raise Exception("No data profile of the training rows found, run the training pipeline before an incremental update")
+
+            logging.info(f"Updating [{config.base_trained_model_file_path}] with the rows of {self.input_file_path_list}")
+            preprocessing_obj = load_object(file_path=config.base_preprocessed_object_file_path)
+            model = load_object(file_path=config.base_trained_model_file_path)
+            data_profile = load_reference_profile(config.base_profile_file_path)
+            lineage = self.get_base_lineage(data_profile=data_profile)
+            replay_arr, replay_rows_seen = self.get_base_replay(lineage=lineage)
+
+            schema = read_yaml_file(config.schema_file_path)
+            batch_df = self.load_batch(schema_file_path=config.schema_file_path)
+            batch_profile = get_data_profile(batch_df, schema, data_profile)
+            incremental_update = apply_incremental_update(preprocessing_obj=preprocessing_obj, model=model, batch_df=batch_df,
+                                                          target_column_name=schema[DATA_VALIDATION_GET_TARGET_COLUMN_KEY],
+                                                          data_profile=data_profile, batch_profile=batch_profile,
+                                                          replay_arr=replay_arr, replay_rows_seen=replay_rows_seen,
+                                                          replay_sample_size=config.replay_sample_size,
+                                                          resample=config.resample)
+            logging.info(f"Model updated with [{incremental_update.update_method}] on [{incremental_update.rows_added}] rows, "
+                         f"accuracy [{incremental_update.batch_accuracy}] and recall [{incremental_update.batch_recall}] "
+                         f"on the batch before the update.")
+
+            save_object(file_path=config.preprocessed_object_file_path, obj=incremental_update.preprocessing_obj)
+            save_array_preprocessor(artifact_dir=config.preprocessed_array_dir, preprocessing_obj=incremental_update.preprocessing_obj)
+            save_object(file_path=config.trained_model_file_path, obj=incremental_update.model)
+            if is_array_model_supported(incremental_update.model):
+                save_array_model(artifact_dir=config.model_array_dir, model=incremental_update.model)
+            if incremental_update.replay_arr is not None:
+                save_numpy_array_data(file_path=config.replay_file_path, array=incremental_update.replay_arr)
+            save_reference_profile(file_path=config.data_profile_file_path, reference_profile=incremental_update.data_profile)
+
+            lineage.append({"time_stamp": os.path.basename(os.path.dirname(config.lineage_file_path)),
+                            "parent_time_stamp": config.base_time_stamp,
+                            "update_method": incremental_update.update_method,
+                            "model_name": type(incremental_update.model).__name__,
+                            "input_files": [{"file_path": os.path.abspath(file_path),
+                                             "sha256": StageCache.get_file_hash(file_path)}
+                                            for file_path in self.input_file_path_list],
+                            "rows_added": incremental_update.rows_added,
+                            "rows_seen": incremental_update.data_profile.rows,
+                            "replay_rows_seen": incremental_update.replay_rows_seen,
+                            "batch_accuracy_before_update": incremental_update.batch_accuracy,
+                            "batch_recall_before_update": incremental_update.batch_recall,
+                            "base_preprocessed_object_file_path": config.base_preprocessed_object_file_path,
+                            "base_trained_model_file_path": config.base_trained_model_file_path,
+                            "preprocessed_object_file_path": config.preprocessed_object_file_path,
+                            "trained_model_file_path": config.trained_model_file_path,
+                            "seconds": time.perf_counter() - start_time,
+                            "created_at": datetime.now().isoformat()})
+            lineage_file_path = self.save_lineage(lineage=lineage)
+
+            incremental_training_artifact = IncrementalTrainingArtifact(is_trained=True,
+                                                                        message="Incremental training successful.",
+                                                                        preprocessed_object_file_path=config.preprocessed_object_file_path,
+                                                                        trained_model_file_path=config.trained_model_file_path,
+                                                                        model_name=type(incremental_update.model).__name__,
+                                                                        update_method=incremental_update.update_method,
+                                                                        rows_added=incremental_update.rows_added,
+                                                                        rows_seen=incremental_update.data_profile.rows,
+                                                                        lineage_file_path=lineage_file_path)
+            logging.info(f"Incremental Training artifact: {incremental_training_artifact}")
+            return incremental_training_artifact
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def __del__(self):
+        logging.info(f"{'='*20}Incremental Trainer log completed.{'='*20} \n\n")
@@ -0,0 +1,257 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import PredictionConfig
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import read_yaml_file, load_object
+from src.Heart_Attack_Risk_Analyzer_Project.utils.array_artifact import load_array_artifact
+from src.Heart_Attack_Risk_Analyzer_Project.utils.compiled_kernel import compile_kernel
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from collections import namedtuple
+from typing import List
+import os, sys
+import math
+import time
+import pandas as pd
+import numpy as np
+
+PredictionReport = namedtuple("PredictionReport",
+                              ["input_file_path", "output_file_path", "rows", "batches", "total_seconds",
+                               "rows_per_second", "mean_batch_latency_ms"])
+
+BatchBenchmark = namedtuple("BatchBenchmark",
+                            ["batch_size", "batches", "mean_latency_ms", "p50_latency_ms", "p99_latency_ms",
+                             "rows_per_second"])
+
+
+class HeartRiskPredictor:
+    """
+    Scores new patients with the fitted preprocessing object and the trained model.
+    Both are loaded once when the predictor is created and kept in memory, so every call only pays for
+    the vectorized transform and predict_proba of its batch.
+    With artifact_format array the memory mapped .npy artifacts are used instead of the dill pickles, worker
+    processes then share the fitted arrays (including the KNN imputer reference data) through the page cache.
+    With compile_kernel both are fused into a CompiledKernel which scores the raw input array directly.
+    """
+    def __init__(self, prediction_config: PredictionConfig):
+        try:
+            self.prediction_config = prediction_config
+            if prediction_config.preprocessed_object_file_path is None or prediction_config.trained_model_file_path is None:
+                raise Exception(f"Preprocessing object or trained model not found, run the training pipeline first. "
+                                f"Config: {prediction_config}")
+
+            if (prediction_config.artifact_format == PREDICTION_ARRAY_ARTIFACT_FORMAT
+                    and prediction_config.preprocessed_array_dir is not None and prediction_config.model_array_dir is not None):
+                logging.info(f"Loading array artifacts of the preprocessing object from [{prediction_config.preprocessed_array_dir}] "
+                             f"and of the model from [{prediction_config.model_array_dir}]")
+                self.preprocessing_obj = load_array_artifact(artifact_dir=prediction_config.preprocessed_array_dir)
+                self.model = load_array_artifact(artifact_dir=prediction_config.model_array_dir)
+            else:
+                logging.info(f"Loading preprocessing object from [{prediction_config.preprocessed_object_file_path}] "
+                             f"and model from [{prediction_config.trained_model_file_path}]")
+                self.preprocessing_obj = load_object(file_path=prediction_config.preprocessed_object_file_path)
+                self.model = load_object(file_path=prediction_config.trained_model_file_path)
+
+            dataset_schema = read_yaml_file(config_file_path=prediction_config.schema_file_path)
+            self.numerical_columns = dataset_schema[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY]
+            self.categorical_columns = dataset_schema[DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY]
+            self.target_column = dataset_schema[DATA_VALIDATION_GET_TARGET_COLUMN_KEY]
+            self.probability_column = f"{self.target_column}{PREDICTION_PROBABILITY_COLUMN_SUFFIX}"
+            self.prediction_column = f"{self.target_column}{PREDICTION_LABEL_COLUMN_SUFFIX}"
+
+            #index of the positive class in predict_proba output
+            self.positive_class_index = int(np.argmax(self.model.classes_))
+
+            self.kernel = None
+            if prediction_config.compile_kernel:
+                try:
+                    self.kernel = compile_kernel(preprocessing_obj=self.preprocessing_obj, model=self.model)
+                    logging.info(f"Compiled [{self.kernel.kernel_type}] inference kernel over columns {self.kernel.input_columns}")
+                except Exception as e:
+                    logging.info(f"Inference kernel not compiled, the sklearn path is used: {e}")
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def prepare_input(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        selects the feature columns and casts them the same way load_data does for training
+        """
+        try:
+            missing_columns = [column for column in self.numerical_columns + self.categorical_columns
+                               if column not in dataframe.columns]
+            if len(missing_columns) > 0:
+                raise Exception(f"Columns {missing_columns} are required for prediction but not present in the input.")
+
+            input_df = pd.DataFrame({column: dataframe[column].astype("float") for column in self.numerical_columns})
+            for column in self.categorical_columns:
+                #None (a null of a json record) is not a missing value for the imputer of the object columns, nan is
+                input_df[column] = dataframe[column].astype("object").where(dataframe[column].notna(), np.nan)
+            return input_df
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_record_errors(self, record: dict) -> list:
+        """
+        reasons why a {column: value} record can not be scored, empty for a valid record: a feature column
+        missing from the record or a value that is not a number. None is a missing value, imputed like in training
+        """
+        error_list = []
+        for column in self.numerical_columns + self.categorical_columns:
+            if column not in record:
+                error_list.append(f"column [{column}] is required")
+                continue
+            value = record[column]
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                error_list.append(f"value [{value}] of column [{column}] is not a number")
+        return error_list
+
+    def get_class_probability(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        returns the probability of every class, through the compiled kernel when there is one
+        """
+        if self.kernel is not None:
+            return self.kernel.predict_proba(self.kernel.get_input_array(dataframe))
+        return self.model.predict_proba(self.preprocessing_obj.transform(self.prepare_input(dataframe)))
+
+    def predict_proba(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        returns the probability of the positive class for every row of the dataframe
+        """
+        try:
+            return self.get_class_probability(dataframe)[:, self.positive_class_index]
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def predict(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        returns a dataframe with the probability and the predicted label of every row
+        """
+        try:
+            probability = self.get_class_probability(dataframe)
+            return pd.DataFrame({self.probability_column: probability[:, self.positive_class_index],
+                                 self.prediction_column: self.model.classes_[np.argmax(probability, axis=1)].astype(int)},
+                                index=dataframe.index)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def predict_record(self, record: dict) -> dict:
+        """
+        scores a single patient given as {column: value}
+        """
+        try:
+            if self.kernel is not None:
+                probability = self.kernel.predict_proba(self.kernel.get_record_array(record))[0]
+                return {self.probability_column: float(probability[self.positive_class_index]),
+                        self.prediction_column: int(self.model.classes_[np.argmax(probability)])}
+            prediction_df = self.predict(pd.DataFrame([record]))
+            return {self.probability_column: float(prediction_df[self.probability_column].iloc[0]),
+                    self.prediction_column: int(prediction_df[self.prediction_column].iloc[0])}
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    @staticmethod
+    def iterate_file_chunks(file_path: str, chunk_size: int):
+        """
+        yields the file as dataframes of at most chunk_size rows, csv and parquet files are supported
+        """
+        if file_path.endswith(PARQUET_FILE_EXTENSION):
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(file_path)
+            for record_batch in parquet_file.iter_batches(batch_size=chunk_size):
+                yield record_batch.to_pandas()
+        else:
+            for chunk_df in pd.read_csv(file_path, chunksize=chunk_size):
+                yield chunk_df
+
+    def predict_file(self, input_file_path: str, output_file_path: str, chunk_size: int = None) -> PredictionReport:
+        """
+        scores a csv/parquet file chunk by chunk and appends every scored chunk to the output file,
+        so memory is bounded by chunk_size whatever the file size.
+        input_file_path: csv or parquet file with the feature columns
+        output_file_path: csv or parquet file written with the input columns plus the prediction columns
+        """
+        try:
+            chunk_size = chunk_size or self.prediction_config.chunk_size
+            output_dir = os.path.dirname(output_file_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            if os.path.exists(output_file_path):
+                os.remove(output_file_path)
+
+            parquet_writer = None
+            rows = 0
+            batch_latency_list = []
+            start_time = time.perf_counter()
+            try:
+                for chunk_df in HeartRiskPredictor.iterate_file_chunks(input_file_path, chunk_size):
+                    batch_start_time = time.perf_counter()
+                    output_df = pd.concat([chunk_df, self.predict(chunk_df)], axis=1)
+                    batch_latency_list.append(time.perf_counter() - batch_start_time)
+
+                    if output_file_path.endswith(PARQUET_FILE_EXTENSION):
+                        import pyarrow as pa
+                        import pyarrow.parquet as pq
+                        #later chunks are cast to the schema of the first one, csv chunks can infer different dtypes
+                        output_schema = parquet_writer.schema if parquet_writer is not None else None
+                        output_table = pa.Table.from_pandas(output_df, schema=output_schema, preserve_index=False)
+                        if parquet_writer is None:
+                            parquet_writer = pq.ParquetWriter(output_file_path, output_table.schema)
+                        parquet_writer.write_table(output_table)
+                    else:
+                        output_df.to_csv(output_file_path, mode='a', header=rows == 0, index=False)
+                    rows += len(chunk_df)
+            finally:
+                if parquet_writer is not None:
+                    parquet_writer.close()
+
+            total_seconds = time.perf_counter() - start_time
+            prediction_report = PredictionReport(input_file_path=input_file_path,
+                                                 output_file_path=output_file_path,
+                                                 rows=rows,
+                                                 batches=len(batch_latency_list),
+                                                 total_seconds=total_seconds,
+                                                 rows_per_second=rows / total_seconds if total_seconds > 0 else float("inf"),
+                                                 mean_batch_latency_ms=1000 * float(np.mean(batch_latency_list)) if batch_latency_list else 0.0)
+            logging.info(f"Prediction report: {prediction_report}")
+            return prediction_report
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def benchmark(self, dataframe: pd.DataFrame, batch_size_list: List[int] = None,
+                  max_rows_per_batch_size: int = 100000, max_batches: int = 200) -> List[BatchBenchmark]:
+        """
+        measures the latency of predict for every batch size on batches cut from the supplied dataframe
+        (rows are repeated when the batch size is bigger than the dataframe).
+        Each batch size is run until max_rows_per_batch_size rows or max_batches batches are scored,
+        with at least 3 batches.
+        """
+        try:
+            batch_size_list = batch_size_list or self.prediction_config.benchmark_batch_sizes
+            benchmark_list = []
+            for batch_size in batch_size_list:
+                repeats = int(np.ceil(batch_size / len(dataframe)))
+                source_df = pd.concat([dataframe] * repeats, ignore_index=True) if repeats > 1 else dataframe
+                batches = max(3, min(max_batches, max_rows_per_batch_size // batch_size))
+
+                #one warm up call so lazy initialisation is not measured
+                self.predict(source_df.iloc[:batch_size])
+                latency_list = []
+                for batch_number in range(batches):
+                    start = (batch_number * batch_size) % max(1, len(source_df) - batch_size + 1)
+                    batch_df = source_df.iloc[start:start + batch_size]
+                    batch_start_time = time.perf_counter()
+                    self.predict(batch_df)
+                    latency_list.append(time.perf_counter() - batch_start_time)
+
+                latency_arr = np.array(latency_list)
+                batch_benchmark = BatchBenchmark(batch_size=batch_size,
+                                                 batches=batches,
+                                                 mean_latency_ms=1000 * float(latency_arr.mean()),
+                                                 p50_latency_ms=1000 * float(np.percentile(latency_arr, 50)),
+                                                 p99_latency_ms=1000 * float(np.percentile(latency_arr, 99)),
+                                                 rows_per_second=batch_size * batches / float(latency_arr.sum()))
+                logging.info(f"Prediction benchmark: {batch_benchmark}")
+                benchmark_list.append(batch_benchmark)
+            return benchmark_list
+        except Exception as e:
+            raise HeartRiskException(e, sys)
@@ -0,0 +1,63 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import ModelTrainerConfig
+from src.Heart_Attack_Risk_Analyzer_Project.entity.model_factory import ModelFactory
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import numpy_array_data, save_object
+from src.Heart_Attack_Risk_Analyzer_Project.utils.array_artifact import save_array_model, is_array_model_supported
+from src.Heart_Attack_Risk_Analyzer_Project.utils.stage_profiler import profile_step
+import sys
+
+
+class ModelTrainer:
+    def __init__(self, model_trainer_config: ModelTrainerConfig, data_transformation_artifact: DataTransformationArtifact):
+        try:
+            logging.info(f"{'='*20} Model Trainer log started. {'='*20}")
+            self.model_trainer_config = model_trainer_config
+            self.data_transformation_artifact = data_transformation_artifact
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+        try:
+            logging.info(f"Loading transformed training dataset.")
+            train_arr = numpy_array_data(file_path=self.data_transformation_artifact.transformed_train_file_path,
+                                         mmap_mode='r')
+
+            #the target is the last column of the transformed array
+            input_feature_train, target_feature_train = train_arr[:, :-1], train_arr[:, -1]
+
+            logging.info(f"Searching the best model using the model config: [{self.model_trainer_config.model_config_file_path}]")
+            model_factory = ModelFactory(model_config_path=self.model_trainer_config.model_config_file_path)
+            best_model = model_factory.get_best_model(X=input_feature_train, y=target_feature_train,
+                                                      base_accuracy=self.model_trainer_config.base_accuracy)
+            logging.info(f"Best model found: {best_model}")
+
+            trained_model_file_path = self.model_trainer_config.trained_model_file_path
+            logging.info(f"Saving the trained model at: [{trained_model_file_path}]")
+            with profile_step("save_model"):
+                save_object(file_path=trained_model_file_path, obj=best_model.best_model)
+
+                #models without an array form are only served from the pickle
+                model_array_dir = None
+                if is_array_model_supported(best_model.best_model):
+                    model_array_dir = self.model_trainer_config.model_array_dir
+                    logging.info(f"Saving the trained model as array artifact at: [{model_array_dir}]")
+                    save_array_model(artifact_dir=model_array_dir, model=best_model.best_model)
+                else:
+                    logging.info(f"[{type(best_model.best_model).__name__}] has no array artifact form, only the pickle is saved.")
+
+            model_trainer_artifact = ModelTrainerArtifact(is_trained=True,
+                                                          message="Model Training successful.",
+                                                          trained_model_file_path=trained_model_file_path,
+                                                          model_name=type(best_model.best_model).__name__,
+                                                          best_parameters=best_model.best_parameters,
+                                                          best_score=float(best_model.best_score),
+                                                          model_array_dir=model_array_dir)
+            logging.info(f"Model Trainer artifact: {model_trainer_artifact}")
+            return model_trainer_artifact
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def __del__(self):
+        logging.info(f"{'='*20}Model Trainer log completed.{'='*20} \n\n")
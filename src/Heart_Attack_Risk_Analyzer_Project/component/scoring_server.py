@@ -0,0 +1,240 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import ServingConfig
+from src.Heart_Attack_Risk_Analyzer_Project.component.model_predictor import HeartRiskPredictor
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import sys
+import time
+import pandas as pd
+import numpy as np
+
+HTTP_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                    500: "Internal Server Error"}
+
+
+class ServingMetrics:
+    """
+    keeps the latency of the last metrics_window requests and the size of the last batches
+    """
+    def __init__(self, metrics_window: int):
+        self.start_time = time.perf_counter()
+        self.request_latency_list = deque(maxlen=metrics_window)
+        self.request_time_list = deque(maxlen=metrics_window)
+        self.batch_size_list = deque(maxlen=metrics_window)
+        self.total_requests = 0
+        self.total_batches = 0
+        self.total_errors = 0
+
+    def record_request(self, latency: float) -> None:
+        self.total_requests += 1
+        self.request_latency_list.append(latency)
+        self.request_time_list.append(time.perf_counter())
+
+    def record_batch(self, batch_size: int) -> None:
+        self.total_batches += 1
+        self.batch_size_list.append(batch_size)
+
+    def get_metrics(self) -> dict:
+        uptime = time.perf_counter() - self.start_time
+        latency_arr = np.array(self.request_latency_list) * 1000
+        window_seconds = (self.request_time_list[-1] - self.request_time_list[0]) if len(self.request_time_list) > 1 else 0
+        return {
+            "uptime_seconds": uptime,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "total_errors": self.total_errors,
+            "qps": self.total_requests / uptime if uptime > 0 else 0.0,
+            "window_qps": (len(self.request_time_list) - 1) / window_seconds if window_seconds > 0 else 0.0,
+            "p50_latency_ms": float(np.percentile(latency_arr, 50)) if len(latency_arr) else None,
+            "p99_latency_ms": float(np.percentile(latency_arr, 99)) if len(latency_arr) else None,
+            "mean_batch_size": float(np.mean(self.batch_size_list)) if len(self.batch_size_list) else None,
+        }
+
+
+class ScoringServer:
+    """
+    Local asyncio HTTP scoring service.
+    The predictor is loaded once at start up. Concurrent requests are put on a queue and a single batching task
+    collects them into micro batches of at most max_batch_size records, waiting at most max_wait_ms after the first
+    record of a batch. Each micro batch is scored with one vectorized predict call on a worker thread, so the event
+    loop keeps accepting requests meanwhile. When that call fails the records of the batch are scored one by one,
+    so only the requests of the failing records get an error.
+    Endpoints:
+        POST /predict : body is one patient json object (or a list of them), returns the probability and the label,
+                        or 400 with the errors of the records missing a feature column or holding a value not a number
+        GET /metrics  : p50/p99 latency, queries per second and batch statistics
+        GET /health   : liveness check
+    """
+    def __init__(self, serving_config: ServingConfig, predictor: HeartRiskPredictor):
+        try:
+            self.serving_config = serving_config
+            self.predictor = predictor
+            self.host = serving_config.host
+            self.port = serving_config.port
+            self.max_batch_size = int(serving_config.max_batch_size)
+            self.max_wait_seconds = float(serving_config.max_wait_ms) / 1000
+            self.metrics = ServingMetrics(metrics_window=int(serving_config.metrics_window))
+            self.request_queue = None
+            self.server = None
+            self.batching_task = None
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scoring")
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    async def get_next_batch(self) -> list:
+        """
+        waits for the first request then collects more until the batch is full or max_wait_ms has passed
+        """
+        batch = [await self.request_queue.get()]
+        deadline = time.perf_counter() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.request_queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run_batching(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.get_next_batch()
+            record_list = [record for record, _ in batch]
+            try:
+                prediction_df = await loop.run_in_executor(self.executor, self.predictor.predict,
+                                                           pd.DataFrame(record_list))
+                self.metrics.record_batch(len(batch))
+                probability_list = prediction_df[self.predictor.probability_column].tolist()
+                prediction_list = prediction_df[self.predictor.prediction_column].tolist()
+                for (_, future), probability, prediction in zip(batch, probability_list, prediction_list):
+                    if not future.done():
+                        future.set_result({self.predictor.probability_column: float(probability),
+                                           self.predictor.prediction_column: int(prediction)})
+            except Exception as e:
+                #the records of the batch are scored one by one, so a bad record only fails its own request
+                logging.error(f"Scoring of a batch of [{len(batch)}] records failed, scoring them one by one: {e}")
+                for record, future in batch:
+                    try:
+                        result = await loop.run_in_executor(self.executor, self.predictor.predict_record, record)
+                        if not future.done():
+                            future.set_result(result)
+                    except Exception as record_error:
+                        if not future.done():
+                            future.set_exception(record_error)
+
+    async def score(self, record_list: list) -> list:
+        loop = asyncio.get_running_loop()
+        future_list = []
+        for record in record_list:
+            future = loop.create_future()
+            await self.request_queue.put((record, future))
+            future_list.append(future)
+        return await asyncio.gather(*future_list)
+
+    async def handle_request(self, method: str, path: str, body: bytes):
+        """
+        returns (status, response object) for a parsed http request
+        """
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, self.metrics.get_metrics()
+        if path == "/predict":
+            if method != "POST":
+                return 405, {"error": "use POST to /predict"}
+            start_time = time.perf_counter()
+            try:
+                payload = json.loads(body or b"null")
+            except ValueError as e:
+                return 400, {"error": f"invalid json: {e}"}
+            if isinstance(payload, dict):
+                record_list = [payload]
+            elif isinstance(payload, list) and all(isinstance(record, dict) for record in payload) and payload:
+                record_list = payload
+            else:
+                return 400, {"error": "body must be a json object or a non empty list of json objects"}
+            #records are checked before they are queued, a micro batch only holds records that can be scored
+            record_error_dict = {index: error_list for index, error_list in
+                                 enumerate(map(self.predictor.get_record_errors, record_list)) if len(error_list) > 0}
+            if len(record_error_dict) > 0:
+                return 400, {"error": "invalid records", "record_errors": record_error_dict}
+            result = await self.score(record_list)
+            if isinstance(payload, dict):
+                result = result[0]
+            self.metrics.record_request(time.perf_counter() - start_time)
+            return 200, result
+        return 404, {"error": f"unknown path [{path}]"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        minimal HTTP/1.1 handling with keep alive, enough for local clients and load generators
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").strip().split(" ", 2)
+                headers = {}
+                while True:
+                    header_line = await reader.readline()
+                    if header_line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header_line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, response = await self.handle_request(method, path.split("?", 1)[0], body)
+                except Exception as e:
+                    self.metrics.total_errors += 1
+                    status, response = 500, {"error": str(e)}
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version.upper() != "HTTP/1.0"
+                response_body = json.dumps(response).encode()
+                writer.write((f"HTTP/1.1 {status} {HTTP_STATUS_TEXT.get(status, '')}\r\n"
+                              f"Content-Type: application/json\r\n"
+                              f"Content-Length: {len(response_body)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + response_body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            logging.info(f"Connection closed: {e}")
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        """
+        starts listening, with port 0 an ephemeral port is used and self.port is updated
+        """
+        try:
+            self.request_queue = asyncio.Queue()
+            self.batching_task = asyncio.create_task(self.run_batching())
+            self.server = await asyncio.start_server(self.handle_connection, host=self.host, port=self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+            logging.info(f"Scoring server listening on [{self.host}:{self.port}] with max_batch_size "
+                         f"[{self.max_batch_size}] and max_wait_ms [{self.serving_config.max_wait_ms}]")
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.batching_task is not None:
+            self.batching_task.cancel()
+        self.executor.shutdown(wait=False)
+        logging.info(f"Scoring server stopped, metrics: {self.metrics.get_metrics()}")
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
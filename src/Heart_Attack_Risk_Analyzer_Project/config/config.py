@@ -3,7 +3,7 @@ from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
 import os
 import sys
 from src.Heart_Attack_Risk_Analyzer_Project.constant import *
-from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import DataIngestionConfig, TrainingPipelineConfig, DataValidationConfig, DataTransformationConfig
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import DataIngestionConfig, TrainingPipelineConfig, DataValidationConfig, DataTransformationConfig, StageCacheConfig, ModelTrainerConfig, IncrementalTrainingConfig, PredictionConfig, ServingConfig, SchedulerConfig, ProfilingConfig, BenchmarkConfig
 from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import read_yaml_file
 
 class Config:
@@ -41,13 +41,45 @@ class Config:
                                              data_ingestion_info[DATA_INGESTION_TEST_DIR_KEY])
             
             zip_file_name = data_ingestion_info[DATA_INGESTSION_ZIP_DATA_FILE_NAME_KEY]
+
+            storage_format = data_ingestion_info.get(DATA_INGESTION_STORAGE_FORMAT_KEY, CSV_STORAGE_FORMAT)
+
+            #the dataset cache is shared by the runs, it is not under the time stamp dir of the run
+            dataset_cache_dir = os.path.join(artifact_dir,
+                                             data_ingestion_info.get(DATA_INGESTION_DATASET_CACHE_DIR_KEY, "dataset_cache"))
+
+            #the row index holds the rows of every run, it is shared like the dataset cache
+            deduplication_info = data_ingestion_info.get(DATA_INGESTION_DEDUPLICATION_KEY, None) or {}
+            row_index_dir = os.path.join(artifact_dir, deduplication_info.get(DEDUPLICATION_INDEX_DIR_KEY, "row_index"))
+
+            file_report_file_path = os.path.join(ingested_data_dir,
+                                                 data_ingestion_info.get(DATA_INGESTION_FILE_REPORT_FILE_NAME_KEY, "file_report.csv"))
+
+            #the files of the multi file mode are checked against the schema of the validation stage
+            data_validation_info = self.config_info[DATA_VALIDATION_CONFIG_KEY]
+            schema_file_path = os.path.join(ROOT_DIR,
+                                            data_validation_info[DATA_VALIDATION_SCHEMA_DIR_KEY],
+                                            data_validation_info[DATA_VALIDATION_SCHEMA_FILE_NAME_KEY])
             
             data_ingestion_config = DataIngestionConfig(dataset_url=dataset_url,
                                                         zip_data_dir=zip_data_dir,
                                                         zip_file_name=zip_file_name,
                                                         raw_data_dir=raw_data_dir,
                                                         ingested_train_dir=ingested_train_dir,
-                                                        ingested_test_dir=ingested_test_dir
+                                                        ingested_test_dir=ingested_test_dir,
+                                                        storage_format=storage_format,
+                                                        source_info=data_ingestion_info.get(DATA_INGESTION_SOURCE_KEY, None) or {},
+                                                        dataset_cache_dir=dataset_cache_dir,
+                                                        stream_extract=data_ingestion_info.get(DATA_INGESTION_STREAM_EXTRACT_KEY, False),
+                                                        multi_file=data_ingestion_info.get(DATA_INGESTION_MULTI_FILE_KEY, False),
+                                                        file_pattern=data_ingestion_info.get(DATA_INGESTION_FILE_PATTERN_KEY, "*.csv"),
+                                                        n_workers=data_ingestion_info.get(DATA_INGESTION_N_WORKERS_KEY, 1),
+                                                        skip_invalid_files=data_ingestion_info.get(DATA_INGESTION_SKIP_INVALID_FILES_KEY, False),
+                                                        file_report_file_path=file_report_file_path,
+                                                        schema_file_path=schema_file_path,
+                                                        split_info=data_ingestion_info.get(DATA_INGESTION_SPLIT_KEY, None) or {},
+                                                        deduplication_info=deduplication_info,
+                                                        row_index_dir=row_index_dir
                                                         )
             logging.info(f"Data Ingestion config: {data_ingestion_config}")
             return data_ingestion_config
@@ -73,10 +105,36 @@ class Config:
             report_page_file_path = os.path.join(data_validation_artifact_dir,
                                                  data_validation_config[DATA_VALIDATION_REPORT_PAGE_FILE_NAME_KEY])
             
+            reference_profile_file_path = os.path.join(data_validation_artifact_dir,
+                                                       data_validation_config.get(DATA_VALIDATION_REFERENCE_PROFILE_FILE_NAME_KEY,
+                                                                                  "reference_profile.json"))
+
+            schema_report_file_path = os.path.join(data_validation_artifact_dir,
+                                                   data_validation_config.get(DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME_KEY,
+                                                                              "schema_report.json"))
+
+            column_profile_file_path = os.path.join(data_validation_artifact_dir,
+                                                    data_validation_config.get(DATA_VALIDATION_COLUMN_PROFILE_FILE_NAME_KEY,
+                                                                               "column_profile.json"))
+
             data_validation_config = DataValidationConfig(
                 schema_file_path=schema_file_path,
                 report_file_path=report_file_path,
-                report_page_file_path=report_page_file_path
+                report_page_file_path=report_page_file_path,
+                executor=data_validation_config.get(DATA_VALIDATION_EXECUTOR_KEY, THREAD_VALIDATION_EXECUTOR),
+                n_workers=data_validation_config.get(DATA_VALIDATION_N_WORKERS_KEY, 1),
+                drift_engine=data_validation_config.get(DATA_VALIDATION_DRIFT_ENGINE_KEY, EVIDENTLY_DRIFT_ENGINE),
+                drift_report_html=data_validation_config.get(DATA_VALIDATION_DRIFT_REPORT_HTML_KEY, True),
+                drift_share=data_validation_config.get(DATA_VALIDATION_DRIFT_SHARE_KEY, 0.5),
+                reference_profile_file_path=reference_profile_file_path,
+                profile_max_centroids=data_validation_config.get(DATA_VALIDATION_PROFILE_MAX_CENTROIDS_KEY, 4096),
+                schema_report_file_path=schema_report_file_path,
+                schema_chunk_size=data_validation_config.get(DATA_VALIDATION_SCHEMA_CHUNK_SIZE_KEY, None),
+                max_invalid_row_share=data_validation_config.get(DATA_VALIDATION_MAX_INVALID_ROW_SHARE_KEY, 0.0),
+                column_profile_file_path=column_profile_file_path,
+                profile_top_k=data_validation_config.get(DATA_VALIDATION_PROFILE_TOP_K_KEY, 16),
+                profile_hll_precision=data_validation_config.get(DATA_VALIDATION_PROFILE_HLL_PRECISION_KEY, 12),
+                max_categories=data_validation_config.get(DATA_VALIDATION_MAX_CATEGORIES_KEY, 5)
             )
             logging.info(f"Data Validation config : [{data_validation_config}]")
             return data_validation_config
@@ -108,17 +166,320 @@ class Config:
             
             change_feature_male_to_gender = data_transformation_config_info[DATA_TRANSFORMATION_CHANGE_FEATURE_NAME_TO_GENDER_KEY]
 
+            preprocessed_array_dir = os.path.join(data_transformation_artifact_dir,
+                                                  data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY],
+                                                  data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSED_ARRAY_DIR_KEY])
+
             data_transformation_config = DataTransformationConfig(preprocessed_object_file_path=preprocessed_object_file_path,
                                                                   transformed_train_dir=transformed_train_dir,
                                                                   transformed_test_dir=transformed_test_dir,
                                                                   convert_features_to_object=convert_features_to_object,
-                                                                  change_feature_male_to_gender=change_feature_male_to_gender)
+                                                                  change_feature_male_to_gender=change_feature_male_to_gender,
+                                                                  preprocessed_array_dir=preprocessed_array_dir,
+                                                                  streaming=data_transformation_config_info.get(DATA_TRANSFORMATION_STREAMING_KEY, False),
+                                                                  chunk_size=data_transformation_config_info.get(DATA_TRANSFORMATION_CHUNK_SIZE_KEY, None),
+                                                                  knn_reference_sample_size=data_transformation_config_info.get(
+                                                                      DATA_TRANSFORMATION_KNN_REFERENCE_SAMPLE_SIZE_KEY, None),
+                                                                  numerical_imputer_info=data_transformation_config_info.get(
+                                                                      DATA_TRANSFORMATION_NUMERICAL_IMPUTER_KEY, None) or {},
+                                                                  resampling_info=data_transformation_config_info.get(
+                                                                      DATA_TRANSFORMATION_RESAMPLING_KEY, None) or {})
             logging.info(f"Data Transformation Config: {data_transformation_config}")
             return data_transformation_config
 
         except Exception as e:
             raise HeartRiskException(e, sys)
     
+    def get_model_trainer_config(self) -> ModelTrainerConfig:
+        try:
+            artifact_dir = self.training_pipeline_config.artifact_dir
+
+            model_trainer_artifact_dir = os.path.join(artifact_dir,
+                                                      MODEL_TRAINER_ARTIFACT_DIR,
+                                                      self.time_stamp)
+            model_trainer_config_info = self.config_info[MODEL_TRAINER_CONFIG_KEY]
+
+            trained_model_file_path = os.path.join(model_trainer_artifact_dir,
+                                                   model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_DIR_KEY],
+                                                   model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY])
+
+            model_config_file_path = os.path.join(ROOT_DIR,
+                                                  model_trainer_config_info[MODEL_TRAINER_MODEL_CONFIG_DIR_KEY],
+                                                  model_trainer_config_info[MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY])
+
+            model_array_dir = os.path.join(model_trainer_artifact_dir,
+                                           model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_DIR_KEY],
+                                           model_trainer_config_info[MODEL_TRAINER_MODEL_ARRAY_DIR_KEY])
+
+            base_accuracy = model_trainer_config_info[MODEL_TRAINER_BASE_ACCURACY_KEY]
+
+            model_trainer_config = ModelTrainerConfig(trained_model_file_path=trained_model_file_path,
+                                                      base_accuracy=base_accuracy,
+                                                      model_config_file_path=model_config_file_path,
+                                                      model_array_dir=model_array_dir)
+            logging.info(f"Model Trainer Config: {model_trainer_config}")
+            return model_trainer_config
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_latest_run_time_stamp(self, stage_artifact_dir_name: str, *relative_path: str) -> str:
+        """
+        returns the time stamp of the most recent run of the stage that produced the file at relative_path,
+        or None when no run has produced it yet
+        """
+        try:
+            stage_artifact_dir = os.path.join(self.training_pipeline_config.artifact_dir, stage_artifact_dir_name)
+            if not os.path.exists(stage_artifact_dir):
+                return None
+            for time_stamp in sorted(os.listdir(stage_artifact_dir), reverse=True):
+                if os.path.exists(os.path.join(stage_artifact_dir, time_stamp, *relative_path)):
+                    return time_stamp
+            return None
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_run_artifact_file_path(self, stage_artifact_dir_name: str, time_stamp: str, *relative_path: str) -> str:
+        """
+        returns the file at relative_path inside the directory of the run time_stamp of the stage,
+        or None when that run did not produce it
+        """
+        if time_stamp is None:
+            return None
+        file_path = os.path.join(self.training_pipeline_config.artifact_dir, stage_artifact_dir_name, time_stamp, *relative_path)
+        return file_path if os.path.exists(file_path) else None
+
+    def get_latest_artifact_file_path(self, stage_artifact_dir_name: str, *relative_path: str) -> str:
+        """
+        returns the file at relative_path inside the most recent time stamped directory of the stage
+        that contains it, or None when no run has produced it yet
+        """
+        time_stamp = self.get_latest_run_time_stamp(stage_artifact_dir_name, *relative_path)
+        return self.get_run_artifact_file_path(stage_artifact_dir_name, time_stamp, *relative_path)
+
+    def get_prediction_config(self) -> PredictionConfig:
+        """
+        the model is the latest trained one, the preprocessing object and the array artifacts are the ones of the
+        same run: a later run whose model was rejected still writes its own preprocessing object
+        """
+        try:
+            data_transformation_config_info = self.config_info[DATA_TRANSFORMATION_CONFIG_KEY]
+            model_trainer_config_info = self.config_info[MODEL_TRAINER_CONFIG_KEY]
+            prediction_config_info = self.config_info[PREDICTION_CONFIG_KEY]
+
+            trained_model_relative_path = (model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_DIR_KEY],
+                                           model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY])
+            time_stamp = self.get_latest_run_time_stamp(MODEL_TRAINER_ARTIFACT_DIR, *trained_model_relative_path)
+
+            trained_model_file_path = self.get_run_artifact_file_path(MODEL_TRAINER_ARTIFACT_DIR, time_stamp,
+                                                                      *trained_model_relative_path)
+
+            preprocessed_object_file_path = self.get_run_artifact_file_path(
+                DATA_TRANSFORMATION_ARTIFACT_DIR, time_stamp,
+                data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY],
+                data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_OBJECT_FILE_NAME_KEY])
+            if time_stamp is not None and preprocessed_object_file_path is None:
+                raise Exception(f"No preprocessing object found for the model of run [{time_stamp}]")
+
+            preprocessed_array_dir = self.get_run_artifact_file_path(
+                DATA_TRANSFORMATION_ARTIFACT_DIR, time_stamp,
+                data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY],
+                data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSED_ARRAY_DIR_KEY])
+
+            model_array_dir = self.get_run_artifact_file_path(
+                MODEL_TRAINER_ARTIFACT_DIR, time_stamp,
+                model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_DIR_KEY],
+                model_trainer_config_info[MODEL_TRAINER_MODEL_ARRAY_DIR_KEY])
+
+            data_validation_config_info = self.config_info[DATA_VALIDATION_CONFIG_KEY]
+            schema_file_path = os.path.join(ROOT_DIR,
+                                            data_validation_config_info[DATA_VALIDATION_SCHEMA_DIR_KEY],
+                                            data_validation_config_info[DATA_VALIDATION_SCHEMA_FILE_NAME_KEY])
+
+            prediction_config = PredictionConfig(preprocessed_object_file_path=preprocessed_object_file_path,
+                                                 trained_model_file_path=trained_model_file_path,
+                                                 schema_file_path=schema_file_path,
+                                                 chunk_size=prediction_config_info[PREDICTION_CHUNK_SIZE_KEY],
+                                                 benchmark_batch_sizes=prediction_config_info[PREDICTION_BENCHMARK_BATCH_SIZES_KEY],
+                                                 artifact_format=prediction_config_info.get(PREDICTION_ARTIFACT_FORMAT_KEY,
+                                                                                            PREDICTION_DILL_ARTIFACT_FORMAT),
+                                                 preprocessed_array_dir=preprocessed_array_dir,
+                                                 model_array_dir=model_array_dir,
+                                                 compile_kernel=prediction_config_info.get(PREDICTION_COMPILE_KERNEL_KEY, False))
+            logging.info(f"Prediction Config: {prediction_config}")
+            return prediction_config
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_incremental_training_config(self) -> IncrementalTrainingConfig:
+        """
+        the updated objects are written where a full run of this time stamp writes them, the base objects are the
+        latest ones. Replay sample and data profile of the base come from the incremental run that wrote it, or
+        from the transformed training array and the reference profile of the last full run.
+        """
+        try:
+            artifact_dir = self.training_pipeline_config.artifact_dir
+            incremental_training_config_info = self.config_info.get(INCREMENTAL_TRAINING_CONFIG_KEY, None) or {}
+            lineage_file_name = incremental_training_config_info.get(INCREMENTAL_TRAINING_LINEAGE_FILE_NAME_KEY, "lineage.json")
+            replay_file_name = incremental_training_config_info.get(INCREMENTAL_TRAINING_REPLAY_FILE_NAME_KEY, "replay.npy")
+            data_profile_file_name = incremental_training_config_info.get(INCREMENTAL_TRAINING_DATA_PROFILE_FILE_NAME_KEY,
+                                                                          "data_profile.json")
+
+            incremental_training_artifact_dir = os.path.join(artifact_dir, INCREMENTAL_TRAINING_ARTIFACT_DIR, self.time_stamp)
+            data_transformation_artifact_dir = os.path.join(artifact_dir, DATA_TRANSFORMATION_ARTIFACT_DIR, self.time_stamp)
+            data_transformation_config = self.get_data_transformation_config()
+            model_trainer_config = self.get_model_trainer_config()
+            prediction_config = self.get_prediction_config()
+
+            base_trained_model_file_path = prediction_config.trained_model_file_path
+            base_preprocessed_object_file_path = prediction_config.preprocessed_object_file_path
+            base_time_stamp, base_lineage_file_path, base_replay_file_path, base_profile_file_path = None, None, None, None
+            if base_trained_model_file_path is not None:
+                base_time_stamp = os.path.relpath(base_trained_model_file_path,
+                                                  os.path.join(artifact_dir, MODEL_TRAINER_ARTIFACT_DIR)).split(os.sep)[0]
+                #the preprocessing object written with the model, the latest one when the model run did not write it
+                base_data_transformation_dir = os.path.join(artifact_dir, DATA_TRANSFORMATION_ARTIFACT_DIR, base_time_stamp)
+                base_data_transformation_config = data_transformation_config._replace(
+                    preprocessed_object_file_path=os.path.join(base_data_transformation_dir, os.path.relpath(
+                        data_transformation_config.preprocessed_object_file_path, data_transformation_artifact_dir)),
+                    transformed_train_dir=os.path.join(base_data_transformation_dir, os.path.relpath(
+                        data_transformation_config.transformed_train_dir, data_transformation_artifact_dir)))
+                if os.path.exists(base_data_transformation_config.preprocessed_object_file_path):
+                    base_preprocessed_object_file_path = base_data_transformation_config.preprocessed_object_file_path
+
+                base_incremental_training_dir = os.path.join(artifact_dir, INCREMENTAL_TRAINING_ARTIFACT_DIR, base_time_stamp)
+                base_lineage_file_path = os.path.join(base_incremental_training_dir, lineage_file_name)
+                base_replay_file_path = os.path.join(base_incremental_training_dir, replay_file_name)
+                base_profile_file_path = os.path.join(base_incremental_training_dir, data_profile_file_name)
+                if not os.path.exists(base_lineage_file_path):
+                    #the base is a full run
+                    base_lineage_file_path = None
+                    transformed_train_dir = base_data_transformation_config.transformed_train_dir
+                    if not os.path.exists(transformed_train_dir):
+                        data_transformation_config_info = self.config_info[DATA_TRANSFORMATION_CONFIG_KEY]
+                        transformed_train_dir = self.get_latest_artifact_file_path(
+                            DATA_TRANSFORMATION_ARTIFACT_DIR,
+                            data_transformation_config_info[DATA_TRANSFORMATION_DIR_KEY],
+                            data_transformation_config_info[DATA_TRANSFORMATION_TRAIN_DIR_KEY])
+                    base_replay_file_path = None
+                    if transformed_train_dir is not None:
+                        base_replay_file_path = next((os.path.join(transformed_train_dir, file_name)
+                                                      for file_name in sorted(os.listdir(transformed_train_dir))), None)
+                    base_profile_file_path = self.get_latest_artifact_file_path(
+                        DATA_VALIDATION_ARTIFACT_DIR_NAME,
+                        os.path.basename(self.get_data_validation_config().reference_profile_file_path))
+
+            incremental_training_config = IncrementalTrainingConfig(
+                lineage_file_path=os.path.join(incremental_training_artifact_dir, lineage_file_name),
+                replay_file_path=os.path.join(incremental_training_artifact_dir, replay_file_name),
+                data_profile_file_path=os.path.join(incremental_training_artifact_dir, data_profile_file_name),
+                replay_sample_size=incremental_training_config_info.get(INCREMENTAL_TRAINING_REPLAY_SAMPLE_SIZE_KEY, 20000),
+                resample=incremental_training_config_info.get(INCREMENTAL_TRAINING_RESAMPLE_KEY, True),
+                schema_file_path=prediction_config.schema_file_path,
+                preprocessed_object_file_path=data_transformation_config.preprocessed_object_file_path,
+                preprocessed_array_dir=data_transformation_config.preprocessed_array_dir,
+                trained_model_file_path=model_trainer_config.trained_model_file_path,
+                model_array_dir=model_trainer_config.model_array_dir,
+                base_time_stamp=base_time_stamp,
+                base_preprocessed_object_file_path=base_preprocessed_object_file_path,
+                base_trained_model_file_path=base_trained_model_file_path,
+                base_lineage_file_path=base_lineage_file_path,
+                base_replay_file_path=base_replay_file_path,
+                base_profile_file_path=base_profile_file_path)
+            logging.info(f"Incremental Training Config: {incremental_training_config}")
+            return incremental_training_config
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_serving_config(self) -> ServingConfig:
+        try:
+            serving_config_info = self.config_info[SERVING_CONFIG_KEY]
+
+            serving_config = ServingConfig(host=serving_config_info[SERVING_HOST_KEY],
+                                           port=serving_config_info[SERVING_PORT_KEY],
+                                           max_batch_size=serving_config_info[SERVING_MAX_BATCH_SIZE_KEY],
+                                           max_wait_ms=serving_config_info[SERVING_MAX_WAIT_MS_KEY],
+                                           metrics_window=serving_config_info[SERVING_METRICS_WINDOW_KEY])
+            logging.info(f"Serving Config: {serving_config}")
+            return serving_config
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_stage_cache_config(self) -> StageCacheConfig:
+        try:
+            artifact_dir = self.training_pipeline_config.artifact_dir
+            stage_cache_config_info = self.config_info.get(STAGE_CACHE_CONFIG_KEY, None) or {}
+
+            cache_dir = os.path.join(artifact_dir,
+                                     stage_cache_config_info.get(STAGE_CACHE_DIR_KEY, "stage_cache"))
+
+            stage_cache_config = StageCacheConfig(enabled=stage_cache_config_info.get(STAGE_CACHE_ENABLED_KEY, False),
+                                                  cache_dir=cache_dir,
+                                                  max_age_days=stage_cache_config_info.get(STAGE_CACHE_MAX_AGE_DAYS_KEY, None),
+                                                  max_size_mb=stage_cache_config_info.get(STAGE_CACHE_MAX_SIZE_MB_KEY, None),
+                                                  evict_interval_hours=stage_cache_config_info.get(STAGE_CACHE_EVICT_INTERVAL_HOURS_KEY, None),
+                                                  artifact_dir=artifact_dir)
+            logging.info(f"Stage Cache Config: {stage_cache_config}")
+            return stage_cache_config
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_scheduler_config(self) -> SchedulerConfig:
+        try:
+            artifact_dir = self.training_pipeline_config.artifact_dir
+            scheduler_config_info = self.config_info.get(SCHEDULER_CONFIG_KEY, None) or {}
+
+            jobs_dir = os.path.join(artifact_dir,
+                                    scheduler_config_info.get(SCHEDULER_JOBS_DIR_KEY, "scheduler"))
+
+            scheduler_config = SchedulerConfig(n_workers=scheduler_config_info.get(SCHEDULER_N_WORKERS_KEY, 1),
+                                               jobs_dir=jobs_dir,
+                                               memory_mb=scheduler_config_info.get(SCHEDULER_MEMORY_MB_KEY, None),
+                                               cpu_seconds=scheduler_config_info.get(SCHEDULER_CPU_SECONDS_KEY, None),
+                                               timeout_seconds=scheduler_config_info.get(SCHEDULER_TIMEOUT_SECONDS_KEY, None),
+                                               n_threads=scheduler_config_info.get(SCHEDULER_N_THREADS_KEY, None),
+                                               poll_interval_seconds=scheduler_config_info.get(SCHEDULER_POLL_INTERVAL_SECONDS_KEY, 0.5),
+                                               artifact_dir=artifact_dir)
+            logging.info(f"Scheduler Config: {scheduler_config}")
+            return scheduler_config
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_profiling_config(self) -> ProfilingConfig:
+        try:
+            profiling_config_info = self.config_info.get(PROFILING_CONFIG_KEY, None) or {}
+            profiling_config = ProfilingConfig(enabled=profiling_config_info.get(PROFILING_ENABLED_KEY, False),
+                                               sample_interval_seconds=profiling_config_info.get(PROFILING_SAMPLE_INTERVAL_SECONDS_KEY, 0.05),
+                                               prometheus=profiling_config_info.get(PROFILING_PROMETHEUS_KEY, False),
+                                               profile_dir=os.path.join(self.training_pipeline_config.artifact_dir,
+                                                                        EXPERIMENT_DIR_NAME))
+            logging.info(f"Profiling Config: {profiling_config}")
+            return profiling_config
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_benchmark_config(self) -> BenchmarkConfig:
+        try:
+            benchmark_config_info = self.config_info.get(BENCHMARK_CONFIG_KEY, None) or {}
+            baseline_file_path = os.path.join(ROOT_DIR,
+                                              benchmark_config_info.get(BENCHMARK_BASELINE_DIR_KEY, "benchmarks"),
+                                              benchmark_config_info.get(BENCHMARK_BASELINE_FILE_NAME_KEY, "baseline.json"))
+            benchmark_config = BenchmarkConfig(source_file_path=os.path.join(ROOT_DIR,
+                                                                             benchmark_config_info.get(BENCHMARK_SOURCE_FILE_KEY,
+                                                                                                       os.path.join(EXPERIMENT_DIR_NAME, "framingham.csv"))),
+                                               sizes=benchmark_config_info.get(BENCHMARK_SIZES_KEY, [4000]),
+                                               seed=benchmark_config_info.get(BENCHMARK_SEED_KEY, 42),
+                                               repeats=benchmark_config_info.get(BENCHMARK_REPEATS_KEY, 1),
+                                               repeat_max_rows=benchmark_config_info.get(BENCHMARK_REPEAT_MAX_ROWS_KEY, None),
+                                               max_rows=benchmark_config_info.get(BENCHMARK_MAX_ROWS_KEY, None) or {},
+                                               work_dir=benchmark_config_info.get(BENCHMARK_WORK_DIR_KEY, None),
+                                               baseline_file_path=baseline_file_path,
+                                               tolerance=benchmark_config_info.get(BENCHMARK_TOLERANCE_KEY, 0.25),
+                                               min_seconds=benchmark_config_info.get(BENCHMARK_MIN_SECONDS_KEY, 0.05))
+            logging.info(f"Benchmark Config: {benchmark_config}")
+            return benchmark_config
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
     def get_training_pipeline_config(self) -> TrainingPipelineConfig:
         try:
             training_pipeline_config = self.config_info[TRAINING_PIPELINE_CONFIG_KEY]
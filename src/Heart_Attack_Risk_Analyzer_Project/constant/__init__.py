@@ -30,6 +30,41 @@ DATA_INGESTION_RAW_DATA_DIR_KEY = "raw_data_dir"
 DATA_INGESTION_INGESTED_DIR_NAME_KEY = "ingested_dir"
 DATA_INGESTION_TRAIN_DIR_KEY = "ingested_train_dir"
 DATA_INGESTION_TEST_DIR_KEY = "ingested_test_dir"
+DATA_INGESTION_STORAGE_FORMAT_KEY = "storage_format"
+PARQUET_STORAGE_FORMAT = "parquet"
+CSV_STORAGE_FORMAT = "csv"
+PARQUET_FILE_EXTENSION = ".parquet"
+CSV_FILE_EXTENSION = ".csv"
+DATA_INGESTION_SOURCE_KEY = "source"
+DATA_INGESTION_DATASET_CACHE_DIR_KEY = "dataset_cache_dir"
+DATA_INGESTION_STREAM_EXTRACT_KEY = "stream_extract"
+DATASET_SOURCE_TYPE_KEY = "type"
+DATASET_SOURCE_PATH_KEY = "path"
+DATASET_SOURCE_URL_KEY = "url"
+DATASET_SOURCE_MEMBER_KEY = "member"
+DATASET_SOURCE_SHA256_KEY = "sha256"
+DATASET_SOURCE_TIMEOUT_SECONDS_KEY = "timeout_seconds"
+DATASET_SOURCE_REFRESH_KEY = "refresh"
+LOCAL_FILE_DATASET_SOURCE = "local_file"
+LOCAL_DIR_DATASET_SOURCE = "local_dir"
+HTTP_DATASET_SOURCE = "http"
+KAGGLE_DATASET_SOURCE = "kaggle"
+DATA_INGESTION_MULTI_FILE_KEY = "multi_file"
+DATA_INGESTION_FILE_PATTERN_KEY = "file_pattern"
+DATA_INGESTION_N_WORKERS_KEY = "n_workers"
+DATA_INGESTION_SKIP_INVALID_FILES_KEY = "skip_invalid_files"
+DATA_INGESTION_FILE_REPORT_FILE_NAME_KEY = "file_report_file_name"
+DATA_INGESTION_SPLIT_KEY = "split"
+SPLIT_METHOD_KEY = "method"
+SPLIT_TEST_SIZE_KEY = "test_size"
+SPLIT_ID_COLUMN_KEY = "id_column"
+SPLIT_SEED_KEY = "seed"
+SPLIT_CHUNK_SIZE_KEY = "chunk_size"
+HASH_SPLIT_METHOD = "hash"
+DATA_INGESTION_DEDUPLICATION_KEY = "deduplication"
+DEDUPLICATION_ENABLED_KEY = "enabled"
+DEDUPLICATION_INDEX_DIR_KEY = "index_dir"
+SHUFFLE_SPLIT_METHOD = "shuffle"
 
 EXPERIMENT_DIR_NAME = "experiment"
 
@@ -44,6 +79,29 @@ DATA_VALIDATION_GET_ALL_COLUMNS_KEY = "columns"
 DATA_VALIDATION_GET_TARGET_COLUMN_KEY = "target_column"
 DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY = "categorical_columns"
 DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY = "numerical_columns"
+DATA_VALIDATION_EXECUTOR_KEY = "executor"
+DATA_VALIDATION_N_WORKERS_KEY = "n_workers"
+THREAD_VALIDATION_EXECUTOR = "thread"
+PROCESS_VALIDATION_EXECUTOR = "process"
+DATA_VALIDATION_DRIFT_ENGINE_KEY = "drift_engine"
+DATA_VALIDATION_DRIFT_REPORT_HTML_KEY = "drift_report_html"
+DATA_VALIDATION_DRIFT_SHARE_KEY = "drift_share"
+DATA_VALIDATION_REFERENCE_PROFILE_FILE_NAME_KEY = "reference_profile_file_name"
+DATA_VALIDATION_PROFILE_MAX_CENTROIDS_KEY = "profile_max_centroids"
+DATA_VALIDATION_SCHEMA_CHUNK_SIZE_KEY = "schema_chunk_size"
+DATA_VALIDATION_MAX_INVALID_ROW_SHARE_KEY = "max_invalid_row_share"
+DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME_KEY = "schema_report_file_name"
+DATA_VALIDATION_COLUMN_RULES_KEY = "column_rules"
+SCHEMA_NULLABLE_KEY = "nullable"
+SCHEMA_MIN_KEY = "min"
+SCHEMA_MAX_KEY = "max"
+SCHEMA_ALLOWED_VALUES_KEY = "allowed_values"
+DATA_VALIDATION_COLUMN_PROFILE_FILE_NAME_KEY = "column_profile_file_name"
+DATA_VALIDATION_PROFILE_TOP_K_KEY = "profile_top_k"
+DATA_VALIDATION_PROFILE_HLL_PRECISION_KEY = "profile_hll_precision"
+DATA_VALIDATION_MAX_CATEGORIES_KEY = "max_categories"
+NATIVE_DRIFT_ENGINE = "native"
+EVIDENTLY_DRIFT_ENGINE = "evidently"
 
 #Data Transformation related variable
 DATA_TRANSFORMATION_ARTIFACT_DIR = "data_transformation"
@@ -53,5 +111,111 @@ DATA_TRANSFORMATION_TRAIN_DIR_KEY = "transformed_train_dir"
 DATA_TRANSFORMATION_TEST_DIR_KEY = "transformed_test_dir"
 DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY = "preprocessing_dir"
 DATA_TRANSFORMATION_PREPROCESSING_OBJECT_FILE_NAME_KEY = "preprocessed_object_file_name"
+DATA_TRANSFORMATION_PREPROCESSED_ARRAY_DIR_KEY = "preprocessed_array_dir"
 DATA_TRANSFORMATION_CHANGE_FEATURE_NAME_TO_GENDER_KEY = "change_feature_male_to_gender"
-DATA_TRANSFORMATION_CONVERT_FEATURES_TO_OBJECTS = "convert_features_to_objects"
\ No newline at end of file
+DATA_TRANSFORMATION_CONVERT_FEATURES_TO_OBJECTS = "convert_features_to_objects"
+DATA_TRANSFORMATION_STREAMING_KEY = "streaming"
+DATA_TRANSFORMATION_CHUNK_SIZE_KEY = "chunk_size"
+DATA_TRANSFORMATION_KNN_REFERENCE_SAMPLE_SIZE_KEY = "knn_reference_sample_size"
+DATA_TRANSFORMATION_NUMERICAL_IMPUTER_KEY = "numerical_imputer"
+NUMERICAL_IMPUTER_ENGINE_KEY = "engine"
+NUMERICAL_IMPUTER_N_NEIGHBORS_KEY = "n_neighbors"
+NUMERICAL_IMPUTER_MAX_REFERENCE_ROWS_KEY = "max_reference_rows"
+NUMERICAL_IMPUTER_N_JOBS_KEY = "n_jobs"
+KNN_IMPUTER_ENGINE = "knn"
+TREE_KNN_IMPUTER_ENGINE = "tree_knn"
+DATA_TRANSFORMATION_RESAMPLING_KEY = "resampling"
+RESAMPLING_STRATEGY_KEY = "strategy"
+RESAMPLING_SAMPLING_RATIO_KEY = "sampling_ratio"
+RESAMPLING_K_NEIGHBORS_KEY = "k_neighbors"
+RESAMPLING_N_JOBS_KEY = "n_jobs"
+RESAMPLING_RANDOM_STATE_KEY = "random_state"
+SMOTE_RESAMPLING_STRATEGY = "smote"
+ADASYN_RESAMPLING_STRATEGY = "adasyn"
+SMOTE_ADASYN_RESAMPLING_STRATEGY = "smote_adasyn"
+NO_RESAMPLING_STRATEGY = "none"
+
+#Model Trainer related variable
+MODEL_TRAINER_ARTIFACT_DIR = "model_trainer"
+MODEL_TRAINER_CONFIG_KEY = "model_trainer_config"
+MODEL_TRAINER_TRAINED_MODEL_DIR_KEY = "trained_model_dir"
+MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY = "model_file_name"
+MODEL_TRAINER_MODEL_ARRAY_DIR_KEY = "model_array_dir"
+MODEL_TRAINER_BASE_ACCURACY_KEY = "base_accuracy"
+MODEL_TRAINER_MODEL_CONFIG_DIR_KEY = "model_config_dir"
+MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY = "model_config_file_name"
+
+#Incremental Training related variable
+INCREMENTAL_TRAINING_ARTIFACT_DIR = "incremental_training"
+INCREMENTAL_TRAINING_CONFIG_KEY = "incremental_training_config"
+INCREMENTAL_TRAINING_LINEAGE_FILE_NAME_KEY = "lineage_file_name"
+INCREMENTAL_TRAINING_REPLAY_FILE_NAME_KEY = "replay_file_name"
+INCREMENTAL_TRAINING_DATA_PROFILE_FILE_NAME_KEY = "data_profile_file_name"
+INCREMENTAL_TRAINING_REPLAY_SAMPLE_SIZE_KEY = "replay_sample_size"
+INCREMENTAL_TRAINING_RESAMPLE_KEY = "resample"
+FULL_TRAINING_UPDATE_METHOD = "full"
+PARTIAL_FIT_UPDATE_METHOD = "partial_fit"
+WARM_START_UPDATE_METHOD = "warm_start"
+REFIT_UPDATE_METHOD = "refit"
+
+#Prediction related variable
+PREDICTION_CONFIG_KEY = "prediction_config"
+PREDICTION_CHUNK_SIZE_KEY = "chunk_size"
+PREDICTION_BENCHMARK_BATCH_SIZES_KEY = "benchmark_batch_sizes"
+PREDICTION_ARTIFACT_FORMAT_KEY = "artifact_format"
+PREDICTION_ARRAY_ARTIFACT_FORMAT = "array"
+PREDICTION_DILL_ARTIFACT_FORMAT = "dill"
+PREDICTION_COMPILE_KERNEL_KEY = "compile_kernel"
+PREDICTION_PROBABILITY_COLUMN_SUFFIX = "_probability"
+PREDICTION_LABEL_COLUMN_SUFFIX = "_prediction"
+
+#Serving related variable
+SERVING_CONFIG_KEY = "serving_config"
+SERVING_HOST_KEY = "host"
+SERVING_PORT_KEY = "port"
+SERVING_MAX_BATCH_SIZE_KEY = "max_batch_size"
+SERVING_MAX_WAIT_MS_KEY = "max_wait_ms"
+SERVING_METRICS_WINDOW_KEY = "metrics_window"
+
+#Stage cache related variable
+STAGE_CACHE_CONFIG_KEY = "stage_cache_config"
+STAGE_CACHE_ENABLED_KEY = "enabled"
+STAGE_CACHE_DIR_KEY = "cache_dir"
+STAGE_CACHE_MAX_AGE_DAYS_KEY = "max_age_days"
+STAGE_CACHE_MAX_SIZE_MB_KEY = "max_size_mb"
+STAGE_CACHE_EVICT_INTERVAL_HOURS_KEY = "evict_interval_hours"
+
+#Scheduler related variable
+SCHEDULER_CONFIG_KEY = "scheduler_config"
+SCHEDULER_N_WORKERS_KEY = "n_workers"
+SCHEDULER_JOBS_DIR_KEY = "jobs_dir"
+SCHEDULER_MEMORY_MB_KEY = "memory_mb"
+SCHEDULER_CPU_SECONDS_KEY = "cpu_seconds"
+SCHEDULER_TIMEOUT_SECONDS_KEY = "timeout_seconds"
+SCHEDULER_N_THREADS_KEY = "n_threads"
+SCHEDULER_POLL_INTERVAL_SECONDS_KEY = "poll_interval_seconds"
+JOB_QUEUED_STATUS = "queued"
+JOB_RUNNING_STATUS = "running"
+JOB_COMPLETED_STATUS = "completed"
+JOB_FAILED_STATUS = "failed"
+JOB_CANCELLED_STATUS = "cancelled"
+
+#Profiling related variable
+PROFILING_CONFIG_KEY = "profiling_config"
+PROFILING_ENABLED_KEY = "enabled"
+PROFILING_SAMPLE_INTERVAL_SECONDS_KEY = "sample_interval_seconds"
+PROFILING_PROMETHEUS_KEY = "prometheus"
+
+#Benchmark related variable
+BENCHMARK_CONFIG_KEY = "benchmark_config"
+BENCHMARK_SOURCE_FILE_KEY = "source_file"
+BENCHMARK_SIZES_KEY = "sizes"
+BENCHMARK_SEED_KEY = "seed"
+BENCHMARK_REPEATS_KEY = "repeats"
+BENCHMARK_REPEAT_MAX_ROWS_KEY = "repeat_max_rows"
+BENCHMARK_MAX_ROWS_KEY = "max_rows"
+BENCHMARK_WORK_DIR_KEY = "work_dir"
+BENCHMARK_BASELINE_DIR_KEY = "baseline_dir"
+BENCHMARK_BASELINE_FILE_NAME_KEY = "baseline_file_name"
+BENCHMARK_TOLERANCE_KEY = "tolerance"
+BENCHMARK_MIN_SECONDS_KEY = "min_seconds"
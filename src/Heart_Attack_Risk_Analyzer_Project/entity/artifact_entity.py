@@ -1,13 +1,23 @@
 from collections import namedtuple
 
 DataIngestionArtifact = namedtuple("DataIngestionArtifact", 
-                                   ["train_file_path", "test_file_path", "is_ingested", "message"])
+                                   ["train_file_path", "test_file_path", "is_ingested", "message",
+                                    "train_dataset", "test_dataset", "file_report_file_path"])
 
 DataValidationArtifact = namedtuple("DataValidationArtifact",
                                     ["schema_file_path", "report_file_path", "report_file_page_path",
                                      "tests_file_path", "tests_file_page_path", "cat_features_list",
-                                     "num_features_list"])
+                                     "num_features_list", "reference_profile_file_path", "column_profile_file_path"])
 
 DataTransformationArtifact = namedtuple("DataTransformationArtifact",
                                         ["is_transformed", "message", "transformed_train_file_path", "transformed_test_file_path",
-                                         "preprocessed_object_file_path"])
\ No newline at end of file
+                                         "preprocessed_object_file_path", "preprocessed_array_dir"])
+
+ModelTrainerArtifact = namedtuple("ModelTrainerArtifact",
+                                  ["is_trained", "message", "trained_model_file_path", "model_name",
+                                   "best_parameters", "best_score", "model_array_dir"])
+
+IncrementalTrainingArtifact = namedtuple("IncrementalTrainingArtifact",
+                                         ["is_trained", "message", "preprocessed_object_file_path",
+                                          "trained_model_file_path", "model_name", "update_method", "rows_added",
+                                          "rows_seen", "lineage_file_path"])
@@ -1,13 +1,56 @@
 from collections import namedtuple
 
 DataIngestionConfig = namedtuple("DataIngestionConfig", 
-["dataset_url", "zip_data_dir", "zip_file_name", "raw_data_dir", "ingested_train_dir", "ingested_test_dir",])
+["dataset_url", "zip_data_dir", "zip_file_name", "raw_data_dir", "ingested_train_dir", "ingested_test_dir",
+ "storage_format", "source_info", "dataset_cache_dir", "stream_extract", "multi_file", "file_pattern", "n_workers",
+ "skip_invalid_files", "file_report_file_path", "schema_file_path", "split_info", "deduplication_info",
+ "row_index_dir"])
 
 TrainingPipelineConfig = namedtuple("TrainingPipelineConfig", ["artifact_dir"])
 
 DataValidationConfig = namedtuple("DataValidationConfig",
-                                  ["schema_file_path", "report_file_path", "report_page_file_path"])
+                                  ["schema_file_path", "report_file_path", "report_page_file_path", "executor",
+                                   "n_workers", "drift_engine", "drift_report_html", "drift_share",
+                                   "reference_profile_file_path", "profile_max_centroids", "schema_report_file_path",
+                                   "schema_chunk_size", "max_invalid_row_share", "column_profile_file_path",
+                                   "profile_top_k", "profile_hll_precision", "max_categories"])
 
 DataTransformationConfig = namedtuple("DataTransformationConfig",
                                       ["preprocessed_object_file_path", "transformed_train_dir", "transformed_test_dir",
-                                       "convert_features_to_object", "change_feature_male_to_gender"])
\ No newline at end of file
+                                       "convert_features_to_object", "change_feature_male_to_gender",
+                                       "preprocessed_array_dir", "streaming", "chunk_size",
+                                       "knn_reference_sample_size", "numerical_imputer_info", "resampling_info"])
+
+ModelTrainerConfig = namedtuple("ModelTrainerConfig",
+                                ["trained_model_file_path", "base_accuracy", "model_config_file_path", "model_array_dir"])
+
+IncrementalTrainingConfig = namedtuple("IncrementalTrainingConfig",
+                                       ["lineage_file_path", "replay_file_path", "data_profile_file_path",
+                                        "replay_sample_size", "resample", "schema_file_path",
+                                        "preprocessed_object_file_path", "preprocessed_array_dir",
+                                        "trained_model_file_path", "model_array_dir", "base_time_stamp",
+                                        "base_preprocessed_object_file_path", "base_trained_model_file_path",
+                                        "base_lineage_file_path", "base_replay_file_path", "base_profile_file_path"])
+
+PredictionConfig = namedtuple("PredictionConfig",
+                              ["preprocessed_object_file_path", "trained_model_file_path", "schema_file_path",
+                               "chunk_size", "benchmark_batch_sizes", "artifact_format", "preprocessed_array_dir",
+                               "model_array_dir", "compile_kernel"])
+
+ServingConfig = namedtuple("ServingConfig",
+                           ["host", "port", "max_batch_size", "max_wait_ms", "metrics_window"])
+
+StageCacheConfig = namedtuple("StageCacheConfig",
+                              ["enabled", "cache_dir", "max_age_days", "max_size_mb", "evict_interval_hours",
+                               "artifact_dir"])
+
+SchedulerConfig = namedtuple("SchedulerConfig",
+                             ["n_workers", "jobs_dir", "memory_mb", "cpu_seconds", "timeout_seconds", "n_threads",
+                              "poll_interval_seconds", "artifact_dir"])
+
+ProfilingConfig = namedtuple("ProfilingConfig",
+                             ["enabled", "sample_interval_seconds", "prometheus", "profile_dir"])
+
+BenchmarkConfig = namedtuple("BenchmarkConfig",
+                             ["source_file_path", "sizes", "seed", "repeats", "repeat_max_rows", "max_rows", "work_dir",
+                              "baseline_file_path", "tolerance", "min_seconds"])
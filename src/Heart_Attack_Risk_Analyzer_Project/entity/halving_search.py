@@ -0,0 +1,275 @@
+import numpy as np
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.entity.parallel_search import ParallelSearchScheduler
+import math
+import sys
+from typing import List
+from sklearn.base import clone, is_classifier
+from sklearn.model_selection import ParameterGrid, check_cv, train_test_split
+
+# solver -> penalties the solver can fit, anything else makes LogisticRegression.fit raise
+LOGISTIC_REGRESSION_SOLVER_PENALTY = {
+    "lbfgs": ["l2", None],
+    "liblinear": ["l1", "l2"],
+    "newton-cg": ["l2", None],
+    "newton-cholesky": ["l2", None],
+    "sag": ["l2", None],
+    "saga": ["elasticnet", "l1", "l2", None],
+}
+
+
+def is_valid_logistic_regression_candidate(parameters: dict) -> bool:
+    solver = parameters.get("solver", "lbfgs")
+    penalty = parameters.get("penalty", "l2")
+    if penalty == "none":
+        penalty = None
+    if solver in LOGISTIC_REGRESSION_SOLVER_PENALTY and penalty not in LOGISTIC_REGRESSION_SOLVER_PENALTY[solver]:
+        return False
+    if penalty == "elasticnet" and parameters.get("l1_ratio", None) is None:
+        return False
+    if parameters.get("dual", False) and not (solver == "liblinear" and penalty == "l2"):
+        return False
+    return True
+
+
+# estimator class name -> function telling if a full parameter set can be fitted
+CANDIDATE_VALIDATORS = {
+    "LogisticRegression": is_valid_logistic_regression_candidate,
+}
+
+
+def prune_invalid_candidates(estimator, candidate_params: List[dict]) -> List[dict]:
+    """
+    removes the candidates which can never be fitted (for example penalty l1 with solver lbfgs),
+    each candidate is checked together with the estimator's own parameters it does not override.
+    """
+    try:
+        validator = CANDIDATE_VALIDATORS.get(type(estimator).__name__, None)
+        if validator is None:
+            return candidate_params
+        estimator_params = estimator.get_params(deep=False)
+        return [parameters for parameters in candidate_params if validator({**estimator_params, **parameters})]
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+class SuccessiveHalvingSearch(ParallelSearchScheduler):
+    """
+    Successive halving over the number of samples: every candidate is first cross validated on a small
+    stratified subsample, only the best 1/factor of them move on to the next rung with factor times more
+    samples, and the last rung uses the full data. Inside a rung the first fold is scored for every candidate
+    before the other folds, candidates that failed or are more than early_rejection_margin below the best
+    first fold score are rejected without running their remaining folds.
+    Invalid parameter combinations are pruned before anything is fitted.
+    """
+    def __init__(self, n_workers: int = -1, cv=5, scoring=None, verbose: int = 0, error_score=np.nan,
+                 factor: int = 3, min_resources="auto", early_rejection_margin=None, random_state: int = 42):
+        try:
+            super().__init__(n_workers=n_workers, cv=cv, scoring=scoring, verbose=verbose, error_score=error_score)
+            if factor < 2:
+                raise Exception(f"successive halving factor must be at least 2, got [{factor}]")
+            self.factor = factor
+            self.min_resources = min_resources
+            self.early_rejection_margin = early_rejection_margin
+            self.random_state = random_state
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_resource_schedule(self, n_samples: int, n_candidates: int, n_splits: int, n_classes: int) -> List[int]:
+        """
+        returns the number of samples used at every rung, the last rung always uses all the samples.
+        There are enough rungs to bring the candidates down to one, but never fewer samples than min_resources.
+        """
+        try:
+            if self.min_resources == "auto":
+                min_resources = n_splits * n_classes * 2
+            else:
+                min_resources = int(self.min_resources)
+            min_resources = min(max(min_resources, n_splits * n_classes), n_samples)
+
+            n_rungs_for_candidates = 1 + math.ceil(math.log(max(n_candidates, 1), self.factor))
+            n_rungs_for_samples = 1 + int(math.floor(math.log(n_samples / min_resources, self.factor)))
+            n_rungs = max(1, min(n_rungs_for_candidates, n_rungs_for_samples))
+
+            return [int(n_samples // (self.factor ** (n_rungs - 1 - rung))) for rung in range(n_rungs)]
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_subsample_index(self, output_feature, n_resources: int, classifier: bool) -> np.ndarray:
+        n_samples = len(output_feature)
+        if n_resources >= n_samples:
+            return np.arange(n_samples)
+        stratify = output_feature if classifier else None
+        subsample_index, _ = train_test_split(np.arange(n_samples), train_size=n_resources,
+                                              stratify=stratify, random_state=self.random_state)
+        return np.sort(subsample_index)
+
+    def get_rung_folds_list(self, resource_schedule: List[int], output_feature, classifier: bool) -> List[list]:
+        """
+        returns the folds of every rung with the indices of the full data, the subsample of a rung only
+        depends on its number of samples so every rung is known before the search starts
+        """
+        try:
+            rung_folds_list = []
+            for n_resources in resource_schedule:
+                subsample_index = self.get_subsample_index(output_feature, n_resources, classifier)
+                rung_output_feature = output_feature[subsample_index]
+                cv = check_cv(self.cv, rung_output_feature, classifier=classifier)
+                rung_folds_list.append([(subsample_index[train_index], subsample_index[test_index])
+                                        for train_index, test_index in cv.split(subsample_index, rung_output_feature)])
+            return rung_folds_list
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_search_plan(self, initialized_model, output_feature) -> tuple:
+        """
+        returns (valid candidate parameters, samples of every rung, folds of every rung) of the model
+        """
+        try:
+            candidate_params = list(ParameterGrid(initialized_model.param_grid_search))
+            n_grid_candidates = len(candidate_params)
+            candidate_params = prune_invalid_candidates(initialized_model.model, candidate_params)
+            logging.info(f"Successive halving for [{type(initialized_model.model).__name__}]: "
+                         f"[{n_grid_candidates - len(candidate_params)}] invalid candidates pruned, "
+                         f"[{len(candidate_params)}] left.")
+            if len(candidate_params) == 0:
+                raise Exception(f"No valid candidate left in the parameter grid of [{initialized_model.model_name}]")
+
+            classifier = is_classifier(initialized_model.model)
+            n_splits = check_cv(self.cv, output_feature, classifier=classifier).get_n_splits()
+            n_classes = len(np.unique(output_feature)) if classifier else 1
+            resource_schedule = self.get_resource_schedule(n_samples=len(output_feature),
+                                                           n_candidates=len(candidate_params),
+                                                           n_splits=n_splits, n_classes=n_classes)
+            return candidate_params, resource_schedule, self.get_rung_folds_list(resource_schedule, output_feature, classifier)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def score_candidates(self, model_index: int, initialized_model, candidate_index_list: List[int],
+                         candidate_params: List[dict], fold_index_list: List[int]) -> dict:
+        """
+        cross validates the given candidates on the folds of fold_index_list (positions in the folds handed to the
+        workers) and returns {candidate_index: mean score}, candidates rejected after the first fold get nan.
+        """
+        try:
+            fold_position = {fold_index: position for position, fold_index in enumerate(fold_index_list)}
+
+            def get_units(position_list, index_list):
+                work_unit_list = self.get_work_unit_list(model_index_list=[0],
+                                                         initialized_model_list=[initialized_model],
+                                                         candidate_params_list=[[candidate_params[i] for i in index_list]],
+                                                         n_folds=len(fold_index_list))
+                return [work_unit._replace(model_index=model_index, candidate_index=index_list[work_unit.candidate_index],
+                                           fold_index=fold_index_list[work_unit.fold_index])
+                        for work_unit in work_unit_list if work_unit.fold_index in position_list]
+
+            scores = {candidate_index: np.full(len(fold_index_list), np.nan) for candidate_index in candidate_index_list}
+            remaining_index_list = list(candidate_index_list)
+            remaining_position_list = list(range(len(fold_index_list)))
+
+            if self.early_rejection_margin is not None and len(fold_index_list) > 1 and len(candidate_index_list) > 1:
+                for result in self.run_work_units(get_units([0], remaining_index_list)):
+                    scores[result.candidate_index][0] = result.score
+                first_fold_scores = np.array([scores[candidate_index][0] for candidate_index in remaining_index_list])
+                if not np.isnan(first_fold_scores).all():
+                    threshold = np.nanmax(first_fold_scores) - self.early_rejection_margin
+                    rejected = [candidate_index for candidate_index, score in zip(remaining_index_list, first_fold_scores)
+                                if np.isnan(score) or score < threshold]
+                    remaining_index_list = [candidate_index for candidate_index in remaining_index_list
+                                            if candidate_index not in rejected]
+                    for candidate_index in rejected:
+                        scores[candidate_index][:] = np.nan
+                    logging.info(f"Early rejection dropped [{len(rejected)}] candidates after the first fold.")
+                remaining_position_list = remaining_position_list[1:]
+
+            if len(remaining_index_list) > 0 and len(remaining_position_list) > 0:
+                for result in self.run_work_units(get_units(remaining_position_list, remaining_index_list)):
+                    scores[result.candidate_index][fold_position[result.fold_index]] = result.score
+
+            return {candidate_index: np.average(scores[candidate_index]) for candidate_index in candidate_index_list}
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def search_initialized_model(self, model_index: int, initialized_model, input_feature, output_feature,
+                                 candidate_params: List[dict], resource_schedule: List[int], rung_fold_index_list: List[list]):
+        """
+        rung_fold_index_list: positions of the folds of every rung in the folds handed to the workers
+        """
+        try:
+            from src.Heart_Attack_Risk_Analyzer_Project.entity.model_factory import GridSearchBestModel
+
+            candidate_index_list = list(range(len(candidate_params)))
+            mean_scores = {}
+            for rung, n_resources in enumerate(resource_schedule):
+                mean_scores = self.score_candidates(model_index=model_index, initialized_model=initialized_model,
+                                                    candidate_index_list=candidate_index_list,
+                                                    candidate_params=candidate_params,
+                                                    fold_index_list=rung_fold_index_list[rung])
+                logging.info(f"Rung [{rung}]: [{len(candidate_index_list)}] candidates on [{n_resources}] samples.")
+
+                if rung < len(resource_schedule) - 1:
+                    n_keep = max(1, math.ceil(len(candidate_index_list) / self.factor))
+                    # stable sort keeps GridSearchCV's tie breaking (first candidate wins), nan goes last
+                    candidate_index_list = sorted(candidate_index_list,
+                                                  key=lambda index: -np.nan_to_num(mean_scores[index], nan=-np.inf))[:n_keep]
+
+            best_index = candidate_index_list[ParallelSearchScheduler.get_best_candidate_index(
+                np.array([mean_scores[index] for index in candidate_index_list]))]
+            best_parameters = candidate_params[best_index]
+
+            best_model = clone(initialized_model.model).set_params(**clone(best_parameters, safe=False))
+            best_model.fit(input_feature, output_feature)
+
+            return GridSearchBestModel(model_serial_number=initialized_model.model_serial_number,
+                                       model=initialized_model.model,
+                                       best_model=best_model,
+                                       best_parameters=best_parameters,
+                                       best_score=mean_scores[best_index])
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def search(self, initialized_model_list: list, input_feature, output_feature) -> list:
+        """
+        search(): performs the successive halving search of every initialized model. The folds of every rung of
+        every model are known up front, so the workers are started once with the full data and all the folds
+        and reused by every rung.
+        initialized_model_list: List[InitializedModelDetail] as returned by ModelFactory.get_initialized_model_list
+        input_feature: your all input features
+        output_feature: Target/Dependent features
+        ================================================================================
+        return: List[GridSearchBestModel] in the same order as initialized_model_list
+        """
+        try:
+            input_feature = np.asarray(input_feature)
+            output_feature = np.asarray(output_feature)
+
+            search_plan_list = []
+            folds = []
+            for initialized_model in initialized_model_list:
+                candidate_params, resource_schedule, rung_folds_list = self.get_search_plan(initialized_model, output_feature)
+                rung_fold_index_list = []
+                for rung_folds in rung_folds_list:
+                    rung_fold_index_list.append(list(range(len(folds), len(folds) + len(rung_folds))))
+                    folds.extend(rung_folds)
+                search_plan_list.append((candidate_params, resource_schedule, rung_fold_index_list))
+
+            grid_search_best_model_list = []
+            self.start_workers(input_feature=input_feature, output_feature=output_feature, folds=folds)
+            try:
+                for model_index, initialized_model in enumerate(initialized_model_list):
+                    candidate_params, resource_schedule, rung_fold_index_list = search_plan_list[model_index]
+                    grid_search_best_model = self.search_initialized_model(model_index=model_index,
+                                                                           initialized_model=initialized_model,
+                                                                           input_feature=input_feature,
+                                                                           output_feature=output_feature,
+                                                                           candidate_params=candidate_params,
+                                                                           resource_schedule=resource_schedule,
+                                                                           rung_fold_index_list=rung_fold_index_list)
+                    logging.info(f"Successive halving search result: {grid_search_best_model}")
+                    grid_search_best_model_list.append(grid_search_best_model)
+            finally:
+                self.stop_workers()
+            return grid_search_best_model_list
+        except Exception as e:
+            raise HeartRiskException(e, sys)
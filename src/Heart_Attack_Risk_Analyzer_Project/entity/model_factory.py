@@ -7,13 +7,21 @@ import os, sys
 from typing import List
 import importlib
 from sklearn.metrics import recall_score
+from src.Heart_Attack_Risk_Analyzer_Project.entity.parallel_search import ParallelSearchScheduler
+from src.Heart_Attack_Risk_Analyzer_Project.entity.halving_search import SuccessiveHalvingSearch
+from src.Heart_Attack_Risk_Analyzer_Project.utils.stage_profiler import profile_step
 
 GRID_SEARCH_KEY = 'grid_search'
 MODULE_KEY = 'module'
 CLASS_KEY = 'class'
 PARAM_KEY = 'params'
 MODEL_SELCTION_KEY = 'model_selection'
-SEARCH_PARAM_GRID_KEY = 'search_papram_grid'
+SEARCH_PARAM_GRID_KEY = 'search_param_grid'
+N_WORKERS_KEY = 'n_workers'
+SEARCH_ENGINE_KEY = 'engine'
+SUCCESSIVE_HALVING_KEY = 'successive_halving'
+GRID_SEARCH_ENGINE = 'grid'
+SUCCESSIVE_HALVING_ENGINE = 'successive_halving'
 
 InitializedModelDetail = namedtuple("InitializedModelDetail",
                                     ["model_serial_number", "model", "param_grid_search", "model_name"])
@@ -32,6 +40,13 @@ class ModelFactory:
             self.grid_search_cv_module: str = self.config[GRID_SEARCH_KEY][MODULE_KEY]
             self.grid_search_class_name: str = self.config[GRID_SEARCH_KEY][CLASS_KEY]
             self.grid_search_property_data: dict = self.config[GRID_SEARCH_KEY][PARAM_KEY]
+            # when n_workers is set the search of all the models is spread over a process pool
+            self.grid_search_n_workers = self.config[GRID_SEARCH_KEY].get(N_WORKERS_KEY, None)
+            self.search_engine: str = self.config[GRID_SEARCH_KEY].get(SEARCH_ENGINE_KEY, GRID_SEARCH_ENGINE)
+            self.successive_halving_property_data: dict = dict(self.config[GRID_SEARCH_KEY].get(SUCCESSIVE_HALVING_KEY, None) or {})
+            if self.search_engine not in [GRID_SEARCH_ENGINE, SUCCESSIVE_HALVING_ENGINE]:
+                raise Exception(f"Unknown search engine [{self.search_engine}], "
+                                f"expected one of {[GRID_SEARCH_ENGINE, SUCCESSIVE_HALVING_ENGINE]}")
 
             self.models_initialization_config: dict = dict(self.config[MODEL_SELCTION_KEY])
             self.initialized_model_list = None
@@ -60,7 +75,7 @@ class ModelFactory:
             # load the module, will raise an Exception if the module cannot be loaded
             module = importlib.import_module(module_name)
             # get the class, will raise an Exception if the class is not found
-            class_ref = getattr(module_name, class_name)
+            class_ref = getattr(module, class_name)
 
             return class_ref
         except Exception as e:
@@ -75,7 +90,7 @@ class ModelFactory:
         try:
             if not isinstance(property_data, dict):
                 raise Exception("property_data parameter required to dictionary")
-            print(property_data)
+            logging.info(f"Setting the properties {property_data} of [{type(instance_ref).__name__}]")
             for key, value in property_data.items():
                 setattr(instance_ref, key, value)
             return instance_ref
@@ -91,7 +106,8 @@ class ModelFactory:
             initialized_model_list = []
             for model_serial_number in self.models_initialization_config.keys():
                 model_initialization_config = self.models_initialization_config[model_serial_number]
-                model_obj_ref = ModelFactory.class_for_name(module_name=model_initialization_config[MODULE_KEY][CLASS_KEY])
+                model_obj_ref = ModelFactory.class_for_name(module_name=model_initialization_config[MODULE_KEY],
+                                                           class_name=model_initialization_config[CLASS_KEY])
                 model = model_obj_ref()
 
                 if PARAM_KEY in model_initialization_config:
@@ -135,8 +151,11 @@ class ModelFactory:
                                                              )
             grid_search_cv = grid_search_cv_ref(estimator=initialized_model.model,
                                                 param_grid=initialized_model.param_grid_search)
+            grid_search_cv = ModelFactory.update_property_of_class(grid_search_cv,
+                                                                   self.grid_search_property_data)
 
-            grid_search_cv.fit(input_feature, output_feature)
+            with profile_step("grid_search", rows=len(input_feature), model=type(initialized_model.model).__name__):
+                grid_search_cv.fit(input_feature, output_feature)
 
             grid_search_best_model = GridSearchBestModel(
                 model_serial_number=initialized_model.model_serial_number,
@@ -178,7 +197,14 @@ class ModelFactory:
         function.
         """
         try:
-            self.grid_searched_best_model_list = []
+            if self.search_engine == SUCCESSIVE_HALVING_ENGINE or self.grid_search_n_workers is not None:
+                return self.initiate_parallel_parameter_search_for_initialized_models(
+                    initialized_model_list=initialized_model_list,
+                    input_feature=input_feature,
+                    output_feature=output_feature
+                )
+
+            self.grid_search_best_model_list = []
             for initialized_model in initialized_model_list:
                 grid_search_best_model = self.initiate_best_parameter_search_for_initialized_model(
                     initialized_model=initialized_model,
@@ -190,6 +216,36 @@ class ModelFactory:
         except Exception as e:
             raise HeartRiskException(e, sys)
         
+    def initiate_parallel_parameter_search_for_initialized_models(self,
+                                                                  initialized_model_list: List[InitializedModelDetail],
+                                                                  input_feature,
+                                                                  output_feature) -> List[GridSearchBestModel]:
+        """
+        this function runs the parameter search of all the initialized models together on a process pool.
+        With the grid engine every (model, candidate, fold) combination is a separate work unit, so the pool stays
+        busy across models instead of finishing one model's grid before starting the next. With the successive_halving
+        engine the candidates are raced on growing subsamples and only the best ones reach the full data.
+        The grid_search params (cv, verbose, scoring) are used the same way GridSearchCV uses them.
+        """
+        try:
+            logging.info(f"Parameter search started with engine: [{self.search_engine}] "
+                         f"and n_workers: [{self.grid_search_n_workers}]")
+            if self.search_engine == SUCCESSIVE_HALVING_ENGINE:
+                scheduler = SuccessiveHalvingSearch(n_workers=self.grid_search_n_workers,
+                                                    **self.grid_search_property_data,
+                                                    **self.successive_halving_property_data)
+            else:
+                scheduler = ParallelSearchScheduler(n_workers=self.grid_search_n_workers,
+                                                    **self.grid_search_property_data)
+            with profile_step(f"{self.search_engine}_search", rows=len(input_feature), n_workers=self.grid_search_n_workers,
+                              models=[initialized_model.model_name for initialized_model in initialized_model_list]):
+                self.grid_search_best_model_list = scheduler.search(initialized_model_list=initialized_model_list,
+                                                                    input_feature=input_feature,
+                                                                    output_feature=output_feature)
+            return self.grid_search_best_model_list
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
     @staticmethod
     def get_recall_grid_searched_best_model_list(bestModel: GridSearchBestModel, input_features, output_features) -> float:
         try:
@@ -208,15 +264,15 @@ class ModelFactory:
             for grid_searched_best_model in grid_serach_best_model_list:
                 recall = ModelFactory.get_recall_grid_searched_best_model_list(grid_searched_best_model, input_features=input_features,
                                                                                output_features=output_features)
-                accuracy = grid_searched_best_model.best_model.best_score_
+                accuracy = grid_searched_best_model.best_score
                 score = abs(recall-accuracy)
                 if base_accuracy > score:
                     logging.info(f"Acceptable Model Found: {grid_searched_best_model}")
                     base_accuracy = score
                     best_model = grid_searched_best_model
-                if not best_model:
-                    raise Exception(f"None of the Models are acceptable")
-                logging.info(f"Best Model: {best_model}")
+            if not best_model:
+                raise Exception(f"None of the Models are acceptable")
+            logging.info(f"Best Model: {best_model}")
             return best_model
                 
         except Exception as e:
@@ -232,7 +288,11 @@ class ModelFactory:
                 input_feature=X,
                 output_feature=y
             )
-            return ModelFactory.get_best_model_from_grid_searched_best_model_list()
+            with profile_step("model_selection", rows=len(X)):
+                return ModelFactory.get_best_model_from_grid_searched_best_model_list(grid_search_best_model_list,
+                                                                                      input_features=X,
+                                                                                      output_features=y,
+                                                                                      base_accuracy=base_accuracy)
 
         except Exception as e:
             raise HeartRiskException(e, sys)
\ No newline at end of file
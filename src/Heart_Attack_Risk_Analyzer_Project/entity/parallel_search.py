@@ -0,0 +1,249 @@
+import numpy as np
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os, sys
+import threading
+import warnings
+from typing import List
+from sklearn.base import clone, is_classifier
+from sklearn.model_selection import ParameterGrid, check_cv
+from sklearn.metrics import check_scoring
+
+SearchWorkUnit = namedtuple("SearchWorkUnit",
+                            ["model_index", "candidate_index", "fold_index", "estimator", "parameters"])
+
+SearchWorkResult = namedtuple("SearchWorkResult",
+                              ["model_index", "candidate_index", "fold_index", "score"])
+
+# share of the work units between two progress lines in the log
+PROGRESS_LOG_FRACTION = 0.1
+
+# data shared by every work unit, set once per worker process by the pool initializer
+_WORKER_DATA = {}
+
+
+def _initialize_worker(input_feature, output_feature, folds, scoring, error_score):
+    _WORKER_DATA["input_feature"] = input_feature
+    _WORKER_DATA["output_feature"] = output_feature
+    _WORKER_DATA["folds"] = folds
+    _WORKER_DATA["scoring"] = scoring
+    _WORKER_DATA["error_score"] = error_score
+
+
+def _fit_and_score_work_unit(work_unit: SearchWorkUnit) -> SearchWorkResult:
+    """
+    fits a fresh clone of the estimator with the candidate parameters on the training part of one fold
+    and scores it on the held out part, the same way GridSearchCV does for a single (candidate, fold) pair.
+    """
+    input_feature = _WORKER_DATA["input_feature"]
+    output_feature = _WORKER_DATA["output_feature"]
+    train_index, test_index = _WORKER_DATA["folds"][work_unit.fold_index]
+
+    estimator = clone(work_unit.estimator)
+    estimator = estimator.set_params(**clone(work_unit.parameters, safe=False))
+    try:
+        estimator.fit(input_feature[train_index], output_feature[train_index])
+        scorer = check_scoring(estimator, scoring=_WORKER_DATA["scoring"])
+        score = scorer(estimator, input_feature[test_index], output_feature[test_index])
+    except Exception as e:
+        if isinstance(_WORKER_DATA["error_score"], str) and _WORKER_DATA["error_score"] == "raise":
+            raise
+        warnings.warn(f"Estimator fit failed for parameters {work_unit.parameters}, "
+                      f"score on this fold is set to {_WORKER_DATA['error_score']}. Details: {e}")
+        score = _WORKER_DATA["error_score"]
+    return SearchWorkResult(model_index=work_unit.model_index,
+                            candidate_index=work_unit.candidate_index,
+                            fold_index=work_unit.fold_index,
+                            score=score)
+
+
+class ParallelSearchScheduler:
+    """
+    Runs the parameter search of all the initialized models at once by splitting it into
+    (model, candidate, fold) work units and spreading them over a pool of worker processes.
+    With n_workers=1 the work units are run in the current process in GridSearchCV order,
+    so the selected parameters and scores are identical to GridSearchCV.
+    """
+    def __init__(self, n_workers: int = -1, cv=5, scoring=None, verbose: int = 0, error_score=np.nan):
+        try:
+            if n_workers is None or n_workers < 1:
+                n_workers = os.cpu_count() or 1
+            self.n_workers = n_workers
+            self.cv = cv
+            self.scoring = scoring
+            self.verbose = verbose
+            self.error_score = error_score
+            self.executor = None
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_work_unit_list(self, model_index_list: List[int], initialized_model_list: list,
+                           candidate_params_list: List[list], n_folds: int) -> List[SearchWorkUnit]:
+        """
+        builds the flat list of work units for the given models, every model contributing
+        n_candidates * n_folds units.
+        """
+        try:
+            work_unit_list = []
+            for model_index in model_index_list:
+                initialized_model = initialized_model_list[model_index]
+                for candidate_index, parameters in enumerate(candidate_params_list[model_index]):
+                    for fold_index in range(n_folds):
+                        work_unit_list.append(SearchWorkUnit(model_index=model_index,
+                                                             candidate_index=candidate_index,
+                                                             fold_index=fold_index,
+                                                             estimator=initialized_model.model,
+                                                             parameters=parameters))
+            return work_unit_list
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def start_workers(self, input_feature, output_feature, folds: list) -> None:
+        """
+        hands the training data and the folds to the workers once, the work units of every following
+        run_work_units call are run on them until stop_workers. A single worker runs them in process.
+        A pool can't be started once the main thread has exited (a pipeline thread left running), the work units
+        are run in process then.
+        """
+        try:
+            initargs = (input_feature, output_feature, folds, self.scoring, self.error_score)
+            if self.n_workers > 1 and not threading.main_thread().is_alive():
+                logging.info(f"Main thread has exited, running the search in process instead of [{self.n_workers}] workers.")
+            if self.n_workers == 1 or not threading.main_thread().is_alive():
+                _initialize_worker(*initargs)
+                self.executor = None
+                return
+            logging.info(f"Starting [{self.n_workers}] search workers.")
+            self.executor = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_initialize_worker,
+                                                initargs=initargs)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def stop_workers(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        _WORKER_DATA.clear()
+
+    def run_work_units(self, work_unit_list: List[SearchWorkUnit]) -> List[SearchWorkResult]:
+        """
+        executes the work units on the workers of start_workers, fold_index of a work unit is its position in the
+        folds handed to them
+        """
+        try:
+            if self.executor is None:
+                return self.collect_results(map(_fit_and_score_work_unit, work_unit_list), len(work_unit_list))
+            chunksize = max(1, len(work_unit_list) // (self.n_workers * 4))
+            logging.info(f"Running [{len(work_unit_list)}] search work units on [{self.n_workers}] workers "
+                         f"with chunksize [{chunksize}]")
+            result_iterator = self.executor.map(_fit_and_score_work_unit, work_unit_list, chunksize=chunksize)
+            return self.collect_results(result_iterator, len(work_unit_list))
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def run_work_unit_list(self, work_unit_list: List[SearchWorkUnit], input_feature, output_feature,
+                           folds: list) -> List[SearchWorkResult]:
+        """
+        executes the work units, in process when a single worker is configured and on a process pool otherwise.
+        The training data is handed to each worker once through the pool initializer, not once per work unit.
+        """
+        try:
+            self.start_workers(input_feature=input_feature, output_feature=output_feature, folds=folds)
+            try:
+                return self.run_work_units(work_unit_list)
+            finally:
+                self.stop_workers()
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def collect_results(self, result_iterator, total_units: int) -> List[SearchWorkResult]:
+        """
+        every work unit is logged at debug level, the progress at info level every PROGRESS_LOG_FRACTION of the units
+        """
+        result_list = []
+        progress_step = max(1, math.ceil(total_units * PROGRESS_LOG_FRACTION))
+        for result in result_iterator:
+            result_list.append(result)
+            if self.verbose > 1:
+                logging.debug(f"[{len(result_list)}/{total_units}] model [{result.model_index}] "
+                              f"candidate [{result.candidate_index}] fold [{result.fold_index}] score [{result.score}]")
+            if self.verbose > 0 and (len(result_list) % progress_step == 0 or len(result_list) == total_units):
+                logging.info(f"[{len(result_list)}/{total_units}] search work units done.")
+        return result_list
+
+    @staticmethod
+    def get_best_candidate_index(mean_scores: np.ndarray) -> int:
+        """
+        GridSearchCV ranks the mean scores with failed candidates (nan) at the bottom and picks the first
+        candidate among the best ranked ones, which is the first occurrence of the maximum.
+        """
+        if np.isnan(mean_scores).all():
+            return 0
+        return int(np.argmax(np.nan_to_num(mean_scores, nan=-np.inf)))
+
+    def search(self, initialized_model_list: list, input_feature, output_feature) -> list:
+        """
+        search(): performs the parameter search of every initialized model and returns one GridSearchBestModel per model
+        initialized_model_list: List[InitializedModelDetail] as returned by ModelFactory.get_initialized_model_list
+        input_feature: your all input features
+        output_feature: Target/Dependent features
+        ================================================================================
+        return: List[GridSearchBestModel] in the same order as initialized_model_list
+        """
+        try:
+            from src.Heart_Attack_Risk_Analyzer_Project.entity.model_factory import GridSearchBestModel
+
+            input_feature = np.asarray(input_feature)
+            output_feature = np.asarray(output_feature)
+
+            candidate_params_list = [list(ParameterGrid(initialized_model.param_grid_search))
+                                     for initialized_model in initialized_model_list]
+
+            cv_list = [check_cv(self.cv, output_feature, classifier=is_classifier(initialized_model.model))
+                       for initialized_model in initialized_model_list]
+            folds_list = [list(cv.split(input_feature, output_feature)) for cv in cv_list]
+
+            # all models share the folds when their splitters agree (the usual case), otherwise each
+            # model is scheduled separately against its own folds
+            if all(len(folds) == len(folds_list[0]) and
+                   all(np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1]) for a, b in zip(folds, folds_list[0]))
+                   for folds in folds_list):
+                model_groups = [(list(range(len(initialized_model_list))), folds_list[0])]
+            else:
+                model_groups = [([model_index], folds_list[model_index])
+                                for model_index in range(len(initialized_model_list))]
+
+            score_list = [np.full((len(candidate_params), len(folds_list[model_index])), np.nan)
+                          for model_index, candidate_params in enumerate(candidate_params_list)]
+
+            for model_index_list, folds in model_groups:
+                work_unit_list = self.get_work_unit_list(model_index_list=model_index_list,
+                                                         initialized_model_list=initialized_model_list,
+                                                         candidate_params_list=candidate_params_list,
+                                                         n_folds=len(folds))
+                for result in self.run_work_unit_list(work_unit_list=work_unit_list, input_feature=input_feature,
+                                                      output_feature=output_feature, folds=folds):
+                    score_list[result.model_index][result.candidate_index, result.fold_index] = result.score
+
+            grid_search_best_model_list = []
+            for model_index, initialized_model in enumerate(initialized_model_list):
+                mean_scores = np.average(score_list[model_index], axis=1)
+                best_index = ParallelSearchScheduler.get_best_candidate_index(mean_scores)
+                best_parameters = candidate_params_list[model_index][best_index]
+
+                best_model = clone(initialized_model.model).set_params(**clone(best_parameters, safe=False))
+                best_model.fit(input_feature, output_feature)
+
+                grid_search_best_model = GridSearchBestModel(model_serial_number=initialized_model.model_serial_number,
+                                                             model=initialized_model.model,
+                                                             best_model=best_model,
+                                                             best_parameters=best_parameters,
+                                                             best_score=mean_scores[best_index])
+                logging.info(f"Parallel search result: {grid_search_best_model}")
+                grid_search_best_model_list.append(grid_search_best_model)
+            return grid_search_best_model_list
+        except Exception as e:
+            raise HeartRiskException(e, sys)
@@ -16,6 +16,6 @@ os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE_PATH = os.path.join(LOG_DIR, LOG_FILE_NAME)
 
 logging.basicConfig(filename=LOG_FILE_PATH,
-                    filemode='w',
+                    filemode='a',
                     format='[%(asctime)s] \t\t %(processName)s \t\t %(threadName)s \t\t %(name)s \t\t %(lineno)d \t\t %(filename)s \t\t %(funcName)s \t\t %(levelname)s \t\t %(message)s',
                     level=logging.INFO)
\ No newline at end of file
@@ -2,68 +2,140 @@ from src.Heart_Attack_Risk_Analyzer_Project.logger import logging, get_log_file_
 from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
 import os, sys
 from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import DataIngestionConfig, DataValidationConfig, DataTransformationConfig
-from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact
+from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact, ModelTrainerArtifact
 from src.Heart_Attack_Risk_Analyzer_Project.component.data_ingestion import DataIngestion
 from src.Heart_Attack_Risk_Analyzer_Project.component.data_validation import DataValidation
 from src.Heart_Attack_Risk_Analyzer_Project.component.data_transformation import DataTransformation
+from src.Heart_Attack_Risk_Analyzer_Project.component.model_trainer import ModelTrainer
 from collections import namedtuple
 from threading import Thread
 from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
 import uuid
-from src.Heart_Attack_Risk_Analyzer_Project.constant import EXPERIMENT_DIR_NAME
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from src.Heart_Attack_Risk_Analyzer_Project.pipeline.stage_cache import StageCache
+from src.Heart_Attack_Risk_Analyzer_Project.utils.dataset_handle import DatasetHandle, get_dataset_load_report
+from src.Heart_Attack_Risk_Analyzer_Project.utils.stage_profiler import StageProfiler, profile_step, set_active_profiler, set_step_info
 from datetime import datetime
 import pandas as pd
 
 Experiment = namedtuple("Experiment", ["experiment_id", "initialization_timestamp", "log_file_name",
                                        "running_status", "start_time", "stop_time", "execution_time",
-                                       "message", "experiment_file_path"])
+                                       "message", "experiment_file_path", "profile_file_path"])
 
 class Pipeline(Thread):
-
-    experiment:Experiment=Experiment(*[None]*9)
-
-    def __new__(cls, *args, **kwargs):
-        if Pipeline.experiment.running_status:
-            raise Exception("Pipeline is already running.")
-        return super(Pipeline, cls).__new__(cls)
-    
-    def __init__(self, config: Config = Config()) -> None:
+    """
+    one training run, every run keeps its own experiment record so several pipelines (threads of a process or
+    jobs of the PipelineScheduler) can run at the same time. Runs are isolated by the time stamp of their
+    config: every stage writes its artifacts in <stage>/<time stamp>.
+    """
+    def __init__(self, config: Config = None) -> None:
         try:
             super().__init__(daemon=False, name="pipeline")
-            self.config = config
+            self.config = config if config is not None else Config()
+            self.stage_cache = StageCache(stage_cache_config=self.config.get_stage_cache_config())
+            self.experiment = Experiment(*[None]*len(Experiment._fields))
+            self.model_trainer_artifact = None
         except Exception as e:
             raise HeartRiskException(e, sys)
     
+    def get_stage_artifact_dir(self, stage_artifact_dir_name: str) -> str:
+        return os.path.join(self.config.training_pipeline_config.artifact_dir, stage_artifact_dir_name, self.config.time_stamp)
+
     def start_data_ingestion(self) -> DataIngestionArtifact:
         try:
             data_ingestion = DataIngestion(data_ingestion_config=self.config.get_data_ingestion_config())
-            return data_ingestion.initiate_data_ingestion()
+            #the key covers the content of the dataset, a replaced or added file is ingested again
+            stage_key = StageCache.get_stage_key(stage_name=DATA_INGESTION_ARTIFACT_DIR,
+                                                 config_info={**self.config.config_info[DATA_INGESTION_CONFIG_KEY],
+                                                              "dataset_identity": data_ingestion.get_dataset_identity()})
+            data_ingestion_artifact = self.stage_cache.get_artifact(DATA_INGESTION_ARTIFACT_DIR, stage_key, DataIngestionArtifact,
+                                                                    stage_artifact_dir=self.get_stage_artifact_dir(DATA_INGESTION_ARTIFACT_DIR))
+            if data_ingestion_artifact is not None:
+                set_step_info(cached=True)
+                #the splits of a cached run are loaded on first use by the next stages
+                return data_ingestion_artifact._replace(
+                    train_dataset=DatasetHandle(file_path=data_ingestion_artifact.train_file_path),
+                    test_dataset=DatasetHandle(file_path=data_ingestion_artifact.test_file_path))
+
+            data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+            #the in memory splits only live for this run, the cache entry keeps the file paths
+            self.stage_cache.save_artifact(DATA_INGESTION_ARTIFACT_DIR, stage_key,
+                                           data_ingestion_artifact._replace(train_dataset=None, test_dataset=None),
+                                           stage_artifact_dir=self.get_stage_artifact_dir(DATA_INGESTION_ARTIFACT_DIR))
+            return data_ingestion_artifact
         except Exception as e:
             raise HeartRiskException(e, sys)
 
     def start_data_validation(self, data_ingestion_artifact:DataIngestionArtifact) -> DataValidationArtifact:
         try:
-            data_validation = DataValidation(data_validation_config=self.config.get_data_validation_config(), data_ingestion_artifiact=data_ingestion_artifact)
-            return data_validation.initiate_data_validation()
+            data_validation_config = self.config.get_data_validation_config()
+            stage_key = StageCache.get_stage_key(stage_name=DATA_VALIDATION_ARTIFACT_DIR_NAME,
+                                                 config_info=self.config.config_info[DATA_VALIDATION_CONFIG_KEY],
+                                                 file_path_list=[data_validation_config.schema_file_path,
+                                                                 data_ingestion_artifact.train_file_path,
+                                                                 data_ingestion_artifact.test_file_path])
+            data_validation_artifact = self.stage_cache.get_artifact(DATA_VALIDATION_ARTIFACT_DIR_NAME, stage_key, DataValidationArtifact,
+                                                                     stage_artifact_dir=self.get_stage_artifact_dir(DATA_VALIDATION_ARTIFACT_DIR_NAME))
+            if data_validation_artifact is not None:
+                set_step_info(cached=True)
+                return data_validation_artifact
+
+            data_validation = DataValidation(data_validation_config=data_validation_config, data_ingestion_artifiact=data_ingestion_artifact)
+            data_validation_artifact = data_validation.initiate_data_validation()
+            self.stage_cache.save_artifact(DATA_VALIDATION_ARTIFACT_DIR_NAME, stage_key, data_validation_artifact,
+                                           stage_artifact_dir=self.get_stage_artifact_dir(DATA_VALIDATION_ARTIFACT_DIR_NAME))
+            return data_validation_artifact
         except Exception as e:
             raise HeartRiskException(e, sys)
     
     def start_data_transformation(self, data_ingestion_artifact: DataIngestionArtifact,
                                   data_validation_artifact: DataValidationArtifact) -> DataTransformationArtifact:
         try:
+            stage_key = StageCache.get_stage_key(stage_name=DATA_TRANSFORMATION_ARTIFACT_DIR,
+                                                 config_info=self.config.config_info[DATA_TRANSFORMATION_CONFIG_KEY],
+                                                 file_path_list=[data_validation_artifact.schema_file_path,
+                                                                 data_ingestion_artifact.train_file_path,
+                                                                 data_ingestion_artifact.test_file_path])
+            data_transformation_artifact = self.stage_cache.get_artifact(DATA_TRANSFORMATION_ARTIFACT_DIR, stage_key, DataTransformationArtifact,
+                                                                         stage_artifact_dir=self.get_stage_artifact_dir(DATA_TRANSFORMATION_ARTIFACT_DIR))
+            if data_transformation_artifact is not None:
+                set_step_info(cached=True)
+                return data_transformation_artifact
+
             data_transformation = DataTransformation(data_ingestion_artifact=data_ingestion_artifact,
                                                      data_validation_artifact=data_validation_artifact,
                                                      data_transformation_config=self.config.get_data_transformation_config())
-            return data_transformation.initiate_data_transformation()
+            data_transformation_artifact = data_transformation.initiate_data_transformation()
+            self.stage_cache.save_artifact(DATA_TRANSFORMATION_ARTIFACT_DIR, stage_key, data_transformation_artifact,
+                                           stage_artifact_dir=self.get_stage_artifact_dir(DATA_TRANSFORMATION_ARTIFACT_DIR))
+            return data_transformation_artifact
         except Exception as e:
             raise HeartRiskException(e, sys)
 
-    def run_pipeline(self):
+    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTrainerArtifact:
+        try:
+            model_trainer_config = self.config.get_model_trainer_config()
+            stage_key = StageCache.get_stage_key(stage_name=MODEL_TRAINER_ARTIFACT_DIR,
+                                                 config_info=self.config.config_info[MODEL_TRAINER_CONFIG_KEY],
+                                                 file_path_list=[model_trainer_config.model_config_file_path,
+                                                                 data_transformation_artifact.transformed_train_file_path])
+            model_trainer_artifact = self.stage_cache.get_artifact(MODEL_TRAINER_ARTIFACT_DIR, stage_key, ModelTrainerArtifact,
+                                                                   stage_artifact_dir=self.get_stage_artifact_dir(MODEL_TRAINER_ARTIFACT_DIR))
+            if model_trainer_artifact is not None:
+                set_step_info(cached=True)
+                return model_trainer_artifact
+
+            model_trainer = ModelTrainer(model_trainer_config=model_trainer_config,
+                                         data_transformation_artifact=data_transformation_artifact)
+            model_trainer_artifact = model_trainer.initiate_model_trainer()
+            self.stage_cache.save_artifact(MODEL_TRAINER_ARTIFACT_DIR, stage_key, model_trainer_artifact,
+                                           stage_artifact_dir=self.get_stage_artifact_dir(MODEL_TRAINER_ARTIFACT_DIR))
+            return model_trainer_artifact
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def run_pipeline(self) -> Experiment:
         try:
-            if Pipeline.experiment.running_status:
-                logging.info("Pipeline is already running")
-                return Pipeline.experiment
-            
             logging.info("Pipeline Starting.")
 
             experiment_id = str(uuid.uuid4())
@@ -73,41 +145,75 @@ class Pipeline(Thread):
             file_name = f"experiemnt-{experiment_id}.csv"
             experiment_file_path = os.path.join(aritifact_dir, file_name)
 
-            Pipeline.experiment = Experiment(experiment_id=experiment_id,
-                                             initialization_timestamp=self.config.time_stamp,
-                                             log_file_name=get_log_file_name(self.config.time_stamp),
-                                             running_status=True,
-                                             start_time=datetime.now(),
-                                             stop_time=None,
-                                             execution_time=None,
-                                             experiment_file_path=experiment_file_path,
-                                             message="Pipeline has been started.")
-            logging.info(f"Pipeline experiment: {Pipeline.experiment}")
+            profiling_config = self.config.get_profiling_config()
+            profiler = None
+            profile_file_path = None
+            if profiling_config.enabled:
+                profiler = StageProfiler(sample_interval_seconds=profiling_config.sample_interval_seconds).start()
+                profile_file_path = os.path.join(profiling_config.profile_dir, f"profile-{experiment_id}.json")
+
+            self.experiment = Experiment(experiment_id=experiment_id,
+                                         initialization_timestamp=self.config.time_stamp,
+                                         log_file_name=get_log_file_name(self.config.time_stamp),
+                                         running_status=True,
+                                         start_time=datetime.now(),
+                                         stop_time=None,
+                                         execution_time=None,
+                                         experiment_file_path=experiment_file_path,
+                                         message="Pipeline has been started.",
+                                         profile_file_path=profile_file_path)
+            logging.info(f"Pipeline experiment: {self.experiment}")
 
             self.save_experiment()
-            data_ingestion_artifact = self.start_data_ingestion()
-            print(data_ingestion_artifact)
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            print(data_validation_artifact)
-            data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact=data_ingestion_artifact,
-                                                                          data_validation_artifact=data_validation_artifact)
-            print(data_transformation_artifact)
+            set_active_profiler(profiler)
+            #the run holds the stage cache until its stages are done, no other run evicts the dirs it reads meanwhile
+            self.stage_cache.open()
+            try:
+                with profile_step(DATA_INGESTION_ARTIFACT_DIR):
+                    data_ingestion_artifact = self.start_data_ingestion()
+                print(data_ingestion_artifact)
+                with profile_step(DATA_VALIDATION_ARTIFACT_DIR_NAME):
+                    data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
+                print(data_validation_artifact)
+                with profile_step(DATA_TRANSFORMATION_ARTIFACT_DIR):
+                    data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact=data_ingestion_artifact,
+                                                                                  data_validation_artifact=data_validation_artifact)
+                print(data_transformation_artifact)
+                with profile_step(MODEL_TRAINER_ARTIFACT_DIR):
+                    self.model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+                print(self.model_trainer_artifact)
+            except Exception as e:
+                self.stop_experiment(message=f"Pipeline has failed: {e}")
+                raise e
+            finally:
+                self.stage_cache.close()
+                set_active_profiler(None)
+                if profiler is not None:
+                    profiler.stop()
+                    prometheus_file_path = os.path.splitext(profile_file_path)[0] + ".prom" if profiling_config.prometheus else None
+                    profiler.save(file_path=profile_file_path, prometheus_file_path=prometheus_file_path,
+                                  experiment_id=experiment_id, time_stamp=self.config.time_stamp)
+                    logging.info(f"Stage profile of the run saved at [{profile_file_path}]")
+
+            dataset_load_report = get_dataset_load_report([data_ingestion_artifact.train_dataset,
+                                                           data_ingestion_artifact.test_dataset])
+            logging.info(f"Dataset loads of the run: {dataset_load_report}")
+            self.stage_cache.evict()
             
             logging.info(f"Pipeline Completed.")
-            stop_time = datetime.now()
-
-            Pipeline.experiment = Experiment(experiment_id=Pipeline.experiment.experiment_id,
-            initialization_timestamp=self.config.time_stamp,
-            log_file_name=get_log_file_name(self.config.time_stamp),
-            running_status=True,
-            start_time=Pipeline.experiment.start_time,
-            stop_time=stop_time,
-            execution_time=stop_time-Pipeline.experiment.start_time,
-            experiment_file_path=Pipeline.experiment.experiment_file_path,
-            message="Pipeline has been completed."
-            )
-            logging.info(f"Pipeline Experiment: {Pipeline.experiment}")
+            self.stop_experiment(message="Pipeline has been completed.")
+            return self.experiment
+        except Exception as e:
+            raise HeartRiskException(e, sys)
 
+    def stop_experiment(self, message: str):
+        try:
+            stop_time = datetime.now()
+            self.experiment = self.experiment._replace(running_status=False,
+                                                       stop_time=stop_time,
+                                                       execution_time=stop_time-self.experiment.start_time,
+                                                       message=message)
+            logging.info(f"Pipeline Experiment: {self.experiment}")
             self.save_experiment()
         except Exception as e:
             raise HeartRiskException(e, sys)
@@ -120,11 +226,11 @@ class Pipeline(Thread):
     
     def save_experiment(self):
         try:
-            if Pipeline.experiment.experiment_id is not None:
-                experiment = Pipeline.experiment
+            if self.experiment.experiment_id is not None:
+                experiment = self.experiment
                 experiment_report = pd.DataFrame(zip(experiment._fields, experiment))
                 experiment_report.to_csv(experiment.experiment_file_path, mode='w', index=False, header=False)
             else:
                 print("First start the experiment.")
         except Exception as e:
-            raise HeartRiskException(e, sys)
\ No newline at end of file
+            raise HeartRiskException(e, sys)
@@ -0,0 +1,304 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import SchedulerConfig
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from collections import namedtuple, deque
+from datetime import datetime
+import multiprocessing
+import threading
+import signal
+import json
+import uuid
+import time
+import os, sys
+
+try:
+    import resource
+except ImportError:
+    #not available on windows, the runs are started without memory and cpu limits there
+    resource = None
+
+PipelineJob = namedtuple("PipelineJob", ["job_id", "name", "status", "config_file_path", "time_stamp",
+                                         "memory_mb", "cpu_seconds", "timeout_seconds", "n_threads",
+                                         "pid", "submitted_at", "started_at", "stopped_at", "message",
+                                         "log_file_path", "experiment", "model_trainer_artifact"])
+
+JOB_FINAL_STATUS_LIST = [JOB_COMPLETED_STATUS, JOB_FAILED_STATUS, JOB_CANCELLED_STATUS]
+
+
+def get_job_file_path(jobs_dir: str, job_id: str) -> str:
+    return os.path.join(jobs_dir, f"{job_id}.json")
+
+
+def write_job(jobs_dir: str, job: PipelineJob) -> None:
+    """
+    the job file is the status of the run, written aside and moved in place so a reader never sees half a file
+    """
+    try:
+        job_file_path = get_job_file_path(jobs_dir, job.job_id)
+        temp_job_file_path = f"{job_file_path}.{os.getpid()}.tmp"
+        with open(temp_job_file_path, 'w') as job_file:
+            json.dump(job._asdict(), job_file, indent=4, default=str)
+        os.replace(temp_job_file_path, job_file_path)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def read_job(jobs_dir: str, job_id: str) -> PipelineJob:
+    try:
+        with open(get_job_file_path(jobs_dir, job_id), 'r') as job_file:
+            return PipelineJob(**json.load(job_file))
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def update_job(jobs_dir: str, job_id: str, **job_info) -> PipelineJob:
+    job = read_job(jobs_dir, job_id)._replace(**job_info)
+    write_job(jobs_dir, job)
+    return job
+
+
+def set_resource_limits(memory_mb: int, cpu_seconds: int) -> None:
+    """
+    limits of the current process: memory_mb caps its address space (an allocation above it raises MemoryError),
+    cpu_seconds its cpu time (the process is killed with SIGXCPU)
+    """
+    if resource is None:
+        if memory_mb is not None or cpu_seconds is not None:
+            logging.info("resource module not available, the run is started without memory and cpu limits.")
+        return
+    if memory_mb is not None:
+        memory_limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+    if cpu_seconds is not None:
+        resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_seconds), resource.getrlimit(resource.RLIMIT_CPU)[1]))
+
+
+def run_pipeline_job(jobs_dir: str, job_id: str) -> None:
+    """
+    entry point of the process of one run, the run writes its status to its job file
+    """
+    from src.Heart_Attack_Risk_Analyzer_Project.pipeline.pipeline import Pipeline
+    from threadpoolctl import threadpool_limits
+
+    job = read_job(jobs_dir, job_id)
+    #the run also logs to a file of its own next to the job file
+    log_handler = logging.FileHandler(job.log_file_path)
+    if logging.root.handlers:
+        log_handler.setFormatter(logging.root.handlers[0].formatter)
+    logging.root.addHandler(log_handler)
+    try:
+        set_resource_limits(memory_mb=job.memory_mb, cpu_seconds=job.cpu_seconds)
+        update_job(jobs_dir, job_id, status=JOB_RUNNING_STATUS, pid=os.getpid(), started_at=time.time(),
+                   message="Pipeline is running.")
+        logging.info(f"Running job [{job_id}] with config [{job.config_file_path}] and time stamp [{job.time_stamp}]")
+
+        pipeline = Pipeline(config=Config(config_file_path=job.config_file_path, current_time_stamp=job.time_stamp))
+        with threadpool_limits(limits=job.n_threads):
+            experiment = pipeline.run_pipeline()
+        model_trainer_artifact = pipeline.model_trainer_artifact
+        update_job(jobs_dir, job_id, status=JOB_COMPLETED_STATUS, stopped_at=time.time(), message=experiment.message,
+                   experiment=experiment._asdict(),
+                   model_trainer_artifact=model_trainer_artifact._asdict() if model_trainer_artifact is not None else None)
+    except BaseException as e:
+        logging.error(f"Job [{job_id}] failed: {e}")
+        update_job(jobs_dir, job_id, status=JOB_FAILED_STATUS, stopped_at=time.time(), message=f"{e}")
+    finally:
+        logging.root.removeHandler(log_handler)
+        log_handler.close()
+
+
+def get_exit_message(exitcode: int) -> str:
+    if exitcode is not None and exitcode < 0:
+        signal_name = signal.Signals(-exitcode).name
+        if signal_name == "SIGXCPU":
+            return f"Run process was killed by {signal_name}, cpu_seconds limit reached."
+        return f"Run process was killed by {signal_name}."
+    return f"Run process exited with code [{exitcode}] before reporting its status."
+
+
+class PipelineScheduler:
+    """
+    Runs several pipeline experiments at the same time, each one in a process of its own.
+    Jobs are queued by submit and started by a dispatcher thread while less than n_workers are running.
+    A job is a pipeline run with its own config file and time stamp, so its artifacts go to
+    <stage>/<time stamp> dirs no other run writes to. The status of every job is a json file in jobs_dir
+    (read with get_job / list_jobs, also from another process), the per run limits are the memory and cpu
+    limits of its process, a wall time timeout and the number of numpy / sklearn threads.
+    One process per job instead of a process pool: a run killed by its limits does not take the other runs with it.
+    """
+    def __init__(self, scheduler_config: SchedulerConfig):
+        try:
+            logging.info(f"{'='*20}Pipeline scheduler log started.{'='*20}")
+            self.scheduler_config = scheduler_config
+            self.jobs_dir = scheduler_config.jobs_dir
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            #spawn so a run never inherits the threads and locks of the scheduler
+            self.context = multiprocessing.get_context("spawn")
+            self.job_queue = deque()
+            self.running_process_dict = {}
+            self.lock = threading.Lock()
+            self.stop_event = threading.Event()
+            self.dispatcher = threading.Thread(target=self.dispatch, name="scheduler", daemon=True)
+            self.dispatcher.start()
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def submit(self, config_file_path: str = CONFIG_FILE_PATH, name: str = None, memory_mb: int = None,
+               cpu_seconds: int = None, timeout_seconds: int = None, n_threads: int = None) -> str:
+        """
+        queues a pipeline run, the limits default to scheduler_config
+        return: job id
+        """
+        try:
+            job_id = uuid.uuid4().hex
+            scheduler_config = self.scheduler_config
+            job = PipelineJob(job_id=job_id,
+                              name=name or os.path.splitext(os.path.basename(config_file_path))[0],
+                              status=JOB_QUEUED_STATUS,
+                              config_file_path=os.path.abspath(config_file_path),
+                              time_stamp=f"{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}-{job_id[:8]}",
+                              memory_mb=memory_mb if memory_mb is not None else scheduler_config.memory_mb,
+                              cpu_seconds=cpu_seconds if cpu_seconds is not None else scheduler_config.cpu_seconds,
+                              timeout_seconds=timeout_seconds if timeout_seconds is not None else scheduler_config.timeout_seconds,
+                              n_threads=n_threads if n_threads is not None else scheduler_config.n_threads,
+                              pid=None,
+                              submitted_at=time.time(),
+                              started_at=None,
+                              stopped_at=None,
+                              message="Job is queued.",
+                              log_file_path=os.path.join(self.jobs_dir, f"{job_id}.log"),
+                              experiment=None,
+                              model_trainer_artifact=None)
+            with self.lock:
+                write_job(self.jobs_dir, job)
+                self.job_queue.append(job_id)
+            logging.info(f"Job submitted: {job}")
+            return job_id
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_job(self, job_id: str) -> PipelineJob:
+        return read_job(self.jobs_dir, job_id)
+
+    def list_jobs(self) -> list:
+        """
+        every job of jobs_dir, also the ones of earlier schedulers, oldest first
+        """
+        try:
+            job_list = [read_job(self.jobs_dir, file_name[:-len(".json")])
+                        for file_name in os.listdir(self.jobs_dir) if file_name.endswith(".json")]
+            return sorted(job_list, key=lambda job: job.submitted_at)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def cancel(self, job_id: str) -> PipelineJob:
+        """
+        removes a queued job or stops a running one
+        """
+        try:
+            with self.lock:
+                job = read_job(self.jobs_dir, job_id)
+                if job.status in JOB_FINAL_STATUS_LIST:
+                    return job
+                if job_id in self.job_queue:
+                    self.job_queue.remove(job_id)
+                if job_id in self.running_process_dict:
+                    self.stop_process(self.running_process_dict.pop(job_id)[0])
+                job = update_job(self.jobs_dir, job_id, status=JOB_CANCELLED_STATUS, stopped_at=time.time(),
+                                 message="Job has been cancelled.")
+            logging.info(f"Job cancelled: {job}")
+            return job
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def wait(self, job_id_list: list = None, timeout: float = None) -> list:
+        """
+        blocks until the jobs (every job of this scheduler by default) are finished or timeout seconds passed
+        return: the jobs
+        """
+        try:
+            if job_id_list is None:
+                with self.lock:
+                    job_id_list = list(self.job_queue) + list(self.running_process_dict)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                job_list = [self.get_job(job_id) for job_id in job_id_list]
+                if all(job.status in JOB_FINAL_STATUS_LIST for job in job_list):
+                    return job_list
+                if deadline is not None and time.monotonic() >= deadline:
+                    return job_list
+                time.sleep(self.scheduler_config.poll_interval_seconds)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def shutdown(self, cancel_jobs: bool = False) -> None:
+        """
+        stops the dispatcher after the jobs are finished, or after cancelling them
+        """
+        try:
+            with self.lock:
+                job_id_list = list(self.job_queue) + list(self.running_process_dict)
+            if cancel_jobs:
+                for job_id in job_id_list:
+                    self.cancel(job_id)
+            else:
+                self.wait(job_id_list)
+            self.stop_event.set()
+            self.dispatcher.join()
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    @staticmethod
+    def stop_process(process) -> None:
+        process.terminate()
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def reap_processes(self) -> None:
+        """
+        collects the finished processes and stops the ones over their timeout
+        """
+        for job_id, (process, timeout_at) in list(self.running_process_dict.items()):
+            if not process.is_alive():
+                process.join()
+                self.running_process_dict.pop(job_id)
+                job = read_job(self.jobs_dir, job_id)
+                if job.status not in JOB_FINAL_STATUS_LIST:
+                    #killed before it could write its status: memory or cpu limit, or a signal from outside
+                    job = update_job(self.jobs_dir, job_id, status=JOB_FAILED_STATUS, stopped_at=time.time(),
+                                     message=get_exit_message(process.exitcode))
+                logging.info(f"Job finished: {job}")
+            elif timeout_at is not None and time.monotonic() > timeout_at:
+                self.stop_process(process)
+                self.running_process_dict.pop(job_id)
+                job = update_job(self.jobs_dir, job_id, status=JOB_FAILED_STATUS, stopped_at=time.time(),
+                                 message="Job has been stopped, timeout_seconds limit reached.")
+                logging.info(f"Job timed out: {job}")
+
+    def start_processes(self) -> None:
+        while len(self.running_process_dict) < self.scheduler_config.n_workers and len(self.job_queue) > 0:
+            job_id = self.job_queue.popleft()
+            job = read_job(self.jobs_dir, job_id)
+            process = self.context.Process(target=run_pipeline_job, args=(self.jobs_dir, job_id),
+                                           name=f"pipeline-{job_id[:8]}")
+            process.start()
+            timeout_at = None if job.timeout_seconds is None else time.monotonic() + float(job.timeout_seconds)
+            self.running_process_dict[job_id] = (process, timeout_at)
+            logging.info(f"Job [{job_id}] started in process [{process.pid}]")
+
+    def dispatch(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                with self.lock:
+                    self.reap_processes()
+                    self.start_processes()
+            except Exception as e:
+                logging.error(f"Scheduler dispatch failed: {e}")
+            self.stop_event.wait(self.scheduler_config.poll_interval_seconds)
+
+    def __del__(self):
+        logging.info(f"{'='*20}Pipeline scheduler log completed.{'='*20}")
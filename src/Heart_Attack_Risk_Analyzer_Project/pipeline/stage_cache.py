@@ -0,0 +1,327 @@
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import StageCacheConfig
+import os, sys
+import json
+import shutil
+import hashlib
+import time
+
+try:
+    import fcntl
+except ImportError:
+    #not available on windows, the cache is used without the inter process lock there
+    fcntl = None
+
+FILE_HASH_BLOCK_SIZE = 1024 * 1024
+LOCK_FILE_NAME = "cache.lock"
+LAST_EVICTION_FILE_NAME = "last_eviction"
+
+
+class StageCache:
+    """
+    Content addressed cache of the pipeline stage artifacts.
+    A stage key is the sha256 of the stage name, its section of config.yaml and the bytes of its input files,
+    so a stage whose inputs and config did not change returns the artifact of the earlier run instead of redoing the work.
+    Entries are json files in cache_dir/<stage_name>/<stage_key>.json and are evicted by age and by the total size of their stage artifact dirs.
+    A hit is linked into the stage artifact dir of the run (hard links, a copy across file systems), so the artifacts
+    of every run live in its own time stamped dirs and the entry moves to the run that used it last.
+    A run holds the cache (a shared lock of cache_dir/cache.lock) from open to close, evict needs the lock for itself
+    and does nothing while another run holds it, so a dir is never deleted while a run links or reads it.
+    """
+    def __init__(self, stage_cache_config: StageCacheConfig):
+        try:
+            self.stage_cache_config = stage_cache_config
+            self.enabled = bool(stage_cache_config.enabled)
+            self.lock_file = None
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_lock_file(self):
+        os.makedirs(self.stage_cache_config.cache_dir, exist_ok=True)
+        return open(os.path.join(self.stage_cache_config.cache_dir, LOCK_FILE_NAME), 'a')
+
+    def open(self) -> "StageCache":
+        """
+        holds the cache for a run until close, the entries and dirs of the cache are not evicted meanwhile
+        """
+        try:
+            if self.enabled and self.lock_file is None:
+                self.lock_file = self.get_lock_file()
+                if fcntl is not None:
+                    fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_SH)
+            return self
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def close(self) -> None:
+        if self.lock_file is not None:
+            if fcntl is not None:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+    @staticmethod
+    def get_file_hash(file_path: str) -> str:
+        """
+        returns the sha256 of the file content, read block by block so big files are not loaded in memory
+        """
+        try:
+            file_hash = hashlib.sha256()
+            with open(file_path, 'rb') as file_obj:
+                for block in iter(lambda: file_obj.read(FILE_HASH_BLOCK_SIZE), b""):
+                    file_hash.update(block)
+            return file_hash.hexdigest()
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    @staticmethod
+    def get_stage_key(stage_name: str, config_info: dict, file_path_list: list = None) -> str:
+        """
+        stage_name: name of the stage the key is for
+        config_info: part of config.yaml the stage depends on (must not contain time stamped paths)
+        file_path_list: input files of the stage, their content is hashed not their path
+        return: hex digest identifying the stage inputs
+        """
+        try:
+            stage_hash = hashlib.sha256()
+            stage_hash.update(stage_name.encode())
+            stage_hash.update(json.dumps(config_info, sort_keys=True, default=str).encode())
+            for file_path in file_path_list or []:
+                stage_hash.update(StageCache.get_file_hash(file_path).encode())
+            return stage_hash.hexdigest()
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_entry_file_path(self, stage_name: str, stage_key: str) -> str:
+        return os.path.join(self.stage_cache_config.cache_dir, stage_name, f"{stage_key}.json")
+
+    @staticmethod
+    def is_artifact_available(artifact_info: dict) -> bool:
+        """
+        an entry is only usable while every file or directory referenced by the artifact is still on disk
+        """
+        for value in artifact_info.values():
+            if isinstance(value, str) and os.path.isabs(value) and not os.path.exists(value):
+                return False
+        return True
+
+    @staticmethod
+    def link_or_copy(src: str, dst: str) -> None:
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    @staticmethod
+    def move_artifact(artifact, from_dir: str, to_dir: str):
+        """
+        the artifact with the paths inside from_dir pointing to the same files inside to_dir
+        """
+        artifact_info = {}
+        for field, value in artifact._asdict().items():
+            if isinstance(value, str) and os.path.isabs(value) and \
+                    os.path.commonpath([os.path.abspath(value), os.path.abspath(from_dir)]) == os.path.abspath(from_dir):
+                value = os.path.join(to_dir, os.path.relpath(value, from_dir))
+            artifact_info[field] = value
+        return type(artifact)(**artifact_info)
+
+    def get_artifact(self, stage_name: str, stage_key: str, artifact_type, stage_artifact_dir: str = None):
+        """
+        returns the cached artifact of type artifact_type (namedtuple) for the key, or None on a miss
+        stage_artifact_dir: time stamped directory of the stage for this run, the cached output is linked there
+        and the artifact returned points to it
+        """
+        try:
+            if not self.enabled:
+                return None
+            entry_file_path = self.get_entry_file_path(stage_name, stage_key)
+            if not os.path.exists(entry_file_path):
+                logging.info(f"Stage cache miss for [{stage_name}] key [{stage_key}]")
+                return None
+
+            with open(entry_file_path, 'r') as entry_file:
+                entry = json.load(entry_file)
+
+            if set(entry["artifact"]) != set(artifact_type._fields):
+                logging.info(f"Stage cache entry [{entry_file_path}] was written for other {artifact_type.__name__} "
+                             f"fields, removing it.")
+                os.remove(entry_file_path)
+                return None
+
+            if not StageCache.is_artifact_available(entry["artifact"]):
+                logging.info(f"Stage cache entry [{entry_file_path}] references missing files, removing it.")
+                os.remove(entry_file_path)
+                return None
+
+            artifact = artifact_type(**entry["artifact"])
+            logging.info(f"Stage cache hit for [{stage_name}] key [{stage_key}] created at "
+                         f"[{time.ctime(entry['created_at'])}]: {artifact}")
+            cached_stage_artifact_dir = entry.get("stage_artifact_dir", None)
+            if stage_artifact_dir is not None and cached_stage_artifact_dir and \
+                    os.path.abspath(cached_stage_artifact_dir) != os.path.abspath(stage_artifact_dir):
+                shutil.copytree(cached_stage_artifact_dir, stage_artifact_dir, copy_function=StageCache.link_or_copy,
+                                dirs_exist_ok=True)
+                artifact = StageCache.move_artifact(artifact, cached_stage_artifact_dir, stage_artifact_dir)
+                logging.info(f"Stage cache output of [{cached_stage_artifact_dir}] linked to [{stage_artifact_dir}]")
+                cached_stage_artifact_dir = stage_artifact_dir
+            #the entry now belongs to this run, it is as recent as a new one for the eviction
+            self.write_entry(entry_file_path, {**entry, "used_at": time.time(),
+                                               "stage_artifact_dir": cached_stage_artifact_dir,
+                                               "artifact": artifact._asdict()})
+            return artifact
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def save_artifact(self, stage_name: str, stage_key: str, artifact, stage_artifact_dir: str) -> None:
+        """
+        stores the artifact of a finished stage
+        stage_artifact_dir: time stamped directory holding the stage output, deleted when the entry is evicted
+        """
+        try:
+            if not self.enabled:
+                return
+            entry_file_path = self.get_entry_file_path(stage_name, stage_key)
+            os.makedirs(os.path.dirname(entry_file_path), exist_ok=True)
+            created_at = time.time()
+            entry = {
+                "stage_name": stage_name,
+                "stage_key": stage_key,
+                "created_at": created_at,
+                "used_at": created_at,
+                "stage_artifact_dir": stage_artifact_dir,
+                "artifact": artifact._asdict()
+            }
+            self.write_entry(entry_file_path, entry)
+            logging.info(f"Stage cache entry saved at [{entry_file_path}]")
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    @staticmethod
+    def write_entry(entry_file_path: str, entry: dict) -> None:
+        #written aside and moved in place, so a pipeline running at the same time never reads half an entry
+        temp_entry_file_path = f"{entry_file_path}.{os.getpid()}.tmp"
+        with open(temp_entry_file_path, 'w') as entry_file:
+            json.dump(entry, entry_file, indent=4, default=str)
+        os.replace(temp_entry_file_path, entry_file_path)
+
+    @staticmethod
+    def get_used_at(entry: dict) -> float:
+        return entry.get("used_at", entry["created_at"])
+
+    def get_entry_list(self) -> list:
+        """
+        returns all the cache entries as (entry_file_path, entry) sorted from least to most recently used
+        """
+        try:
+            entry_list = []
+            cache_dir = self.stage_cache_config.cache_dir
+            if not os.path.exists(cache_dir):
+                return entry_list
+            for stage_name in os.listdir(cache_dir):
+                stage_dir = os.path.join(cache_dir, stage_name)
+                if not os.path.isdir(stage_dir):
+                    continue
+                for file_name in os.listdir(stage_dir):
+                    if not file_name.endswith(".json"):
+                        continue
+                    entry_file_path = os.path.join(stage_dir, file_name)
+                    with open(entry_file_path, 'r') as entry_file:
+                        entry_list.append((entry_file_path, json.load(entry_file)))
+            entry_list.sort(key=lambda entry: StageCache.get_used_at(entry[1]))
+            return entry_list
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    @staticmethod
+    def get_dir_size(dir_path: str) -> int:
+        total_size = 0
+        for root, _, file_names in os.walk(dir_path):
+            for file_name in file_names:
+                file_path = os.path.join(root, file_name)
+                if not os.path.islink(file_path):
+                    total_size += os.path.getsize(file_path)
+        return total_size
+
+    def remove_entry(self, entry_file_path: str, entry: dict) -> int:
+        """
+        deletes the entry and its stage artifact dir, returns the number of bytes freed.
+        The newest dir of a stage is kept, it holds the artifacts prediction and serving load
+        """
+        freed_bytes = 0
+        stage_artifact_dir = entry.get("stage_artifact_dir", None)
+        if stage_artifact_dir and os.path.exists(stage_artifact_dir) and \
+                os.path.basename(stage_artifact_dir) != max(os.listdir(os.path.dirname(stage_artifact_dir))):
+            freed_bytes = StageCache.get_dir_size(stage_artifact_dir)
+            shutil.rmtree(stage_artifact_dir, ignore_errors=True)
+        if os.path.exists(entry_file_path):
+            os.remove(entry_file_path)
+        logging.info(f"Evicted stage cache entry [{entry_file_path}], freed [{freed_bytes}] bytes.")
+        return freed_bytes
+
+    def evict(self) -> int:
+        """
+        removes the entries not used for max_age_days, then the least recently used entries until the stage artifact
+        dirs of the entries add up to less than max_size_mb. Returns the number of evicted entries.
+        Done at most every evict_interval_hours and only while no run holds the cache, a run calls it after close.
+        """
+        try:
+            if not self.enabled:
+                return 0
+            lock_file = self.get_lock_file()
+            try:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        logging.info("Stage cache is held by another run, eviction skipped.")
+                        return 0
+                return self.evict_entries()
+            finally:
+                lock_file.close()
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def evict_entries(self) -> int:
+        try:
+            last_eviction_file_path = os.path.join(self.stage_cache_config.cache_dir, LAST_EVICTION_FILE_NAME)
+            evict_interval_hours = self.stage_cache_config.evict_interval_hours
+            if evict_interval_hours is not None and os.path.exists(last_eviction_file_path) and \
+                    time.time() - os.path.getmtime(last_eviction_file_path) < float(evict_interval_hours) * 60 * 60:
+                return 0
+            with open(last_eviction_file_path, 'w') as last_eviction_file:
+                last_eviction_file.write(time.ctime())
+
+            evicted_entries = 0
+            entry_list = self.get_entry_list()
+
+            max_age_days = self.stage_cache_config.max_age_days
+            if max_age_days is not None:
+                oldest_allowed = time.time() - float(max_age_days) * 24 * 60 * 60
+                remaining_entry_list = []
+                for entry_file_path, entry in entry_list:
+                    if StageCache.get_used_at(entry) < oldest_allowed:
+                        self.remove_entry(entry_file_path, entry)
+                        evicted_entries += 1
+                    else:
+                        remaining_entry_list.append((entry_file_path, entry))
+                entry_list = remaining_entry_list
+
+            max_size_mb = self.stage_cache_config.max_size_mb
+            if max_size_mb is not None:
+                max_size = float(max_size_mb) * 1024 * 1024
+                #only the stage outputs of the entries count, not the dataset cache, row index or other outputs
+                #of artifact_dir. An artifact dir shared by several entries is counted once
+                stage_artifact_dir_set = {entry.get("stage_artifact_dir", None) for _, entry in entry_list}
+                total_size = sum(StageCache.get_dir_size(stage_artifact_dir) for stage_artifact_dir in stage_artifact_dir_set
+                                 if stage_artifact_dir and os.path.exists(stage_artifact_dir))
+                for entry_file_path, entry in entry_list:
+                    if total_size <= max_size:
+                        break
+                    total_size -= self.remove_entry(entry_file_path, entry)
+                    evicted_entries += 1
+
+            logging.info(f"Stage cache eviction completed, [{evicted_entries}] entries evicted.")
+            return evicted_entries
+        except Exception as e:
+            raise HeartRiskException(e, sys)
@@ -0,0 +1,389 @@
+import os, sys
+import json
+import shutil
+import numpy as np
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer, KNNImputer
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import GaussianNB
+from sklearn.metrics.pairwise import nan_euclidean_distances
+from src.Heart_Attack_Risk_Analyzer_Project.utils.tree_knn_imputer import TreeKNNImputer, tree_knn_impute, get_neighbor_weights
+from src.Heart_Attack_Risk_Analyzer_Project.utils.knn_imputer import ReferenceKNNImputer
+
+# Array artifact format:
+# a fitted preprocessor or model is stored as a directory holding one .npy file per fitted array plus a small
+# manifest.json describing how the arrays are used. Only plain numeric arrays are written, so every array can be
+# opened with np.load(mmap_mode='r'): worker processes loading the same artifact share one copy through the page cache
+# and loading costs milliseconds whatever the size of the reference data.
+
+ARRAY_ARTIFACT_FORMAT_VERSION = 1
+ARRAY_ARTIFACT_MANIFEST_FILE_NAME = "manifest.json"
+PREPROCESSOR_ARTIFACT_KIND = "preprocessor"
+MODEL_ARTIFACT_KIND = "model"
+
+KNN_IMPUTER_CHUNK_ROWS = 1024
+
+
+class ArrayArtifactWriter:
+    """
+    collects the arrays of an artifact and writes them next to the manifest.
+    Without artifact_dir nothing is written, the arrays and the manifest are only kept in memory.
+    """
+    def __init__(self, artifact_dir: str = None):
+        self.artifact_dir = artifact_dir
+        self.array_file_name_list = []
+        self.arrays = {}
+        self.manifest = None
+        if artifact_dir is not None:
+            if os.path.exists(artifact_dir):
+                shutil.rmtree(artifact_dir)
+            os.makedirs(artifact_dir, exist_ok=True)
+
+    def add_array(self, name: str, array) -> str:
+        try:
+            #the memory order is kept (np.save records fortran order), distance computations on the stored
+            #reference data then round exactly like the fitted estimator and break ties the same way
+            array = np.asarray(array, dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise Exception(f"Array [{name}] is not numeric and can not be stored in the array artifact format: {e}")
+        file_name = f"{name}.npy"
+        if self.artifact_dir is None:
+            self.arrays[file_name] = array
+        else:
+            np.save(os.path.join(self.artifact_dir, file_name), array)
+        self.array_file_name_list.append(file_name)
+        return file_name
+
+    def write_manifest(self, manifest: dict) -> None:
+        manifest["format_version"] = ARRAY_ARTIFACT_FORMAT_VERSION
+        self.manifest = manifest
+        if self.artifact_dir is None:
+            return
+        with open(os.path.join(self.artifact_dir, ARRAY_ARTIFACT_MANIFEST_FILE_NAME), 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=4)
+
+
+def get_step_manifest(writer: ArrayArtifactWriter, prefix: str, step) -> dict:
+    """
+    describes one fitted step of a ColumnTransformer pipeline, its fitted arrays go through the writer
+    """
+    if isinstance(step, SimpleImputer):
+        if not (isinstance(step.missing_values, float) and np.isnan(step.missing_values)) or step.add_indicator:
+            raise Exception("Only SimpleImputer with missing_values=nan and no indicator is supported")
+        statistics = np.asarray(step.statistics_, dtype=np.float64)
+        if np.isnan(statistics).any():
+            raise Exception("SimpleImputer with an all missing training column is not supported")
+        return {"type": "SimpleImputer", "arrays": {"statistics": writer.add_array(f"{prefix}_statistics", statistics)}}
+
+    if isinstance(step, ReferenceKNNImputer):
+        if step.metric != "nan_euclidean" or step.add_indicator or not np.all(step.valid_columns_):
+            raise Exception("Only KNNImputer with the nan_euclidean metric, no indicator and no empty column is supported")
+        if step.weights not in ["uniform", "distance"]:
+            raise Exception(f"KNNImputer weights [{step.weights}] is not supported")
+        return {"type": "KNNImputer",
+                "params": {"n_neighbors": int(step.n_neighbors), "weights": step.weights},
+                "arrays": {"fit_X": writer.add_array(f"{prefix}_fit_X", step.reference_)}}
+
+    if isinstance(step, KNNImputer):
+        #its training rows are only held in private attributes of sklearn
+        raise Exception("KNNImputer is not supported, fit a ReferenceKNNImputer")
+
+    if isinstance(step, TreeKNNImputer):
+        return {"type": "TreeKNNImputer",
+                "params": {"n_neighbors": int(step.n_neighbors), "weights": step.weights},
+                "arrays": {"reference": writer.add_array(f"{prefix}_reference", step.reference_),
+                           "column_mean": writer.add_array(f"{prefix}_column_mean", step.column_mean_)}}
+
+    if isinstance(step, StandardScaler):
+        n_features = int(step.n_features_in_)
+        mean = step.mean_ if step.mean_ is not None and step.with_mean else np.zeros(n_features)
+        scale = step.scale_ if step.scale_ is not None and step.with_std else np.ones(n_features)
+        return {"type": "StandardScaler",
+                "arrays": {"mean": writer.add_array(f"{prefix}_mean", mean),
+                           "scale": writer.add_array(f"{prefix}_scale", scale)}}
+
+    if isinstance(step, OneHotEncoder):
+        if step.drop is not None:
+            raise Exception("OneHotEncoder with drop is not supported")
+        categories = {}
+        for position, column_categories in enumerate(step.categories_):
+            categories[str(position)] = writer.add_array(f"{prefix}_categories_{position}", column_categories)
+        return {"type": "OneHotEncoder",
+                "params": {"handle_unknown": step.handle_unknown},
+                "arrays": {"categories": categories}}
+
+    raise Exception(f"Step of type [{type(step).__name__}] is not supported by the array artifact format")
+
+
+def write_array_preprocessor(writer: ArrayArtifactWriter, preprocessing_obj: ColumnTransformer) -> None:
+    transformer_list = []
+    for name, transformer, columns in preprocessing_obj.transformers_:
+        if isinstance(transformer, str) and transformer == "drop":
+            continue
+        if isinstance(transformer, str) and transformer == "passthrough":
+            step_list = []
+        elif isinstance(transformer, Pipeline):
+            step_list = [get_step_manifest(writer, f"{name}_{step_name}", step) for step_name, step in transformer.steps]
+        else:
+            step_list = [get_step_manifest(writer, name, transformer)]
+        transformer_list.append({"name": name, "columns": list(columns), "steps": step_list})
+    writer.write_manifest({"kind": PREPROCESSOR_ARTIFACT_KIND, "transformers": transformer_list})
+
+
+def save_array_preprocessor(artifact_dir: str, preprocessing_obj: ColumnTransformer) -> str:
+    """
+    stores a fitted ColumnTransformer made of pipelines of SimpleImputer, ReferenceKNNImputer, TreeKNNImputer, StandardScaler
+    and OneHotEncoder steps in the array artifact format
+    artifact_dir: directory to write the arrays and the manifest into
+    preprocessing_obj: fitted ColumnTransformer
+    return: artifact_dir
+    """
+    try:
+        write_array_preprocessor(ArrayArtifactWriter(artifact_dir), preprocessing_obj)
+        return artifact_dir
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def is_array_model_supported(model) -> bool:
+    """
+    LogisticRegression, SGDClassifier with log_loss and GaussianNB can be stored in the array artifact format
+    """
+    if isinstance(model, SGDClassifier):
+        return model.loss == "log_loss"
+    return isinstance(model, (LogisticRegression, GaussianNB))
+
+
+def write_array_model(writer: ArrayArtifactWriter, model) -> None:
+    if not is_array_model_supported(model):
+        raise Exception(f"Model of type [{type(model).__name__}] is not supported by the array artifact format")
+    classes = writer.add_array("classes", model.classes_)
+    if isinstance(model, (LogisticRegression, SGDClassifier)):
+        manifest = {"type": "LinearClassifier",
+                    "arrays": {"classes": classes,
+                               "coef": writer.add_array("coef", model.coef_),
+                               "intercept": writer.add_array("intercept", model.intercept_)}}
+    else:
+        manifest = {"type": "GaussianNB",
+                    "arrays": {"classes": classes,
+                               "theta": writer.add_array("theta", model.theta_),
+                               "var": writer.add_array("var", model.var_),
+                               "class_prior": writer.add_array("class_prior", model.class_prior_)}}
+    manifest["kind"] = MODEL_ARTIFACT_KIND
+    writer.write_manifest(manifest)
+
+
+def save_array_model(artifact_dir: str, model) -> str:
+    """
+    stores a fitted LogisticRegression, linear SGDClassifier or GaussianNB in the array artifact format
+    """
+    try:
+        write_array_model(ArrayArtifactWriter(artifact_dir), model)
+        return artifact_dir
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def knn_impute(X: np.ndarray, fit_X: np.ndarray, n_neighbors: int, weights: str) -> np.ndarray:
+    """
+    KNNImputer.transform on plain arrays: every missing value is the (weighted) mean of the column over the
+    n_neighbors nearest training rows having that column, nearest in nan_euclidean distance.
+    Receivers without any defined distance get the training column mean.
+    """
+    mask = np.isnan(X)
+    row_missing_idx = np.flatnonzero(mask.any(axis=1))
+    if row_missing_idx.size == 0:
+        return X
+
+    mask_fit_X = np.isnan(fit_X)
+    non_missing_fit_X = ~mask_fit_X
+    for start in range(0, row_missing_idx.size, KNN_IMPUTER_CHUNK_ROWS):
+        row_missing_chunk = row_missing_idx[start:start + KNN_IMPUTER_CHUNK_ROWS]
+        dist_chunk = nan_euclidean_distances(X[row_missing_chunk], fit_X)
+
+        for col in range(X.shape[1]):
+            col_mask = mask[row_missing_chunk, col]
+            if not np.any(col_mask):
+                continue
+
+            (potential_donors_idx,) = np.nonzero(non_missing_fit_X[:, col])
+            receivers_position = np.flatnonzero(col_mask)
+            receivers_idx = row_missing_chunk[receivers_position]
+            dist_subset = dist_chunk[receivers_position][:, potential_donors_idx]
+
+            all_nan_dist_mask = np.isnan(dist_subset).all(axis=1)
+            if all_nan_dist_mask.any():
+                X[receivers_idx[all_nan_dist_mask], col] = np.ma.array(fit_X[:, col], mask=mask_fit_X[:, col]).mean()
+                if all_nan_dist_mask.all():
+                    continue
+                receivers_idx = receivers_idx[~all_nan_dist_mask]
+                dist_subset = dist_subset[~all_nan_dist_mask]
+
+            col_n_neighbors = min(n_neighbors, len(potential_donors_idx))
+            donors_idx = np.argpartition(dist_subset, col_n_neighbors - 1, axis=1)[:, :col_n_neighbors]
+            donors_dist = dist_subset[np.arange(donors_idx.shape[0])[:, None], donors_idx]
+
+            weight_matrix = get_neighbor_weights(donors_dist, weights)
+            if weight_matrix is not None:
+                weight_matrix[np.isnan(weight_matrix)] = 0.0
+            else:
+                weight_matrix = np.ones_like(donors_dist)
+                weight_matrix[np.isnan(donors_dist)] = 0.0
+
+            fit_X_col = fit_X[potential_donors_idx, col]
+            donors = np.ma.array(fit_X_col.take(donors_idx), mask=mask_fit_X[potential_donors_idx, col].take(donors_idx))
+            X[receivers_idx, col] = np.ma.average(donors, axis=1, weights=weight_matrix).data
+    return X
+
+
+class ArrayPreprocessor:
+    """
+    transform function rebuilt from an array artifact, equivalent to the ColumnTransformer it was saved from
+    arrays: in memory arrays by file name, used instead of the files of artifact_dir when given
+    """
+    def __init__(self, artifact_dir: str, manifest: dict, mmap_mode: str = 'r', arrays: dict = None):
+        self.artifact_dir = artifact_dir
+        self.manifest = manifest
+        load_array = lambda file_name: (arrays[file_name] if arrays is not None
+                                        else np.load(os.path.join(artifact_dir, file_name), mmap_mode=mmap_mode))
+        self.transformers = []
+        for transformer in manifest["transformers"]:
+            step_list = []
+            for step in transformer["steps"]:
+                step_arrays = {}
+                for name, file_name in step.get("arrays", {}).items():
+                    if isinstance(file_name, dict):
+                        step_arrays[name] = [load_array(file_name[position]) for position in sorted(file_name, key=int)]
+                    else:
+                        step_arrays[name] = load_array(file_name)
+                if step["type"] == "TreeKNNImputer":
+                    #the KD trees are built on first use and reused by the next calls
+                    step_arrays["index_cache"] = {}
+                step_list.append((step["type"], step.get("params", {}), step_arrays))
+            self.transformers.append((transformer["columns"], step_list))
+        self.feature_columns = [column for columns, _ in self.transformers for column in columns]
+
+    @staticmethod
+    def apply_step(step_type: str, params: dict, arrays: dict, X: np.ndarray) -> np.ndarray:
+        if step_type == "SimpleImputer":
+            missing_row_idx, missing_col_idx = np.nonzero(np.isnan(X))
+            X[missing_row_idx, missing_col_idx] = arrays["statistics"][missing_col_idx]
+            return X
+        if step_type == "TreeKNNImputer":
+            return tree_knn_impute(X, np.asarray(arrays["reference"]), np.asarray(arrays["column_mean"]),
+                                   params["n_neighbors"], params["weights"], index_cache=arrays["index_cache"])
+        if step_type == "KNNImputer":
+            return knn_impute(X, np.asarray(arrays["fit_X"]), params["n_neighbors"], params["weights"])
+        if step_type == "StandardScaler":
+            X -= arrays["mean"]
+            X /= arrays["scale"]
+            return X
+        if step_type == "OneHotEncoder":
+            one_hot_list = []
+            for position, categories in enumerate(arrays["categories"]):
+                one_hot = (X[:, position][:, None] == np.asarray(categories)[None, :]).astype(np.float64)
+                if params["handle_unknown"] == "error" and not one_hot.any(axis=1).all():
+                    raise Exception(f"Found unknown categories in column [{position}] during transform")
+                one_hot_list.append(one_hot)
+            return np.hstack(one_hot_list)
+        raise Exception(f"Unknown step type [{step_type}]")
+
+    def transform(self, dataframe) -> np.ndarray:
+        """
+        dataframe: pandas dataframe (or dict of column arrays) holding the feature columns
+        return: float64 array laid out as the ColumnTransformer output
+        """
+        try:
+            output_list = []
+            for columns, step_list in self.transformers:
+                X = np.column_stack([np.asarray(dataframe[column], dtype=np.float64) for column in columns])
+                for step_type, params, arrays in step_list:
+                    X = ArrayPreprocessor.apply_step(step_type, params, arrays, X)
+                output_list.append(X)
+            return np.hstack(output_list)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+
+class ArrayModel:
+    """
+    predict_proba rebuilt from an array artifact, equivalent to the model it was saved from
+    arrays: in memory arrays by file name, used instead of the files of artifact_dir when given
+    """
+    def __init__(self, artifact_dir: str, manifest: dict, mmap_mode: str = 'r', arrays: dict = None):
+        self.artifact_dir = artifact_dir
+        self.manifest = manifest
+        self.model_type = manifest["type"]
+        self.arrays = {name: (arrays[file_name] if arrays is not None
+                              else np.load(os.path.join(artifact_dir, file_name), mmap_mode=mmap_mode))
+                       for name, file_name in manifest["arrays"].items()}
+        self.classes_ = np.asarray(self.arrays["classes"])
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        try:
+            if self.model_type == "LinearClassifier":
+                decision = X @ self.arrays["coef"].T + self.arrays["intercept"]
+                if decision.shape[1] == 1:
+                    probability = 1.0 / (1.0 + np.exp(-decision[:, 0]))
+                    return np.column_stack([1.0 - probability, probability])
+                decision = decision - decision.max(axis=1, keepdims=True)
+                np.exp(decision, out=decision)
+                return decision / decision.sum(axis=1, keepdims=True)
+
+            if self.model_type == "GaussianNB":
+                theta, var = self.arrays["theta"], self.arrays["var"]
+                joint_log_likelihood = (np.log(self.arrays["class_prior"])
+                                        - 0.5 * np.sum(np.log(2.0 * np.pi * var), axis=1)
+                                        - 0.5 * (((X[:, None, :] - theta[None, :, :]) ** 2) / var[None, :, :]).sum(axis=2))
+                joint_log_likelihood -= joint_log_likelihood.max(axis=1, keepdims=True)
+                np.exp(joint_log_likelihood, out=joint_log_likelihood)
+                return joint_log_likelihood / joint_log_likelihood.sum(axis=1, keepdims=True)
+
+            raise Exception(f"Unknown model type [{self.model_type}]")
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load_array_artifact(artifact_dir: str, mmap_mode: str = 'r'):
+    """
+    loads an array artifact written by save_array_preprocessor or save_array_model
+    artifact_dir: directory holding the manifest and the arrays
+    mmap_mode: passed to np.load, 'r' maps the arrays read only instead of reading them, None reads them in memory
+    return: ArrayPreprocessor or ArrayModel
+    """
+    try:
+        with open(os.path.join(artifact_dir, ARRAY_ARTIFACT_MANIFEST_FILE_NAME), 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get("format_version") != ARRAY_ARTIFACT_FORMAT_VERSION:
+            raise Exception(f"Unsupported array artifact format version [{manifest.get('format_version')}]")
+        if manifest["kind"] == PREPROCESSOR_ARTIFACT_KIND:
+            return ArrayPreprocessor(artifact_dir, manifest, mmap_mode=mmap_mode)
+        if manifest["kind"] == MODEL_ARTIFACT_KIND:
+            return ArrayModel(artifact_dir, manifest, mmap_mode=mmap_mode)
+        raise Exception(f"Unknown array artifact kind [{manifest['kind']}]")
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def get_array_artifact(obj):
+    """
+    converts a fitted ColumnTransformer or model to its array form in memory, without writing anything.
+    ArrayPreprocessor and ArrayModel objects are returned unchanged.
+    """
+    try:
+        if isinstance(obj, (ArrayPreprocessor, ArrayModel)):
+            return obj
+        writer = ArrayArtifactWriter()
+        if isinstance(obj, ColumnTransformer):
+            write_array_preprocessor(writer, obj)
+            return ArrayPreprocessor(None, writer.manifest, arrays=writer.arrays)
+        write_array_model(writer, obj)
+        return ArrayModel(None, writer.manifest, arrays=writer.arrays)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
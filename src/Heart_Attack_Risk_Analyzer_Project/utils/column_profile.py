@@ -0,0 +1,294 @@
+import os, sys
+import json
+import numpy as np
+import pandas as pd
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.utils.hash_split import get_column_bits, mix64
+
+# Column profile:
+# fixed size summary of every column of a dataset, updated one chunk at a time so a file of any size is profiled in
+# one pass with the memory of one chunk, and merged with the profile of other chunks, files or processes.
+#   rows, nulls, min, max : exact (min and max of the numerical columns)
+#   distinct values       : HyperLogLog sketch of 2**precision registers (relative error about 1.04/sqrt(2**precision),
+#                           1.6% with precision 12), the values are hashed as in the hash split
+#   top values            : Misra-Gries summary of at most top_k counters, every value more frequent than
+#                           (rows - nulls) / (top_k + 1) is in it and its count is low by at most that much.
+#                           While no counter was dropped the counts are exact and so is the distinct count
+# The feature types (categorical below max_categories distinct values) are read from the profile instead of
+# counting the distinct values of the dataset again.
+
+PROFILE_FORMAT_VERSION = 1
+DEFAULT_HLL_PRECISION = 12
+DEFAULT_TOP_K = 16
+HLL_HASH_BITS = 64
+#the registers are 1 KB to 64 KB, the rank bits must fit in a float64 mantissa
+MIN_HLL_PRECISION = 11
+MAX_HLL_PRECISION = 16
+
+
+def get_hll_alpha(register_count: int) -> float:
+    """
+    bias correction constant of the HyperLogLog estimate (of 128 registers and more)
+    """
+    return 0.7213 / (1 + 1.079 / register_count)
+
+
+def get_hll_update(hashes: np.ndarray, precision: int):
+    """
+    (register index, rank) of every uint64 hash: the top precision bits select the register, the rank is the
+    position of the first 1 bit of the remaining bits
+    """
+    remaining_bits = HLL_HASH_BITS - precision
+    register_index = (hashes >> np.uint64(remaining_bits)).astype(np.intp)
+    #frexp gives the bit length exactly, the remaining bits fit in the 53 bits of a float64 mantissa
+    bit_length = np.frexp((hashes & np.uint64((1 << remaining_bits) - 1)).astype(np.float64))[1]
+    return register_index, (remaining_bits - bit_length + 1).astype(np.uint8)
+
+
+def merge_top_values(top_values: pd.Series, other_top_values: pd.Series, top_k: int):
+    """
+    adds two Misra-Gries summaries (value counts series) and keeps the counters heavier than the top_k + 1-th one,
+    its count is taken off all of them (the merge of Agarwal et al.). Returns the summary and the count taken off
+    """
+    if len(top_values) == 0:
+        merged = other_top_values
+    elif len(other_top_values) == 0:
+        merged = top_values
+    else:
+        merged = top_values.add(other_top_values, fill_value=0).astype(np.int64)
+    if len(merged) <= top_k:
+        return merged, 0
+    decrement = int(merged.nlargest(top_k + 1).iloc[-1])
+    return merged[merged > decrement] - decrement, decrement
+
+
+class ColumnSketch:
+    """
+    profile of one column, see the top of the module
+    """
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION, top_k: int = DEFAULT_TOP_K):
+        if not MIN_HLL_PRECISION <= precision <= MAX_HLL_PRECISION:
+            raise Exception(f"HyperLogLog precision [{precision}] is not in [{MIN_HLL_PRECISION}, {MAX_HLL_PRECISION}]")
+        self.precision = precision
+        self.top_k = top_k
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        self.rows = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.top_values = pd.Series(dtype=np.int64)
+        #sum of the counts taken off by the Misra-Gries merges, the error bound of the top value counts
+        self.top_value_error = 0
+        self.is_numeric = True
+
+    def update(self, series: pd.Series) -> "ColumnSketch":
+        try:
+            is_null = series.isna().to_numpy()
+            self.rows += len(series)
+            self.nulls += int(is_null.sum())
+            values = series[~is_null]
+            if len(values) == 0:
+                return self
+            is_numeric = pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype)
+            self.is_numeric = self.is_numeric and is_numeric
+            if is_numeric:
+                numbers = values.to_numpy(dtype=np.float64)
+                self.min = float(numbers.min()) if self.min is None else min(self.min, float(numbers.min()))
+                self.max = float(numbers.max()) if self.max is None else max(self.max, float(numbers.max()))
+                #numbers as float64 so 1 and 1.0 are the same value in every chunk
+                values = pd.Series(numbers)
+
+            register_index, rank = get_hll_update(mix64(get_column_bits(values)), self.precision)
+            np.maximum.at(self.registers, register_index, rank)
+
+            self.top_values, decrement = merge_top_values(self.top_values, values.value_counts(sort=False), self.top_k)
+            self.top_value_error += decrement
+            return self
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        try:
+            if (self.precision, self.top_k) != (other.precision, other.top_k):
+                raise Exception(f"Column sketches of precision/top_k [{self.precision}, {self.top_k}] and "
+                                f"[{other.precision}, {other.top_k}] can't be merged.")
+            merged = ColumnSketch(precision=self.precision, top_k=self.top_k)
+            merged.registers = np.maximum(self.registers, other.registers)
+            merged.rows = self.rows + other.rows
+            merged.nulls = self.nulls + other.nulls
+            min_list = [value for value in [self.min, other.min] if value is not None]
+            max_list = [value for value in [self.max, other.max] if value is not None]
+            merged.min = min(min_list) if min_list else None
+            merged.max = max(max_list) if max_list else None
+            merged.top_values, decrement = merge_top_values(self.top_values, other.top_values, self.top_k)
+            merged.top_value_error = self.top_value_error + other.top_value_error + decrement
+            merged.is_numeric = self.is_numeric and other.is_numeric
+            return merged
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_distinct_estimate(self) -> float:
+        """
+        HyperLogLog estimate of the distinct values, linear counting of the empty registers for small counts
+        """
+        register_count = len(self.registers)
+        raw_estimate = get_hll_alpha(register_count) * register_count ** 2 / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        empty_registers = int((self.registers == 0).sum())
+        if raw_estimate <= 2.5 * register_count and empty_registers > 0:
+            return register_count * np.log(register_count / empty_registers)
+        return float(raw_estimate)
+
+    def get_distinct_count(self) -> int:
+        """
+        distinct non missing values, exact while no top value counter was dropped
+        """
+        if self.top_value_error == 0:
+            return len(self.top_values)
+        return int(round(self.get_distinct_estimate()))
+
+    def get_top_values(self) -> list:
+        """
+        [(value, count)] of the top values, most frequent first
+        """
+        top_values = self.top_values.sort_values(ascending=False, kind="stable")
+        return list(zip(top_values.index.tolist(), top_values.tolist()))
+
+    def to_dict(self) -> dict:
+        return {"rows": self.rows,
+                "nulls": self.nulls,
+                "min": self.min,
+                "max": self.max,
+                "is_numeric": self.is_numeric,
+                "distinct_count": self.get_distinct_count(),
+                "is_distinct_count_exact": self.top_value_error == 0,
+                "precision": self.precision,
+                "top_k": self.top_k,
+                "registers": self.registers.tolist(),
+                "top_values": [[value, count] for value, count in self.get_top_values()],
+                "top_value_error": self.top_value_error}
+
+    @classmethod
+    def from_dict(cls, sketch_dict: dict) -> "ColumnSketch":
+        sketch = cls(precision=sketch_dict["precision"], top_k=sketch_dict["top_k"])
+        sketch.registers = np.array(sketch_dict["registers"], dtype=np.uint8)
+        sketch.rows = sketch_dict["rows"]
+        sketch.nulls = sketch_dict["nulls"]
+        sketch.min = sketch_dict["min"]
+        sketch.max = sketch_dict["max"]
+        sketch.is_numeric = sketch_dict["is_numeric"]
+        sketch.top_values = pd.Series([count for _, count in sketch_dict["top_values"]],
+                                      index=[value for value, _ in sketch_dict["top_values"]], dtype=np.int64)
+        sketch.top_value_error = sketch_dict["top_value_error"]
+        return sketch
+
+
+class ColumnProfile:
+    """
+    column sketches of every column of a dataset, built with update over its chunks
+    """
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION, top_k: int = DEFAULT_TOP_K):
+        self.precision = precision
+        self.top_k = top_k
+        self.columns = {}
+        self.rows = 0
+
+    @classmethod
+    def from_chunks(cls, chunk_iterator, precision: int = DEFAULT_HLL_PRECISION,
+                    top_k: int = DEFAULT_TOP_K) -> "ColumnProfile":
+        """
+        profile of the dataframes of chunk_iterator in one pass
+        """
+        column_profile = cls(precision=precision, top_k=top_k)
+        for chunk_df in chunk_iterator:
+            column_profile.update(chunk_df)
+        return column_profile
+
+    def update(self, dataframe: pd.DataFrame) -> "ColumnProfile":
+        try:
+            for column in dataframe.columns:
+                if column not in self.columns:
+                    self.columns[column] = ColumnSketch(precision=self.precision, top_k=self.top_k)
+                    #rows of the chunks before the column appeared are missing values of the column
+                    self.columns[column].rows = self.columns[column].nulls = self.rows
+                self.columns[column].update(dataframe[column])
+            for column in self.columns:
+                if column not in dataframe.columns:
+                    self.columns[column].rows += len(dataframe)
+                    self.columns[column].nulls += len(dataframe)
+            self.rows += len(dataframe)
+            return self
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def merge(self, other: "ColumnProfile") -> "ColumnProfile":
+        try:
+            merged = ColumnProfile(precision=self.precision, top_k=self.top_k)
+            merged.rows = self.rows + other.rows
+            for column in list(self.columns) + [column for column in other.columns if column not in self.columns]:
+                empty_sketch = ColumnSketch(precision=self.precision, top_k=self.top_k)
+                sketch = self.columns.get(column, None)
+                if sketch is None:
+                    sketch = empty_sketch
+                    sketch.rows = sketch.nulls = self.rows
+                other_sketch = other.columns.get(column, None)
+                if other_sketch is None:
+                    other_sketch = ColumnSketch(precision=self.precision, top_k=self.top_k)
+                    other_sketch.rows = other_sketch.nulls = other.rows
+                merged.columns[column] = sketch.merge(other_sketch)
+            return merged
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_feature_types(self, max_categories: int = 5, exclude_columns: list = None):
+        """
+        (categorical columns, numerical columns): columns of less than max_categories distinct values, or holding
+        text, are categorical
+        """
+        exclude_columns = exclude_columns or []
+        categorical_columns = []
+        numerical_columns = []
+        for column, sketch in self.columns.items():
+            if column in exclude_columns:
+                continue
+            if not sketch.is_numeric or sketch.get_distinct_count() < max_categories:
+                categorical_columns.append(column)
+            else:
+                numerical_columns.append(column)
+        return categorical_columns, numerical_columns
+
+    def to_dict(self) -> dict:
+        return {"version": PROFILE_FORMAT_VERSION,
+                "rows": self.rows,
+                "precision": self.precision,
+                "top_k": self.top_k,
+                "columns": {column: sketch.to_dict() for column, sketch in self.columns.items()}}
+
+    @classmethod
+    def from_dict(cls, profile_dict: dict) -> "ColumnProfile":
+        if profile_dict.get("version", None) != PROFILE_FORMAT_VERSION:
+            raise Exception(f"Column profile version [{profile_dict.get('version', None)}] is not supported.")
+        column_profile = cls(precision=profile_dict["precision"], top_k=profile_dict["top_k"])
+        column_profile.rows = profile_dict["rows"]
+        column_profile.columns = {column: ColumnSketch.from_dict(sketch_dict)
+                                  for column, sketch_dict in profile_dict["columns"].items()}
+        return column_profile
+
+
+def save_column_profile(file_path: str, column_profile: ColumnProfile) -> str:
+    try:
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        with open(file_path, 'w') as profile_file:
+            json.dump(column_profile.to_dict(), profile_file)
+        return file_path
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def load_column_profile(file_path: str) -> ColumnProfile:
+    try:
+        with open(file_path, 'r') as profile_file:
+            return ColumnProfile.from_dict(json.load(profile_file))
+    except Exception as e:
+        raise HeartRiskException(e, sys)
@@ -0,0 +1,247 @@
+import sys
+import numpy as np
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.utils.array_artifact import get_array_artifact, knn_impute
+from src.Heart_Attack_Risk_Analyzer_Project.utils.tree_knn_imputer import tree_knn_impute
+
+# Compiled inference kernel:
+# the fitted preprocessor and model are folded into a few fixed arrays so scoring a batch is
+#   numerical columns  : nan filling (SimpleImputer statistics, or KNN/KD tree imputation of the incomplete rows only),
+#                        the StandardScaler is folded into the model parameters
+#   categorical columns: nan filling, then every value is mapped to its one hot position with a searchsorted
+#                        and the model contribution of that position is read from a lookup table
+#   model              : one dot product (linear models) or one quadratic form per class (GaussianNB)
+# No one hot matrix, no scaled copy of the input and no DataFrame is built.
+
+LINEAR_KERNEL = "LinearClassifier"
+GAUSSIAN_NB_KERNEL = "GaussianNB"
+IMPUTER_STEP_TYPES = ["SimpleImputer", "KNNImputer", "TreeKNNImputer"]
+
+
+class NumericalBlock:
+    """
+    numerical columns of one transformer: their imputer and the scaler parameters,
+    weights (linear) or theta/inverse_variance (GaussianNB) are set when the model is compiled
+    """
+    def __init__(self, input_index: np.ndarray, output_index: np.ndarray, imputer: tuple,
+                 mean: np.ndarray, scale: np.ndarray):
+        self.input_index = input_index
+        self.output_index = output_index
+        self.imputer = imputer
+        self.mean = mean
+        self.scale = scale
+
+    def get_values(self, X: np.ndarray) -> np.ndarray:
+        """
+        returns the imputed (not scaled) columns of the block, X itself is not modified
+        """
+        values = X[:, self.input_index]
+        if self.imputer is None:
+            return values
+        imputer_type, params, arrays = self.imputer
+        if imputer_type == "SimpleImputer":
+            return np.where(np.isnan(values), arrays["statistics"], values)
+        if imputer_type == "TreeKNNImputer":
+            return tree_knn_impute(values, np.asarray(arrays["reference"]), np.asarray(arrays["column_mean"]),
+                                   params["n_neighbors"], params["weights"], index_cache=arrays["index_cache"])
+        return knn_impute(values, np.asarray(arrays["fit_X"]), params["n_neighbors"], params["weights"])
+
+
+class CategoricalColumn:
+    """
+    one categorical column: its fill value, its sorted categories and the model contribution of every
+    category in table (the last row of table is the contribution of an unknown category)
+    """
+    def __init__(self, input_index: int, output_index: np.ndarray, fill_value: float, categories: np.ndarray,
+                 handle_unknown: str):
+        self.input_index = input_index
+        self.output_index = output_index
+        self.fill_value = fill_value
+        self.categories = categories
+        self.handle_unknown = handle_unknown
+        self.table = None
+
+    def get_codes(self, values: np.ndarray) -> np.ndarray:
+        """
+        returns the one hot position of every value, len(categories) for unknown values
+        """
+        if self.fill_value is not None:
+            values = np.where(np.isnan(values), self.fill_value, values)
+        position = np.searchsorted(self.categories, values)
+        np.minimum(position, len(self.categories) - 1, out=position)
+        known = self.categories[position] == values
+        if self.handle_unknown == "error" and not known.all():
+            raise Exception(f"Found unknown categories {np.unique(values[~known])} in input column [{self.input_index}]")
+        return np.where(known, position, len(self.categories))
+
+
+class CompiledKernel:
+    """
+    fused numpy scorer equivalent to preprocessing_obj.transform followed by model.predict_proba.
+    preprocessing_obj: fitted ColumnTransformer or ArrayPreprocessor
+    model: fitted LogisticRegression, SGDClassifier(log_loss), GaussianNB or ArrayModel
+    The raw input is a float array whose columns are ordered as input_columns.
+    """
+    def __init__(self, preprocessing_obj, model):
+        try:
+            preprocessor = get_array_artifact(preprocessing_obj)
+            array_model = get_array_artifact(model)
+
+            self.input_columns = []
+            self.numerical_block_list = []
+            self.categorical_column_list = []
+            output_position = 0
+            for columns, step_list in preprocessor.transformers:
+                input_index = np.arange(len(self.input_columns), len(self.input_columns) + len(columns))
+                self.input_columns.extend(columns)
+                step_type_list = [step_type for step_type, _, _ in step_list]
+
+                if step_type_list in (["OneHotEncoder"], ["SimpleImputer", "OneHotEncoder"]):
+                    _, encoder_params, encoder_arrays = step_list[-1]
+                    statistics = step_list[0][2]["statistics"] if len(step_list) == 2 else None
+                    for position, column_index in enumerate(input_index):
+                        categories = np.asarray(encoder_arrays["categories"][position], dtype=np.float64)
+                        if np.isnan(categories).any():
+                            raise Exception(f"Missing value category of column [{columns[position]}] can not be compiled")
+                        self.categorical_column_list.append(CategoricalColumn(
+                            input_index=int(column_index),
+                            output_index=np.arange(output_position, output_position + len(categories)),
+                            fill_value=None if statistics is None else float(statistics[position]),
+                            categories=categories,
+                            handle_unknown=encoder_params["handle_unknown"]))
+                        output_position += len(categories)
+                    continue
+
+                imputer, scaler_arrays = None, None
+                for position, (step_type, params, arrays) in enumerate(step_list):
+                    if step_type in IMPUTER_STEP_TYPES and position == 0:
+                        imputer = (step_type, params, arrays)
+                    elif step_type == "StandardScaler" and scaler_arrays is None:
+                        scaler_arrays = arrays
+                    else:
+                        raise Exception(f"Steps {step_type_list} of the transformer of {columns} can not be compiled")
+                self.numerical_block_list.append(NumericalBlock(
+                    input_index=input_index,
+                    output_index=np.arange(output_position, output_position + len(columns)),
+                    imputer=imputer,
+                    mean=np.zeros(len(columns)) if scaler_arrays is None else np.asarray(scaler_arrays["mean"], dtype=np.float64),
+                    scale=np.ones(len(columns)) if scaler_arrays is None else np.asarray(scaler_arrays["scale"], dtype=np.float64)))
+                output_position += len(columns)
+
+            self.n_transformed_features = output_position
+            self.classes_ = np.asarray(array_model.classes_)
+            self.kernel_type = array_model.model_type
+            if self.kernel_type == LINEAR_KERNEL:
+                self.compile_linear(coef=np.asarray(array_model.arrays["coef"]),
+                                    intercept=np.asarray(array_model.arrays["intercept"]))
+            elif self.kernel_type == GAUSSIAN_NB_KERNEL:
+                self.compile_gaussian_nb(theta=np.asarray(array_model.arrays["theta"]),
+                                         var=np.asarray(array_model.arrays["var"]),
+                                         class_prior=np.asarray(array_model.arrays["class_prior"]))
+            else:
+                raise Exception(f"Model type [{self.kernel_type}] can not be compiled")
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def compile_linear(self, coef: np.ndarray, intercept: np.ndarray) -> None:
+        """
+        decision = sum over numerical blocks of x @ (coef / scale).T - coef @ (mean / scale)
+                   + sum over categorical columns of coef[:, position of the value] + intercept
+        """
+        if coef.shape[1] != self.n_transformed_features:
+            raise Exception(f"Model expects [{coef.shape[1]}] features, the preprocessor gives [{self.n_transformed_features}]")
+        self.bias = np.asarray(intercept, dtype=np.float64).copy()
+        for block in self.numerical_block_list:
+            block_coef = coef[:, block.output_index]
+            block.weights = np.ascontiguousarray((block_coef / block.scale).T)
+            self.bias -= block_coef @ (block.mean / block.scale)
+        for column in self.categorical_column_list:
+            column.table = np.vstack([coef[:, column.output_index].T, np.zeros((1, coef.shape[0]))])
+
+    def compile_gaussian_nb(self, theta: np.ndarray, var: np.ndarray, class_prior: np.ndarray) -> None:
+        """
+        joint log likelihood = log(prior) - 0.5 * sum(log(2 pi var)) - 0.5 * sum((z - theta)^2 / var)
+        with z = (x - mean) / scale for numerical features, that is (x - (mean + theta * scale))^2 / (var * scale^2).
+        One hot features are 0 or 1, so a categorical column adds the 0 term of all its categories (a constant)
+        plus the difference between the 1 and the 0 term of the category of the value.
+        """
+        if theta.shape[1] != self.n_transformed_features:
+            raise Exception(f"Model expects [{theta.shape[1]}] features, the preprocessor gives [{self.n_transformed_features}]")
+        self.bias = np.log(class_prior) - 0.5 * np.sum(np.log(2.0 * np.pi * var), axis=1)
+        for block in self.numerical_block_list:
+            block.theta = block.mean + theta[:, block.output_index] * block.scale
+            block.inverse_variance = 0.5 / (var[:, block.output_index] * block.scale ** 2)
+        for column in self.categorical_column_list:
+            column_theta, column_var = theta[:, column.output_index], var[:, column.output_index]
+            zero_term = -0.5 * column_theta ** 2 / column_var
+            one_term = -0.5 * (1.0 - column_theta) ** 2 / column_var
+            self.bias += zero_term.sum(axis=1)
+            column.table = np.vstack([(one_term - zero_term).T, np.zeros((1, theta.shape[0]))])
+
+    def get_input_array(self, dataframe) -> np.ndarray:
+        """
+        dataframe: pandas dataframe (or dict of column arrays) holding the input columns
+        return: float64 array with the columns ordered as input_columns
+        """
+        try:
+            missing_columns = [column for column in self.input_columns if column not in dataframe]
+            if len(missing_columns) > 0:
+                raise Exception(f"Columns {missing_columns} are required for prediction but not present in the input.")
+            return np.column_stack([np.asarray(dataframe[column], dtype=np.float64) for column in self.input_columns])
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_record_array(self, record: dict) -> np.ndarray:
+        """
+        returns the one row input array of a {column: value} record, None values are missing values
+        """
+        try:
+            return np.array([[record[column] for column in self.input_columns]], dtype=np.float64)
+        except KeyError as e:
+            raise HeartRiskException(Exception(f"Column {e} is required for prediction but not present in the record."), sys)
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """
+        returns the linear decision function or the joint log likelihood of every class, shape (n_rows, n_outputs)
+        """
+        scores = np.empty((X.shape[0], self.bias.shape[0]))
+        scores[:] = self.bias
+        for block in self.numerical_block_list:
+            values = block.get_values(X)
+            if self.kernel_type == LINEAR_KERNEL:
+                scores += values @ block.weights
+            else:
+                for class_index in range(scores.shape[1]):
+                    difference = values - block.theta[class_index]
+                    difference *= difference
+                    scores[:, class_index] -= difference @ block.inverse_variance[class_index]
+        for column in self.categorical_column_list:
+            scores += column.table[column.get_codes(X[:, column.input_index])]
+        return scores
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        X: raw input array ordered as input_columns, missing values as nan
+        return: class probabilities, columns ordered as classes_
+        """
+        try:
+            scores = self.decision_function(X)
+            if self.kernel_type == LINEAR_KERNEL and scores.shape[1] == 1:
+                probability = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+                return np.column_stack([1.0 - probability, probability])
+            scores -= scores.max(axis=1, keepdims=True)
+            np.exp(scores, out=scores)
+            scores /= scores.sum(axis=1, keepdims=True)
+            return scores
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def compile_kernel(preprocessing_obj, model) -> CompiledKernel:
+    """
+    compiles the fitted preprocessor and model into a CompiledKernel
+    """
+    return CompiledKernel(preprocessing_obj=preprocessing_obj, model=model)
@@ -0,0 +1,104 @@
+import os, sys
+import threading
+from collections import namedtuple
+import pandas as pd
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import get_load_dtypes, read_dataframe
+
+DatasetLoadReport = namedtuple("DatasetLoadReport", ["datasets", "loads", "shared_loads", "avoided_bytes"])
+
+
+class DatasetHandle:
+    """
+    one split of the dataset, loaded from its file at most once per pipeline run and shared by every stage
+    through the DataIngestionArtifact. Stages get a shallow copy of the in memory frame, with the copy on write
+    of pandas a stage changing its frame never changes the frame seen by the others.
+    file_path: train or test file written by the ingestion
+    dataframe: the split when it is already in memory (the ingestion holds it), read from file_path otherwise
+    """
+    def __init__(self, file_path: str, dataframe: pd.DataFrame = None):
+        self.file_path = file_path
+        self.dataframe = dataframe
+        self.schema_dataframe_dict = {}
+        #concurrent validation checks share the handle, the first one loads the split and the others wait for it
+        self.lock = threading.Lock()
+        #loads: reads of the file, shared_loads: requests answered from memory instead of reading the file again
+        self.loads = 0
+        self.shared_loads = 0
+        self.avoided_bytes = 0
+
+    def get_file_size(self) -> int:
+        return os.path.getsize(self.file_path) if os.path.exists(self.file_path) else 0
+
+    def get_dataframe(self) -> pd.DataFrame:
+        """
+        returns the split with the column types stored in the file (what read_dataframe gives)
+        """
+        try:
+            with self.lock:
+                if self.dataframe is None:
+                    logging.info(f"Loading dataset [{self.file_path}] in memory.")
+                    self.dataframe = read_dataframe(file_path=self.file_path)
+                    self.loads += 1
+                else:
+                    self.shared_loads += 1
+                    self.avoided_bytes += self.get_file_size()
+                return self.dataframe.copy(deep=False)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_schema_dataframe(self, schema_file_path: str) -> pd.DataFrame:
+        """
+        returns the split cast as load_data does (numerical columns float, categorical columns object),
+        the cast frame is kept so it is only built once per schema
+        """
+        try:
+            schema_dataframe = self.schema_dataframe_dict.get(schema_file_path, None)
+            if schema_dataframe is None:
+                dataframe = self.get_dataframe()
+                load_dtypes = get_load_dtypes(dataframe_columns=dataframe.columns, schema_file_path=schema_file_path)
+                schema_dataframe = self.schema_dataframe_dict.setdefault(schema_file_path, dataframe.astype(load_dtypes))
+            else:
+                with self.lock:
+                    self.shared_loads += 1
+                    self.avoided_bytes += self.get_file_size()
+            return schema_dataframe.copy(deep=False)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def __getstate__(self):
+        #worker processes get the path only and load the split themselves
+        state = self.__dict__.copy()
+        state["dataframe"] = None
+        state["schema_dataframe_dict"] = {}
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"DatasetHandle(file_path='{self.file_path}', in_memory={self.dataframe is not None})"
+
+
+def get_dataset_handle(dataset_handle: DatasetHandle, file_path: str) -> DatasetHandle:
+    """
+    returns the handle given through the artifact, or a new handle of file_path when there is none
+    (artifact built outside of the pipeline or restored from the stage cache)
+    """
+    if dataset_handle is not None and dataset_handle.file_path == file_path:
+        return dataset_handle
+    return DatasetHandle(file_path=file_path)
+
+
+def get_dataset_load_report(dataset_handle_list: list) -> DatasetLoadReport:
+    """
+    sums the load counters of the handles
+    """
+    dataset_handle_list = [dataset_handle for dataset_handle in dataset_handle_list if dataset_handle is not None]
+    return DatasetLoadReport(datasets=len(dataset_handle_list),
+                             loads=sum(dataset_handle.loads for dataset_handle in dataset_handle_list),
+                             shared_loads=sum(dataset_handle.shared_loads for dataset_handle in dataset_handle_list),
+                             avoided_bytes=sum(dataset_handle.avoided_bytes for dataset_handle in dataset_handle_list))
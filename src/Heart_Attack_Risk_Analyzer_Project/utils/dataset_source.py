@@ -0,0 +1,481 @@
+import os, sys
+import json
+import time
+import shutil
+import fnmatch
+import hashlib
+import zipfile
+import tempfile
+import urllib.request
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import read_yaml_file
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+
+# Dataset sources:
+# the raw dataset of the ingestion comes from the source registered under source.type of data_ingestion_config
+#   local_file : a csv or zip file on disk
+#   local_dir  : a directory holding zip_file_name or a single data file (a copy shared in an air gapped network)
+#   http       : a mirror serving the archive at source.url, any static file server (file:// urls work too)
+#   kaggle     : the kaggle dataset dataset_url, needs the kaggle credentials
+# Archives of the remote sources are kept in a cache shared by the runs. A cache entry is the archive and a json
+# record of its sha256, size and source, it is used without network access while the archive still has the recorded
+# checksum (and the sha256 of config.yaml when one is given). Local files are read in place, checked against the
+# sha256 of config.yaml when one is given.
+# Zip archives are read straight from the archive (stream extraction), or extracted once per archive checksum into
+# the cache when stream extraction is off. New sources are added with register_dataset_source.
+# Partitioned datasets (one csv per site and month) are read with read_dataset_files: every file of a directory or
+# archive matching a name pattern is parsed by pyarrow in a pool of threads with the column types of schema.yaml,
+# and the tables are concatenated without copying their columns.
+
+HASH_CHUNK_BYTES = 1024 * 1024
+DATASET_FILE_EXTENSION_LIST = [".csv", ".zip"]
+CACHE_RECORD_FILE_EXTENSION = ".json"
+EXTRACTED_CACHE_DIR_NAME = "extracted"
+EXTRACTED_COMPLETE_FILE_NAME = ".complete"
+
+#arrow type every schema.yaml type is parsed as
+SCHEMA_ARROW_TYPE_DICT = {"int64": "int64", "float64": "float64", "object": "string", "bool": "bool_"}
+
+IngestedFile = namedtuple("IngestedFile", ["file_path", "member_name", "rows", "bytes", "seconds", "is_valid", "message"])
+
+DATASET_SOURCE_REGISTRY = {}
+
+
+def register_dataset_source(source_type: str):
+    """
+    class decorator adding a DatasetSource to the registry under source_type
+    """
+    def register(source_class):
+        DATASET_SOURCE_REGISTRY[source_type] = source_class
+        return source_class
+    return register
+
+
+def get_file_sha256(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as dataset_file:
+        for chunk in iter(lambda: dataset_file.read(HASH_CHUNK_BYTES), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def verify_sha256(file_path: str, expected_sha256: str) -> str:
+    """
+    returns the sha256 of the file, raises when it is not expected_sha256 (not checked when None)
+    """
+    sha256 = get_file_sha256(file_path)
+    if expected_sha256 is not None and sha256 != expected_sha256.lower():
+        raise Exception(f"Checksum of [{file_path}] is [{sha256}], [{expected_sha256}] was expected")
+    return sha256
+
+
+class DatasetSource:
+    """
+    where the raw dataset comes from
+    source_info: source block of data_ingestion_config
+    dataset_url: kaggle dataset of data_ingestion_config
+    file_name: zip_file_name of data_ingestion_config, name of the cache entry of the remote sources
+    """
+    is_remote = False
+
+    def __init__(self, source_info: dict, dataset_url: str = None, file_name: str = None):
+        self.source_info = source_info
+        self.dataset_url = dataset_url
+        self.file_name = file_name
+        self.expected_sha256 = source_info.get(DATASET_SOURCE_SHA256_KEY, None)
+
+    def get_identity(self) -> str:
+        """
+        what is fetched, a cache entry of another identity is fetched again
+        """
+        raise NotImplementedError
+
+    def get_local_path(self) -> str:
+        """
+        file of a local source
+        """
+        raise NotImplementedError
+
+    def get_local_dir(self) -> str:
+        """
+        directory of the partitioned files of a local source, None when the source is a single file
+        """
+        return None
+
+    def fetch(self, file_path: str) -> None:
+        """
+        writes the archive of a remote source at file_path
+        """
+        raise NotImplementedError
+
+
+@register_dataset_source(LOCAL_FILE_DATASET_SOURCE)
+class LocalFileSource(DatasetSource):
+    def get_identity(self) -> str:
+        return f"{LOCAL_FILE_DATASET_SOURCE}:{self.source_info.get(DATASET_SOURCE_PATH_KEY)}"
+
+    def get_local_path(self) -> str:
+        file_path = self.source_info.get(DATASET_SOURCE_PATH_KEY, None)
+        if file_path is None or not os.path.isfile(file_path):
+            raise Exception(f"Dataset file [{file_path}] of the [{LOCAL_FILE_DATASET_SOURCE}] source not found")
+        return file_path
+
+
+@register_dataset_source(LOCAL_DIR_DATASET_SOURCE)
+class LocalDirectorySource(DatasetSource):
+    def get_identity(self) -> str:
+        return f"{LOCAL_DIR_DATASET_SOURCE}:{self.source_info.get(DATASET_SOURCE_PATH_KEY)}"
+
+    def get_local_dir(self) -> str:
+        dir_path = self.source_info.get(DATASET_SOURCE_PATH_KEY, None)
+        if dir_path is None or not os.path.isdir(dir_path):
+            raise Exception(f"Dataset directory [{dir_path}] of the [{LOCAL_DIR_DATASET_SOURCE}] source not found")
+        return dir_path
+
+    def get_local_path(self) -> str:
+        dir_path = self.get_local_dir()
+        if self.file_name is not None and os.path.isfile(os.path.join(dir_path, self.file_name)):
+            return os.path.join(dir_path, self.file_name)
+        file_name_list = sorted(file_name for file_name in os.listdir(dir_path)
+                                if os.path.splitext(file_name)[1].lower() in DATASET_FILE_EXTENSION_LIST)
+        if len(file_name_list) != 1:
+            raise Exception(f"[{dir_path}] holds neither [{self.file_name}] nor a single dataset file: {file_name_list}")
+        return os.path.join(dir_path, file_name_list[0])
+
+
+@register_dataset_source(HTTP_DATASET_SOURCE)
+class HttpMirrorSource(DatasetSource):
+    is_remote = True
+
+    def get_identity(self) -> str:
+        return f"{HTTP_DATASET_SOURCE}:{self.source_info.get(DATASET_SOURCE_URL_KEY)}"
+
+    def fetch(self, file_path: str) -> None:
+        url = self.source_info.get(DATASET_SOURCE_URL_KEY, None)
+        if url is None:
+            raise Exception(f"The [{HTTP_DATASET_SOURCE}] source needs a url")
+        logging.info(f"Downloading dataset from : [{url}] into : [{file_path}]")
+        with urllib.request.urlopen(url, timeout=self.source_info.get(DATASET_SOURCE_TIMEOUT_SECONDS_KEY, 60)) as response:
+            with open(file_path, 'wb') as dataset_file:
+                shutil.copyfileobj(response, dataset_file, HASH_CHUNK_BYTES)
+
+
+@register_dataset_source(KAGGLE_DATASET_SOURCE)
+class KaggleSource(DatasetSource):
+    is_remote = True
+
+    def get_identity(self) -> str:
+        return f"{KAGGLE_DATASET_SOURCE}:{self.dataset_url}"
+
+    def fetch(self, file_path: str) -> None:
+        #imported here, the kaggle package authenticates on import and the other sources work without credentials
+        from kaggle.api.kaggle_api_extended import KaggleApi
+        logging.info("Dataset source authentication in progress...")
+        api = KaggleApi()
+        api.authenticate()
+        logging.info("Dataset source authentication completed.")
+
+        download_dir = tempfile.mkdtemp(dir=os.path.dirname(file_path))
+        try:
+            logging.info(f"Downloading dataset from : [{self.dataset_url}] into : [{download_dir}]")
+            api.dataset_download_files(self.dataset_url, path=download_dir)
+            file_name_list = os.listdir(download_dir)
+            if len(file_name_list) != 1:
+                raise Exception(f"Kaggle download of [{self.dataset_url}] gave {file_name_list}, one archive was expected")
+            os.replace(os.path.join(download_dir, file_name_list[0]), file_path)
+        finally:
+            shutil.rmtree(download_dir, ignore_errors=True)
+
+
+def get_dataset_source(source_info: dict, dataset_url: str = None, file_name: str = None) -> DatasetSource:
+    try:
+        source_type = source_info.get(DATASET_SOURCE_TYPE_KEY, KAGGLE_DATASET_SOURCE)
+        if source_type not in DATASET_SOURCE_REGISTRY:
+            raise Exception(f"Dataset source [{source_type}] is not supported, use one of {list(DATASET_SOURCE_REGISTRY)}")
+        return DATASET_SOURCE_REGISTRY[source_type](source_info=source_info, dataset_url=dataset_url, file_name=file_name)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+class DatasetCache:
+    """
+    archives of the remote sources and extracted archives, shared by the runs, see the top of the module
+    cache_dir: directory of the entries
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def get_record_file_path(self, file_path: str) -> str:
+        return file_path + CACHE_RECORD_FILE_EXTENSION
+
+    def read_record(self, file_path: str) -> dict:
+        record_file_path = self.get_record_file_path(file_path)
+        if not os.path.exists(file_path) or not os.path.exists(record_file_path):
+            return None
+        with open(record_file_path, 'r') as record_file:
+            return json.load(record_file)
+
+    def get_valid_file(self, source: DatasetSource, file_path: str) -> str:
+        """
+        returns the sha256 of the cached archive when it can be used for source, None otherwise
+        """
+        record = self.read_record(file_path)
+        if record is None:
+            return None
+        if record.get("identity") != source.get_identity():
+            logging.info(f"Cached dataset [{file_path}] comes from [{record.get('identity')}], not from [{source.get_identity()}]")
+            return None
+        sha256 = get_file_sha256(file_path)
+        if sha256 != record.get("sha256"):
+            logging.info(f"Cached dataset [{file_path}] does not match its recorded checksum, it is fetched again.")
+            return None
+        if source.expected_sha256 is not None and sha256 != source.expected_sha256.lower():
+            logging.info(f"Cached dataset [{file_path}] is not the expected [{source.expected_sha256}], it is fetched again.")
+            return None
+        return sha256
+
+    def get_file(self, source: DatasetSource) -> tuple:
+        """
+        returns (archive path, sha256) of source, fetched when the cache has no valid entry
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            file_path = os.path.join(self.cache_dir, source.file_name or source.get_identity().replace("/", "_"))
+            if not source.source_info.get(DATASET_SOURCE_REFRESH_KEY, False):
+                sha256 = self.get_valid_file(source=source, file_path=file_path)
+                if sha256 is not None:
+                    logging.info(f"Dataset found in the cache at [{file_path}], download skipped.")
+                    return file_path, sha256
+
+            #written next to the entry and renamed, runs fetching at the same time never see a partial archive
+            tmp_file_descriptor, tmp_file_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(tmp_file_descriptor)
+            try:
+                source.fetch(tmp_file_path)
+                sha256 = verify_sha256(file_path=tmp_file_path, expected_sha256=source.expected_sha256)
+                record = {"identity": source.get_identity(),
+                          "sha256": sha256,
+                          "size": os.path.getsize(tmp_file_path),
+                          "fetched_at": time.time()}
+                os.replace(tmp_file_path, file_path)
+                tmp_record_file_path = tmp_file_path + CACHE_RECORD_FILE_EXTENSION
+                with open(tmp_record_file_path, 'w') as record_file:
+                    json.dump(record, record_file, indent=4)
+                os.replace(tmp_record_file_path, self.get_record_file_path(file_path))
+            finally:
+                if os.path.exists(tmp_file_path):
+                    os.remove(tmp_file_path)
+            logging.info(f"Dataset cached at [{file_path}] with sha256 [{sha256}]")
+            return file_path, sha256
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_extracted_dir(self, zip_file_path: str, sha256: str) -> str:
+        """
+        directory holding the content of the archive, extracted once per archive checksum
+        """
+        try:
+            extracted_dir = os.path.join(self.cache_dir, EXTRACTED_CACHE_DIR_NAME, sha256)
+            if os.path.exists(os.path.join(extracted_dir, EXTRACTED_COMPLETE_FILE_NAME)):
+                logging.info(f"Archive [{zip_file_path}] already extracted at [{extracted_dir}], extraction skipped.")
+                return extracted_dir
+            os.makedirs(os.path.dirname(extracted_dir), exist_ok=True)
+            tmp_extracted_dir = tempfile.mkdtemp(dir=os.path.dirname(extracted_dir))
+            try:
+                logging.info(f"Extracting the dataset zip file from : [{zip_file_path}] into : [{extracted_dir}]")
+                with zipfile.ZipFile(zip_file_path, 'r') as zip_file:
+                    zip_file.extractall(tmp_extracted_dir)
+                open(os.path.join(tmp_extracted_dir, EXTRACTED_COMPLETE_FILE_NAME), 'w').close()
+                shutil.rmtree(extracted_dir, ignore_errors=True)
+                os.replace(tmp_extracted_dir, extracted_dir)
+            finally:
+                shutil.rmtree(tmp_extracted_dir, ignore_errors=True)
+            return extracted_dir
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+
+def get_zip_member_name(zip_file: zipfile.ZipFile, member_name: str = None) -> str:
+    """
+    member_name, or the single csv file of the archive when it is None
+    """
+    if member_name is not None:
+        return member_name
+    member_name_list = [name for name in zip_file.namelist()
+                        if not name.endswith("/") and os.path.splitext(name)[1].lower() == CSV_FILE_EXTENSION]
+    if len(member_name_list) != 1:
+        raise Exception(f"Set the source member, the archive holds {len(member_name_list)} csv files: {member_name_list}")
+    return member_name_list[0]
+
+
+def read_dataset_file(file_path: str, member_name: str = None) -> pd.DataFrame:
+    """
+    reads a csv file, or the member_name csv of a zip archive straight from the archive without extracting it
+    """
+    try:
+        if not zipfile.is_zipfile(file_path):
+            return pd.read_csv(file_path)
+        with zipfile.ZipFile(file_path, 'r') as zip_file:
+            member_name = get_zip_member_name(zip_file=zip_file, member_name=member_name)
+            logging.info(f"Reading [{member_name}] straight from the archive [{file_path}]")
+            with zip_file.open(member_name, 'r') as member_file:
+                return pd.read_csv(member_file)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def list_dataset_files(file_path: str, file_pattern: str) -> list:
+    """
+    [(file path, archive member name or None)] of the files whose name matches file_pattern, in name order
+    file_path: directory (searched with its sub directories), zip archive or single file
+    """
+    try:
+        if os.path.isdir(file_path):
+            file_list = []
+            for dir_path, dir_name_list, file_name_list in os.walk(file_path):
+                dir_name_list.sort()
+                file_list.extend((os.path.join(dir_path, file_name), None) for file_name in sorted(file_name_list)
+                                 if fnmatch.fnmatch(file_name, file_pattern))
+            return file_list
+        if zipfile.is_zipfile(file_path):
+            with zipfile.ZipFile(file_path, 'r') as zip_file:
+                return [(file_path, member_name) for member_name in sorted(zip_file.namelist())
+                        if not member_name.endswith("/") and fnmatch.fnmatch(os.path.basename(member_name), file_pattern)]
+        return [(file_path, None)]
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def read_schema_file(file_path: str, member_name: str, column_type_dict: dict, use_threads: bool) -> tuple:
+    """
+    parses one csv file with the schema column types
+    return: (IngestedFile, pyarrow Table with the schema columns in schema order, None when the file is invalid)
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    start_time = time.perf_counter()
+    read_options = pa_csv.ReadOptions(use_threads=use_threads)
+    convert_options = pa_csv.ConvertOptions(column_types=column_type_dict)
+    table = None
+    file_bytes = None
+    message = ""
+    try:
+        if member_name is None:
+            file_bytes = os.path.getsize(file_path)
+            table = pa_csv.read_csv(file_path, read_options=read_options, convert_options=convert_options)
+        else:
+            with zipfile.ZipFile(file_path, 'r') as zip_file:
+                file_bytes = zip_file.getinfo(member_name).file_size
+                with zip_file.open(member_name, 'r') as member_file:
+                    table = pa_csv.read_csv(member_file, read_options=read_options, convert_options=convert_options)
+        missing_column_list = [column for column in column_type_dict if column not in table.column_names]
+        extra_column_list = [column for column in table.column_names if column not in column_type_dict]
+        if len(missing_column_list) > 0 or len(extra_column_list) > 0:
+            message = f"missing columns {missing_column_list}, columns not in the schema {extra_column_list}"
+            table = None
+        else:
+            table = table.select(list(column_type_dict))
+    except (pa.ArrowInvalid, OSError, KeyError) as e:
+        #a value that does not parse as its schema type, or an unreadable file
+        message = str(e).splitlines()[0]
+        table = None
+    return IngestedFile(file_path=file_path,
+                        member_name=member_name,
+                        rows=table.num_rows if table is not None else None,
+                        bytes=file_bytes,
+                        seconds=round(time.perf_counter() - start_time, 6),
+                        is_valid=table is not None,
+                        message=message), table
+
+
+def get_schema_arrow_types(schema_file_path: str) -> dict:
+    """
+    {column: arrow type} of the columns of schema.yaml
+    """
+    import pyarrow as pa
+    schema = read_yaml_file(schema_file_path)
+    return {column: getattr(pa, SCHEMA_ARROW_TYPE_DICT.get(str(dtype), "string"))()
+            for column, dtype in schema[DATA_VALIDATION_GET_ALL_COLUMNS_KEY].items()}
+
+
+def iter_dataset_files(file_list: list, schema_file_path: str, n_workers: int = 1):
+    """
+    yields (IngestedFile, pyarrow Table or None when the file does not match the schema) of the files of
+    list_dataset_files in file order. They are parsed in a pool of n_workers threads with at most 2 * n_workers
+    files parsed ahead, so the memory is bounded by a few files whatever the number of files.
+    """
+    try:
+        if len(file_list) == 0:
+            raise Exception("No dataset file found.")
+        column_type_dict = get_schema_arrow_types(schema_file_path)
+        #arrow parses a lone file with its own threads, several files are parsed one per worker
+        use_threads = n_workers <= 1 or len(file_list) == 1
+        n_workers = max(n_workers, 1)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            future_list = deque()
+            for file_path, member_name in file_list:
+                future_list.append(executor.submit(read_schema_file, file_path=file_path, member_name=member_name,
+                                                   column_type_dict=column_type_dict, use_threads=use_threads))
+                if len(future_list) >= 2 * n_workers:
+                    yield future_list.popleft().result()
+            while len(future_list) > 0:
+                yield future_list.popleft().result()
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def check_ingested_files(ingested_file_list: list, skip_invalid_files: bool) -> None:
+    """
+    logs the files not matching the schema, raises on the first one unless skip_invalid_files
+    """
+    invalid_file_list = [ingested_file for ingested_file in ingested_file_list if not ingested_file.is_valid]
+    for ingested_file in invalid_file_list:
+        logging.info(f"Dataset file [{ingested_file.file_path}] [{ingested_file.member_name}] does not match "
+                     f"the schema: {ingested_file.message}")
+    if len(invalid_file_list) > 0 and not skip_invalid_files:
+        raise Exception(f"[{len(invalid_file_list)}] dataset files do not match the schema, "
+                        f"first one [{invalid_file_list[0].file_path}] [{invalid_file_list[0].member_name}]: "
+                        f"{invalid_file_list[0].message}")
+
+
+def read_dataset_files(file_list: list, schema_file_path: str, n_workers: int = 1, skip_invalid_files: bool = False) -> tuple:
+    """
+    reads the files of list_dataset_files in a pool of n_workers threads, every file is checked against the columns
+    and types of schema.yaml. The tables are concatenated in file order, the columns are chunked arrays over the
+    buffers of the files so nothing is copied.
+    skip_invalid_files: leaves out the files not matching the schema, otherwise they raise an exception
+    return: (pyarrow Table, list of IngestedFile)
+    """
+    try:
+        import pyarrow as pa
+        result_list = list(iter_dataset_files(file_list=file_list, schema_file_path=schema_file_path, n_workers=n_workers))
+        ingested_file_list = [ingested_file for ingested_file, _ in result_list]
+        check_ingested_files(ingested_file_list=ingested_file_list, skip_invalid_files=skip_invalid_files)
+        table_list = [table for _, table in result_list if table is not None]
+        if len(table_list) == 0:
+            raise Exception(f"None of the [{len(file_list)}] dataset files matches the schema.")
+        logging.info(f"[{len(table_list)}] dataset files read: [{sum(table.num_rows for table in table_list)}] rows, "
+                     f"[{sum(ingested_file.bytes or 0 for ingested_file in ingested_file_list)}] bytes.")
+        return pa.concat_tables(table_list), ingested_file_list
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def iter_dataset_file_chunks(file_path: str, member_name: str = None, chunk_size: int = 100000):
+    """
+    same as read_dataset_file but yields the csv as dataframes of at most chunk_size rows
+    """
+    try:
+        if not zipfile.is_zipfile(file_path):
+            yield from pd.read_csv(file_path, chunksize=chunk_size)
+            return
+        with zipfile.ZipFile(file_path, 'r') as zip_file:
+            member_name = get_zip_member_name(zip_file=zip_file, member_name=member_name)
+            with zip_file.open(member_name, 'r') as member_file:
+                yield from pd.read_csv(member_file, chunksize=chunk_size)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
@@ -0,0 +1,239 @@
+import sys
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from scipy import stats
+from scipy.spatial import distance
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+
+# Native drift engine:
+# every column of the reference split is reduced once to its table of (sorted distinct value, count), the tables
+# are stored next to report.json in the reference profile and a drift check only builds the table of the current
+# data (one np.unique per column) and compares the two tables. The test of every column is picked with the default rules of the Evidently
+# DataDriftPreset so dataset_drift is the same decision:
+#   reference rows <= 1000 : numerical -> ks (chi-square or z test when <= 5 distinct values), categorical -> chi-square
+#                            (z test for 2 values)
+#   reference rows >  1000 : numerical -> normed wasserstein (jensen-shannon when <= 5 distinct values),
+#                            categorical -> jensen-shannon
+# PSI of every column and the KS p value of the numerical columns are reported as well.
+
+NUMERICAL_COLUMN_TYPE = "num"
+CATEGORICAL_COLUMN_TYPE = "cat"
+SMALL_REFERENCE_ROWS = 1000
+NUMBER_UNIQUE_AS_CATEGORICAL = 5
+KS_EXACT_MAX_ROWS = 10000
+PSI_BINNED_MIN_UNIQUE = 20
+
+StatTest = namedtuple("StatTest", ["name", "threshold", "lower_is_drift", "strict"])
+
+KS_STAT_TEST = StatTest(name="K-S p_value", threshold=0.05, lower_is_drift=True, strict=False)
+CHI_STAT_TEST = StatTest(name="chi-square p_value", threshold=0.05, lower_is_drift=True, strict=True)
+Z_STAT_TEST = StatTest(name="Z-test p_value", threshold=0.05, lower_is_drift=True, strict=True)
+WASSERSTEIN_STAT_TEST = StatTest(name="Wasserstein distance (normed)", threshold=0.1, lower_is_drift=False, strict=False)
+JENSENSHANNON_STAT_TEST = StatTest(name="Jensen-Shannon distance", threshold=0.1, lower_is_drift=False, strict=False)
+
+ReferenceColumn = namedtuple("ReferenceColumn", ["column_type", "values", "counts", "missing_count"])
+
+ColumnDrift = namedtuple("ColumnDrift", ["column_name", "column_type", "stattest_name", "stattest_threshold",
+                                         "drift_score", "drift_detected", "psi", "ks_p_value"])
+
+
+def get_value_counts(values: np.ndarray):
+    """
+    returns the sorted distinct values, their counts and the number of missing values (nan and inf are missing)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(values)
+    distinct_values, counts = np.unique(values[valid], return_counts=True)
+    return distinct_values, counts, int(len(values) - valid.sum())
+
+
+def get_column_type(series: pd.Series, numerical_columns: list, categorical_columns: list) -> str:
+    """
+    schema.yaml decides for its columns, the other ones (the target) are typed like Evidently does:
+    integer columns with at most 5 distinct values are categorical
+    """
+    if series.name in numerical_columns:
+        return NUMERICAL_COLUMN_TYPE
+    if series.name in categorical_columns:
+        return CATEGORICAL_COLUMN_TYPE
+    if pd.api.types.is_integer_dtype(series.dtype) and series.nunique() <= NUMBER_UNIQUE_AS_CATEGORICAL:
+        return CATEGORICAL_COLUMN_TYPE
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return CATEGORICAL_COLUMN_TYPE
+    return NUMERICAL_COLUMN_TYPE
+
+
+def build_drift_reference(dataframe: pd.DataFrame, numerical_columns: list, categorical_columns: list) -> dict:
+    """
+    reduces every column of the reference dataframe to its ReferenceColumn
+    return: {column: ReferenceColumn}
+    """
+    try:
+        drift_reference = {}
+        for column in dataframe.columns:
+            values, counts, missing_count = get_value_counts(dataframe[column].to_numpy(dtype=np.float64, na_value=np.nan))
+            drift_reference[column] = ReferenceColumn(
+                column_type=get_column_type(dataframe[column], numerical_columns, categorical_columns),
+                values=values,
+                counts=counts,
+                missing_count=missing_count)
+        return drift_reference
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def get_stat_test(column_type: str, reference_rows: int, n_values: int) -> StatTest:
+    """
+    default test of the Evidently DataDriftPreset for the column
+    """
+    if reference_rows <= SMALL_REFERENCE_ROWS:
+        if column_type == NUMERICAL_COLUMN_TYPE and n_values > NUMBER_UNIQUE_AS_CATEGORICAL:
+            return KS_STAT_TEST
+        return CHI_STAT_TEST if n_values > 2 else Z_STAT_TEST
+    if column_type == NUMERICAL_COLUMN_TYPE and n_values > NUMBER_UNIQUE_AS_CATEGORICAL:
+        return WASSERSTEIN_STAT_TEST
+    return JENSENSHANNON_STAT_TEST
+
+
+def fill_zero_share(share: np.ndarray) -> np.ndarray:
+    """
+    empty bins get a small share so that PSI stays finite (same fill as Evidently)
+    """
+    minimum_share = share[share != 0].min()
+    share = share.copy()
+    share[share == 0] = minimum_share / 10 ** 6 if minimum_share <= 0.0001 else 0.0001
+    return share
+
+
+def get_psi(keys: np.ndarray, reference_counts: np.ndarray, current_counts: np.ndarray, column_type: str,
+            reference_unique: int) -> float:
+    """
+    PSI over the distinct values, or over sturges bins of the common range for numerical columns with more than
+    20 distinct reference values
+    """
+    if column_type == NUMERICAL_COLUMN_TYPE and reference_unique > PSI_BINNED_MIN_UNIQUE:
+        rows = reference_counts.sum() + current_counts.sum()
+        first_edge, last_edge = keys[0], keys[-1]
+        width = (last_edge - first_edge) / (np.log2(rows) + 1.0)
+        n_bins = int(np.ceil((last_edge - first_edge) / width)) if width > 0 else 1
+        bin_edges = np.linspace(first_edge, last_edge, n_bins + 1)
+        reference_counts = np.histogram(keys, bin_edges, weights=reference_counts)[0]
+        current_counts = np.histogram(keys, bin_edges, weights=current_counts)[0]
+    reference_share = fill_zero_share(reference_counts / reference_counts.sum())
+    current_share = fill_zero_share(current_counts / current_counts.sum())
+    return float(np.sum((reference_share - current_share) * np.log(reference_share / current_share)))
+
+
+def get_ks_p_value(keys: np.ndarray, reference_counts: np.ndarray, current_counts: np.ndarray) -> float:
+    """
+    two sided KS p value from the two count tables, exact like scipy ks_2samp for samples of at most 10000 rows
+    """
+    reference_rows, current_rows = int(reference_counts.sum()), int(current_counts.sum())
+    if max(reference_rows, current_rows) <= KS_EXACT_MAX_ROWS:
+        return float(stats.ks_2samp(np.repeat(keys, reference_counts), np.repeat(keys, current_counts)).pvalue)
+    statistic = np.abs(np.cumsum(reference_counts) / reference_rows - np.cumsum(current_counts) / current_rows).max()
+    return float(stats.kstwo.sf(statistic, np.round(reference_rows * current_rows / (reference_rows + current_rows))))
+
+
+def get_drift_score(stat_test: StatTest, keys: np.ndarray, reference_counts: np.ndarray,
+                    current_counts: np.ndarray) -> float:
+    reference_rows, current_rows = reference_counts.sum(), current_counts.sum()
+    if stat_test is WASSERSTEIN_STAT_TEST:
+        reference_mean = np.sum(keys * reference_counts) / reference_rows
+        reference_std = np.sqrt(np.sum(reference_counts * (keys - reference_mean) ** 2) / reference_rows)
+        return float(stats.wasserstein_distance(keys, keys, reference_counts, current_counts) / max(reference_std, 0.001))
+    if stat_test is JENSENSHANNON_STAT_TEST:
+        return float(distance.jensenshannon(reference_counts / reference_rows, current_counts / current_rows))
+    if stat_test is KS_STAT_TEST:
+        return get_ks_p_value(keys, reference_counts, current_counts)
+    if stat_test is CHI_STAT_TEST:
+        return float(stats.chisquare(current_counts, reference_counts * current_rows / reference_rows)[1])
+    #z test on the share of rows different from the smallest value
+    if len(keys) == 1:
+        return 1.0
+    reference_share = 1.0 - reference_counts[0] / reference_rows
+    current_share = 1.0 - current_counts[0] / current_rows
+    pooled_share = (reference_share * reference_rows + current_share * current_rows) / (reference_rows + current_rows)
+    z_statistic = (reference_share - current_share) / np.sqrt(pooled_share * (1 - pooled_share)
+                                                              * (1.0 / reference_rows + 1.0 / current_rows))
+    return float(2 * (1 - stats.norm.cdf(np.abs(z_statistic))))
+
+
+def get_column_drift(column: str, reference_column: ReferenceColumn, current_column: ReferenceColumn) -> ColumnDrift:
+    """
+    compares the current table of a column to its reference table
+    """
+    if len(reference_column.values) == 0 or len(current_column.values) == 0:
+        raise Exception(f"An empty column [{column}] was provided for drift calculation.")
+
+    keys = np.union1d(reference_column.values, current_column.values)
+    reference_counts = np.zeros(len(keys), dtype=np.int64)
+    np.add.at(reference_counts, np.searchsorted(keys, reference_column.values), reference_column.counts)
+    current_counts = np.zeros(len(keys), dtype=np.int64)
+    np.add.at(current_counts, np.searchsorted(keys, current_column.values), current_column.counts)
+
+    stat_test = get_stat_test(column_type=reference_column.column_type,
+                              reference_rows=int(reference_column.counts.sum()), n_values=len(keys))
+    drift_score = get_drift_score(stat_test, keys, reference_counts, current_counts)
+    if stat_test.lower_is_drift:
+        drift_detected = drift_score < stat_test.threshold if stat_test.strict else drift_score <= stat_test.threshold
+    else:
+        drift_detected = drift_score >= stat_test.threshold
+
+    return ColumnDrift(column_name=column,
+                       column_type=reference_column.column_type,
+                       stattest_name=stat_test.name,
+                       stattest_threshold=stat_test.threshold,
+                       drift_score=drift_score,
+                       drift_detected=bool(drift_detected),
+                       psi=get_psi(keys, reference_counts, current_counts, reference_column.column_type,
+                                   len(reference_column.values)),
+                       ks_p_value=get_ks_p_value(keys, reference_counts, current_counts)
+                       if reference_column.column_type == NUMERICAL_COLUMN_TYPE else None)
+
+
+def get_table_drift_report(drift_reference: dict, current_reference: dict, drift_share: float = 0.5) -> dict:
+    """
+    checks every reference column for drift against the table of the same column in current_reference
+    return: report with the layout of the Evidently DataDriftPreset json, metrics[0].result.dataset_drift is
+    the dataset drift decision and metrics[1].result.drift_by_columns has the ColumnDrift of every column
+    """
+    try:
+        column_drift_list = [get_column_drift(column, reference_column, current_reference[column])
+                             for column, reference_column in drift_reference.items()]
+        number_of_drifted_columns = sum(column_drift.drift_detected for column_drift in column_drift_list)
+        share_of_drifted_columns = number_of_drifted_columns / len(column_drift_list)
+        return {"metrics": [
+            {"metric": "DatasetDriftMetric",
+             "result": {"drift_share": drift_share,
+                        "number_of_columns": len(column_drift_list),
+                        "number_of_drifted_columns": number_of_drifted_columns,
+                        "share_of_drifted_columns": share_of_drifted_columns,
+                        "dataset_drift": bool(share_of_drifted_columns >= drift_share)}},
+            {"metric": "DataDriftTable",
+             "result": {"number_of_columns": len(column_drift_list),
+                        "number_of_drifted_columns": number_of_drifted_columns,
+                        "share_of_drifted_columns": share_of_drifted_columns,
+                        "dataset_drift": bool(share_of_drifted_columns >= drift_share),
+                        "drift_by_columns": {column_drift.column_name: column_drift._asdict()
+                                             for column_drift in column_drift_list}}}
+        ]}
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def get_drift_report(drift_reference: dict, current_df: pd.DataFrame, drift_share: float = 0.5) -> dict:
+    """
+    checks every reference column for drift in current_df, see get_table_drift_report
+    """
+    try:
+        current_reference = {}
+        for column, reference_column in drift_reference.items():
+            values, counts, missing_count = get_value_counts(current_df[column].to_numpy(dtype=np.float64, na_value=np.nan))
+            current_reference[column] = ReferenceColumn(column_type=reference_column.column_type, values=values,
+                                                        counts=counts, missing_count=missing_count)
+        return get_table_drift_report(drift_reference=drift_reference, current_reference=current_reference,
+                                      drift_share=drift_share)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
@@ -0,0 +1,157 @@
+import os, sys
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.constant import PARQUET_FILE_EXTENSION
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import dataframe_to_arrow_table
+
+# Hash split:
+# every row goes to the test split when a 64 bit hash of the row is below test_size of the hash range, so the split of
+# a row only depends on the row itself: it never changes when rows are added, removed or read in another order, and a
+# dataset of any size is split in one pass over chunks of rows with the memory of one chunk.
+# The hash is the one of the id column when there is one, otherwise of the feature columns (not of the target, so a
+# corrected label does not move its row). Values are hashed as float64 bits (a column read as int64 in one chunk and
+# as float64 in another gives the same hash) mixed with the splitmix64 finalizer, no pandas or python hash involved.
+# The rows of every class go to the test split with probability test_size independently of the other classes, so the
+# class shares of train and test match up to the sampling noise (sqrt(p(1-p)/rows of the class)) and the split is
+# stratified on the target without having to see the whole dataset first.
+
+SPLITMIX64_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+SPLITMIX64_MULTIPLIER_1 = np.uint64(0xBF58476D1CE4E5B9)
+SPLITMIX64_MULTIPLIER_2 = np.uint64(0x94D049BB133111EB)
+CANONICAL_NAN_BITS = np.array([np.nan], dtype=np.float64).view(np.uint64)[0]
+#hash key of the string columns, fixed so the hashes are the same in every process
+STRING_HASH_KEY = "heartrisksplit01"
+
+HashSplitReport = namedtuple("HashSplitReport", ["rows", "train_rows", "test_rows", "train_class_counts",
+                                                 "test_class_counts", "test_share"])
+
+
+def mix64(values: np.ndarray) -> np.ndarray:
+    """
+    splitmix64 finalizer of an uint64 array, the multiplications wrap around
+    """
+    values = (values ^ (values >> np.uint64(30))) * SPLITMIX64_MULTIPLIER_1
+    values = (values ^ (values >> np.uint64(27))) * SPLITMIX64_MULTIPLIER_2
+    return values ^ (values >> np.uint64(31))
+
+
+def get_column_bits(series: pd.Series) -> np.ndarray:
+    """
+    uint64 of every value: the float64 bits of numbers (every nan the same, -0.0 as 0.0), a keyed hash of strings
+    """
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan) + 0.0
+        bits = values.view(np.uint64).copy()
+        bits[np.isnan(values)] = CANONICAL_NAN_BITS
+        return bits
+    values = series.astype(str).where(series.notna(), "")
+    return pd.util.hash_array(values.to_numpy(dtype=object), hash_key=STRING_HASH_KEY, categorize=False)
+
+
+def get_row_hash(dataframe: pd.DataFrame, hash_columns: list, seed: int = 0) -> np.ndarray:
+    """
+    uint64 hash of every row over hash_columns (in the given order)
+    """
+    try:
+        row_hash = mix64(np.full(len(dataframe), seed, dtype=np.uint64) + SPLITMIX64_GAMMA)
+        for column_index, column in enumerate(hash_columns):
+            #the column constant is wrapped to 64 bits in python, numpy warns on uint64 scalar overflows
+            column_bits = get_column_bits(dataframe[column]) + np.uint64(int(SPLITMIX64_GAMMA) * (column_index + 1) % (1 << 64))
+            row_hash = mix64(row_hash ^ mix64(column_bits))
+        return row_hash
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def get_test_mask(dataframe: pd.DataFrame, hash_columns: list, test_size: float, seed: int = 0) -> np.ndarray:
+    """
+    True for the rows of the test split
+    """
+    #the top 53 bits of the hash as a float of [0, 1)
+    return (get_row_hash(dataframe=dataframe, hash_columns=hash_columns, seed=seed) >> np.uint64(11)) \
+        * (1.0 / (1 << 53)) < test_size
+
+
+class SplitFileWriter:
+    """
+    writes the chunks of one split to a .parquet (one row group per chunk) or .csv file
+    column_dtypes: {column: dtype} every chunk is cast to, so the chunks of the file have the same column types
+    """
+    def __init__(self, file_path: str, column_dtypes: dict = None):
+        self.file_path = file_path
+        self.column_dtypes = column_dtypes or {}
+        self.parquet_writer = None
+        self.rows = 0
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def write(self, dataframe: pd.DataFrame) -> None:
+        dataframe = dataframe.astype({column: dtype for column, dtype in self.column_dtypes.items()
+                                      if column in dataframe.columns})
+        if self.file_path.endswith(PARQUET_FILE_EXTENSION):
+            import pyarrow.parquet as pq
+            table = dataframe_to_arrow_table(dataframe)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.file_path, table.schema)
+            self.parquet_writer.write_table(table, row_group_size=max(len(dataframe), 1))
+        else:
+            dataframe.to_csv(self.file_path, mode='a', header=self.rows == 0, index=False)
+        self.rows += len(dataframe)
+
+    def close(self) -> None:
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+
+def hash_split_chunks(chunk_iterator, train_file_path: str, test_file_path: str, target_column: str,
+                      test_size: float, hash_columns: list = None, seed: int = 0,
+                      column_dtypes: dict = None) -> HashSplitReport:
+    """
+    splits the dataframes of chunk_iterator into the train and test files in one pass, see the top of the module
+    hash_columns: columns the rows are hashed on, every column but the target when None
+    column_dtypes: {column: dtype} the chunks are written with
+    """
+    try:
+        train_writer = SplitFileWriter(file_path=train_file_path, column_dtypes=column_dtypes)
+        test_writer = SplitFileWriter(file_path=test_file_path, column_dtypes=column_dtypes)
+        train_class_counts = {}
+        test_class_counts = {}
+        try:
+            for chunk_df in chunk_iterator:
+                if len(chunk_df) == 0:
+                    continue
+                chunk_hash_columns = hash_columns or [column for column in chunk_df.columns if column != target_column]
+                test_mask = get_test_mask(dataframe=chunk_df, hash_columns=chunk_hash_columns,
+                                          test_size=test_size, seed=seed)
+                for class_counts, split_df, writer in [(train_class_counts, chunk_df[~test_mask], train_writer),
+                                                       (test_class_counts, chunk_df[test_mask], test_writer)]:
+                    if len(split_df) > 0:
+                        writer.write(split_df)
+                        for label, count in split_df[target_column].value_counts().items():
+                            class_counts[label] = class_counts.get(label, 0) + int(count)
+        finally:
+            train_writer.close()
+            test_writer.close()
+
+        rows = train_writer.rows + test_writer.rows
+        if train_writer.rows == 0 or test_writer.rows == 0:
+            raise Exception(f"The hash split of [{rows}] rows left the train or the test split empty.")
+        hash_split_report = HashSplitReport(rows=rows,
+                                            train_rows=train_writer.rows,
+                                            test_rows=test_writer.rows,
+                                            train_class_counts=train_class_counts,
+                                            test_class_counts=test_class_counts,
+                                            test_share={label: round(test_class_counts.get(label, 0) /
+                                                                     (test_class_counts.get(label, 0) + train_class_counts.get(label, 0)), 6)
+                                                        for label in sorted(set(train_class_counts) | set(test_class_counts))})
+        logging.info(f"Hash split report: {hash_split_report}")
+        return hash_split_report
+    except Exception as e:
+        raise HeartRiskException(e, sys)
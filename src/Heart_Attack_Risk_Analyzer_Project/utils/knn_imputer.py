@@ -0,0 +1,21 @@
+import numpy as np
+from sklearn.impute import KNNImputer
+
+
+class ReferenceKNNImputer(KNNImputer):
+    """
+    sklearn KNNImputer which keeps the rows it was fitted on in reference_ and the columns holding a value in
+    valid_columns_. The array artifact and the inference kernel read them instead of the private fitted
+    attributes of KNNImputer, which change between sklearn versions.
+    """
+    def fit(self, X, y=None):
+        super().fit(X, y)
+        self.reference_ = np.array(X, dtype=np.float64)
+        self.valid_columns_ = ~np.isnan(self.reference_).all(axis=0)
+        return self
+
+    def partial_fit(self, X, y=None):
+        """
+        adds the rows of X to the rows the imputer was fitted on
+        """
+        return self.fit(np.vstack([self.reference_, np.asarray(X, dtype=np.float64)]), y)
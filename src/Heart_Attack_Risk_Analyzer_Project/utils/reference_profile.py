@@ -0,0 +1,206 @@
+import os, sys
+import json
+import time
+import numpy as np
+import pandas as pd
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.utils.drift_engine import (NUMERICAL_COLUMN_TYPE, ReferenceColumn,
+                                                                       build_drift_reference, get_table_drift_report)
+
+# Reference profile:
+# a small summary of a dataset that drift checks and monitoring use instead of the raw rows.
+#   categorical columns: exact category frequencies
+#   numerical columns  : quantile sketch, the sorted (value, count) table of the column, exact while the column has
+#                        at most max_centroids distinct values, above that neighbouring values are merged into
+#                        max_centroids weighted centroids of about the same count
+#   every column       : missing value count, min and max
+# Two profiles are merged by adding their tables (and compacting the sketches again), so the profile of many daily
+# batches is built without reading the batches again. The profile of a batch is compared to the reference profile
+# with the drift engine.
+
+PROFILE_FORMAT_VERSION = 1
+DEFAULT_MAX_CENTROIDS = 4096
+
+
+def compact_table(values: np.ndarray, counts: np.ndarray, max_centroids: int):
+    """
+    merges neighbouring values of a sorted table into at most max_centroids centroids of about total/max_centroids
+    rows each, a centroid is the count weighted mean of its values. A value heavier than a bucket is kept alone.
+    """
+    if max_centroids is None or len(values) <= max_centroids:
+        return values, counts
+    start_weight = np.cumsum(counts) - counts
+    bucket = np.floor(start_weight * max_centroids / counts.sum()).astype(np.int64)
+    group_start = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    group_counts = np.add.reduceat(counts, group_start)
+    group_values = np.add.reduceat(values * counts, group_start) / group_counts
+    return group_values, group_counts
+
+
+def merge_tables(values_list: list, counts_list: list, max_centroids: int):
+    """
+    adds sorted (value, count) tables and compacts the result
+    """
+    values = np.concatenate(values_list)
+    counts = np.concatenate(counts_list)
+    values, inverse = np.unique(values, return_inverse=True)
+    merged_counts = np.zeros(len(values), dtype=np.int64)
+    np.add.at(merged_counts, inverse, counts)
+    return compact_table(values, merged_counts, max_centroids)
+
+
+class ReferenceProfile:
+    """
+    mergeable profile of a dataset, see the top of the module
+    columns: {column: ReferenceColumn}, the tables the drift engine compares
+    rows: number of rows profiled
+    batches: number of profiles merged into this one
+    version: incremented on every merge, so the profile stored next to report.json tells how often it was updated
+    """
+    def __init__(self, columns: dict, rows: int, max_centroids: int = DEFAULT_MAX_CENTROIDS, batches: int = 1,
+                 version: int = 1, created_at: float = None, updated_at: float = None):
+        self.columns = columns
+        self.rows = rows
+        self.max_centroids = max_centroids
+        self.batches = batches
+        self.version = version
+        self.created_at = created_at or time.time()
+        self.updated_at = updated_at or self.created_at
+
+    @classmethod
+    def from_dataframe(cls, dataframe: pd.DataFrame, numerical_columns: list, categorical_columns: list,
+                       max_centroids: int = DEFAULT_MAX_CENTROIDS, column_type_dict: dict = None) -> "ReferenceProfile":
+        """
+        profiles a dataframe in one pass per column
+        column_type_dict: {column: column type} of the reference profile, a batch is profiled with the types of the
+        reference so the two profiles can be compared and merged
+        """
+        try:
+            columns = {}
+            for column, reference_column in build_drift_reference(dataframe=dataframe, numerical_columns=numerical_columns,
+                                                                  categorical_columns=categorical_columns).items():
+                if column_type_dict is not None and column in column_type_dict:
+                    reference_column = reference_column._replace(column_type=column_type_dict[column])
+                if reference_column.column_type == NUMERICAL_COLUMN_TYPE:
+                    values, counts = compact_table(reference_column.values, reference_column.counts, max_centroids)
+                    reference_column = reference_column._replace(values=values, counts=counts)
+                columns[column] = reference_column
+            return cls(columns=columns, rows=len(dataframe), max_centroids=max_centroids)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def merge(self, other: "ReferenceProfile") -> "ReferenceProfile":
+        """
+        returns the profile of the rows of both profiles, they must have the same columns
+        """
+        try:
+            if set(self.columns) != set(other.columns):
+                raise Exception(f"Profiles with different columns can not be merged: {sorted(set(self.columns) ^ set(other.columns))}")
+            columns = {}
+            for column, reference_column in self.columns.items():
+                other_column = other.columns[column]
+                if other_column.column_type != reference_column.column_type:
+                    raise Exception(f"Column [{column}] is [{reference_column.column_type}] in one profile "
+                                    f"and [{other_column.column_type}] in the other")
+                max_centroids = self.max_centroids if reference_column.column_type == NUMERICAL_COLUMN_TYPE else None
+                values, counts = merge_tables([reference_column.values, other_column.values],
+                                              [reference_column.counts, other_column.counts], max_centroids)
+                columns[column] = ReferenceColumn(column_type=reference_column.column_type, values=values, counts=counts,
+                                                  missing_count=reference_column.missing_count + other_column.missing_count)
+            return ReferenceProfile(columns=columns, rows=self.rows + other.rows, max_centroids=self.max_centroids,
+                                    batches=self.batches + other.batches, version=max(self.version, other.version) + 1,
+                                    created_at=min(self.created_at, other.created_at), updated_at=time.time())
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_quantiles(self, column: str, quantile_list: list) -> np.ndarray:
+        """
+        quantiles of a column read from its table (interpolated between centroids)
+        """
+        reference_column = self.columns[column]
+        cumulative_share = (np.cumsum(reference_column.counts) - 0.5 * reference_column.counts) / reference_column.counts.sum()
+        return np.interp(quantile_list, cumulative_share, reference_column.values)
+
+    def get_histogram(self, column: str, bin_edges: np.ndarray) -> np.ndarray:
+        """
+        row count of every bin of bin_edges (np.histogram bins)
+        """
+        reference_column = self.columns[column]
+        return np.histogram(reference_column.values, bin_edges, weights=reference_column.counts)[0].astype(np.int64)
+
+    def get_category_frequencies(self, column: str) -> dict:
+        """
+        {category: share of the non missing rows}
+        """
+        reference_column = self.columns[column]
+        return dict(zip(reference_column.values.tolist(), (reference_column.counts / reference_column.counts.sum()).tolist()))
+
+    def get_column_type_dict(self) -> dict:
+        return {column: reference_column.column_type for column, reference_column in self.columns.items()}
+
+    def get_drift_report(self, current_profile: "ReferenceProfile", drift_share: float = 0.5) -> dict:
+        """
+        drift report of the rows profiled in current_profile against this profile, on the columns of current_profile
+        (a batch to score has no target column)
+        """
+        try:
+            unknown_column_list = [column for column in current_profile.columns if column not in self.columns]
+            if len(unknown_column_list) > 0:
+                raise Exception(f"Columns {unknown_column_list} are not in the reference profile")
+            return get_table_drift_report(drift_reference={column: self.columns[column] for column in current_profile.columns},
+                                          current_reference=current_profile.columns, drift_share=drift_share)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def to_dict(self) -> dict:
+        return {"format_version": PROFILE_FORMAT_VERSION,
+                "version": self.version,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+                "rows": self.rows,
+                "batches": self.batches,
+                "max_centroids": self.max_centroids,
+                "columns": {column: {"column_type": reference_column.column_type,
+                                     "missing_count": int(reference_column.missing_count),
+                                     "min": float(reference_column.values[0]) if len(reference_column.values) else None,
+                                     "max": float(reference_column.values[-1]) if len(reference_column.values) else None,
+                                     "values": reference_column.values.tolist(),
+                                     "counts": reference_column.counts.tolist()}
+                            for column, reference_column in self.columns.items()}}
+
+    @classmethod
+    def from_dict(cls, profile_dict: dict) -> "ReferenceProfile":
+        try:
+            if profile_dict.get("format_version") != PROFILE_FORMAT_VERSION:
+                raise Exception(f"Reference profile format version [{profile_dict.get('format_version')}] "
+                                f"is not supported, expected [{PROFILE_FORMAT_VERSION}]")
+            columns = {column: ReferenceColumn(column_type=column_info["column_type"],
+                                               values=np.asarray(column_info["values"], dtype=np.float64),
+                                               counts=np.asarray(column_info["counts"], dtype=np.int64),
+                                               missing_count=column_info["missing_count"])
+                       for column, column_info in profile_dict["columns"].items()}
+            return cls(columns=columns, rows=profile_dict["rows"], max_centroids=profile_dict["max_centroids"],
+                       batches=profile_dict["batches"], version=profile_dict["version"],
+                       created_at=profile_dict["created_at"], updated_at=profile_dict["updated_at"])
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+
+def save_reference_profile(file_path: str, reference_profile: ReferenceProfile) -> str:
+    try:
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        with open(file_path, 'w') as profile_file:
+            json.dump(reference_profile.to_dict(), profile_file)
+        return file_path
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+
+def load_reference_profile(file_path: str) -> ReferenceProfile:
+    try:
+        with open(file_path, 'r') as profile_file:
+            return ReferenceProfile.from_dict(json.load(profile_file))
+    except Exception as e:
+        raise HeartRiskException(e, sys)
@@ -0,0 +1,247 @@
+import os, sys
+import json
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.logger import logging
+from src.Heart_Attack_Risk_Analyzer_Project.utils.hash_split import get_row_hash
+
+try:
+    import fcntl
+except ImportError:
+    #not available on windows, the index is used without the inter process lock there
+    fcntl = None
+
+# Row fingerprint index:
+# persistent set of the 64 bit hashes (fingerprints) of every row ingested so far, so a row already ingested in an
+# earlier batch (a dataset file) is dropped without comparing the rows of the batches.
+# Every batch gets an ordinal the first time it is ingested, recorded with its key in the manifest. The key is the
+# name of the source file, not its content, so a file that grows or is published again stays the same batch and
+# keeps its rows. Every fingerprint is stored once with the ordinal of the first batch it was seen in.
+# A row is a duplicate when it was already kept in this ingestion (earlier in its batch or in another batch), or when
+# its fingerprint belongs to a batch of a lower ordinal that is ingested as well (the active batches, that batch
+# keeps the row). The fingerprints of a batch no longer ingested never drop a row, the rows of the active batches are
+# the whole dataset and none of them is lost. Ingesting the same files again drops the same rows every time.
+# The index is a list of runs, sorted fingerprint and ordinal arrays in .npy files memory mapped for the lookups
+# (a binary search per run). The new fingerprints of a run of the ingestion are written as a new run, and the
+# last runs are merged while a run is not bigger than twice the next one (size tiered), so there are
+# O(log rows) runs and every fingerprint is rewritten O(log rows) times. Checking a batch is O(batch log rows).
+# The hash is the one of the hash split with another seed, with about 10**9 indexed rows the chance that any new
+# row is taken for a duplicate by a hash collision is about rows / 2**64.
+
+ROW_INDEX_FORMAT_VERSION = 1
+ROW_FINGERPRINT_SEED = 0x5EED0F1D
+MANIFEST_FILE_NAME = "manifest.json"
+LOCK_FILE_NAME = "index.lock"
+FINGERPRINT_FILE_SUFFIX = ".fingerprints.npy"
+ORDINAL_FILE_SUFFIX = ".ordinals.npy"
+#runs of the current ingestion kept in memory before they are merged
+MAX_SESSION_RUNS = 8
+
+
+def get_row_fingerprints(dataframe: pd.DataFrame, fingerprint_columns: list) -> np.ndarray:
+    """
+    uint64 fingerprint of every row over fingerprint_columns, int and float columns of the same values give the
+    same fingerprint
+    """
+    return get_row_hash(dataframe=dataframe, hash_columns=fingerprint_columns, seed=ROW_FINGERPRINT_SEED)
+
+
+def merge_runs(run_list: list) -> tuple:
+    """
+    merges (fingerprints, ordinals) runs into one sorted run, a fingerprint in several runs keeps its lowest ordinal
+    """
+    fingerprints = np.concatenate([run[0] for run in run_list])
+    ordinals = np.concatenate([run[1] for run in run_list])
+    order = np.lexsort((ordinals, fingerprints))
+    fingerprints, ordinals = fingerprints[order], ordinals[order]
+    is_first = np.r_[True, fingerprints[1:] != fingerprints[:-1]]
+    return fingerprints[is_first], ordinals[is_first]
+
+
+def lookup_run(run: tuple, fingerprints: np.ndarray) -> tuple:
+    """
+    (is found, ordinal) of every fingerprint in a sorted run, the ordinal is meaningless where not found
+    """
+    run_fingerprints, run_ordinals = run
+    if len(run_fingerprints) == 0:
+        return np.zeros(len(fingerprints), dtype=bool), np.zeros(len(fingerprints), dtype=np.uint32)
+    position = np.minimum(np.searchsorted(run_fingerprints, fingerprints), len(run_fingerprints) - 1)
+    return run_fingerprints[position] == fingerprints, run_ordinals[position]
+
+
+class RowFingerprintIndex:
+    """
+    persistent index of the fingerprints of the ingested rows, see the top of the module.
+    open locks the index directory for this process until commit or close, set_active_batches registers the
+    batches of the ingestion, drop_duplicates filters their chunks, commit writes the new fingerprints.
+    index_dir: directory of the manifest and of the run files
+    """
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self.lock_file = None
+        self.manifest = None
+        self.runs = []
+        self.session_runs = []
+        self.active_ordinals = set()
+        self.batch_seen_rows = {}
+        self.duplicate_rows = {}
+
+    def get_manifest_file_path(self) -> str:
+        return os.path.join(self.index_dir, MANIFEST_FILE_NAME)
+
+    def open(self) -> "RowFingerprintIndex":
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            self.lock_file = open(os.path.join(self.index_dir, LOCK_FILE_NAME), 'a')
+            if fcntl is not None:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+            manifest_file_path = self.get_manifest_file_path()
+            if os.path.exists(manifest_file_path):
+                with open(manifest_file_path, 'r') as manifest_file:
+                    self.manifest = json.load(manifest_file)
+                if self.manifest.get("version", None) != ROW_INDEX_FORMAT_VERSION:
+                    raise Exception(f"Row index version [{self.manifest.get('version', None)}] of [{self.index_dir}] "
+                                    f"is not supported.")
+            else:
+                self.manifest = {"version": ROW_INDEX_FORMAT_VERSION, "next_ordinal": 0, "rows": 0,
+                                 "batches": {}, "runs": []}
+            self.runs = [(np.load(os.path.join(self.index_dir, run["name"] + FINGERPRINT_FILE_SUFFIX), mmap_mode='r'),
+                          np.load(os.path.join(self.index_dir, run["name"] + ORDINAL_FILE_SUFFIX), mmap_mode='r'))
+                         for run in self.manifest["runs"]]
+            logging.info(f"Row index [{self.index_dir}] opened: [{self.manifest['rows']}] fingerprints of "
+                         f"[{len(self.manifest['batches'])}] batches in [{len(self.runs)}] runs.")
+            return self
+        except Exception as e:
+            self.close()
+            raise HeartRiskException(e, sys)
+
+    def get_batch_ordinal(self, batch_key: str) -> int:
+        """
+        ordinal of the batch, a new one for a batch not seen before
+        """
+        batch_dict = self.manifest["batches"]
+        if batch_key not in batch_dict:
+            batch_dict[batch_key] = {"ordinal": self.manifest["next_ordinal"], "rows": 0, "added_at": time.time()}
+            self.manifest["next_ordinal"] += 1
+        self.active_ordinals.add(batch_dict[batch_key]["ordinal"])
+        return batch_dict[batch_key]["ordinal"]
+
+    def set_active_batches(self, batch_key_list: list) -> None:
+        """
+        registers every batch of the ingestion before the first chunk is checked, a row is only dropped for a
+        batch of the ingestion
+        """
+        for batch_key in batch_key_list:
+            self.get_batch_ordinal(batch_key)
+
+    def drop_duplicates(self, dataframe: pd.DataFrame, batch_key: str, fingerprint_columns: list) -> pd.DataFrame:
+        """
+        the rows of a chunk of the batch batch_key not ingested in an earlier batch nor earlier in this batch
+        """
+        try:
+            ordinal = self.get_batch_ordinal(batch_key)
+            fingerprints = get_row_fingerprints(dataframe=dataframe, fingerprint_columns=fingerprint_columns)
+            #the first row of every fingerprint of the chunk
+            _, first_position = np.unique(fingerprints, return_index=True)
+            is_duplicate = np.ones(len(fingerprints), dtype=bool)
+            is_duplicate[first_position] = False
+            active_ordinals = np.fromiter(self.active_ordinals, dtype=np.uint32)
+            for run in self.runs:
+                is_found, found_ordinal = lookup_run(run, fingerprints)
+                is_duplicate |= is_found & (found_ordinal < ordinal) & np.isin(found_ordinal, active_ordinals)
+            #rows kept earlier in this ingestion, by this batch or another one
+            for run in self.session_runs:
+                is_duplicate |= lookup_run(run, fingerprints)[0]
+
+            kept_fingerprints = np.sort(fingerprints[~is_duplicate])
+            self.session_runs.append((kept_fingerprints, np.full(len(kept_fingerprints), ordinal, dtype=np.uint32)))
+            if len(self.session_runs) > MAX_SESSION_RUNS:
+                self.session_runs = [merge_runs(self.session_runs)]
+            self.batch_seen_rows[batch_key] = self.batch_seen_rows.get(batch_key, 0) + len(kept_fingerprints)
+            self.duplicate_rows[batch_key] = self.duplicate_rows.get(batch_key, 0) + int(is_duplicate.sum())
+            return dataframe[~is_duplicate]
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def save_run(self, run: tuple) -> dict:
+        run_name = f"run-{uuid.uuid4().hex}"
+        for suffix, array in [(FINGERPRINT_FILE_SUFFIX, run[0]), (ORDINAL_FILE_SUFFIX, run[1])]:
+            tmp_file_path = os.path.join(self.index_dir, run_name + suffix + ".tmp")
+            with open(tmp_file_path, 'wb') as run_file:
+                np.save(run_file, np.ascontiguousarray(array))
+            os.replace(tmp_file_path, os.path.join(self.index_dir, run_name + suffix))
+        return {"name": run_name, "rows": int(len(run[0]))}
+
+    def remove_run_files(self, run_info_list: list) -> None:
+        for run_info in run_info_list:
+            for suffix in [FINGERPRINT_FILE_SUFFIX, ORDINAL_FILE_SUFFIX]:
+                run_file_path = os.path.join(self.index_dir, run_info["name"] + suffix)
+                if os.path.exists(run_file_path):
+                    os.remove(run_file_path)
+
+    def commit(self) -> dict:
+        """
+        writes the fingerprints not indexed yet as a new run, merges the last runs (size tiered) and the
+        manifest, then releases the lock. Returns {batch key: duplicate rows dropped}
+        """
+        try:
+            duplicate_rows = dict(self.duplicate_rows)
+            if len(self.session_runs) > 0:
+                session_fingerprints, session_ordinals = merge_runs(self.session_runs)
+                is_new = np.ones(len(session_fingerprints), dtype=bool)
+                for run in self.runs:
+                    is_new &= ~lookup_run(run, session_fingerprints)[0]
+                new_run = (session_fingerprints[is_new], session_ordinals[is_new])
+                run_list = list(self.runs)
+                run_info_list = list(self.manifest["runs"])
+                removed_run_info_list = []
+                #a rerun of the same files adds no fingerprint and no run
+                if len(new_run[0]) > 0:
+                    run_list.append(new_run)
+                    run_info_list.append(self.save_run(new_run))
+                #size tiered merge of the last runs
+                while len(run_list) > 1 and run_info_list[-2]["rows"] <= 2 * run_info_list[-1]["rows"]:
+                    merged_run = merge_runs(run_list[-2:])
+                    removed_run_info_list.extend(run_info_list[-2:])
+                    run_list = run_list[:-2] + [merged_run]
+                    run_info_list = run_info_list[:-2] + [self.save_run(merged_run)]
+
+                for batch_key, batch_info in self.manifest["batches"].items():
+                    if batch_key in self.batch_seen_rows:
+                        batch_info["rows"] = self.batch_seen_rows[batch_key]
+                self.manifest["runs"] = run_info_list
+                self.manifest["rows"] = int(sum(run_info["rows"] for run_info in run_info_list))
+                tmp_manifest_file_path = self.get_manifest_file_path() + ".tmp"
+                with open(tmp_manifest_file_path, 'w') as manifest_file:
+                    json.dump(self.manifest, manifest_file, indent=2)
+                os.replace(tmp_manifest_file_path, self.get_manifest_file_path())
+                #the merged run files are removed once the manifest no longer references them (nor a memory map)
+                self.runs = []
+                run_list = None
+                self.remove_run_files(removed_run_info_list)
+                logging.info(f"Row index [{self.index_dir}] updated: [{len(new_run[0])}] new fingerprints of "
+                             f"[{len(self.batch_seen_rows)}] batches, [{self.manifest['rows']}] fingerprints in "
+                             f"[{len(run_info_list)}] runs.")
+            self.close()
+            return duplicate_rows
+        except Exception as e:
+            self.close()
+            raise HeartRiskException(e, sys)
+
+    def close(self) -> None:
+        """
+        releases the lock without writing anything, what was not committed is lost
+        """
+        self.runs = []
+        self.session_runs = []
+        self.active_ordinals = set()
+        self.batch_seen_rows = {}
+        self.duplicate_rows = {}
+        if self.lock_file is not None:
+            if fcntl is not None:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
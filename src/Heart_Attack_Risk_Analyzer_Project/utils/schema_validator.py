@@ -0,0 +1,190 @@
+import sys
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+
+# Schema validation engine:
+# the columns and column_rules of schema.yaml are compiled once into arrays of column positions and bounds, a batch
+# of rows is checked by copying its schema columns into one float64 matrix and evaluating every rule of every column
+# with a few numpy comparisons over that matrix:
+#   not_null       : a missing value in a column with nullable: false
+#   integer        : a value with a fraction in an int64 column
+#   min / max      : a value outside the plausible range of the column (bounds included in the range)
+#   allowed_values : a value out of the allowed values of a categorical column
+# Missing values only break not_null. The result is one boolean column per rule (the row masks) and its count,
+# validate_chunks adds up the counts of the chunks of a file that does not fit in memory.
+# Column errors are checked once per column instead of on the rows: a schema column missing from the data, an int64
+# column stored as float, or a text column (the categorical columns of load_data) holding values that are not numbers.
+
+NOT_NULL_RULE = "not_null"
+INTEGER_RULE = "integer"
+MIN_RULE = "min"
+MAX_RULE = "max"
+ALLOWED_VALUES_RULE = "allowed_values"
+#rows of invalid_row_sample kept by validate_chunks
+INVALID_ROW_SAMPLE_SIZE = 20
+
+SchemaValidationResult = namedtuple("SchemaValidationResult", ["rows", "invalid_rows", "rule_names", "rule_counts",
+                                                               "column_errors", "rule_masks", "invalid_row_mask",
+                                                               "invalid_row_sample"])
+
+
+class SchemaValidator:
+    """
+    the rules of a schema.yaml compiled for the vectorized checks, see the top of the module
+    schema: content of schema.yaml
+    """
+    def __init__(self, schema: dict):
+        try:
+            self.column_dtypes = dict(schema[DATA_VALIDATION_GET_ALL_COLUMNS_KEY])
+            self.column_list = list(self.column_dtypes)
+            column_rules = schema.get(DATA_VALIDATION_COLUMN_RULES_KEY, None) or {}
+            unknown_column_list = [column for column in column_rules if column not in self.column_dtypes]
+            if len(unknown_column_list) > 0:
+                raise Exception(f"column_rules of columns not in the schema columns: {unknown_column_list}")
+
+            position = {column: index for index, column in enumerate(self.column_list)}
+            rule_dict = {column: column_rules.get(column, None) or {} for column in self.column_list}
+            self.not_null_columns = [column for column in self.column_list
+                                     if not rule_dict[column].get(SCHEMA_NULLABLE_KEY, True)]
+            self.integer_columns = [column for column in self.column_list
+                                    if str(self.column_dtypes[column]).startswith("int")]
+            self.min_columns = [column for column in self.column_list if rule_dict[column].get(SCHEMA_MIN_KEY) is not None]
+            self.max_columns = [column for column in self.column_list if rule_dict[column].get(SCHEMA_MAX_KEY) is not None]
+            self.allowed_value_columns = [column for column in self.column_list
+                                          if rule_dict[column].get(SCHEMA_ALLOWED_VALUES_KEY) is not None]
+
+            #positions in the value matrix and bounds of every rule kind
+            self.not_null_index = np.array([position[column] for column in self.not_null_columns], dtype=np.intp)
+            self.integer_index = np.array([position[column] for column in self.integer_columns], dtype=np.intp)
+            self.min_index = np.array([position[column] for column in self.min_columns], dtype=np.intp)
+            self.min_values = np.array([rule_dict[column][SCHEMA_MIN_KEY] for column in self.min_columns], dtype=np.float64)
+            self.max_index = np.array([position[column] for column in self.max_columns], dtype=np.intp)
+            self.max_values = np.array([rule_dict[column][SCHEMA_MAX_KEY] for column in self.max_columns], dtype=np.float64)
+            self.allowed_value_index = np.array([position[column] for column in self.allowed_value_columns], dtype=np.intp)
+            #allowed values of every column padded with nan to a (columns, values) matrix, nan never equals a value
+            max_allowed_values = max([len(rule_dict[column][SCHEMA_ALLOWED_VALUES_KEY])
+                                      for column in self.allowed_value_columns], default=0)
+            self.allowed_values = np.full((len(self.allowed_value_columns), max_allowed_values), np.nan)
+            for row, column in enumerate(self.allowed_value_columns):
+                allowed_value_list = rule_dict[column][SCHEMA_ALLOWED_VALUES_KEY]
+                self.allowed_values[row, :len(allowed_value_list)] = allowed_value_list
+
+            self.rule_names = ([f"{column}:{NOT_NULL_RULE}" for column in self.not_null_columns] +
+                               [f"{column}:{INTEGER_RULE}" for column in self.integer_columns] +
+                               [f"{column}:{MIN_RULE}" for column in self.min_columns] +
+                               [f"{column}:{MAX_RULE}" for column in self.max_columns] +
+                               [f"{column}:{ALLOWED_VALUES_RULE}" for column in self.allowed_value_columns])
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def get_value_matrix(self, dataframe: pd.DataFrame) -> tuple:
+        """
+        (float64 matrix of the schema columns with nan for missing values, {column: error}), the columns with an
+        error are left as nan
+        """
+        column_errors = {column: "missing column" for column in self.column_list if column not in dataframe.columns}
+        #column major, every column is one contiguous buffer
+        value_matrix = np.full((len(dataframe), len(self.column_list)), np.nan, order="F")
+        for index, column in enumerate(self.column_list):
+            if column in column_errors:
+                continue
+            series = dataframe[column]
+            #int64 columns of a chunk without missing values are fine for float64, not the other way round
+            allowed_kinds = "iub" if str(self.column_dtypes[column]).startswith("int") else "iubf"
+            if series.dtype.kind in allowed_kinds:
+                value_matrix[:, index] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                continue
+            if series.dtype.kind in "iubf":
+                column_errors[column] = f"dtype {series.dtype} instead of {self.column_dtypes[column]}"
+                value_matrix[:, index] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                continue
+            #object columns (categorical columns of load_data) hold numbers, anything else is an error
+            values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            not_number_count = int((np.isnan(values) & series.notna().to_numpy()).sum())
+            if not_number_count > 0:
+                column_errors[column] = f"{not_number_count} values are not numbers"
+            value_matrix[:, index] = values
+        return value_matrix, column_errors
+
+    def validate(self, dataframe: pd.DataFrame) -> SchemaValidationResult:
+        """
+        checks every rule on every row of dataframe in one pass over its value matrix
+        return: SchemaValidationResult with the (rows, rules) boolean rule_masks, True where a row breaks a rule
+        """
+        try:
+            value_matrix, column_errors = self.get_value_matrix(dataframe)
+            is_missing = np.isnan(value_matrix)
+
+            not_null_masks = is_missing[:, self.not_null_index]
+            integer_values = value_matrix[:, self.integer_index]
+            integer_masks = np.floor(integer_values) != integer_values
+            integer_masks &= ~is_missing[:, self.integer_index]
+            #comparisons with nan are False, missing values never break a range
+            min_masks = value_matrix[:, self.min_index] < self.min_values
+            max_masks = value_matrix[:, self.max_index] > self.max_values
+            #one comparison of the (rows, columns) values per allowed value position instead of a 3D broadcast
+            allowed_value_matrix = value_matrix[:, self.allowed_value_index]
+            allowed_value_masks = ~is_missing[:, self.allowed_value_index]
+            for value_position in range(self.allowed_values.shape[1]):
+                allowed_value_masks &= allowed_value_matrix != self.allowed_values[:, value_position]
+
+            rule_masks = np.concatenate([not_null_masks, integer_masks, min_masks, max_masks, allowed_value_masks], axis=1)
+            invalid_row_mask = rule_masks.any(axis=1)
+            return SchemaValidationResult(rows=len(dataframe),
+                                          invalid_rows=int(invalid_row_mask.sum()),
+                                          rule_names=self.rule_names,
+                                          rule_counts=dict(zip(self.rule_names, rule_masks.sum(axis=0).tolist())),
+                                          column_errors=column_errors,
+                                          rule_masks=rule_masks,
+                                          invalid_row_mask=invalid_row_mask,
+                                          invalid_row_sample=np.flatnonzero(invalid_row_mask)[:INVALID_ROW_SAMPLE_SIZE].tolist())
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def validate_chunks(self, chunk_iterator) -> SchemaValidationResult:
+        """
+        validate over the dataframes of chunk_iterator (load_data_chunks of a file), the counts are added up and
+        the masks are not kept, invalid_row_sample holds the positions in the file of the first invalid rows
+        """
+        try:
+            rows = 0
+            invalid_rows = 0
+            rule_counts = dict.fromkeys(self.rule_names, 0)
+            column_errors = {}
+            invalid_row_sample = []
+            for chunk_df in chunk_iterator:
+                chunk_result = self.validate(chunk_df)
+                for rule_name, count in chunk_result.rule_counts.items():
+                    rule_counts[rule_name] += count
+                for column, error in chunk_result.column_errors.items():
+                    column_errors.setdefault(column, error)
+                if len(invalid_row_sample) < INVALID_ROW_SAMPLE_SIZE:
+                    invalid_row_sample.extend(rows + row for row in chunk_result.invalid_row_sample)
+                    invalid_row_sample = invalid_row_sample[:INVALID_ROW_SAMPLE_SIZE]
+                rows += chunk_result.rows
+                invalid_rows += chunk_result.invalid_rows
+            return SchemaValidationResult(rows=rows,
+                                          invalid_rows=invalid_rows,
+                                          rule_names=self.rule_names,
+                                          rule_counts=rule_counts,
+                                          column_errors=column_errors,
+                                          rule_masks=None,
+                                          invalid_row_mask=None,
+                                          invalid_row_sample=invalid_row_sample)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+
+def get_schema_validation_summary(result: SchemaValidationResult) -> dict:
+    """
+    json part of a result: counts of the broken rules, column errors and the first invalid rows
+    """
+    return {"rows": result.rows,
+            "invalid_rows": result.invalid_rows,
+            "invalid_row_share": round(result.invalid_rows / result.rows, 6) if result.rows > 0 else 0.0,
+            "rule_counts": {rule_name: int(count) for rule_name, count in result.rule_counts.items() if count > 0},
+            "column_errors": result.column_errors,
+            "invalid_row_sample": result.invalid_row_sample}
@@ -0,0 +1,313 @@
+import os, sys
+import json
+import time
+import threading
+import pandas as pd
+from collections import namedtuple
+from contextlib import contextmanager
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Stage profiler:
+# records wall time, cpu time, peak rss, rows and bytes read / written of the pipeline stages and their sub steps.
+# Components wrap their steps in `with profile_step("download"):`, the step is recorded by the profiler active in the
+# process (set by the Pipeline for the length of a run) and nested under the step open in the same thread, or under
+# the step open in the thread that started the profiler for steps of worker threads (validation checks).
+# Without an active profiler profile_step does nothing, so components used on their own are not slowed down.
+# Counters are the ones of the whole process: cpu time and bytes of steps running at the same time overlap.
+#   cpu_seconds         : user + system time of the process, children_cpu_seconds the one of finished child processes
+#   peak_rss_bytes      : highest resident set size sampled while the step was open
+#   bytes_read / written: rchar / wchar of /proc/self/io, every read and write call (files and sockets)
+
+PROMETHEUS_METRIC_PREFIX = "heart_risk_step"
+
+StepRecord = namedtuple("StepRecord", ["name", "path", "status", "start_seconds", "wall_seconds", "cpu_seconds",
+                                       "children_cpu_seconds", "peak_rss_bytes", "rss_delta_bytes", "rows",
+                                       "rows_per_second", "bytes_read", "bytes_written", "info"])
+
+PROMETHEUS_METRIC_LIST = [("wall_seconds", "Wall time of the step."),
+                          ("cpu_seconds", "Cpu time of the process during the step."),
+                          ("children_cpu_seconds", "Cpu time of the child processes finished during the step."),
+                          ("peak_rss_bytes", "Highest resident set size of the process during the step."),
+                          ("rows", "Rows processed by the step."),
+                          ("rows_per_second", "Rows processed per second of wall time."),
+                          ("bytes_read", "Bytes read by the process during the step."),
+                          ("bytes_written", "Bytes written by the process during the step.")]
+
+
+def get_rss_bytes() -> int:
+    """
+    current resident set size, the peak so far when /proc is not available
+    """
+    try:
+        with open("/proc/self/statm", 'r') as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return None
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        #kilobytes on linux, bytes on macos
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def get_io_bytes():
+    """
+    (bytes read, bytes written) by the process so far, (None, None) when /proc/self/io is not available
+    """
+    try:
+        io_counters = {}
+        with open("/proc/self/io", 'r') as io_file:
+            for line in io_file:
+                key, value = line.split(":")
+                io_counters[key] = int(value)
+        return io_counters["rchar"], io_counters["wchar"]
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+
+def get_cpu_seconds():
+    """
+    (cpu seconds of the process, cpu seconds of its finished children)
+    """
+    times = os.times()
+    return times.user + times.system, times.children_user + times.children_system
+
+
+def get_delta(end_value, start_value):
+    if end_value is None or start_value is None:
+        return None
+    return end_value - start_value
+
+
+class ProfileStep:
+    """
+    open step, rows and info can be set while it runs
+    """
+    def __init__(self, name: str, path: str, rows: int = None, info: dict = None):
+        self.name = name
+        self.path = path
+        self.rows = rows
+        self.info = dict(info or {})
+        self.status = "ok"
+        self.start_time = time.perf_counter()
+        self.start_cpu_seconds, self.start_children_cpu_seconds = get_cpu_seconds()
+        self.start_bytes_read, self.start_bytes_written = get_io_bytes()
+        self.start_rss_bytes = get_rss_bytes()
+        self.peak_rss_bytes = self.start_rss_bytes
+
+    def set_rows(self, rows: int) -> None:
+        self.rows = int(rows)
+
+    def add_rows(self, rows: int) -> None:
+        self.rows = (self.rows or 0) + int(rows)
+
+    def set_info(self, **info) -> None:
+        self.info.update(info)
+
+    def update_peak_rss(self, rss_bytes: int) -> None:
+        if rss_bytes is not None and (self.peak_rss_bytes is None or rss_bytes > self.peak_rss_bytes):
+            self.peak_rss_bytes = rss_bytes
+
+    def get_record(self, profiler_start_time: float) -> StepRecord:
+        wall_seconds = time.perf_counter() - self.start_time
+        cpu_seconds, children_cpu_seconds = get_cpu_seconds()
+        bytes_read, bytes_written = get_io_bytes()
+        rss_bytes = get_rss_bytes()
+        self.update_peak_rss(rss_bytes)
+        return StepRecord(name=self.name,
+                          path=self.path,
+                          status=self.status,
+                          start_seconds=round(self.start_time - profiler_start_time, 6),
+                          wall_seconds=round(wall_seconds, 6),
+                          cpu_seconds=round(cpu_seconds - self.start_cpu_seconds, 6),
+                          children_cpu_seconds=round(children_cpu_seconds - self.start_children_cpu_seconds, 6),
+                          peak_rss_bytes=self.peak_rss_bytes,
+                          rss_delta_bytes=get_delta(rss_bytes, self.start_rss_bytes),
+                          rows=self.rows,
+                          rows_per_second=round(self.rows / wall_seconds, 3) if self.rows and wall_seconds > 0 else None,
+                          bytes_read=get_delta(bytes_read, self.start_bytes_read),
+                          bytes_written=get_delta(bytes_written, self.start_bytes_written),
+                          info=self.info)
+
+
+class StageProfiler:
+    """
+    collects the steps of one pipeline run, see the top of the module
+    sample_interval_seconds: period of the rss sampling thread giving the peak memory of the open steps
+    """
+    def __init__(self, sample_interval_seconds: float = 0.05):
+        try:
+            self.sample_interval_seconds = sample_interval_seconds
+            self.record_list = []
+            self.open_step_list = []
+            self.lock = threading.Lock()
+            self.thread_stack = threading.local()
+            self.owner_stack = []
+            self.owner_thread = None
+            self.start_time = None
+            self.stop_event = threading.Event()
+            self.sampler = None
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def start(self) -> "StageProfiler":
+        self.start_time = time.perf_counter()
+        self.owner_thread = threading.current_thread()
+        self.thread_stack.steps = self.owner_stack
+        self.stop_event.clear()
+        self.sampler = threading.Thread(target=self.sample_rss, name="stage-profiler", daemon=True)
+        self.sampler.start()
+        return self
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.sampler is not None:
+            self.sampler.join()
+            self.sampler = None
+
+    def sample_rss(self) -> None:
+        while not self.stop_event.wait(self.sample_interval_seconds):
+            rss_bytes = get_rss_bytes()
+            with self.lock:
+                for step in self.open_step_list:
+                    step.update_peak_rss(rss_bytes)
+
+    def get_step_stack(self) -> list:
+        if not hasattr(self.thread_stack, "steps"):
+            self.thread_stack.steps = []
+        return self.thread_stack.steps
+
+    def get_parent_step(self):
+        step_stack = self.get_step_stack()
+        if len(step_stack) > 0:
+            return step_stack[-1]
+        #steps of a worker thread go under the step the pipeline thread has open
+        owner_stack = list(self.owner_stack)
+        return owner_stack[-1] if len(owner_stack) > 0 else None
+
+    @contextmanager
+    def step(self, name: str, rows: int = None, **info):
+        parent_step = self.get_parent_step()
+        step = ProfileStep(name=name, path=name if parent_step is None else f"{parent_step.path}/{name}",
+                           rows=rows, info=info)
+        step_stack = self.get_step_stack()
+        step_stack.append(step)
+        with self.lock:
+            self.open_step_list.append(step)
+        try:
+            yield step
+        except BaseException:
+            step.status = "failed"
+            raise
+        finally:
+            step_stack.pop()
+            with self.lock:
+                self.open_step_list.remove(step)
+                self.record_list.append(step.get_record(profiler_start_time=self.start_time))
+
+    def get_current_step(self):
+        step_stack = self.get_step_stack()
+        return step_stack[-1] if len(step_stack) > 0 else None
+
+    def get_records(self) -> list:
+        """
+        finished steps in start order
+        """
+        with self.lock:
+            return sorted(self.record_list, key=lambda record: record.start_seconds)
+
+    def get_dataframe(self) -> pd.DataFrame:
+        record_list = self.get_records()
+        profile_df = pd.DataFrame(record_list, columns=StepRecord._fields)
+        profile_df["info"] = [json.dumps(record.info, default=str) for record in record_list]
+        return profile_df
+
+    def get_prometheus_text(self, labels: dict = None) -> str:
+        """
+        the steps in the prometheus text exposition format, one gauge per metric with a step label
+        """
+        label_text = "".join(f'{key}="{value}",' for key, value in (labels or {}).items())
+        line_list = []
+        record_list = self.get_records()
+        for metric, help_text in PROMETHEUS_METRIC_LIST:
+            metric_name = f"{PROMETHEUS_METRIC_PREFIX}_{metric}"
+            line_list.append(f"# HELP {metric_name} {help_text}")
+            line_list.append(f"# TYPE {metric_name} gauge")
+            for record in record_list:
+                value = getattr(record, metric)
+                if value is not None:
+                    line_list.append(f'{metric_name}{{{label_text}step="{record.path}"}} {value}')
+        return "\n".join(line_list) + "\n"
+
+    def save(self, file_path: str, prometheus_file_path: str = None, **run_info) -> str:
+        """
+        writes the steps as json at file_path, as csv next to it and, when prometheus_file_path is given,
+        in the prometheus text format. run_info is stored at the top of the json and as prometheus labels.
+        return: file_path
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w') as profile_file:
+                json.dump({**run_info,
+                           "wall_seconds": round(time.perf_counter() - self.start_time, 6),
+                           "steps": [record._asdict() for record in self.get_records()]},
+                          profile_file, indent=4, default=str)
+            self.get_dataframe().to_csv(os.path.splitext(file_path)[0] + ".csv", index=False)
+            if prometheus_file_path is not None:
+                with open(prometheus_file_path, 'w') as prometheus_file:
+                    prometheus_file.write(self.get_prometheus_text(labels=run_info))
+            return file_path
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+
+_active_profiler = None
+
+
+def set_active_profiler(profiler: StageProfiler) -> None:
+    """
+    profiler recording the profile_step calls of the process, None to stop recording
+    """
+    global _active_profiler
+    _active_profiler = profiler
+
+
+def get_active_profiler() -> StageProfiler:
+    return _active_profiler
+
+
+@contextmanager
+def profile_step(name: str, rows: int = None, **info):
+    """
+    records the block as a step of the active profiler, yields the step (None without active profiler)
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        yield None
+        return
+    with profiler.step(name, rows=rows, **info) as step:
+        yield step
+
+
+def set_step_rows(rows: int) -> None:
+    """
+    sets the rows of the innermost step open in this thread
+    """
+    profiler = _active_profiler
+    step = profiler.get_current_step() if profiler is not None else None
+    if step is not None:
+        step.set_rows(rows)
+
+
+def set_step_info(**info) -> None:
+    """
+    adds info to the innermost step open in this thread
+    """
+    profiler = _active_profiler
+    step = profiler.get_current_step() if profiler is not None else None
+    if step is not None:
+        step.set_info(**info)
@@ -0,0 +1,228 @@
+import sys
+import time
+import numpy as np
+from collections import namedtuple
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.neighbors import NearestNeighbors
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+
+ImputationBenchmark = namedtuple("ImputationBenchmark",
+                                 ["imputer", "rows", "masked_values", "fit_seconds", "transform_seconds",
+                                  "normalized_rmse"])
+
+
+def get_neighbor_weights(dist: np.ndarray, weights: str):
+    """
+    same weights as the KNN estimators: None for uniform, inverse distance otherwise where a zero distance
+    neighbor takes all the weight of its row
+    """
+    if weights == "uniform":
+        return None
+    with np.errstate(divide="ignore"):
+        dist = 1.0 / dist
+    inf_mask = np.isinf(dist)
+    inf_row = np.any(inf_mask, axis=1)
+    dist[inf_row] = inf_mask[inf_row]
+    return dist
+
+
+def merge_reservoir_sample(sample: np.ndarray, rows_seen: int, new_rows: np.ndarray, max_rows: int,
+                           random_generator: np.random.Generator) -> np.ndarray:
+    """
+    sample is a uniform sample of rows_seen rows, returns a uniform sample of at most max_rows rows of the
+    rows_seen + len(new_rows) rows: the number of new rows kept follows the hypergeometric law of a uniform draw
+    over both sets, they replace as many random rows of the sample
+    """
+    if max_rows is None or len(sample) + len(new_rows) <= max_rows:
+        return np.concatenate([sample, new_rows])
+    if rows_seen < len(sample):
+        raise Exception(f"Sample of [{len(sample)}] rows can not come from [{rows_seen}] rows")
+    sample_rows = min(max_rows, rows_seen + len(new_rows))
+    new_rows_kept = random_generator.hypergeometric(ngood=len(new_rows), nbad=rows_seen, nsample=sample_rows)
+    old_rows_kept = sample_rows - new_rows_kept
+    old_idx = np.sort(random_generator.choice(len(sample), min(old_rows_kept, len(sample)), replace=False))
+    new_idx = np.sort(random_generator.choice(len(new_rows), new_rows_kept, replace=False))
+    return np.concatenate([sample[old_idx], new_rows[new_idx]])
+
+
+def tree_knn_impute(X: np.ndarray, reference: np.ndarray, column_mean: np.ndarray, n_neighbors: int,
+                    weights: str, index_cache: dict = None, n_jobs: int = None) -> np.ndarray:
+    """
+    imputes the missing values of X in place from the n_neighbors nearest complete reference rows.
+    Rows are grouped by missing pattern, for every pattern a KD tree is built over the observed columns of the
+    reference (kept in index_cache for the next calls) and queried once for all the rows of the pattern,
+    in parallel batches with n_jobs threads. The distance on the observed columns ranks the neighbors like the
+    nan_euclidean distance of KNNImputer, the donors being complete rows every missing column is filled
+    from the same neighbors. Rows with no observed column get the column mean.
+    """
+    mask = np.isnan(X)
+    row_missing_idx = np.flatnonzero(mask.any(axis=1))
+    if row_missing_idx.size == 0:
+        return X
+
+    pattern_codes = mask[row_missing_idx] @ (1 << np.arange(X.shape[1], dtype=np.int64))
+    for pattern_code in np.unique(pattern_codes):
+        rows = row_missing_idx[pattern_codes == pattern_code]
+        missing_columns = mask[rows[0]]
+        observed_columns = ~missing_columns
+        if not observed_columns.any():
+            X[np.ix_(rows, missing_columns)] = column_mean[missing_columns]
+            continue
+
+        index = index_cache.get(int(pattern_code)) if index_cache is not None else None
+        if index is None:
+            index = NearestNeighbors(n_neighbors=min(n_neighbors, len(reference)), algorithm="kd_tree",
+                                     n_jobs=n_jobs).fit(reference[:, observed_columns])
+            if index_cache is not None:
+                index_cache[int(pattern_code)] = index
+        dist, neighbor_idx = index.kneighbors(X[np.ix_(rows, observed_columns)])
+
+        donors = reference[:, missing_columns][neighbor_idx]
+        weight_matrix = get_neighbor_weights(dist, weights)
+        if weight_matrix is None:
+            X[np.ix_(rows, missing_columns)] = donors.mean(axis=1)
+        else:
+            X[np.ix_(rows, missing_columns)] = ((donors * weight_matrix[:, :, None]).sum(axis=1)
+                                                / weight_matrix.sum(axis=1)[:, None])
+    return X
+
+
+class TreeKNNImputer(BaseEstimator, TransformerMixin):
+    """
+    KNN imputation answered by KD trees over the complete training rows instead of brute force distances to
+    every training row. At most max_reference_rows complete rows (a random sample) are kept, so the fitted
+    imputer does not hold the full training matrix and a query costs about log(max_reference_rows).
+    n_neighbors: number of neighbors used to impute a value
+    weights: uniform or distance
+    max_reference_rows: size of the reference sample, None keeps every complete row
+    n_jobs: threads used to query the trees
+    """
+    def __init__(self, n_neighbors: int = 5, weights: str = "uniform", max_reference_rows: int = 50000,
+                 n_jobs: int = None, random_state: int = 42):
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.max_reference_rows = max_reference_rows
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        try:
+            X = np.asarray(X, dtype=np.float64)
+            if self.weights not in ["uniform", "distance"]:
+                raise Exception(f"weights [{self.weights}] is not supported, use uniform or distance")
+            self.n_features_in_ = X.shape[1]
+            with np.errstate(invalid="ignore"):
+                self.column_mean_ = np.nanmean(X, axis=0)
+            if np.isnan(self.column_mean_).any():
+                raise Exception("TreeKNNImputer can not impute a column with no value")
+            #counts kept for partial_fit: observed values of every column and complete rows seen
+            self.n_observed_ = (~np.isnan(X)).sum(axis=0)
+
+            reference = X[~np.isnan(X).any(axis=1)]
+            if len(reference) == 0:
+                raise Exception("TreeKNNImputer needs at least one complete row")
+            self.n_reference_seen_ = len(reference)
+            if self.max_reference_rows is not None and len(reference) > self.max_reference_rows:
+                random_generator = np.random.default_rng(self.random_state)
+                reference = reference[np.sort(random_generator.choice(len(reference), self.max_reference_rows,
+                                                                      replace=False))]
+            self.reference_ = np.ascontiguousarray(reference)
+            self.index_cache_ = {}
+            return self
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def partial_fit(self, X, y=None):
+        """
+        updates the fitted imputer with new rows: the column means are updated with the new observed values and
+        the new complete rows enter the reference sample as if it had been drawn from all the rows seen,
+        the trees are rebuilt on next use
+        """
+        try:
+            if not hasattr(self, "reference_"):
+                return self.fit(X)
+            X = np.asarray(X, dtype=np.float64)
+            if X.shape[1] != self.n_features_in_:
+                raise Exception(f"X has [{X.shape[1]}] features, TreeKNNImputer was fitted with [{self.n_features_in_}]")
+            #imputers fitted before the counts were kept: the reference sample stands for the rows seen
+            n_observed = getattr(self, "n_observed_", np.full(self.n_features_in_, len(self.reference_)))
+            n_reference_seen = getattr(self, "n_reference_seen_", len(self.reference_))
+
+            observed_mask = ~np.isnan(X)
+            new_observed = observed_mask.sum(axis=0)
+            self.column_mean_ = ((self.column_mean_ * n_observed + np.where(observed_mask, X, 0.0).sum(axis=0))
+                                 / (n_observed + new_observed))
+            self.n_observed_ = n_observed + new_observed
+
+            new_reference = X[observed_mask.all(axis=1)]
+            random_generator = np.random.default_rng(None if self.random_state is None
+                                                     else self.random_state + int(n_reference_seen))
+            self.reference_ = np.ascontiguousarray(merge_reservoir_sample(sample=self.reference_,
+                                                                          rows_seen=n_reference_seen,
+                                                                          new_rows=new_reference,
+                                                                          max_rows=self.max_reference_rows,
+                                                                          random_generator=random_generator))
+            self.n_reference_seen_ = n_reference_seen + len(new_reference)
+            self.index_cache_ = {}
+            return self
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def transform(self, X):
+        try:
+            X = np.array(X, dtype=np.float64)
+            if X.shape[1] != self.n_features_in_:
+                raise Exception(f"X has [{X.shape[1]}] features, TreeKNNImputer was fitted with [{self.n_features_in_}]")
+            return tree_knn_impute(X, self.reference_, self.column_mean_, self.n_neighbors, self.weights,
+                                   index_cache=self.index_cache_, n_jobs=self.n_jobs)
+        except Exception as e:
+            raise HeartRiskException(e, sys)
+
+    def __getstate__(self):
+        #the trees are rebuilt on first use, they are not pickled with the imputer
+        state = self.__dict__.copy()
+        if "index_cache_" in state:
+            state["index_cache_"] = {}
+        return state
+
+
+def benchmark_imputation(X: np.ndarray, imputer_dict: dict, mask_fraction: float = 0.1,
+                         random_state: int = 42) -> list:
+    """
+    hides one random value in mask_fraction of the complete rows of X (most incomplete rows of the framingham
+    data miss a single value), imputes them with every imputer and compares them to the hidden values
+    X: numerical array with its natural missing values
+    imputer_dict: {name: unfitted imputer}
+    return: list of ImputationBenchmark, normalized_rmse is the rmse of every column divided by its std, averaged
+    """
+    try:
+        random_generator = np.random.default_rng(random_state)
+        complete_row_idx = np.flatnonzero(~np.isnan(X).any(axis=1))
+        hidden_row_idx = complete_row_idx[random_generator.random(len(complete_row_idx)) < mask_fraction]
+        hidden_mask = np.zeros(X.shape, dtype=bool)
+        hidden_mask[hidden_row_idx, random_generator.integers(0, X.shape[1], len(hidden_row_idx))] = True
+        X_masked = X.copy()
+        X_masked[hidden_mask] = np.nan
+        column_std = np.nanstd(X, axis=0)
+
+        benchmark_list = []
+        for name, imputer in imputer_dict.items():
+            start_time = time.perf_counter()
+            imputer.fit(X_masked)
+            fit_seconds = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            X_imputed = imputer.transform(X_masked)
+            transform_seconds = time.perf_counter() - start_time
+
+            column_rmse = [np.sqrt(np.mean((X_imputed[hidden_mask[:, column], column] - X[hidden_mask[:, column], column]) ** 2))
+                           for column in range(X.shape[1]) if hidden_mask[:, column].any()]
+            column_scale = [column_std[column] for column in range(X.shape[1]) if hidden_mask[:, column].any()]
+            benchmark_list.append(ImputationBenchmark(imputer=name,
+                                                      rows=X.shape[0],
+                                                      masked_values=int(hidden_mask.sum()),
+                                                      fit_seconds=fit_seconds,
+                                                      transform_seconds=transform_seconds,
+                                                      normalized_rmse=float(np.mean(np.array(column_rmse) / np.array(column_scale)))))
+        return benchmark_list
+    except Exception as e:
+        raise HeartRiskException(e, sys)
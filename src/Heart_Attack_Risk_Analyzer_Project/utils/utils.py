@@ -5,7 +5,8 @@ import yaml
 import pandas as pd
 import numpy as np
 import dill
-from src.Heart_Attack_Risk_Analyzer_Project.constant import DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY, DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY
+from src.Heart_Attack_Risk_Analyzer_Project.constant import DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY, DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY, \
+    PARQUET_FILE_EXTENSION
 
 def unzip_file(zip_file_path:str, extract_to:str) -> None:
     """
@@ -27,42 +28,185 @@ def read_yaml_file(config_file_path:str)->dict:
     except Exception as e:
         raise HeartRiskException(e, sys)
 
-def load_data_helper(dataframe: pd.DataFrame, schema_type: list, data_type: str) -> pd.DataFrame:
+def get_load_dtypes(dataframe_columns: list, schema_file_path: str) -> dict:
+    """
+    returns the dtype every schema column is loaded with: float64 for the numerical columns and object for the
+    categorical ones, raises an exception when a schema column is not in the data
+    dataframe_columns: columns of the file being loaded
+    schema_file_path: str file to check the specified column type and other properties
+    """
     try:
+        dataset_schema = read_yaml_file(schema_file_path)
+
+        load_dtypes = {column: "float64" for column in dataset_schema[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY]}
+        load_dtypes.update({column: "object" for column in dataset_schema[DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY]})
+
         error_message = ""
-        for column in schema_type:
-            if column in dataframe.columns:
-                dataframe[column] = dataframe[column].astype(data_type)
-            else:
+        for column in load_dtypes:
+            if column not in dataframe_columns:
                 error_message = f"{error_message} \nColumn: [{column}] is not in the schema."
         if len(error_message) > 0:
             raise Exception(error_message)
-        return dataframe
+        return load_dtypes
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+def get_csv_parse_dtypes(load_dtypes: dict) -> dict:
+    """
+    dtypes given to read_csv, object columns are left out because read_csv would keep them as strings
+    """
+    return {column: dtype for column, dtype in load_dtypes.items() if dtype != "object"}
+
+def arrow_table_to_dataframe(table, load_dtypes: dict = None) -> pd.DataFrame:
+    """
+    converts an arrow table to a dataframe, numeric columns without nulls are wrapped without a copy
+    table: pyarrow Table
+    load_dtypes: {column: dtype} of the columns to cast, the other columns keep their stored type
+    """
+    try:
+        load_dtypes = load_dtypes or {}
+        column_dict = {}
+        for column in table.column_names:
+            chunked_array = table.column(column)
+            if chunked_array.null_count == 0 and chunked_array.num_chunks == 1:
+                values = chunked_array.chunk(0).to_numpy(zero_copy_only=False)
+            else:
+                values = chunked_array.to_pandas().to_numpy()
+            if column in load_dtypes:
+                values = values.astype(load_dtypes[column], copy=False)
+            column_dict[column] = values
+        return pd.DataFrame(column_dict, copy=False)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+def dataframe_to_arrow_table(dataframe: pd.DataFrame):
+    """
+    converts a dataframe to an arrow table with the column types of the dataframe, the missing values of
+    float columns are kept as nan values (not nulls) so they are loaded back without a copy
+    dataframe: pd.DataFrame data to be converted
+    """
+    try:
+        import pyarrow as pa
+        array_list = []
+        for column in dataframe.columns:
+            if pd.api.types.is_numeric_dtype(dataframe[column]):
+                array_list.append(pa.array(dataframe[column].to_numpy(), from_pandas=False))
+            else:
+                array_list.append(pa.array(dataframe[column], from_pandas=True))
+        return pa.Table.from_arrays(array_list, names=[str(column) for column in dataframe.columns])
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+def save_dataframe(file_path: str, dataframe: pd.DataFrame) -> str:
+    """
+    writes the dataframe as parquet or csv depending on the file extension.
+    In parquet files the column types of the dataframe are kept and the missing values of float columns are
+    stored as nan values (not nulls) so they are loaded back without a copy.
+    file_path: str .parquet or .csv file to write
+    dataframe: pd.DataFrame data to be saved
+    """
+    try:
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        if file_path.endswith(PARQUET_FILE_EXTENSION):
+            import pyarrow.parquet as pq
+            pq.write_table(dataframe_to_arrow_table(dataframe), file_path, row_group_size=max(len(dataframe), 1))
+        else:
+            dataframe.to_csv(file_path, index=False)
+        return file_path
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+def read_dataframe(file_path: str, columns: list = None) -> pd.DataFrame:
+    """
+    reads a parquet or csv file (depending on the extension) with the stored/inferred column types
+    file_path: str location to load data from
+    columns: list of the columns to read, all of them when None
+    """
+    try:
+        if file_path.endswith(PARQUET_FILE_EXTENSION):
+            import pyarrow.parquet as pq
+            return arrow_table_to_dataframe(pq.read_table(file_path, columns=columns))
+        return pd.read_csv(file_path, usecols=columns)
     except Exception as e:
         raise HeartRiskException(e, sys)
 
+def read_dataframe_chunks(file_path: str, chunk_size: int, columns: list = None):
+    """
+    same as read_dataframe but yields the file as dataframes of at most chunk_size rows
+    file_path: str location to load data from
+    chunk_size: int number of rows of each dataframe
+    columns: list of the columns to read, all of them when None
+    """
+    try:
+        if file_path.endswith(PARQUET_FILE_EXTENSION):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            for record_batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size, columns=columns):
+                yield arrow_table_to_dataframe(pa.Table.from_batches([record_batch]))
+            return
+        yield from pd.read_csv(file_path, usecols=columns, chunksize=chunk_size)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
+
+def count_rows(file_path: str, chunk_size: int = 100000) -> int:
+    """
+    number of rows of a parquet file (read from its metadata) or of a csv file
+    """
+    try:
+        if file_path.endswith(PARQUET_FILE_EXTENSION):
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(file_path).metadata.num_rows
+        first_column = pd.read_csv(file_path, nrows=0).columns[0]
+        return sum(len(chunk_df) for chunk_df in pd.read_csv(file_path, usecols=[first_column], chunksize=chunk_size))
+    except Exception as e:
+        raise HeartRiskException(e, sys)
 
 def load_data(file_path:str, schema_file_path: str) -> pd.DataFrame:
     """
     this function loads the data as per the given schema and raises an exception in case the dataframe doesn't 
-    match the given schema
+    match the given schema. Parquet files are converted from their arrow columns, csv files are parsed with
+    the numerical dtypes and the categorical columns cast once.
     file_path: str location to load data from
     schema_file_path: str file to check the specified column type and other properties
     """
     try:
-        dataset_schema = read_yaml_file(schema_file_path)
+        if file_path.endswith(PARQUET_FILE_EXTENSION):
+            import pyarrow.parquet as pq
+            table = pq.read_table(file_path)
+            load_dtypes = get_load_dtypes(dataframe_columns=table.column_names, schema_file_path=schema_file_path)
+            return arrow_table_to_dataframe(table, load_dtypes=load_dtypes)
 
-        schema_num_columns = dataset_schema[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY]
-        schema_cat_columns = dataset_schema[DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY]
-
-        dataframe = pd.read_csv(file_path)
+        load_dtypes = get_load_dtypes(dataframe_columns=pd.read_csv(file_path, nrows=0).columns,
+                                      schema_file_path=schema_file_path)
+        return pd.read_csv(file_path, dtype=get_csv_parse_dtypes(load_dtypes)).astype(load_dtypes)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
 
-        error_message = ""
+def load_data_chunks(file_path: str, schema_file_path: str, chunk_size: int):
+    """
+    same as load_data but yields the file as dataframes of at most chunk_size rows,
+    so files bigger than the memory can be processed
+    file_path: str location to load data from
+    schema_file_path: str file to check the specified column type and other properties
+    chunk_size: int number of rows of each dataframe
+    """
+    try:
+        if file_path.endswith(PARQUET_FILE_EXTENSION):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(file_path)
+            load_dtypes = get_load_dtypes(dataframe_columns=parquet_file.schema_arrow.names,
+                                          schema_file_path=schema_file_path)
+            for record_batch in parquet_file.iter_batches(batch_size=chunk_size):
+                yield arrow_table_to_dataframe(pa.Table.from_batches([record_batch]), load_dtypes=load_dtypes)
+            return
 
-        dataframe = load_data_helper(dataframe=dataframe, schema_type=schema_num_columns, data_type="float")
-        dataframe = load_data_helper(dataframe=dataframe, schema_type=schema_cat_columns, data_type="object")
-        
-        return dataframe
+        load_dtypes = get_load_dtypes(dataframe_columns=pd.read_csv(file_path, nrows=0).columns,
+                                      schema_file_path=schema_file_path)
+        for dataframe in pd.read_csv(file_path, dtype=get_csv_parse_dtypes(load_dtypes), chunksize=chunk_size):
+            yield dataframe.astype(load_dtypes)
     except Exception as e:
         raise HeartRiskException(e, sys)
 
@@ -80,13 +224,16 @@ def save_numpy_array_data(file_path:str, array:np.array):
     except Exception as e:
         raise HeartRiskException(e, sys)
 
-def numpy_array_data(file_path: str) -> np.array:
+def numpy_array_data(file_path: str, mmap_mode: str = None) -> np.array:
     """
     loads the numpy array from a file
     file_path: str location of file to load
+    mmap_mode: str passed to np.load, 'r' maps the file instead of reading it in memory
     return: np.array data loaded
     """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, 'rb') as file_obj:
             return np.load(file_obj)
     except Exception as e:
@@ -104,4 +251,16 @@ def save_object(file_path: str, obj):
         with open(file_path, 'wb') as file_obj:
             dill.dump(obj, file_obj)
     except Exception as e:
-        raise HeartRiskException(e, sys)
\ No newline at end of file
+        raise HeartRiskException(e, sys)
+
+def load_object(file_path: str):
+    """
+    load an object saved with save_object
+    file_path: str location of the file to load
+    return: the object that was saved
+    """
+    try:
+        with open(file_path, 'rb') as file_obj:
+            return dill.load(file_obj)
+    except Exception as e:
+        raise HeartRiskException(e, sys)
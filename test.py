@@ -12,6 +12,8 @@ def main():
     try:
         pipeline = Pipeline()
         pipeline.start()
+        #the pools of the stages can only take work while the interpreter runs, the main thread waits for the run
+        pipeline.join()
         logging.info("main function execution completed.")
     except Exception as e:
         logging.error(f"{e}")
@@ -0,0 +1,35 @@
+import os
+import pytest
+import pandas as pd
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import read_yaml_file
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILE_PATH = os.path.join(ROOT_DIR, "config", "schema.yaml")
+DATASET_FILE_PATH = os.path.join(ROOT_DIR, "experiment", "framingham.csv")
+
+
+@pytest.fixture(scope="session")
+def schema_file_path() -> str:
+    return SCHEMA_FILE_PATH
+
+
+@pytest.fixture(scope="session")
+def schema(schema_file_path) -> dict:
+    return read_yaml_file(config_file_path=schema_file_path)
+
+
+@pytest.fixture(scope="session")
+def dataset_df() -> pd.DataFrame:
+    """
+    the framingham dataset shipped in experiment/, missing values included
+    """
+    return pd.read_csv(DATASET_FILE_PATH)
+
+
+@pytest.fixture(scope="session")
+def feature_columns(schema) -> tuple:
+    """
+    (numerical columns, categorical columns) of schema.yaml
+    """
+    return schema[DATA_VALIDATION_GET_NUMERICAL_COLUMN_KEY], schema[DATA_VALIDATION_GET_CATEGORICAL_COLUMN_KEY]
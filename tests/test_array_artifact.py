@@ -0,0 +1,48 @@
+import json
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.utils.array_artifact import (ARRAY_ARTIFACT_MANIFEST_FILE_NAME, ArrayModel,
+                                                                          ArrayPreprocessor, is_array_model_supported,
+                                                                          load_array_artifact, save_array_model,
+                                                                          save_array_preprocessor)
+from tests.utils import fit_preprocessing_and_model, get_model_input
+
+
+@pytest.mark.parametrize("model", [LogisticRegression(max_iter=1000), GaussianNB()], ids=lambda model: type(model).__name__)
+def test_loaded_artifacts_match_sklearn(tmp_path, dataset_df, schema, feature_columns, model):
+    preprocessing_obj, model = fit_preprocessing_and_model(train_df=dataset_df.iloc[:3000], feature_columns=feature_columns,
+                                                           target_column=schema["target_column"],
+                                                           numerical_imputer=SimpleImputer(strategy="median"), model=model)
+    array_preprocessor = load_array_artifact(save_array_preprocessor(str(tmp_path / "preprocessor"), preprocessing_obj))
+    array_model = load_array_artifact(save_array_model(str(tmp_path / "model"), model))
+    assert isinstance(array_preprocessor, ArrayPreprocessor) and isinstance(array_model, ArrayModel)
+    #the arrays are mapped from the files, not read
+    assert all(isinstance(array, np.memmap) for array in array_model.arrays.values())
+
+    input_df = get_model_input(dataset_df.iloc[3000:], *feature_columns)
+    transformed_arr = preprocessing_obj.transform(input_df)
+    np.testing.assert_allclose(array_preprocessor.transform(input_df), transformed_arr, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(array_model.predict_proba(transformed_arr), model.predict_proba(transformed_arr),
+                               rtol=0, atol=1e-9)
+
+
+def test_unsupported_model_and_format_version(tmp_path, dataset_df, schema, feature_columns):
+    _, model = fit_preprocessing_and_model(train_df=dataset_df.iloc[:500], feature_columns=feature_columns,
+                                           target_column=schema["target_column"],
+                                           numerical_imputer=SimpleImputer(strategy="median"),
+                                           model=LogisticRegression(max_iter=1000))
+    assert not is_array_model_supported(RandomForestClassifier())
+    artifact_dir = save_array_model(str(tmp_path / "model"), model)
+    manifest_file_path = os.path.join(artifact_dir, ARRAY_ARTIFACT_MANIFEST_FILE_NAME)
+    with open(manifest_file_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    with open(manifest_file_path, "w") as manifest_file:
+        json.dump(dict(manifest, format_version=manifest["format_version"] + 1), manifest_file)
+    with pytest.raises(HeartRiskException, match="Unsupported array artifact format version"):
+        load_array_artifact(artifact_dir)
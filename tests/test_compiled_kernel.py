@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.impute import KNNImputer, SimpleImputer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import GaussianNB
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.utils.compiled_kernel import compile_kernel
+from src.Heart_Attack_Risk_Analyzer_Project.utils.knn_imputer import ReferenceKNNImputer
+from tests.utils import fit_preprocessing_and_model, get_model_input
+
+MODEL_LIST = [LogisticRegression(max_iter=1000),
+              SGDClassifier(loss="log_loss", random_state=42),
+              GaussianNB()]
+NUMERICAL_IMPUTER_LIST = [SimpleImputer(strategy="median"), ReferenceKNNImputer(n_neighbors=5)]
+
+
+def get_fitted_objects(dataset_df, schema, feature_columns, numerical_imputer, model) -> tuple:
+    return fit_preprocessing_and_model(train_df=dataset_df.iloc[:3000], feature_columns=feature_columns,
+                                       target_column=schema["target_column"], numerical_imputer=numerical_imputer,
+                                       model=model)
+
+
+@pytest.mark.parametrize("model", MODEL_LIST, ids=lambda model: type(model).__name__)
+@pytest.mark.parametrize("numerical_imputer", NUMERICAL_IMPUTER_LIST, ids=lambda imputer: type(imputer).__name__)
+def test_kernel_matches_sklearn(dataset_df, schema, feature_columns, numerical_imputer, model):
+    preprocessing_obj, model = get_fitted_objects(dataset_df, schema, feature_columns, numerical_imputer, model)
+    kernel = compile_kernel(preprocessing_obj=preprocessing_obj, model=model)
+
+    #rows not seen in the fit, with missing values in both column kinds
+    score_df = dataset_df.iloc[3000:]
+    assert score_df[kernel.input_columns].isna().any(axis=0).sum() > 2
+    sklearn_probability = model.predict_proba(preprocessing_obj.transform(get_model_input(score_df, *feature_columns)))
+    kernel_probability = kernel.predict_proba(kernel.get_input_array(score_df))
+
+    np.testing.assert_allclose(kernel_probability, sklearn_probability, rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(kernel.predict(kernel.get_input_array(score_df)),
+                                  model.classes_[np.argmax(sklearn_probability, axis=1)])
+
+
+def test_kernel_record_matches_batch(dataset_df, schema, feature_columns):
+    preprocessing_obj, model = get_fitted_objects(dataset_df, schema, feature_columns,
+                                                  SimpleImputer(strategy="median"), LogisticRegression(max_iter=1000))
+    kernel = compile_kernel(preprocessing_obj=preprocessing_obj, model=model)
+    score_df = dataset_df.iloc[3000:3050]
+    batch_probability = kernel.predict_proba(kernel.get_input_array(score_df))
+    for position, record in enumerate(score_df.astype(object).where(score_df.notna(), None).to_dict("records")):
+        np.testing.assert_allclose(kernel.predict_proba(kernel.get_record_array(record))[0], batch_probability[position],
+                                   rtol=0, atol=1e-12)
+
+
+def test_kernel_handles_unknown_category(dataset_df, schema, feature_columns):
+    preprocessing_obj, model = get_fitted_objects(dataset_df, schema, feature_columns,
+                                                  SimpleImputer(strategy="median"), LogisticRegression(max_iter=1000))
+    kernel = compile_kernel(preprocessing_obj=preprocessing_obj, model=model)
+    score_df = dataset_df.iloc[3000:3100].copy()
+    #a category not seen in the fit is encoded as all zeros by handle_unknown ignore
+    score_df["education"] = 9.0
+    sklearn_probability = model.predict_proba(preprocessing_obj.transform(get_model_input(score_df, *feature_columns)))
+    np.testing.assert_allclose(kernel.predict_proba(kernel.get_input_array(score_df)), sklearn_probability,
+                               rtol=0, atol=1e-9)
+
+
+def test_kernel_is_not_compiled_from_plain_knn_imputer(dataset_df, schema, feature_columns):
+    #the training rows of sklearn KNNImputer are private, the predictor keeps the sklearn path for it
+    preprocessing_obj, model = get_fitted_objects(dataset_df, schema, feature_columns,
+                                                  KNNImputer(n_neighbors=5), LogisticRegression(max_iter=1000))
+    with pytest.raises(HeartRiskException, match="fit a ReferenceKNNImputer"):
+        compile_kernel(preprocessing_obj=preprocessing_obj, model=model)
@@ -0,0 +1,54 @@
+import os
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from tests.utils import get_config_info, write_config_file
+
+
+def write_run_artifacts(config_file_path: str, time_stamp: str, with_model: bool = True,
+                        with_preprocessor: bool = True) -> None:
+    """
+    empty files at the places a pipeline run of time_stamp writes its prediction artifacts
+    """
+    run_config = Config(config_file_path=config_file_path, current_time_stamp=time_stamp)
+    data_transformation_config = run_config.get_data_transformation_config()
+    model_trainer_config = run_config.get_model_trainer_config()
+    file_path_list = []
+    if with_preprocessor:
+        file_path_list.append(data_transformation_config.preprocessed_object_file_path)
+        os.makedirs(data_transformation_config.preprocessed_array_dir)
+    if with_model:
+        file_path_list.append(model_trainer_config.trained_model_file_path)
+        os.makedirs(model_trainer_config.model_array_dir)
+    for file_path in file_path_list:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        open(file_path, "w").close()
+
+
+@pytest.fixture
+def config_file_path(tmp_path) -> str:
+    return write_config_file(tmp_path, get_config_info(tmp_path))
+
+
+def test_prediction_artifacts_come_from_the_run_of_the_model(config_file_path):
+    write_run_artifacts(config_file_path, "2024-01-01-00-00-00")
+    #the model of the later run was rejected, its preprocessing object must not be paired with the older model
+    write_run_artifacts(config_file_path, "2024-01-02-00-00-00", with_model=False)
+    prediction_config = Config(config_file_path=config_file_path).get_prediction_config()
+    for file_path in [prediction_config.preprocessed_object_file_path, prediction_config.trained_model_file_path,
+                      prediction_config.preprocessed_array_dir, prediction_config.model_array_dir]:
+        assert os.sep + "2024-01-01-00-00-00" + os.sep in file_path
+
+
+def test_model_without_preprocessing_object(config_file_path):
+    write_run_artifacts(config_file_path, "2024-01-01-00-00-00")
+    write_run_artifacts(config_file_path, "2024-01-02-00-00-00", with_preprocessor=False)
+    with pytest.raises(HeartRiskException, match="No preprocessing object found"):
+        Config(config_file_path=config_file_path).get_prediction_config()
+
+
+def test_no_trained_model(config_file_path):
+    prediction_config = Config(config_file_path=config_file_path).get_prediction_config()
+    assert prediction_config.trained_model_file_path is None
+    assert prediction_config.preprocessed_object_file_path is None
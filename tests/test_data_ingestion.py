@@ -0,0 +1,58 @@
+import os
+import pandas as pd
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.component.data_ingestion import DataIngestion
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from tests.utils import get_config_info, write_config_file
+
+
+def get_config(tmp_path, run_name: str, source_info: dict, multi_file: bool = False) -> Config:
+    """
+    config.yaml of the repository with a local source, the artifacts under tmp_path and deduplication on
+    """
+    config_info = get_config_info(tmp_path)
+    data_ingestion_info = config_info["data_ingestion_config"]
+    data_ingestion_info["source"] = dict(data_ingestion_info["source"], **source_info)
+    data_ingestion_info["multi_file"] = multi_file
+    data_ingestion_info["deduplication"]["enabled"] = True
+    return Config(config_file_path=write_config_file(tmp_path, config_info), current_time_stamp=run_name)
+
+
+def ingest(config: Config) -> pd.DataFrame:
+    """
+    rows of the train and test splits of an ingestion
+    """
+    data_ingestion_artifact = DataIngestion(data_ingestion_config=config.get_data_ingestion_config()).initiate_data_ingestion()
+    return pd.concat([pd.read_parquet(data_ingestion_artifact.train_file_path),
+                      pd.read_parquet(data_ingestion_artifact.test_file_path)])
+
+
+@pytest.mark.parametrize("split_method", ["hash", "shuffle"])
+def test_grown_file_is_ingested_whole(tmp_path, dataset_df, split_method):
+    dataset_file_path = tmp_path / "framingham.csv"
+    source_info = {"type": "local_file", "path": str(dataset_file_path)}
+    dataset_df.iloc[:3000].to_csv(dataset_file_path, index=False)
+    config = get_config(tmp_path, "run-1", source_info)
+    config.config_info["data_ingestion_config"]["split"]["method"] = split_method
+    assert len(ingest(config)) == 3000
+
+    #the file is published again with more rows, the rows of the first version stay in the splits
+    dataset_df.to_csv(dataset_file_path, index=False)
+    config = get_config(tmp_path, "run-2", source_info)
+    config.config_info["data_ingestion_config"]["split"]["method"] = split_method
+    ingested_df = ingest(config)
+    assert len(ingested_df) == len(dataset_df.drop_duplicates())
+
+
+def test_rows_repeated_across_files_are_dropped(tmp_path, dataset_df):
+    dataset_dir = tmp_path / "daily"
+    os.makedirs(dataset_dir)
+    source_info = {"type": "local_dir", "path": str(dataset_dir)}
+    dataset_df.iloc[0:2000].to_csv(dataset_dir / "day-1.csv", index=False)
+    dataset_df.iloc[1500:3000].to_csv(dataset_dir / "day-2.csv", index=False)
+    assert len(ingest(get_config(tmp_path, "run-1", source_info, multi_file=True))) == 3000
+
+    #a new day repeating rows of both earlier days only adds its own rows, the earlier days keep theirs
+    pd.concat([dataset_df.iloc[2500:3500], dataset_df.iloc[100:200]]).to_csv(dataset_dir / "day-3.csv", index=False)
+    assert len(ingest(get_config(tmp_path, "run-2", source_info, multi_file=True))) == 3500
+    assert len(ingest(get_config(tmp_path, "run-3", source_info, multi_file=True))) == 3500
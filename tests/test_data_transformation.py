@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.component.data_transformation import DataTransformation, ReSampling
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataValidationArtifact
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import load_data
+from tests.utils import get_config_info, write_config_file
+
+TRAIN_ROWS = 1000
+CHUNK_SIZE = 128
+
+
+@pytest.fixture(scope="module")
+def train_file_path(tmp_path_factory, dataset_df) -> str:
+    train_file_path = str(tmp_path_factory.mktemp("ingested") / "train.csv")
+    dataset_df.iloc[:TRAIN_ROWS].to_csv(train_file_path, index=False)
+    return train_file_path
+
+
+def get_data_transformation(tmp_path, schema_file_path: str, **config_info) -> DataTransformation:
+    config = Config(config_file_path=write_config_file(tmp_path, get_config_info(tmp_path)))
+    data_validation_artifact = DataValidationArtifact(*[None] * len(DataValidationArtifact._fields))._replace(
+        schema_file_path=schema_file_path)
+    return DataTransformation(data_ingestion_artifact=None, data_validation_artifact=data_validation_artifact,
+                              data_transformation_config=config.get_data_transformation_config()._replace(**config_info))
+
+
+def test_streaming_transformation_matches_in_memory(tmp_path, schema_file_path, schema, train_file_path):
+    #every row is in the KNN reference sample, the chunks only change how the statistics are summed up
+    data_transformation = get_data_transformation(tmp_path, schema_file_path, chunk_size=CHUNK_SIZE,
+                                                  knn_reference_sample_size=TRAIN_ROWS)
+    transformed_file_path = str(tmp_path / "transformed" / "train.npy")
+    preprocessing_obj = data_transformation.fit_transform_to_memmap(file_path=train_file_path, schema_file_path=schema_file_path,
+                                                                    target_column_name=schema["target_column"],
+                                                                    transformed_file_path=transformed_file_path)
+    streamed_arr = np.load(transformed_file_path, mmap_mode="r")
+
+    train_df = load_data(file_path=train_file_path, schema_file_path=schema_file_path)
+    in_memory_arr = data_transformation.get_data_transformer_object().fit_transform(train_df)
+    assert streamed_arr.shape == (TRAIN_ROWS, in_memory_arr.shape[1] + 1)
+    np.testing.assert_allclose(streamed_arr[:, :-1], in_memory_arr, rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(streamed_arr[:, -1], train_df[schema["target_column"]].astype(float).to_numpy())
+    #the saved object transforms the rows as they were streamed
+    np.testing.assert_allclose(preprocessing_obj.transform(train_df), in_memory_arr, rtol=0, atol=1e-9)
+
+
+@pytest.fixture(scope="module")
+def train_arr(dataset_df, schema) -> np.ndarray:
+    """
+    complete rows of the numerical columns with the target last, about one minority row in six
+    """
+    complete_df = dataset_df.dropna().iloc[:TRAIN_ROWS]
+    return np.c_[complete_df[schema["numerical_columns"]].to_numpy(dtype=float),
+                 complete_df[schema["target_column"]].to_numpy(dtype=float)]
+
+
+@pytest.mark.parametrize("strategy", [SMOTE_RESAMPLING_STRATEGY, ADASYN_RESAMPLING_STRATEGY, SMOTE_ADASYN_RESAMPLING_STRATEGY])
+def test_new_rows_are_made_between_minority_rows(train_arr, strategy):
+    resampled_arr = ReSampling(strategy=strategy, sampling_ratio=0.8, random_state=42).fit_transform(train_arr)
+    #the input rows come first, unchanged
+    np.testing.assert_array_equal(resampled_arr[:len(train_arr)], train_arr)
+    class_counts = np.unique(resampled_arr[:, -1], return_counts=True)[1]
+    assert class_counts.min() == int(0.8 * class_counts.max())
+    minority_arr = train_arr[train_arr[:, -1] == 1]
+    new_arr = resampled_arr[len(train_arr):]
+    assert (new_arr[:, -1] == 1).all()
+    assert (new_arr[:, :-1] >= minority_arr[:, :-1].min(axis=0)).all()
+    assert (new_arr[:, :-1] <= minority_arr[:, :-1].max(axis=0)).all()
+
+
+def test_target_column_index(train_arr):
+    resampling = ReSampling(random_state=42)
+    moved_arr = np.roll(train_arr, 1, axis=1)
+    np.testing.assert_array_equal(ReSampling(random_state=42, target_column_index=0).fit_transform(moved_arr),
+                                  np.roll(resampling.fit_transform(train_arr), 1, axis=1))
+
+
+def test_only_the_training_array_is_resampled(train_arr):
+    resampling = ReSampling(random_state=42).fit(train_arr)
+    assert resampling.transform(train_arr) is train_arr
+    assert ReSampling(strategy=NO_RESAMPLING_STRATEGY).fit_transform(train_arr).shape == train_arr.shape
+    with pytest.raises(HeartRiskException, match="is not supported"):
+        ReSampling(strategy="random").fit_transform(train_arr)
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.component.data_ingestion import DataIngestion
+from src.Heart_Attack_Risk_Analyzer_Project.component.data_validation import DataValidation, InlineExecutor
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from tests.utils import get_config_info, write_config_file
+
+
+@pytest.fixture(scope="module")
+def config_file_path(tmp_path_factory) -> str:
+    tmp_path = tmp_path_factory.mktemp("validation")
+    return write_config_file(tmp_path, get_config_info(tmp_path))
+
+
+@pytest.fixture(scope="module")
+def data_ingestion_artifact(config_file_path):
+    config = Config(config_file_path=config_file_path, current_time_stamp="ingestion")
+    return DataIngestion(data_ingestion_config=config.get_data_ingestion_config()).initiate_data_ingestion()
+
+
+def get_data_validation(config_file_path: str, data_ingestion_artifact, time_stamp: str, **config_info) -> DataValidation:
+    config = Config(config_file_path=config_file_path, current_time_stamp=time_stamp)
+    config.config_info[DATA_VALIDATION_CONFIG_KEY].update(config_info)
+    return DataValidation(data_validation_config=config.get_data_validation_config(),
+                          data_ingestion_artifiact=data_ingestion_artifact)
+
+
+@pytest.mark.parametrize("executor", [THREAD_VALIDATION_EXECUTOR, PROCESS_VALIDATION_EXECUTOR])
+def test_checks_pass_and_write_the_reports(config_file_path, data_ingestion_artifact, executor):
+    data_validation = get_data_validation(config_file_path, data_ingestion_artifact, f"run-{executor}",
+                                          executor=executor, n_workers=4)
+    data_validation_artifact = data_validation.initiate_data_validation()
+    for file_path in [data_validation_artifact.report_file_path, data_validation_artifact.tests_file_path,
+                      data_validation_artifact.reference_profile_file_path]:
+        assert os.path.exists(file_path)
+
+
+@pytest.mark.parametrize("inline", [False, True], ids=["pool", "inline"])
+def test_failed_check_stops_the_running_checks(monkeypatch, config_file_path, data_ingestion_artifact, inline):
+    data_validation = get_data_validation(config_file_path, data_ingestion_artifact, f"failing-{inline}", n_workers=4)
+    #every check is running when the schema check fails, the splits take a moment to load
+    get_train_and_test_df = data_validation.get_train_and_test_df
+    def get_train_and_test_df_slowly():
+        time.sleep(0.2)
+        return get_train_and_test_df()
+    def fail_schema_check():
+        raise Exception("schema check failed")
+    monkeypatch.setattr(data_validation, "get_train_and_test_df", get_train_and_test_df_slowly)
+    monkeypatch.setattr(data_validation, "check_file_and_schema", fail_schema_check)
+    if inline:
+        monkeypatch.setattr(data_validation, "get_validation_executor", InlineExecutor)
+
+    with pytest.raises(HeartRiskException, match="schema check failed"):
+        data_validation.check_data_and_get_paths()
+    for thread in threading.enumerate():
+        if thread.name.startswith("validation"):
+            thread.join()
+    #the drift report and the test suite stopped before writing anything
+    assert not os.path.exists(os.path.dirname(data_validation.data_validation_config.report_file_path))
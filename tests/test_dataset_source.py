@@ -0,0 +1,69 @@
+import os
+import zipfile
+import pandas as pd
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.utils.dataset_source import (DatasetCache, HttpMirrorSource, get_dataset_source,
+                                                                          get_file_sha256, read_dataset_file)
+from tests.conftest import DATASET_FILE_PATH
+
+ZIP_FILE_NAME = "heart.zip"
+
+
+@pytest.fixture(scope="module")
+def zip_file_path(tmp_path_factory) -> str:
+    """
+    the dataset of experiment/ in a zip archive, like the kaggle download
+    """
+    zip_file_path = str(tmp_path_factory.mktemp("mirror") / ZIP_FILE_NAME)
+    with zipfile.ZipFile(zip_file_path, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.write(DATASET_FILE_PATH, arcname=os.path.basename(DATASET_FILE_PATH))
+    return zip_file_path
+
+
+def get_http_source(zip_file_path: str, **source_info) -> HttpMirrorSource:
+    source_info = {DATASET_SOURCE_TYPE_KEY: HTTP_DATASET_SOURCE, DATASET_SOURCE_URL_KEY: f"file://{zip_file_path}", **source_info}
+    return get_dataset_source(source_info=source_info, file_name=ZIP_FILE_NAME)
+
+
+def test_cached_archive_is_not_fetched_again(monkeypatch, tmp_path, zip_file_path):
+    dataset_cache = DatasetCache(cache_dir=str(tmp_path / "cache"))
+    cached_file_path, sha256 = dataset_cache.get_file(get_http_source(zip_file_path))
+    assert sha256 == get_file_sha256(zip_file_path)
+
+    def fetch_offline(self, file_path):
+        raise Exception("no network")
+    monkeypatch.setattr(HttpMirrorSource, "fetch", fetch_offline)
+    assert dataset_cache.get_file(get_http_source(zip_file_path)) == (cached_file_path, sha256)
+    #a changed archive does not match its record and has to be fetched
+    with open(cached_file_path, "ab") as cached_file:
+        cached_file.write(b"0")
+    with pytest.raises(HeartRiskException, match="no network"):
+        dataset_cache.get_file(get_http_source(zip_file_path))
+
+
+def test_archive_with_another_checksum_is_rejected(tmp_path, zip_file_path):
+    dataset_cache = DatasetCache(cache_dir=str(tmp_path / "cache"))
+    with pytest.raises(HeartRiskException):
+        dataset_cache.get_file(get_http_source(zip_file_path, **{DATASET_SOURCE_SHA256_KEY: "0" * 64}))
+    assert not os.path.exists(tmp_path / "cache" / ZIP_FILE_NAME)
+
+
+def test_archive_is_read_without_extraction(zip_file_path):
+    pd.testing.assert_frame_equal(read_dataset_file(zip_file_path), pd.read_csv(DATASET_FILE_PATH))
+
+
+def test_archive_is_extracted_once(tmp_path, zip_file_path):
+    dataset_cache = DatasetCache(cache_dir=str(tmp_path / "cache"))
+    sha256 = get_file_sha256(zip_file_path)
+    extracted_dir = dataset_cache.get_extracted_dir(zip_file_path, sha256)
+    extracted_file_path = os.path.join(extracted_dir, os.path.basename(DATASET_FILE_PATH))
+    modified_time = os.path.getmtime(extracted_file_path)
+    assert dataset_cache.get_extracted_dir(zip_file_path, sha256) == extracted_dir
+    assert os.path.getmtime(extracted_file_path) == modified_time
+
+
+def test_unknown_source_type():
+    with pytest.raises(HeartRiskException, match="is not supported"):
+        get_dataset_source(source_info={DATASET_SOURCE_TYPE_KEY: "ftp"})
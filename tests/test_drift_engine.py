@@ -0,0 +1,68 @@
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.utils.drift_engine import build_drift_reference, get_drift_report
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import load_data
+
+evidently_report = pytest.importorskip("evidently.report")
+evidently_presets = pytest.importorskip("evidently.metric_preset")
+
+DRIFT_SHARE = 0.5
+
+
+@pytest.fixture(scope="module")
+def split_df_tuple(tmp_path_factory, dataset_df, schema_file_path) -> tuple:
+    """
+    (train, test) read back with load_data, the column types the validation stage checks for drift
+    """
+    split_dir = tmp_path_factory.mktemp("split")
+    dataset_df.iloc[:3400].to_csv(split_dir / "train.csv", index=False)
+    dataset_df.iloc[3400:].to_csv(split_dir / "test.csv", index=False)
+    return (load_data(file_path=str(split_dir / "train.csv"), schema_file_path=schema_file_path),
+            load_data(file_path=str(split_dir / "test.csv"), schema_file_path=schema_file_path))
+
+
+def get_shifted_df(dataframe):
+    shifted_df = dataframe.copy()
+    shifted_df["age"] = shifted_df["age"] + 6
+    shifted_df["sysBP"] = shifted_df["sysBP"] * 1.2
+    shifted_df["glucose"] = shifted_df["glucose"] * 1.3
+    shifted_df["BMI"] = shifted_df["BMI"] + 4
+    return shifted_df
+
+
+def assert_same_drift(reference_df, current_df, feature_columns):
+    numerical_columns, categorical_columns = feature_columns
+    native_report = get_drift_report(drift_reference=build_drift_reference(dataframe=reference_df,
+                                                                           numerical_columns=numerical_columns,
+                                                                           categorical_columns=categorical_columns),
+                                     current_df=current_df, drift_share=DRIFT_SHARE)
+    report = evidently_report.Report(metrics=[evidently_presets.DataDriftPreset(drift_share=DRIFT_SHARE)])
+    report.run(reference_data=reference_df, current_data=current_df)
+    evidently_report_json = report.as_dict()
+
+    assert native_report["metrics"][0]["result"]["dataset_drift"] == evidently_report_json["metrics"][0]["result"]["dataset_drift"]
+    native_columns = native_report["metrics"][1]["result"]["drift_by_columns"]
+    evidently_columns = evidently_report_json["metrics"][1]["result"]["drift_by_columns"]
+    assert set(native_columns) == set(evidently_columns)
+    for column, evidently_column in evidently_columns.items():
+        assert native_columns[column]["stattest_name"] == evidently_column["stattest_name"], column
+        assert native_columns[column]["drift_score"] == pytest.approx(evidently_column["drift_score"], abs=1e-9), column
+        assert native_columns[column]["drift_detected"] == evidently_column["drift_detected"], column
+    return native_report
+
+
+def test_native_engine_matches_evidently_on_the_split(split_df_tuple, feature_columns):
+    train_df, test_df = split_df_tuple
+    assert_same_drift(train_df, test_df, feature_columns)
+
+
+def test_native_engine_matches_evidently_on_shifted_data(split_df_tuple, feature_columns):
+    train_df, test_df = split_df_tuple
+    native_report = assert_same_drift(train_df, get_shifted_df(test_df), feature_columns)
+    assert native_report["metrics"][1]["result"]["number_of_drifted_columns"] >= 4
+
+
+def test_native_engine_matches_evidently_on_a_small_reference(split_df_tuple, feature_columns):
+    #at most 1000 reference rows the p value tests (ks, chi-square, z) are used instead of the distances
+    train_df, test_df = split_df_tuple
+    assert_same_drift(train_df.iloc[:800], test_df.iloc[:300], feature_columns)
+    assert_same_drift(train_df.iloc[:800], get_shifted_df(test_df.iloc[:300]), feature_columns)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+from src.Heart_Attack_Risk_Analyzer_Project.entity import parallel_search
+from src.Heart_Attack_Risk_Analyzer_Project.entity.halving_search import SuccessiveHalvingSearch, prune_invalid_candidates
+from src.Heart_Attack_Risk_Analyzer_Project.entity.model_factory import InitializedModelDetail
+
+
+@pytest.fixture(scope="module")
+def training_data(dataset_df, schema):
+    complete_df = dataset_df.dropna().iloc[:1500]
+    input_feature = complete_df.drop(columns=schema["target_column"]).to_numpy(dtype=float)
+    input_feature = (input_feature - input_feature.mean(axis=0)) / input_feature.std(axis=0)
+    return input_feature, complete_df[schema["target_column"]].to_numpy()
+
+
+def get_initialized_model_list() -> list:
+    return [InitializedModelDetail(model_serial_number="module_0", model=LogisticRegression(max_iter=500), model_name="lr",
+                                   param_grid_search={"C": [0.01, 0.1, 1, 10], "solver": ["lbfgs", "liblinear"],
+                                                      "penalty": ["l1", "l2"]}),
+            InitializedModelDetail(model_serial_number="module_1", model=GaussianNB(), model_name="nb",
+                                   param_grid_search={"var_smoothing": [1e-9, 1e-5, 1e-2, 1e-1]})]
+
+
+def get_search(n_workers: int) -> SuccessiveHalvingSearch:
+    return SuccessiveHalvingSearch(n_workers=n_workers, cv=3, factor=2, min_resources=150, early_rejection_margin=0.02)
+
+
+def test_invalid_candidates_are_pruned():
+    candidate_params = [{"solver": "lbfgs", "penalty": "l1"}, {"solver": "liblinear", "penalty": "l1"},
+                        {"solver": "saga", "penalty": "elasticnet", "l1_ratio": None}, {"solver": "lbfgs", "penalty": "l2"}]
+    assert prune_invalid_candidates(LogisticRegression(), candidate_params) == [candidate_params[1], candidate_params[3]]
+
+
+def test_workers_are_started_once_per_search(monkeypatch, training_data):
+    started_pool_list = []
+
+    class CountedProcessPoolExecutor(parallel_search.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            started_pool_list.append(self)
+
+    monkeypatch.setattr(parallel_search, "ProcessPoolExecutor", CountedProcessPoolExecutor)
+    result_list = get_search(n_workers=2).search(get_initialized_model_list(), *training_data)
+    #every rung of both models ran on the same pool, with the results of the in process search
+    assert len(started_pool_list) == 1
+    in_process_result_list = get_search(n_workers=1).search(get_initialized_model_list(), *training_data)
+    for result, in_process_result in zip(result_list, in_process_result_list):
+        assert result.best_parameters == in_process_result.best_parameters
+        assert result.best_score == pytest.approx(in_process_result.best_score, abs=1e-12)
+    assert parallel_search._WORKER_DATA == {}
+
+
+def test_rung_folds_index_the_full_data(training_data):
+    input_feature, output_feature = training_data
+    search = get_search(n_workers=1)
+    resource_schedule = search.get_resource_schedule(n_samples=len(output_feature), n_candidates=8, n_splits=3, n_classes=2)
+    rung_folds_list = search.get_rung_folds_list(resource_schedule, output_feature, classifier=True)
+    assert resource_schedule[-1] == len(output_feature)
+    for n_resources, rung_folds in zip(resource_schedule, rung_folds_list):
+        rung_index = np.unique(np.concatenate(rung_folds[0]))
+        assert len(rung_index) == n_resources
+        assert np.array_equal(rung_index, search.get_subsample_index(output_feature, n_resources, classifier=True))
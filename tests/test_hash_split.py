@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.utils.hash_split import get_row_hash, get_test_mask, hash_split_chunks
+
+TEST_SIZE = 0.2
+
+
+def get_feature_columns(dataframe: pd.DataFrame, schema: dict) -> list:
+    return [column for column in dataframe.columns if column != schema["target_column"]]
+
+
+def get_synthetic_df(rows: int, positive_share: float, seed: int = 0) -> pd.DataFrame:
+    """
+    distinct rows with an imbalanced binary target, enough of them for tight share checks
+    """
+    random_state = np.random.RandomState(seed)
+    return pd.DataFrame({"id": np.arange(rows),
+                         "age": random_state.randint(30, 70, rows),
+                         "glucose": random_state.normal(80, 20, rows),
+                         "target": (random_state.rand(rows) < positive_share).astype(int)})
+
+
+def test_split_is_deterministic(dataset_df, schema):
+    hash_columns = get_feature_columns(dataset_df, schema)
+    test_mask = get_test_mask(dataframe=dataset_df, hash_columns=hash_columns, test_size=TEST_SIZE, seed=42)
+    np.testing.assert_array_equal(get_test_mask(dataframe=dataset_df.copy(), hash_columns=hash_columns,
+                                                test_size=TEST_SIZE, seed=42), test_mask)
+    #another seed is another split
+    assert (get_test_mask(dataframe=dataset_df, hash_columns=hash_columns, test_size=TEST_SIZE, seed=7) != test_mask).any()
+
+
+def test_split_of_a_row_does_not_depend_on_the_other_rows(dataset_df, schema):
+    hash_columns = get_feature_columns(dataset_df, schema)
+    test_mask = pd.Series(get_test_mask(dataframe=dataset_df, hash_columns=hash_columns, test_size=TEST_SIZE, seed=42),
+                          index=dataset_df.index)
+    #shuffled rows and a subset of the rows keep the split of every row
+    shuffled_df = dataset_df.sample(frac=1.0, random_state=0)
+    shuffled_mask = get_test_mask(dataframe=shuffled_df, hash_columns=hash_columns, test_size=TEST_SIZE, seed=42)
+    np.testing.assert_array_equal(shuffled_mask, test_mask.loc[shuffled_df.index].to_numpy())
+    subset_df = dataset_df.iloc[1000:1500]
+    np.testing.assert_array_equal(get_test_mask(dataframe=subset_df, hash_columns=hash_columns, test_size=TEST_SIZE, seed=42),
+                                  test_mask.iloc[1000:1500].to_numpy())
+
+
+def test_hash_ignores_int_and_float_storage(dataset_df, schema):
+    hash_columns = get_feature_columns(dataset_df, schema)
+    complete_df = dataset_df.dropna()
+    float_df = complete_df.astype("float64")
+    int_columns = [column for column in hash_columns if (complete_df[column] % 1 == 0).all()]
+    int_df = complete_df.astype({column: "int64" for column in int_columns})
+    np.testing.assert_array_equal(get_row_hash(dataframe=int_df, hash_columns=hash_columns),
+                                  get_row_hash(dataframe=float_df, hash_columns=hash_columns))
+
+
+def test_split_is_stratified():
+    dataframe = get_synthetic_df(rows=200000, positive_share=0.15)
+    test_mask = get_test_mask(dataframe=dataframe, hash_columns=["id", "age", "glucose"], test_size=TEST_SIZE, seed=42)
+    #the test share of every class is test_size up to the sampling noise (below 4 standard deviations here)
+    for label in [0, 1]:
+        is_class = (dataframe["target"] == label).to_numpy()
+        class_rows = is_class.sum()
+        noise = np.sqrt(TEST_SIZE * (1 - TEST_SIZE) / class_rows)
+        assert abs(test_mask[is_class].mean() - TEST_SIZE) < 4 * noise
+    positive_share = dataframe["target"].mean()
+    assert dataframe["target"][test_mask].mean() == pytest.approx(positive_share, abs=0.005)
+    assert dataframe["target"][~test_mask].mean() == pytest.approx(positive_share, abs=0.005)
+
+
+def test_hash_split_chunks_matches_the_whole_dataset(tmp_path, dataset_df, schema):
+    target_column = schema["target_column"]
+    chunk_report = hash_split_chunks(chunk_iterator=(dataset_df.iloc[start:start + 500]
+                                                     for start in range(0, len(dataset_df), 500)),
+                                     train_file_path=str(tmp_path / "chunks" / "train.parquet"),
+                                     test_file_path=str(tmp_path / "chunks" / "test.parquet"),
+                                     target_column=target_column, test_size=TEST_SIZE, seed=42)
+    whole_report = hash_split_chunks(chunk_iterator=iter([dataset_df]),
+                                     train_file_path=str(tmp_path / "whole" / "train.parquet"),
+                                     test_file_path=str(tmp_path / "whole" / "test.parquet"),
+                                     target_column=target_column, test_size=TEST_SIZE, seed=42)
+    assert chunk_report == whole_report
+    assert chunk_report.rows == len(dataset_df)
+    assert chunk_report.train_rows + chunk_report.test_rows == len(dataset_df)
+    for split_name in ["train", "test"]:
+        chunk_split_df = pd.read_parquet(tmp_path / "chunks" / f"{split_name}.parquet")
+        whole_split_df = pd.read_parquet(tmp_path / "whole" / f"{split_name}.parquet")
+        pd.testing.assert_frame_equal(chunk_split_df, whole_split_df)
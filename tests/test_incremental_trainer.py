@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+from src.Heart_Attack_Risk_Analyzer_Project.component.incremental_trainer import apply_incremental_update, get_data_profile
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from src.Heart_Attack_Risk_Analyzer_Project.exception import HeartRiskException
+from src.Heart_Attack_Risk_Analyzer_Project.utils.knn_imputer import ReferenceKNNImputer
+from tests.utils import fit_preprocessing_and_model, get_model_input
+
+BASE_ROWS = 2000
+BATCH_ROWS = 500
+
+
+def get_update_inputs(dataset_df, schema, feature_columns, model) -> dict:
+    """
+    objects fitted on the first BASE_ROWS complete rows, the next BATCH_ROWS rows as the batch and
+    every training row as the replay sample
+    """
+    target_column = schema[DATA_VALIDATION_GET_TARGET_COLUMN_KEY]
+    complete_df = dataset_df.dropna().reset_index(drop=True)
+    base_df = complete_df.iloc[:BASE_ROWS]
+    batch_df = get_model_input(complete_df.iloc[BASE_ROWS:BASE_ROWS + BATCH_ROWS], *feature_columns)
+    batch_df[target_column] = complete_df[target_column].iloc[BASE_ROWS:BASE_ROWS + BATCH_ROWS].to_numpy()
+    preprocessing_obj, model = fit_preprocessing_and_model(train_df=base_df, feature_columns=feature_columns,
+                                                           target_column=target_column,
+                                                           numerical_imputer=ReferenceKNNImputer(n_neighbors=5), model=model)
+    replay_arr = np.c_[preprocessing_obj.transform(get_model_input(base_df, *feature_columns)),
+                       base_df[target_column].astype(float).to_numpy()]
+    data_profile = get_data_profile(base_df, schema)
+    return dict(preprocessing_obj=preprocessing_obj, model=model, batch_df=batch_df, target_column_name=target_column,
+                data_profile=data_profile, batch_profile=get_data_profile(batch_df, schema, data_profile),
+                replay_arr=replay_arr, replay_rows_seen=len(replay_arr), replay_sample_size=len(replay_arr) + BATCH_ROWS,
+                resample=False, random_state=42)
+
+
+@pytest.mark.parametrize("model, update_method", [(GaussianNB(), PARTIAL_FIT_UPDATE_METHOD),
+                                                  (LogisticRegression(max_iter=1000), WARM_START_UPDATE_METHOD),
+                                                  (LogisticRegression(solver="liblinear"), REFIT_UPDATE_METHOD)],
+                         ids=["partial_fit", "warm_start", "liblinear"])
+def test_update_method(dataset_df, schema, feature_columns, model, update_method):
+    update_inputs = get_update_inputs(dataset_df, schema, feature_columns, model)
+    incremental_update = apply_incremental_update(**update_inputs)
+    assert incremental_update.update_method == update_method
+    assert incremental_update.replay_rows_seen == BASE_ROWS + BATCH_ROWS
+    #the KNN imputer keeps the batch rows with the training rows
+    num_imputer = incremental_update.preprocessing_obj.named_transformers_['num_pipeline'].steps[0][1]
+    assert len(num_imputer.reference_) == BASE_ROWS + BATCH_ROWS
+
+
+def test_liblinear_is_refitted_on_every_row(dataset_df, schema, feature_columns):
+    update_inputs = get_update_inputs(dataset_df, schema, feature_columns, LogisticRegression(solver="liblinear"))
+    incremental_update = apply_incremental_update(**update_inputs)
+    #same model as a fit from scratch on the replay rows and the batch rows
+    refit_model = clone(incremental_update.model).fit(incremental_update.replay_arr[:, :-1], incremental_update.replay_arr[:, -1])
+    assert not incremental_update.model.warm_start
+    np.testing.assert_allclose(incremental_update.model.coef_, refit_model.coef_, rtol=0, atol=1e-9)
+
+
+def test_liblinear_without_every_row_is_not_updated(dataset_df, schema, feature_columns):
+    update_inputs = get_update_inputs(dataset_df, schema, feature_columns, LogisticRegression(solver="liblinear"))
+    update_inputs["replay_rows_seen"] += 1
+    coef = update_inputs["model"].coef_.copy()
+    num_imputer = update_inputs["preprocessing_obj"].named_transformers_['num_pipeline'].steps[0][1]
+    with pytest.raises(HeartRiskException, match="run the full training pipeline"):
+        apply_incremental_update(**update_inputs)
+    #nothing was changed before the update failed
+    np.testing.assert_array_equal(update_inputs["model"].coef_, coef)
+    assert len(num_imputer.reference_) == BASE_ROWS
@@ -0,0 +1,40 @@
+import logging
+import pytest
+from sklearn.model_selection import GridSearchCV
+from sklearn.naive_bayes import GaussianNB
+from src.Heart_Attack_Risk_Analyzer_Project.entity.model_factory import InitializedModelDetail
+from src.Heart_Attack_Risk_Analyzer_Project.entity.parallel_search import ParallelSearchScheduler
+
+PARAM_GRID = {"var_smoothing": [1e-9, 1e-7, 1e-5, 1e-3, 1e-1]}
+
+
+@pytest.fixture(scope="module")
+def training_data(dataset_df, schema):
+    complete_df = dataset_df.dropna().iloc[:1500]
+    return complete_df.drop(columns=schema["target_column"]).to_numpy(dtype=float), complete_df[schema["target_column"]].to_numpy()
+
+
+def search(training_data, verbose: int = 0):
+    initialized_model = InitializedModelDetail(model_serial_number="module_0", model=GaussianNB(),
+                                               param_grid_search=PARAM_GRID, model_name="nb")
+    return ParallelSearchScheduler(n_workers=1, cv=5, verbose=verbose).search([initialized_model], *training_data)[0]
+
+
+def test_in_process_search_matches_grid_search(training_data):
+    grid_search = GridSearchCV(GaussianNB(), param_grid=PARAM_GRID, cv=5).fit(*training_data)
+    result = search(training_data)
+    assert result.best_parameters == grid_search.best_params_
+    assert result.best_score == pytest.approx(grid_search.best_score_, abs=1e-12)
+
+
+def test_work_units_are_logged_at_debug_and_progress_every_tenth(caplog, training_data):
+    caplog.set_level(logging.DEBUG)
+    search(training_data, verbose=2)
+    #5 candidates * 5 folds
+    unit_record_list = [record for record in caplog.records if "candidate [" in record.getMessage()]
+    progress_record_list = [record for record in caplog.records if "search work units done" in record.getMessage()]
+    assert len(unit_record_list) == 25
+    assert {record.levelno for record in unit_record_list} == {logging.DEBUG}
+    assert [record.getMessage() for record in progress_record_list] == [
+        f"[{units_done}/25] search work units done." for units_done in [3, 6, 9, 12, 15, 18, 21, 24, 25]]
+    assert {record.levelno for record in progress_record_list} == {logging.INFO}
@@ -0,0 +1,109 @@
+import os
+import pandas as pd
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.utils import row_index
+from src.Heart_Attack_Risk_Analyzer_Project.utils.row_index import RowFingerprintIndex
+
+
+@pytest.fixture
+def batch_df_list(dataset_df) -> list:
+    """
+    three daily batches: the second repeats 300 rows of the first, the third repeats rows of both and one of its own
+    """
+    first_df = dataset_df.iloc[0:1000]
+    second_df = pd.concat([dataset_df.iloc[700:1000], dataset_df.iloc[1000:1800]])
+    third_df = pd.concat([dataset_df.iloc[1800:2400], dataset_df.iloc[100:200], dataset_df.iloc[1500:1600],
+                          dataset_df.iloc[2000:2050]])
+    return [first_df, second_df, third_df]
+
+
+def ingest(index_dir: str, batch_df_list: list, chunk_size: int = 250) -> list:
+    """
+    rows of every batch kept by the index, the batches are checked chunk by chunk like the ingestion reads them
+    """
+    index = RowFingerprintIndex(index_dir=index_dir).open()
+    kept_df_list = []
+    for batch_number, batch_df in enumerate(batch_df_list):
+        fingerprint_columns = list(batch_df.columns)
+        kept_df_list.append(pd.concat([index.drop_duplicates(dataframe=batch_df.iloc[start:start + chunk_size],
+                                                             batch_key=f"batch-{batch_number}",
+                                                             fingerprint_columns=fingerprint_columns)
+                                       for start in range(0, len(batch_df), chunk_size)]))
+    index.commit()
+    return kept_df_list
+
+
+def test_rows_of_earlier_batches_are_dropped(tmp_path, batch_df_list):
+    kept_df_list = ingest(str(tmp_path / "row_index"), batch_df_list)
+    assert [len(kept_df) for kept_df in kept_df_list] == [1000, 800, 600]
+    pd.testing.assert_frame_equal(pd.concat(kept_df_list).sort_index(),
+                                  pd.concat(batch_df_list).drop_duplicates().sort_index())
+
+
+def test_batches_ingested_in_separate_runs(tmp_path, batch_df_list):
+    index_dir = str(tmp_path / "row_index")
+    #every day a new batch joins the dataset, the rows of the earlier days come from their own batch
+    for day in range(1, len(batch_df_list) + 1):
+        index = RowFingerprintIndex(index_dir=index_dir).open()
+        index.set_active_batches([f"batch-{batch_number}" for batch_number in range(day)])
+        kept_rows = [len(index.drop_duplicates(dataframe=batch_df, batch_key=f"batch-{batch_number}",
+                                               fingerprint_columns=list(batch_df.columns)))
+                     for batch_number, batch_df in enumerate(batch_df_list[:day])]
+        index.commit()
+        assert kept_rows == [1000, 800, 600][:day]
+
+
+def test_rows_of_batches_not_ingested_are_kept(tmp_path, batch_df_list):
+    index_dir = str(tmp_path / "row_index")
+    ingest(index_dir, batch_df_list)
+    #the first batch left the dataset, its rows in the other batches are not duplicates anymore
+    index = RowFingerprintIndex(index_dir=index_dir).open()
+    index.set_active_batches(["batch-1", "batch-2"])
+    kept_rows = [len(index.drop_duplicates(dataframe=batch_df, batch_key=f"batch-{batch_number}",
+                                           fingerprint_columns=list(batch_df.columns)))
+                 for batch_number, batch_df in enumerate(batch_df_list) if batch_number > 0]
+    index.commit()
+    assert kept_rows == [1100, 700]
+
+
+def test_grown_batch_keeps_its_rows(tmp_path, dataset_df):
+    index_dir = str(tmp_path / "row_index")
+    assert len(ingest(index_dir, [dataset_df.iloc[:3000]])[0]) == 3000
+    #the same file with more rows is the same batch, none of its earlier rows is dropped
+    assert len(ingest(index_dir, [dataset_df])[0]) == len(dataset_df.drop_duplicates())
+
+
+def test_rerun_keeps_the_same_rows(tmp_path, batch_df_list):
+    index_dir = str(tmp_path / "row_index")
+    first_kept_df_list = ingest(index_dir, batch_df_list)
+    #every pipeline run reads the whole dataset again, a batch never loses its rows to itself
+    for _ in range(2):
+        kept_df_list = ingest(index_dir, batch_df_list, chunk_size=333)
+        for kept_df, first_kept_df in zip(kept_df_list, first_kept_df_list):
+            pd.testing.assert_frame_equal(kept_df, first_kept_df)
+
+
+def test_rows_repeated_in_a_batch_are_dropped(tmp_path, dataset_df):
+    batch_df = pd.concat([dataset_df.iloc[:100], dataset_df.iloc[50:150], dataset_df.iloc[:10]])
+    kept_df = ingest(str(tmp_path / "row_index"), [batch_df], chunk_size=80)[0]
+    assert len(kept_df) == 150
+    assert not kept_df.duplicated().any()
+
+
+def test_runs_are_merged(tmp_path, dataset_df):
+    index_dir = str(tmp_path / "row_index")
+    for batch_number in range(8):
+        batch_df = dataset_df.iloc[batch_number * 100:(batch_number + 1) * 100]
+        index = RowFingerprintIndex(index_dir=index_dir).open()
+        index.drop_duplicates(dataframe=batch_df, batch_key=f"batch-{batch_number}",
+                              fingerprint_columns=list(batch_df.columns))
+        index.commit()
+
+    index = RowFingerprintIndex(index_dir=index_dir).open()
+    #size tiered runs, fewer runs than batches and no file left of the merged runs
+    assert index.manifest["rows"] == 800
+    assert len(index.manifest["runs"]) < 8
+    run_file_names = {run["name"] + suffix for run in index.manifest["runs"]
+                      for suffix in [row_index.FINGERPRINT_FILE_SUFFIX, row_index.ORDINAL_FILE_SUFFIX]}
+    assert {file_name for file_name in os.listdir(index_dir) if file_name.endswith(".npy")} == run_file_names
+    index.close()
@@ -0,0 +1,70 @@
+import os
+import yaml
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.constant import *
+from src.Heart_Attack_Risk_Analyzer_Project.pipeline.scheduler import PipelineScheduler
+from src.Heart_Attack_Risk_Analyzer_Project.pipeline.stage_cache import StageCache
+from tests.utils import get_config_info, write_config_file
+
+#one model and two candidates, a run takes seconds
+MODEL_CONFIG_INFO = {
+    "grid_search": {"class": "GridSearchCV", "module": "sklearn.model_selection", "params": {"cv": 2, "verbose": 0},
+                    "n_workers": 1, "engine": "grid"},
+    "model_selection": {"module_0": {"class": "GaussianNB", "module": "sklearn.naive_bayes", "params": {"priors": None},
+                                     "search_param_grid": {"var_smoothing": [1.0e-9, 1.0e-8]}}}
+}
+
+
+def get_scheduler(config_file_path: str) -> PipelineScheduler:
+    scheduler_config = Config(config_file_path=config_file_path).get_scheduler_config()
+    return PipelineScheduler(scheduler_config=scheduler_config._replace(n_workers=1, poll_interval_seconds=0.1))
+
+
+@pytest.fixture
+def config_file_path(tmp_path) -> str:
+    config_info = get_config_info(tmp_path)
+    model_config_dir = tmp_path / "model"
+    os.makedirs(model_config_dir)
+    with open(model_config_dir / "model.yaml", "w") as model_config_file:
+        yaml.safe_dump(MODEL_CONFIG_INFO, model_config_file)
+    config_info["model_trainer_config"]["model_config_dir"] = str(model_config_dir)
+    config_info["model_trainer_config"]["base_accuracy"] = 0.5
+    config_info["stage_cache_config"].update(enabled=True, max_size_mb=None, max_age_days=None)
+    return write_config_file(tmp_path, config_info)
+
+
+def test_jobs_sharing_the_stage_cache_keep_their_own_artifacts(config_file_path):
+    scheduler = get_scheduler(config_file_path)
+    job_id_list = [scheduler.submit(config_file_path=config_file_path) for _ in range(2)]
+    scheduler.shutdown()
+    first_job, second_job = [scheduler.get_job(job_id) for job_id in job_id_list]
+    assert [first_job.status, second_job.status] == [JOB_COMPLETED_STATUS] * 2, [first_job.message, second_job.message]
+
+    #the second run is served by the cache, with the files in its own stage dirs
+    first_model_file_path = first_job.model_trainer_artifact["trained_model_file_path"]
+    second_model_file_path = second_job.model_trainer_artifact["trained_model_file_path"]
+    assert second_job.time_stamp in second_model_file_path
+    assert os.path.samefile(first_model_file_path, second_model_file_path)
+
+    #evicting every entry keeps the model prediction loads
+    config = Config(config_file_path=config_file_path)
+    StageCache(stage_cache_config=config.get_stage_cache_config()._replace(max_size_mb=0, evict_interval_hours=None)).evict()
+    assert StageCache(stage_cache_config=config.get_stage_cache_config()).get_entry_list() == []
+    latest_model_file_path = config.get_latest_artifact_file_path(MODEL_TRAINER_ARTIFACT_DIR, "trained_model", "model.pkl")
+    assert latest_model_file_path in [first_model_file_path, second_model_file_path]
+
+
+def test_failed_and_cancelled_jobs(tmp_path, config_file_path):
+    config_info = get_config_info(tmp_path)
+    config_info["data_ingestion_config"]["source"]["path"] = str(tmp_path / "missing.csv")
+    failing_config_file_path = write_config_file(tmp_path, config_info, file_name="failing.yaml")
+
+    scheduler = get_scheduler(config_file_path)
+    failing_job_id = scheduler.submit(config_file_path=failing_config_file_path)
+    queued_job_id = scheduler.submit(config_file_path=config_file_path)
+    assert scheduler.cancel(queued_job_id).status == JOB_CANCELLED_STATUS
+    scheduler.shutdown()
+    assert scheduler.get_job(failing_job_id).status == JOB_FAILED_STATUS
+    assert scheduler.get_job(queued_job_id).status == JOB_CANCELLED_STATUS
+    assert {job.job_id for job in scheduler.list_jobs()} == {failing_job_id, queued_job_id}
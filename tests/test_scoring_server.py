@@ -0,0 +1,128 @@
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from src.Heart_Attack_Risk_Analyzer_Project.component.model_predictor import HeartRiskPredictor
+from src.Heart_Attack_Risk_Analyzer_Project.component.scoring_server import ScoringServer
+from src.Heart_Attack_Risk_Analyzer_Project.constant import PREDICTION_DILL_ARTIFACT_FORMAT
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import PredictionConfig, ServingConfig
+from src.Heart_Attack_Risk_Analyzer_Project.utils.utils import save_object
+from tests.utils import fit_preprocessing_and_model
+
+
+@pytest.fixture(scope="module")
+def prediction_config(tmp_path_factory, dataset_df, schema, schema_file_path, feature_columns) -> PredictionConfig:
+    """
+    dill artifacts of a model fitted on the dataset, as the training pipeline saves them
+    """
+    artifact_dir = tmp_path_factory.mktemp("artifact")
+    preprocessing_obj, model = fit_preprocessing_and_model(train_df=dataset_df.iloc[:3000], feature_columns=feature_columns,
+                                                           target_column=schema["target_column"],
+                                                           numerical_imputer=SimpleImputer(strategy="median"),
+                                                           model=LogisticRegression(max_iter=1000))
+    save_object(file_path=str(artifact_dir / "preprocessed.pkl"), obj=preprocessing_obj)
+    save_object(file_path=str(artifact_dir / "model.pkl"), obj=model)
+    return PredictionConfig(preprocessed_object_file_path=str(artifact_dir / "preprocessed.pkl"),
+                            trained_model_file_path=str(artifact_dir / "model.pkl"),
+                            schema_file_path=schema_file_path,
+                            chunk_size=1000,
+                            benchmark_batch_sizes=[1],
+                            artifact_format=PREDICTION_DILL_ARTIFACT_FORMAT,
+                            preprocessed_array_dir=None,
+                            model_array_dir=None,
+                            compile_kernel=True)
+
+
+@pytest.fixture(scope="module")
+def record_list(dataset_df, schema) -> list:
+    """
+    patients of rows not seen in the fit as json objects, missing values as null
+    """
+    feature_df = dataset_df.iloc[3000:3020].drop(columns=schema["target_column"])
+    return json.loads(feature_df.to_json(orient="records"))
+
+
+def get_scoring_server(prediction_config: PredictionConfig, compile_kernel: bool = True) -> ScoringServer:
+    serving_config = ServingConfig(host="127.0.0.1", port=0, max_batch_size=8, max_wait_ms=5, metrics_window=100)
+    return ScoringServer(serving_config=serving_config,
+                         predictor=HeartRiskPredictor(prediction_config=prediction_config._replace(compile_kernel=compile_kernel)))
+
+
+def run_requests(scoring_server: ScoringServer, body_list: list) -> list:
+    """
+    (status, response) of every body, the requests are handled at the same time so they share micro batches
+    """
+    async def handle_requests():
+        await scoring_server.start()
+        try:
+            return await asyncio.gather(*[scoring_server.handle_request("POST", "/predict", json.dumps(body).encode())
+                                          for body in body_list])
+        finally:
+            await scoring_server.stop()
+    return asyncio.run(handle_requests())
+
+
+def test_predictor_kernel_matches_sklearn_path(prediction_config, dataset_df):
+    kernel_predictor = HeartRiskPredictor(prediction_config=prediction_config)
+    sklearn_predictor = HeartRiskPredictor(prediction_config=prediction_config._replace(compile_kernel=False))
+    assert kernel_predictor.kernel is not None and sklearn_predictor.kernel is None
+    score_df = dataset_df.iloc[3000:]
+    kernel_prediction_df = kernel_predictor.predict(score_df)
+    sklearn_prediction_df = sklearn_predictor.predict(score_df)
+    np.testing.assert_allclose(kernel_prediction_df[kernel_predictor.probability_column],
+                               sklearn_prediction_df[sklearn_predictor.probability_column], rtol=0, atol=1e-9)
+    pd.testing.assert_series_equal(kernel_prediction_df[kernel_predictor.prediction_column],
+                                   sklearn_prediction_df[sklearn_predictor.prediction_column])
+
+
+def test_predict_file_matches_predict(prediction_config, dataset_df, tmp_path):
+    predictor = HeartRiskPredictor(prediction_config=prediction_config)
+    input_file_path = str(tmp_path / "patients.csv")
+    dataset_df.iloc[3000:].to_csv(input_file_path, index=False)
+    prediction_report = predictor.predict_file(input_file_path=input_file_path,
+                                               output_file_path=str(tmp_path / "scored.parquet"), chunk_size=300)
+    assert prediction_report.rows == len(dataset_df) - 3000
+    assert prediction_report.batches == int(np.ceil(prediction_report.rows / 300))
+    scored_df = pd.read_parquet(tmp_path / "scored.parquet")
+    np.testing.assert_allclose(scored_df[predictor.probability_column],
+                               predictor.predict_proba(dataset_df.iloc[3000:]), rtol=0, atol=1e-12)
+
+
+def test_record_errors(prediction_config, record_list):
+    predictor = HeartRiskPredictor(prediction_config=prediction_config)
+    assert predictor.get_record_errors(record_list[0]) == []
+    #null is a missing value, imputed like in training
+    assert predictor.get_record_errors(dict(record_list[0], glucose=None)) == []
+    assert len(predictor.get_record_errors({"male": 1})) == len(predictor.numerical_columns + predictor.categorical_columns) - 1
+    for value in ["high", True, [1], float("nan")]:
+        assert predictor.get_record_errors(dict(record_list[0], age=value)) == \
+            [f"value [{value}] of column [age] is not a number"]
+
+
+@pytest.mark.parametrize("compile_kernel", [True, False], ids=["kernel", "sklearn"])
+def test_batched_scores_match_predict_record(prediction_config, record_list, compile_kernel):
+    scoring_server = get_scoring_server(prediction_config, compile_kernel=compile_kernel)
+    response_list = run_requests(scoring_server, record_list)
+    assert [status for status, _ in response_list] == [200] * len(record_list)
+    assert scoring_server.metrics.total_batches < len(record_list)
+    for (_, response), record in zip(response_list, record_list):
+        expected = scoring_server.predictor.predict_record(record)
+        assert response[scoring_server.predictor.prediction_column] == expected[scoring_server.predictor.prediction_column]
+        assert response[scoring_server.predictor.probability_column] == \
+            pytest.approx(expected[scoring_server.predictor.probability_column], abs=1e-12)
+
+
+def test_invalid_records_get_400_and_do_not_fail_the_batch(prediction_config, record_list):
+    scoring_server = get_scoring_server(prediction_config)
+    body_list = [record_list[0], {"male": 1}, dict(record_list[1], age="x"), record_list[2:5],
+                 [record_list[5], {"male": 1}], "text", []]
+    response_list = run_requests(scoring_server, body_list)
+    assert [status for status, _ in response_list] == [200, 400, 400, 200, 400, 400, 400]
+    assert list(response_list[2][1]["record_errors"]) == [0]
+    assert list(response_list[4][1]["record_errors"]) == [1]
+    assert len(response_list[3][1]) == 3
+    #the invalid records were never queued, only the 4 valid records were scored
+    assert sum(scoring_server.metrics.batch_size_list) == 4
@@ -0,0 +1,93 @@
+import os
+import time
+import pytest
+from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import ModelTrainerArtifact
+from src.Heart_Attack_Risk_Analyzer_Project.entity.config_entity import StageCacheConfig
+from src.Heart_Attack_Risk_Analyzer_Project.pipeline.stage_cache import StageCache, fcntl
+
+STAGE_NAME = "model_trainer"
+
+
+def get_stage_cache(tmp_path, **config_info) -> StageCache:
+    config_info = {"max_age_days": None, "max_size_mb": None, "evict_interval_hours": None, **config_info}
+    return StageCache(stage_cache_config=StageCacheConfig(enabled=True, cache_dir=str(tmp_path / "stage_cache"),
+                                                          artifact_dir=str(tmp_path), **config_info))
+
+
+def run_stage(tmp_path, stage_cache: StageCache, time_stamp: str, stage_key: str = "key") -> ModelTrainerArtifact:
+    """
+    the artifact of the stage for a run, from the cache or written in the stage dir of the run on a miss
+    """
+    stage_artifact_dir = str(tmp_path / STAGE_NAME / time_stamp)
+    artifact = stage_cache.get_artifact(STAGE_NAME, stage_key, ModelTrainerArtifact, stage_artifact_dir=stage_artifact_dir)
+    if artifact is not None:
+        return artifact
+    model_file_path = os.path.join(stage_artifact_dir, "trained_model", "model.pkl")
+    os.makedirs(os.path.dirname(model_file_path))
+    with open(model_file_path, "wb") as model_file:
+        model_file.write(os.urandom(64 * 1024))
+    artifact = ModelTrainerArtifact(is_trained=True, message="trained", trained_model_file_path=model_file_path,
+                                    model_name="GaussianNB", best_parameters={}, best_score=0.8, model_array_dir=None)
+    stage_cache.save_artifact(STAGE_NAME, stage_key, artifact, stage_artifact_dir=stage_artifact_dir)
+    return artifact
+
+
+def test_hit_is_linked_into_the_run_dir(tmp_path):
+    stage_cache = get_stage_cache(tmp_path)
+    first_artifact = run_stage(tmp_path, stage_cache, "run-1")
+    second_artifact = run_stage(tmp_path, stage_cache, "run-2")
+    #the second run gets the same files in its own dir
+    assert second_artifact.trained_model_file_path == str(tmp_path / STAGE_NAME / "run-2" / "trained_model" / "model.pkl")
+    assert os.path.samefile(second_artifact.trained_model_file_path, first_artifact.trained_model_file_path)
+    assert second_artifact._replace(trained_model_file_path=None) == first_artifact._replace(trained_model_file_path=None)
+    #the entry moved to the run that used it last
+    entry_list = stage_cache.get_entry_list()
+    assert len(entry_list) == 1
+    assert entry_list[0][1]["stage_artifact_dir"] == str(tmp_path / STAGE_NAME / "run-2")
+    assert entry_list[0][1]["used_at"] > entry_list[0][1]["created_at"]
+
+
+def test_eviction_keeps_the_files_of_other_runs(tmp_path):
+    stage_cache = get_stage_cache(tmp_path, max_size_mb=0)
+    first_artifact = run_stage(tmp_path, stage_cache, "run-1")
+    run_stage(tmp_path, stage_cache, "run-2", stage_key="other-key")
+    assert stage_cache.evict() == 2
+    #the entries are gone, the dir of run-1 with them, the newest dir of the stage is kept for prediction
+    assert stage_cache.get_entry_list() == []
+    assert not os.path.exists(first_artifact.trained_model_file_path)
+    assert os.path.exists(tmp_path / STAGE_NAME / "run-2" / "trained_model" / "model.pkl")
+
+
+def test_eviction_of_a_linked_entry_keeps_the_run_files(tmp_path):
+    stage_cache = get_stage_cache(tmp_path, max_size_mb=0)
+    first_artifact = run_stage(tmp_path, stage_cache, "run-1")
+    second_artifact = run_stage(tmp_path, stage_cache, "run-2")
+    run_stage(tmp_path, stage_cache, "run-3", stage_key="other-key")
+    stage_cache.evict()
+    #the entry of run-2 is evicted, run-1 still has its own link to the files
+    assert not os.path.exists(second_artifact.trained_model_file_path)
+    assert os.path.exists(first_artifact.trained_model_file_path)
+
+
+@pytest.mark.skipif(fcntl is None, reason="no inter process lock without fcntl")
+def test_no_eviction_while_a_run_holds_the_cache(tmp_path):
+    run_stage(tmp_path, get_stage_cache(tmp_path), "run-1")
+    running_stage_cache = get_stage_cache(tmp_path).open()
+    try:
+        assert get_stage_cache(tmp_path, max_age_days=0).evict() == 0
+        assert len(running_stage_cache.get_entry_list()) == 1
+    finally:
+        running_stage_cache.close()
+    assert get_stage_cache(tmp_path, max_age_days=0).evict() == 1
+
+
+def test_eviction_interval(tmp_path):
+    run_stage(tmp_path, get_stage_cache(tmp_path), "run-1")
+    stage_cache = get_stage_cache(tmp_path, max_age_days=1, evict_interval_hours=1)
+    assert stage_cache.evict() == 0
+    time.sleep(0.01)
+    #an hour did not pass since the last eviction, the entry is not checked again
+    stage_cache = get_stage_cache(tmp_path, max_age_days=0, evict_interval_hours=1)
+    assert stage_cache.evict() == 0
+    assert len(stage_cache.get_entry_list()) == 1
+    assert get_stage_cache(tmp_path, max_age_days=0, evict_interval_hours=0).evict() == 1
@@ -0,0 +1,67 @@
+import os
+import yaml
+import pandas as pd
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from src.Heart_Attack_Risk_Analyzer_Project.component.data_transformation import DataTransformation
+from src.Heart_Attack_Risk_Analyzer_Project.config.config import Config
+from src.Heart_Attack_Risk_Analyzer_Project.constant import CONFIG_FILE_PATH
+from src.Heart_Attack_Risk_Analyzer_Project.entity.artifact_entity import DataValidationArtifact
+from tests.conftest import DATASET_FILE_PATH, SCHEMA_FILE_PATH
+
+
+def get_config_info(tmp_path) -> dict:
+    """
+    config.yaml of the repository with the artifacts under tmp_path and the dataset of experiment/ as source
+    """
+    with open(CONFIG_FILE_PATH) as config_file:
+        config_info = yaml.safe_load(config_file)
+    config_info["training_pipeline_config"]["artifact_dir"] = str(tmp_path / "artifact")
+    data_ingestion_info = config_info["data_ingestion_config"]
+    data_ingestion_info["source"] = dict(data_ingestion_info["source"], type="local_file", path=DATASET_FILE_PATH)
+    return config_info
+
+
+def write_config_file(tmp_path, config_info: dict, file_name: str = "config.yaml") -> str:
+    config_file_path = str(tmp_path / file_name)
+    with open(config_file_path, "w") as config_file:
+        yaml.safe_dump(config_info, config_file)
+    return config_file_path
+
+
+def get_model_input(dataframe: pd.DataFrame, numerical_columns: list, categorical_columns: list) -> pd.DataFrame:
+    """
+    feature columns cast like HeartRiskPredictor.prepare_input
+    """
+    input_df = pd.DataFrame({column: dataframe[column].astype("float") for column in numerical_columns})
+    for column in categorical_columns:
+        input_df[column] = dataframe[column].astype("object")
+    return input_df
+
+
+def get_data_transformer_object(numerical_imputer=None) -> ColumnTransformer:
+    """
+    unfitted preprocessing object of DataTransformation for config.yaml and schema.yaml of the repository,
+    with numerical_imputer in place of the configured one when given
+    """
+    data_validation_artifact = DataValidationArtifact(*[None] * len(DataValidationArtifact._fields))._replace(
+        schema_file_path=SCHEMA_FILE_PATH)
+    data_transformation = DataTransformation(data_ingestion_artifact=None, data_validation_artifact=data_validation_artifact,
+                                             data_transformation_config=Config().get_data_transformation_config())
+    preprocessing_obj = data_transformation.get_data_transformer_object()
+    if numerical_imputer is not None:
+        preprocessing_obj.set_params(num_pipeline__imputer=clone(numerical_imputer))
+    return preprocessing_obj
+
+
+def fit_preprocessing_and_model(train_df: pd.DataFrame, feature_columns: tuple, target_column: str,
+                                numerical_imputer, model) -> tuple:
+    """
+    preprocessing object of DataTransformation with numerical_imputer and the model fitted on it
+    return: (fitted preprocessing object, fitted model)
+    """
+    preprocessing_obj = get_data_transformer_object(numerical_imputer=numerical_imputer)
+    features = preprocessing_obj.fit_transform(get_model_input(train_df, *feature_columns))
+    model = clone(model)
+    model.fit(features, train_df[target_column])
+    return preprocessing_obj, model